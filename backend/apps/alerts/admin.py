@@ -8,12 +8,16 @@ class AlertRuleAdmin(admin.ModelAdmin):
     list_display = (
         "code",
         "name",
+        "kind",
         "severity",
         "min_glycemia",
         "max_glycemia",
+        "rate_limit",
+        "horizon_minutes",
+        "risk_threshold",
         "is_active",
     )
-    list_filter = ("severity", "is_active")
+    list_filter = ("kind", "severity", "is_active")
     search_fields = ("code", "name", "description")
     ordering = ("severity", "code")
 
@@ -39,6 +43,7 @@ class AlertEventAdmin(admin.ModelAdmin):
         "user",
         "rule",
         "glycemia_value",
+        "readings_count",
         "status",
         "triggered_at",
         "push_sent_at",
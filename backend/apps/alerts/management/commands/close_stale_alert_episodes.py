@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from apps.alerts.services.trigger import close_stale_episodes
+
+
+class Command(BaseCommand):
+    help = "Clôt les épisodes d'alerte restés ouverts sans nouvelle mesure"
+
+    def handle(self, *args, **kwargs):
+        closed = close_stale_episodes()
+        self.stdout.write(self.style.SUCCESS(f"Épisodes clos: {closed}"))
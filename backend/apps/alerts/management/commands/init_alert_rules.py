@@ -1,29 +1,47 @@
 from django.core.management.base import BaseCommand
 
-from apps.alerts.models import AlertRule, AlertSeverity
+from apps.alerts.models import AlertRule, AlertRuleKind, AlertSeverity
+from apps.glycemia.thresholds import HYPER_THRESHOLD, HYPO_THRESHOLD
 
 RULES = [
     {
         "code": "HYPO",
         "name": "Hypoglycémie",
-        "description": "Glycémie inférieure à 70 mg/dL",
-        "max_glycemia": 69,
+        "description": f"Glycémie inférieure à {HYPO_THRESHOLD} mg/dL",
+        "max_glycemia": HYPO_THRESHOLD - 1,
         "min_glycemia": None,
         "severity": AlertSeverity.CRITICAL,
     },
     {
         "code": "HYPER",
         "name": "Hyperglycémie",
-        "description": "Glycémie supérieure à 180 mg/dL",
-        "min_glycemia": 181,
+        "description": f"Glycémie supérieure à {HYPER_THRESHOLD} mg/dL",
+        "min_glycemia": HYPER_THRESHOLD + 1,
         "max_glycemia": None,
         "severity": AlertSeverity.HIGH,
     },
+    {
+        "code": "PRED_HYPO_30",
+        "name": "Hypoglycémie probable",
+        "description": "Risque d'hypoglycémie d'au moins 70 % dans les 30 minutes (prédiction IA)",
+        "kind": AlertRuleKind.PREDICTED_HYPO,
+        "horizon_minutes": 30,
+        "risk_threshold": 0.7,
+        "severity": AlertSeverity.HIGH,
+    },
+    {
+        "code": "FAST_DROP",
+        "name": "Chute rapide",
+        "description": "Glycémie en baisse d'au moins 2 mg/dL par minute",
+        "kind": AlertRuleKind.RATE,
+        "rate_limit": -2.0,
+        "severity": AlertSeverity.MEDIUM,
+    },
 ]
 
 
 class Command(BaseCommand):
-    help = "Create or update the default HYPO/HYPER alert rules"
+    help = "Create or update the default alert rules (thresholds, predictive, rate)"
 
     def handle(self, *args, **options):
         for rule_data in RULES:
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.7 on 2026-10-19 15:27
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alerts', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='alertevent',
+            name='horizon_minutes',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='alertevent',
+            name='risk',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='alertrule',
+            name='horizon_minutes',
+            field=models.PositiveSmallIntegerField(blank=True, choices=[(15, '15 min'), (30, '30 min'), (60, '60 min')], null=True),
+        ),
+        migrations.AddField(
+            model_name='alertrule',
+            name='kind',
+            field=models.CharField(choices=[('VALUE', 'Valeur mesurée'), ('RATE', 'Vitesse de variation'), ('PREDICTED_HYPO', "Risque d'hypo prédit"), ('PREDICTED_HYPER', "Risque d'hyper prédit")], default='VALUE', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='alertrule',
+            name='rate_limit',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='alertrule',
+            name='risk_threshold',
+            field=models.FloatField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(0.0), django.core.validators.MaxValueValidator(1.0)]),
+        ),
+    ]
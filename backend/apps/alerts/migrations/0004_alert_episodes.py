@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-19 15:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alerts', '0003_predictive_rules'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='alertevent',
+            name='last_value_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='alertevent',
+            name='max_value',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='alertevent',
+            name='min_value',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='alertevent',
+            name='readings_count',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
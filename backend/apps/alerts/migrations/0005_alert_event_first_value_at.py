@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 17:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alerts', '0004_alert_episodes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='alertevent',
+            name='first_value_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
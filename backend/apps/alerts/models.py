@@ -20,18 +20,42 @@ class AlertEventStatus(models.TextChoices):
     FAILED = "FAILED", "FAILED"
 
 
+class AlertRuleKind(models.TextChoices):
+    VALUE = "VALUE", "Valeur mesurée"
+    RATE = "RATE", "Vitesse de variation"
+    PREDICTED_HYPO = "PREDICTED_HYPO", "Risque d'hypo prédit"
+    PREDICTED_HYPER = "PREDICTED_HYPER", "Risque d'hyper prédit"
+
+
+class PredictionHorizon(models.IntegerChoices):
+    MIN_15 = 15, "15 min"
+    MIN_30 = 30, "30 min"
+    MIN_60 = 60, "60 min"
+
+
 class AlertRule(models.Model):
     """
-    Règle générique, seuils en mg/dL (bornes inclusives).
+    Règle générique (bornes inclusives) :
+    - VALUE : seuils en mg/dL sur la mesure ;
+    - RATE : `rate_limit` en mg/dL/min (négatif = chute, positif = montée) ;
+    - PREDICTED_HYPO/HYPER : risque IA (0..1) >= `risk_threshold` à `horizon_minutes`.
     """
 
     code = models.SlugField(max_length=50, unique=True)  # ex: "HYPO", "HYPER"
     name = models.CharField(max_length=150)
     description = models.TextField(blank=True, null=True)
 
+    kind = models.CharField(max_length=20, choices=AlertRuleKind.choices, default=AlertRuleKind.VALUE)
+
     min_glycemia = models.IntegerField(blank=True, null=True)  # inclusive
     max_glycemia = models.IntegerField(blank=True, null=True)  # inclusive
 
+    rate_limit = models.FloatField(blank=True, null=True)  # mg/dL/min, inclusive
+    horizon_minutes = models.PositiveSmallIntegerField(choices=PredictionHorizon.choices, blank=True, null=True)
+    risk_threshold = models.FloatField(
+        blank=True, null=True, validators=[MinValueValidator(0.0), MaxValueValidator(1.0)]
+    )
+
     severity = models.PositiveSmallIntegerField(
         choices=AlertSeverity.choices,
         default=AlertSeverity.MEDIUM,
@@ -86,7 +110,12 @@ class UserAlertRule(models.Model):
 
 class AlertEvent(models.Model):
     """
-    Occurrence (historique) + delivery push/in-app + ack.
+    Épisode d'alerte (historique) + delivery push/in-app + ack.
+
+    Un épisode par (user, règle) : ouvert à la première mesure qui matche,
+    mis à jour sur place (nombre de mesures, min/max, dernière mesure) tant
+    que la règle matche, clos (RESOLVED, resolved_at) au retour franc hors
+    seuil (hystérésis) ou après une interruption des mesures.
     """
 
     user = models.ForeignKey(
@@ -95,8 +124,19 @@ class AlertEvent(models.Model):
     rule = models.ForeignKey(AlertRule, on_delete=models.PROTECT, related_name="events")
 
     glycemia_value = models.IntegerField()
+    # Règles prédictives : risque IA et horizon ayant déclenché l'alerte
+    risk = models.FloatField(blank=True, null=True)
+    horizon_minutes = models.PositiveSmallIntegerField(blank=True, null=True)
     triggered_at = models.DateTimeField(auto_now_add=True)
 
+    # Épisode : mesures ayant matché depuis l'ouverture
+    readings_count = models.PositiveIntegerField(default=1)
+    min_value = models.IntegerField(blank=True, null=True)
+    max_value = models.IntegerField(blank=True, null=True)
+    # Bornes de l'épisode en heure de mesure (measured_at), pas d'arrivée
+    first_value_at = models.DateTimeField(blank=True, null=True)
+    last_value_at = models.DateTimeField(blank=True, null=True)
+
     # In-app : on crée une entrée systématiquement
     inapp_created_at = models.DateTimeField(blank=True, null=True)
 
@@ -122,3 +162,9 @@ class AlertEvent(models.Model):
             models.Index(fields=["status", "-triggered_at"]),
             models.Index(fields=["user", "rule", "-triggered_at"]),
         ]
+
+    @property
+    def duration_seconds(self) -> int:
+        start = self.first_value_at or self.triggered_at
+        end = self.resolved_at or self.last_value_at or start
+        return max(0, int((end - start).total_seconds()))
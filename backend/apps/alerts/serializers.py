@@ -45,5 +45,12 @@ class AlertEventSerializer(serializers.ModelSerializer):
             "triggered_at",
             "status",
             "error_message",
+            "readings_count",
+            "min_value",
+            "max_value",
+            "last_value_at",
+            "resolved_at",
+            "risk",
+            "horizon_minutes",
         ]
         read_only_fields = ["user", "triggered_at"]
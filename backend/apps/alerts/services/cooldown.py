@@ -0,0 +1,59 @@
+"""
+Cooldown des push d'alerte par (utilisateur, règle).
+
+Une clé de cache avec TTL = cooldown_seconds matérialise « push envoyé
+récemment ». `acquire` s'appuie sur `cache.add` (SET NX EX sur Redis) :
+un seul worker obtient le droit d'envoyer, même avec des ingestions
+concurrentes.
+
+Tant que la clé existe, une mesure qui rematche ne fait aucune requête.
+Quand la clé est absente (cooldown écoulé, redémarrage, cache vidé), la
+base fait foi : on vérifie le dernier AlertEvent.push_sent_at et, s'il
+est encore dans la fenêtre, la clé est reposée pour le temps restant.
+"""
+
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.utils import timezone
+
+CACHE_PREFIX = "alerts:cooldown"
+
+
+def _key(user_id, rule_id) -> str:
+    return f"{CACHE_PREFIX}:{user_id}:{rule_id}"
+
+
+def _last_push_at(user_id, rule_id, since):
+    from apps.alerts.models import AlertEvent
+
+    return (
+        AlertEvent.objects.filter(user_id=user_id, rule_id=rule_id, push_sent_at__gte=since)
+        .order_by("-push_sent_at")
+        .values_list("push_sent_at", flat=True)
+        .first()
+    )
+
+
+def acquire(user_id, rule_id, cooldown_seconds: int) -> bool:
+    """True si un push peut partir maintenant ; la fenêtre de cooldown démarre alors."""
+    if cooldown_seconds <= 0:
+        return True
+
+    now = timezone.now()
+    key = _key(user_id, rule_id)
+    if not cache.add(key, now.timestamp(), cooldown_seconds):
+        return False
+
+    last = _last_push_at(user_id, rule_id, now - timedelta(seconds=cooldown_seconds))
+    if last is not None:
+        remaining = cooldown_seconds - int((now - last).total_seconds())
+        if remaining > 0:
+            cache.set(key, last.timestamp(), remaining)
+            return False
+    return True
+
+
+def release(user_id, rule_id) -> None:
+    """Annule la fenêtre (push finalement non envoyé)."""
+    cache.delete(_key(user_id, rule_id))
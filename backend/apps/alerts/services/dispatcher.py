@@ -0,0 +1,74 @@
+"""
+Envoi des push d'alerte hors de la transaction de déclenchement.
+
+trigger_for_value ouvre/prolonge les épisodes (AlertEvent) et réserve le
+push (push_sent_at) dans sa transaction, puis planifie `deliver_alert_pushes` après commit sur
+le pool de fond : aucun appel HTTP ne tient une transaction ouverte.
+"""
+
+import logging
+
+from django.db import transaction
+
+from apps.alerts.models import AlertEvent, AlertEventStatus, AlertRuleKind
+from apps.alerts.services import cooldown
+from apps.alerts.services.push import PushSendError, send_push
+from utils import background
+
+logger = logging.getLogger(__name__)
+
+SILENCED_STATUSES = {AlertEventStatus.ACKED, AlertEventStatus.TREATING, AlertEventStatus.RESOLVED}
+
+
+def schedule_alert_pushes(event_ids: list[int]) -> None:
+    """Planifie l'envoi des push après le commit de la transaction courante."""
+    if not event_ids:
+        return
+    ids = list(event_ids)
+    transaction.on_commit(lambda: background.submit(deliver_alert_pushes, ids))
+
+
+def push_body(event: AlertEvent) -> str:
+    kind = event.rule.kind
+    if kind in (AlertRuleKind.PREDICTED_HYPO, AlertRuleKind.PREDICTED_HYPER):
+        label = "d'hypoglycémie" if kind == AlertRuleKind.PREDICTED_HYPO else "d'hyperglycémie"
+        return (
+            f"Risque {label} dans {event.horizon_minutes} min : {round((event.risk or 0) * 100)} % "
+            f"(prévision {event.glycemia_value} mg/dL)"
+        )
+    if kind == AlertRuleKind.RATE:
+        return f"Glycémie: {event.glycemia_value} mg/dL, variation rapide"
+    return f"Glycémie: {event.glycemia_value} mg/dL"
+
+
+def deliver_alert_pushes(event_ids: list[int]) -> None:
+    events = AlertEvent.objects.filter(id__in=event_ids).select_related("user", "rule")
+    for event in events:
+        rule = event.rule
+        if event.status in SILENCED_STATUSES:
+            # Rappel d'un épisode déjà pris en charge ou clos entre-temps.
+            continue
+        try:
+            send_push(
+                user=event.user,
+                title=f"Glycopilot: 🩸 {rule.name}",
+                body=push_body(event),
+                data={"rule": rule.code, "event_id": event.id},
+            )
+            if event.status in (AlertEventStatus.TRIGGERED, AlertEventStatus.FAILED):
+                event.status = AlertEventStatus.SENT
+                event.save(update_fields=["status"])
+            logger.info(f"[DISPATCH] Push SENT for event={event.id}")
+        except Exception as e:
+            if isinstance(e, PushSendError):
+                logger.error(f"[DISPATCH] Push FAILED for event={event.id}: {e}")
+            else:
+                logger.error(f"[DISPATCH] Unexpected error sending push for event={event.id}: {e}")
+            # Push non parti : on libère le cooldown. Un rappel en échec ne
+            # change pas l'épisode déjà notifié (statut, dernier push parti).
+            if event.status == AlertEventStatus.TRIGGERED:
+                event.status = AlertEventStatus.FAILED
+                event.push_sent_at = None
+            event.error_message = str(e)
+            event.save(update_fields=["status", "push_sent_at", "error_message"])
+            cooldown.release(event.user_id, event.rule_id)
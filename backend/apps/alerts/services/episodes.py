@@ -0,0 +1,45 @@
+"""
+État des épisodes d'alerte ouverts par utilisateur : {rule_id: (event_id, last_ts)}.
+
+Gardé en cache pour que l'évaluation d'une mesure qui ne matche rien, sans
+épisode ouvert, ne fasse aucune requête. Sur miss, l'état est rechargé
+depuis AlertEvent (épisodes sans resolved_at). Seuls les épisodes créés par
+la machine à états (last_value_at renseigné) sont pris en compte.
+"""
+
+from django.core.cache import cache
+
+from apps.alerts.models import AlertEvent
+
+CACHE_PREFIX = "alerts:episodes"
+TTL = 24 * 60 * 60
+
+
+def _key(user_id) -> str:
+    return f"{CACHE_PREFIX}:{user_id}"
+
+
+def load(user_id) -> dict:
+    state = {}
+    rows = (
+        AlertEvent.objects.filter(user_id=user_id, resolved_at__isnull=True, last_value_at__isnull=False)
+        .order_by("triggered_at")
+        .values_list("rule_id", "id", "last_value_at")
+    )
+    for rule_id, event_id, last_value_at in rows:
+        state[rule_id] = (event_id, last_value_at.timestamp())
+    cache.set(_key(user_id), state, TTL)
+    return state
+
+
+def get_open(user_id) -> dict:
+    state = cache.get(_key(user_id))
+    return load(user_id) if state is None else state
+
+
+def save(user_id, state: dict) -> None:
+    cache.set(_key(user_id), state, TTL)
+
+
+def invalidate(user_id) -> None:
+    cache.delete(_key(user_id))
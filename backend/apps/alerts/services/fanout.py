@@ -0,0 +1,97 @@
+"""
+Index de diffusion patient -> proches, mis en cache.
+
+Pour chaque patient (clé : id de l'identité `users.User`), le cache garde
+le nom affiché et la liste des comptes actifs des proches (FAMILY,
+CAREGIVER, NURSE d'une équipe de soin ACTIVE). Sur miss, la liste est
+résolue en une seule requête ; les tokens push de ces comptes viennent
+ensuite du cache des tokens (notifications.services.tokens), invalidé de
+son côté à chaque modification de PushToken.
+
+Invalidation (signals.py) : équipe de soin modifiée/supprimée, profil ou
+compte d'un membre modifié, identité du patient renommée. Le TTL borne
+les écarts dus aux mises à jour en masse (queryset.update).
+"""
+
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass
+
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = "alerts:fanout"
+TTL = 10 * 60
+
+PROCHE_ROLES = ("FAMILY", "CAREGIVER", "NURSE")
+
+
+@dataclass(frozen=True, slots=True)
+class Recipient:
+    account_id: object
+    email: str
+
+
+@dataclass(frozen=True, slots=True)
+class FanOut:
+    patient_name: str
+    recipients: tuple[Recipient, ...]
+
+
+def _key(identity_id) -> str:
+    return f"{CACHE_PREFIX}:{identity_id}"
+
+
+def resolve(patient_auth) -> FanOut:
+    """Proches actifs du patient, en une requête."""
+    from apps.users.models import AuthAccount
+
+    rows = (
+        AuthAccount.objects.filter(
+            is_active=True,
+            user__profiles__care_teams_as_member__patient_profile__profile__user_id=patient_auth.user_id,
+            user__profiles__care_teams_as_member__role__in=PROCHE_ROLES,
+            user__profiles__care_teams_as_member__status__label="ACTIVE",
+        )
+        .distinct()
+        .order_by("email")
+        .values_list("pk", "email")
+    )
+    patient_user = patient_auth.user
+    name = f"{patient_user.first_name} {patient_user.last_name}".strip() or "Votre proche"
+    return FanOut(patient_name=name, recipients=tuple(Recipient(pk, email) for pk, email in rows))
+
+
+def get(patient_auth) -> FanOut:
+    key = _key(patient_auth.user_id)
+    try:
+        fanout = cache.get(key)
+    except Exception as e:
+        logger.warning(f"Fan-out cache unavailable: {e}")
+        return resolve(patient_auth)
+    if fanout is None:
+        fanout = resolve(patient_auth)
+        cache.set(key, fanout, TTL)
+    return fanout
+
+
+def invalidate(*identity_ids):
+    try:
+        cache.delete_many([_key(identity_id) for identity_id in identity_ids])
+    except Exception as e:
+        logger.warning(f"Failed to invalidate fan-out cache: {e}")
+
+
+def invalidate_for_member_identities(identity_ids):
+    """Invalide les patients dont l'équipe de soin contient l'un de ces membres."""
+    from apps.doctors.models import PatientCareTeam
+
+    patients = set(
+        PatientCareTeam.objects.filter(member_profile__user_id__in=identity_ids).values_list(
+            "patient_profile__profile__user_id", flat=True
+        )
+    )
+    if patients:
+        invalidate(*patients)
@@ -1,18 +1,38 @@
 """
 Notifications push vers les proches lors du déclenchement d'alertes glycémiques.
 
-Appelé depuis glycemia/signals.py en thread non-bloquant, après trigger_for_value.
-Un proche sans AuthAccount actif est silencieusement ignoré.
+Planifié depuis glycemia/signals.py (`schedule_proche_notifications`) après le
+commit de la transaction de trigger_for_value, sur le pool de fond : les
+épisodes sont relus (avec leur règle, en une requête), un rollback n'envoie rien.
+Les destinataires viennent de l'index de diffusion en cache (fanout.py) : un
+proche sans AuthAccount actif n'y figure pas. Toutes les notifications
+(alertes × proches) partent dans un seul PushBatch ; à chaud, la diffusion ne
+fait aucune requête SQL quelle que soit la taille de l'équipe de soin.
 """
 
 import logging
 
+from django.db import transaction
+
 from apps.alerts.models import AlertEvent
-from apps.notifications.services import send_push_to_user
+from apps.alerts.services import fanout
+from apps.notifications.services import PushBatch
+from utils import background
 
 logger = logging.getLogger(__name__)
 
-_PROCHE_ROLES = {"FAMILY", "CAREGIVER", "NURSE"}
+
+def schedule_proche_notifications(patient_auth, events: list[AlertEvent]) -> None:
+    """Planifie la notification des proches après le commit de la transaction courante."""
+    if not events:
+        return
+    ids = [event.id for event in events]
+    transaction.on_commit(lambda: background.submit(deliver_proche_notifications, patient_auth, ids))
+
+
+def deliver_proche_notifications(patient_auth, event_ids: list[int]) -> None:
+    events = list(AlertEvent.objects.filter(id__in=event_ids).select_related("rule").order_by("id"))
+    notify_proches_of_alert(patient_auth, events)
 
 
 def notify_proches_of_alert(patient_auth, events: list[AlertEvent]) -> None:
@@ -27,71 +47,44 @@ def notify_proches_of_alert(patient_auth, events: list[AlertEvent]) -> None:
     if not events:
         return
 
-    from apps.doctors.models import PatientCareTeam
-    from apps.users.models import AuthAccount
-
-    patient_user = patient_auth.user
-    patient_name = f"{patient_user.first_name} {patient_user.last_name}".strip() or "Votre proche"
-
-    # Résoudre le PatientProfile du patient
-    patient_role_profile = patient_user.profiles.filter(role__name__iexact="PATIENT").first()
-    if not patient_role_profile or not hasattr(patient_role_profile, "patient_profile"):
-        logger.warning(
-            f"[PROCHE ALERT] Pas de PatientProfile pour user={patient_user.id_user}"
-        )
-        return
-
-    patient_profile = patient_role_profile.patient_profile
-
-    care_team_members = list(
-        PatientCareTeam.objects.filter(
-            patient_profile=patient_profile,
-            role__in=_PROCHE_ROLES,
-            status__label="ACTIVE",
-        ).select_related("member_profile__user")
-    )
-
-    if not care_team_members:
+    team = fanout.get(patient_auth)
+    if not team.recipients:
         return
 
     logger.info(
-        f"[PROCHE ALERT] {len(events)} alert(s) → notifying {len(care_team_members)} proche(s) "
-        f"for patient={patient_user.id_user}"
+        f"[PROCHE ALERT] {len(events)} alert(s) → notifying {len(team.recipients)} proche(s) "
+        f"for patient={patient_auth.user_id}"
     )
 
+    batch = PushBatch("proches")
+    sent = []
     for event in events:
         rule = event.rule
-        title = f"Alerte pour {patient_name}"
+        title = f"Alerte pour {team.patient_name}"
         body = f"{rule.name} : {event.glycemia_value} mg/dL"
         payload = {
             "rule": rule.code,
             "event_id": event.id,
-            "patient_user_id": str(patient_user.id_user),
+            "patient_user_id": str(patient_auth.user_id),
         }
+        for member in team.recipients:
+            sent.append((batch.add(member.account_id, title, body, payload), member, rule, event))
+
+    try:
+        results = batch.flush()
+    except Exception as exc:
+        logger.error(f"[PROCHE ALERT] Échec envoi groupé pour patient={patient_auth.user_id}: {exc}")
+        return
 
-        for member in care_team_members:
-            if not member.member_profile:
-                continue
-            try:
-                member_auth = AuthAccount.objects.get(
-                    user=member.member_profile.user, is_active=True
-                )
-                result = send_push_to_user(member_auth, title, body, payload)
-                if result.get("success"):
-                    logger.info(
-                        f"[PROCHE ALERT] Push OK → {member_auth.email} "
-                        f"rule={rule.code} event={event.id}"
-                    )
-                else:
-                    logger.warning(
-                        f"[PROCHE ALERT] Push non envoyé → {member_auth.email}: "
-                        f"{result.get('error')}"
-                    )
-            except AuthAccount.DoesNotExist:
-                # Proche sans compte actif (ajouté sans email ou invitation en attente)
-                pass
-            except Exception as exc:
-                logger.error(
-                    f"[PROCHE ALERT] Échec push pour membre "
-                    f"{member.member_profile.user}: {exc}"
-                )
+    for handle, member, rule, event in sent:
+        result = results[handle]
+        if result.get("success"):
+            logger.info(
+                f"[PROCHE ALERT] Push OK → {member.email} "
+                f"rule={rule.code} event={event.id}"
+            )
+        else:
+            logger.warning(
+                f"[PROCHE ALERT] Push non envoyé → {member.email}: "
+                f"{result.get('error')}"
+            )
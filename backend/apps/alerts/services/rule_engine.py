@@ -0,0 +1,190 @@
+"""
+Règles d'alerte compilées par utilisateur, évaluées en mémoire.
+
+Les UserAlertRule actives d'un utilisateur (seuils après overrides) sont
+compilées en une liste d'intervalles inclusifs et mises en cache. Évaluer
+une mesure (valeur, vitesse de variation) ou une prédiction IA ne fait
+alors aucune requête SQL : la base n'est touchée que si une règle matche.
+
+Invalidation (signals.py) :
+- UserAlertRule modifiée/supprimée -> cache de l'utilisateur supprimé ;
+- AlertRule modifiée/supprimée     -> version globale incrémentée, toutes
+  les entrées deviennent obsolètes.
+Le TTL borne la durée de vie d'une entrée si une invalidation est manquée
+(cache local à un process, écriture en masse sans signal).
+"""
+
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+
+from django.core.cache import cache
+
+from apps.alerts.models import AlertRuleKind, UserAlertRule
+
+CACHE_PREFIX = "alerts:rules"
+VERSION_KEY = f"{CACHE_PREFIX}:version"
+RULES_TTL = 5 * 60
+
+# Hystérésis de clôture des épisodes : il faut repasser franchement le seuil.
+VALUE_HYSTERESIS = 10  # mg/dL
+RATE_HYSTERESIS = 1.0  # mg/dL/min
+RISK_HYSTERESIS = 0.2
+
+
+@dataclass(frozen=True, slots=True)
+class CompiledRule:
+    rule_id: int
+    code: str
+    name: str
+    kind: str
+    min_value: int | None
+    max_value: int | None
+    cooldown_seconds: int
+    rate_limit: float | None = None
+    horizon_minutes: int | None = None
+    risk_threshold: float | None = None
+
+    def matches(self, value: int) -> bool:
+        """Règle VALUE, bornes inclusives ; une règle sans aucune borne ne matche jamais."""
+        if self.kind != AlertRuleKind.VALUE:
+            return False
+        if self.min_value is None and self.max_value is None:
+            return False
+        if self.min_value is not None and value < self.min_value:
+            return False
+        if self.max_value is not None and value > self.max_value:
+            return False
+        return True
+
+    def matches_rate(self, rate: float | None) -> bool:
+        """Règle RATE : chute (limite négative) ou montée (positive) au moins aussi rapide."""
+        if self.kind != AlertRuleKind.RATE or rate is None or not self.rate_limit:
+            return False
+        return rate <= self.rate_limit if self.rate_limit < 0 else rate >= self.rate_limit
+
+    def recovered(self, value: int, rate: float | None = None) -> bool:
+        """Mesure assez loin des bornes pour clore un épisode VALUE/RATE ouvert."""
+        if self.kind == AlertRuleKind.VALUE:
+            if self.max_value is not None and value > self.max_value + VALUE_HYSTERESIS:
+                return True
+            return self.min_value is not None and value < self.min_value - VALUE_HYSTERESIS
+        if self.kind == AlertRuleKind.RATE and self.rate_limit:
+            if rate is None:
+                return True
+            if self.rate_limit < 0:
+                return rate > self.rate_limit + RATE_HYSTERESIS
+            return rate < self.rate_limit - RATE_HYSTERESIS
+        return False
+
+    def prediction_recovered(self, prediction) -> bool:
+        """Risque retombé sous le seuil moins l'hystérésis (ou absent)."""
+        field = _RISK_FIELDS.get(self.kind)
+        if field is None or self.horizon_minutes is None or self.risk_threshold is None:
+            return False
+        risk = getattr(prediction, f"{field}_{self.horizon_minutes}", None)
+        return risk is None or risk < self.risk_threshold - RISK_HYSTERESIS
+
+    def prediction_risk(self, prediction) -> float | None:
+        """Règle PREDICTED_* : risque à l'horizon de la règle s'il atteint le seuil, sinon None."""
+        field = _RISK_FIELDS.get(self.kind)
+        if field is None or self.horizon_minutes is None or self.risk_threshold is None:
+            return None
+        risk = getattr(prediction, f"{field}_{self.horizon_minutes}", None)
+        return risk if risk is not None and risk >= self.risk_threshold else None
+
+
+_RISK_FIELDS = {
+    AlertRuleKind.PREDICTED_HYPO: "risk_hypo",
+    AlertRuleKind.PREDICTED_HYPER: "risk_hyper",
+}
+
+
+def _version() -> int:
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Horodatage plutôt que 1 : une version évincée du cache ne doit pas
+        # faire ressortir d'anciennes entrées.
+        cache.add(VERSION_KEY, int(time.time()), None)
+        version = cache.get(VERSION_KEY) or int(time.time())
+    return version
+
+
+def _key(user_id, version: int) -> str:
+    return f"{CACHE_PREFIX}:{version}:{user_id}"
+
+
+def compile_user_rules(user_id) -> tuple[CompiledRule, ...]:
+    """Charge et compile les règles actives de l'utilisateur (overrides appliqués)."""
+    rows = (
+        UserAlertRule.objects.filter(user_id=user_id, enabled=True, rule__is_active=True)
+        .order_by("rule_id")
+        .values_list(
+            "rule_id",
+            "rule__code",
+            "rule__name",
+            "rule__kind",
+            "rule__min_glycemia",
+            "rule__max_glycemia",
+            "min_glycemia_override",
+            "max_glycemia_override",
+            "cooldown_seconds",
+            "rule__rate_limit",
+            "rule__horizon_minutes",
+            "rule__risk_threshold",
+        )
+    )
+    return tuple(
+        CompiledRule(
+            rule_id=rule_id,
+            code=code,
+            name=name,
+            kind=kind,
+            min_value=min_override if min_override is not None else min_v,
+            max_value=max_override if max_override is not None else max_v,
+            cooldown_seconds=cooldown,
+            rate_limit=rate_limit,
+            horizon_minutes=horizon,
+            risk_threshold=risk_threshold,
+        )
+        for (
+            rule_id, code, name, kind, min_v, max_v, min_override, max_override,
+            cooldown, rate_limit, horizon, risk_threshold,
+        ) in rows
+    )
+
+
+def get_user_rules(user_id) -> tuple[CompiledRule, ...]:
+    key = _key(user_id, _version())
+    rules = cache.get(key)
+    if rules is None:
+        rules = compile_user_rules(user_id)
+        cache.set(key, rules, RULES_TTL)
+    return rules
+
+
+def matching_rules(user_id, value: int, rate: float | None = None) -> list[CompiledRule]:
+    """Règles VALUE et RATE déclenchées par une mesure."""
+    return [rule for rule in get_user_rules(user_id) if rule.matches(value) or rule.matches_rate(rate)]
+
+
+def matching_prediction_rules(user_id, prediction) -> list[tuple[CompiledRule, float]]:
+    """Règles prédictives déclenchées par une GlycemiaDataIA, avec le risque observé."""
+    matched = []
+    for rule in get_user_rules(user_id):
+        risk = rule.prediction_risk(prediction)
+        if risk is not None:
+            matched.append((rule, risk))
+    return matched
+
+
+def invalidate_user(user_id):
+    cache.delete(_key(user_id, _version()))
+
+
+def invalidate_all():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, int(time.time()), None)
@@ -1,119 +1,229 @@
 import logging
-from datetime import timedelta
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
 
 from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest, Least
 from django.utils import timezone
 
-from apps.alerts.models import AlertEvent, AlertEventStatus, AlertRule, UserAlertRule
-from apps.alerts.services.push import PushSendError, send_push
+from apps.alerts.models import AlertEvent, AlertEventStatus, AlertRuleKind
+from apps.alerts.services import cooldown, episodes, rule_engine
+from apps.alerts.services.dispatcher import schedule_alert_pushes
 
 logger = logging.getLogger(__name__)
 
-
-def compute_thresholds(
-    user_rule: UserAlertRule, rule: AlertRule
-) -> tuple[int | None, int | None]:
-    min_v = (
-        user_rule.min_glycemia_override
-        if user_rule.min_glycemia_override is not None
-        else rule.min_glycemia
-    )
-    max_v = (
-        user_rule.max_glycemia_override
-        if user_rule.max_glycemia_override is not None
-        else rule.max_glycemia
-    )
-    return min_v, max_v
+# Une prédiction plus ancienne (import d'historique) n'alerte plus personne.
+PREDICTION_MAX_AGE = timedelta(minutes=15)
+# Au-delà de cet intervalle sans mesure, un épisode ouvert est clos et la
+# mesure suivante en ouvre un nouveau.
+EPISODE_GAP = timedelta(minutes=30)
+# Décision d'évaluation : observation assez loin du seuil pour clore l'épisode.
+RECOVERED = "recovered"
 
 
-def matches(min_v: int | None, max_v: int | None, value: int) -> bool:
+def trigger_for_value(
+    *, user, glycemia_value: int, rate: float | None = None, measured_at: datetime | None = None
+) -> list[AlertEvent]:
     """
-    A rule matches when the value falls within [min_v, max_v] (inclusive).
-    - HYPO  (min=None, max=69):  matches when value <= 69
-    - HYPER (min=181, max=None): matches when value >= 181
+    Appelée à chaque nouvelle mesure : fait avancer les épisodes des règles
+    VALUE/RATE (ouverture, mise à jour sur place, clôture avec hystérésis).
+    Les épisodes sont datés par `measured_at` (défaut : maintenant), pas par
+    l'heure d'arrivée : un envoi groupé de lectures garde ses intervalles.
+    Aucune requête si rien ne matche et qu'aucun épisode n'est ouvert.
+    Retourne les épisodes ouverts par cette mesure.
     """
-    if min_v is not None and value < min_v:
-        return False
-    if max_v is not None and value > max_v:
-        return False
-    return min_v is not None or max_v is not None
 
+    def evaluate(rule):
+        if rule.kind not in (AlertRuleKind.VALUE, AlertRuleKind.RATE):
+            return None
+        if rule.matches(glycemia_value) or rule.matches_rate(rate):
+            return {"glycemia_value": glycemia_value}
+        if rule.recovered(glycemia_value, rate):
+            return RECOVERED
+        return None  # zone d'hystérésis : l'épisode éventuel reste ouvert
 
-def can_send_push(user, rule: AlertRule, cooldown_seconds: int) -> bool:
-    since = timezone.now() - timedelta(seconds=cooldown_seconds)
-    return not AlertEvent.objects.filter(
-        user=user,
-        rule=rule,
-        push_sent_at__gte=since,
-    ).exists()
+    return _advance(user, evaluate, measured_at or timezone.now())
 
 
-@transaction.atomic
-def trigger_for_value(*, user, glycemia_value: int) -> list[AlertEvent]:
+def trigger_for_prediction(*, user, prediction) -> list[AlertEvent]:
     """
-    Appelée à chaque nouvelle mesure.
-    - 1 AlertEvent par règle matchée
-    - in-app systématique
-    - push si cooldown OK
+    Appelée à chaque nouvelle GlycemiaDataIA : règles PREDICTED_HYPO/HYPER
+    évaluées sur les risques de la prédiction, sans lecture en base.
+    La valeur de l'épisode est la glycémie prédite à l'horizon de la règle.
     """
-    events: list[AlertEvent] = []
-
-    user_rules = UserAlertRule.objects.select_related("rule").filter(
-        user=user, enabled=True, rule__is_active=True
-    )
+    if prediction.for_time < timezone.now() - PREDICTION_MAX_AGE:
+        return []
 
-    now = timezone.now()
+    def evaluate(rule):
+        risk = rule.prediction_risk(prediction)
+        if risk is not None:
+            predicted = getattr(prediction, f"y_hat_{rule.horizon_minutes}", None)
+            return {"glycemia_value": round(predicted or 0), "risk": risk, "horizon_minutes": rule.horizon_minutes}
+        if rule.prediction_recovered(prediction):
+            return RECOVERED
+        return None
 
-    for ur in user_rules:
-        rule = ur.rule
-        min_v, max_v = compute_thresholds(ur, rule)
+    # Observation : dernière lecture utilisée par le modèle.
+    return _advance(user, evaluate, prediction.input_end or timezone.now())
 
-        matched = matches(min_v, max_v, glycemia_value)
-        logger.info(
-            f"[TRIGGER] rule={rule.code} min={min_v} max={max_v} "
-            f"value={glycemia_value} matched={matched}"
-        )
 
-        if not matched:
-            continue
-
-        event = AlertEvent.objects.create(
-            user=user,
-            rule=rule,
-            glycemia_value=glycemia_value,
-            status=AlertEventStatus.TRIGGERED,
-            inapp_created_at=now,
-        )
-
-        push_ok = can_send_push(user, rule, ur.cooldown_seconds)
-        logger.info(f"[TRIGGER] event={event.id} can_send_push={push_ok}")
-
-        if push_ok:
-            try:
-                send_push(
+def _advance(user, evaluate, observed_at: datetime) -> list[AlertEvent]:
+    """
+    Machine à états des épisodes de l'utilisateur pour une nouvelle
+    observation datée `observed_at`.
+    """
+    decisions = {}
+    for rule in rule_engine.get_user_rules(user.pk):
+        decision = evaluate(rule)
+        if decision is not None:
+            decisions[rule] = decision
+
+    observed_ts = observed_at.timestamp()
+    open_episodes = episodes.get_open(user.pk)
+    # Mesures interrompues : tout épisode ouvert sans mesure depuis EPISODE_GAP
+    # est clos, que cette observation concerne sa règle ou non.
+    stale = {
+        rule_id: episode
+        for rule_id, episode in open_episodes.items()
+        if observed_ts - episode[1] > EPISODE_GAP.total_seconds()
+    }
+    if not stale and not any(decision is not RECOVERED for decision in decisions.values()):
+        if not any(rule.rule_id in open_episodes for rule in decisions):
+            return []
+
+    state = dict(open_episodes)
+    now = timezone.now()
+    opened: list[AlertEvent] = []
+    to_push: list[int] = []
+    acquired: list[int] = []
+    changed = False
+
+    try:
+        with transaction.atomic():
+            for rule_id, (event_id, last_ts) in stale.items():
+                # L'épisode s'arrête à sa dernière mesure.
+                changed |= _close(event_id, datetime.fromtimestamp(last_ts, tz=dt_timezone.utc))
+                del state[rule_id]
+
+            for rule, decision in decisions.items():
+                current = state.get(rule.rule_id)
+                if current and current[1] - observed_ts > EPISODE_GAP.total_seconds():
+                    # Lecture arrivée en retard, antérieure à l'épisode : ni
+                    # prolongation, ni nouvel épisode pour un passé révolu.
+                    continue
+
+                if decision is RECOVERED:
+                    if current:
+                        changed |= _close(current[0], max(observed_at, _at(current[1])))
+                        del state[rule.rule_id]
+                        logger.info(f"[TRIGGER] rule={rule.code} episode={current[0]} closed")
+                    continue
+
+                push_ok = cooldown.acquire(user.pk, rule.rule_id, rule.cooldown_seconds)
+                if push_ok:
+                    acquired.append(rule.rule_id)
+
+                if current and _extend(current[0], decision, observed_at, now, push_ok):
+                    changed = True
+                    state[rule.rule_id] = (current[0], max(current[1], observed_ts))
+                    if push_ok:
+                        to_push.append(current[0])  # rappel, au rythme du cooldown
+                    continue
+
+                value = decision["glycemia_value"]
+                event = AlertEvent.objects.create(
                     user=user,
-                    title=f"Glycopilot: 🩸 {rule.name}",
-                    body=f"Glycémie: {glycemia_value} mg/dL",
-                    data={"rule": rule.code, "event_id": event.id},
+                    rule_id=rule.rule_id,
+                    status=AlertEventStatus.TRIGGERED,
+                    inapp_created_at=now,
+                    # Réservation : bloque le cooldown dès maintenant, libérée
+                    # par le dispatcher si l'envoi échoue.
+                    push_sent_at=now if push_ok else None,
+                    min_value=value,
+                    max_value=value,
+                    first_value_at=observed_at,
+                    last_value_at=observed_at,
+                    **decision,
                 )
-                event.push_sent_at = now
-                event.status = AlertEventStatus.SENT
-                event.save(update_fields=["push_sent_at", "status"])
-                logger.info(f"[TRIGGER] Push SENT for event={event.id}")
-            except PushSendError as e:
-                event.status = AlertEventStatus.FAILED
-                event.error_message = str(e)
-                event.save(update_fields=["status", "error_message"])
-                logger.error(f"[TRIGGER] Push FAILED for event={event.id}: {e}")
-            except Exception as e:
-                logger.error(f"[TRIGGER] Unexpected error sending push: {e}")
-                event.status = AlertEventStatus.FAILED
-                event.error_message = str(e)
-                event.save(update_fields=["status", "error_message"])
-
-        events.append(event)
-
-    return events
+                logger.info(f"[TRIGGER] rule={rule.code} episode={event.id} opened, can_send_push={push_ok}")
+                state[rule.rule_id] = (event.id, observed_ts)
+                opened.append(event)
+                if push_ok:
+                    to_push.append(event.id)
+
+            schedule_alert_pushes(to_push)
+    except Exception:
+        # Transaction annulée : fenêtres de cooldown et état en cache ne valent rien.
+        for rule_id in acquired:
+            cooldown.release(user.pk, rule_id)
+        episodes.invalidate(user.pk)
+        raise
+
+    episodes.save(user.pk, state)
+    if changed:
+        # update() sans post_save : le summary (section alerts) est rafraîchi ici.
+        _refresh_dashboard(user.pk)
+    return opened
+
+
+def close_stale_episodes(now: datetime | None = None) -> int:
+    """
+    Clôt les épisodes restés ouverts sans mesure depuis EPISODE_GAP (capteur
+    retiré, plus aucune lecture) ; appelée périodiquement
+    (commande `close_stale_alert_episodes`). Retourne le nombre clos.
+    """
+    cutoff = (now or timezone.now()) - EPISODE_GAP
+    rows = AlertEvent.objects.filter(
+        resolved_at__isnull=True, last_value_at__isnull=False, last_value_at__lt=cutoff
+    ).values_list("id", "user_id", "last_value_at")
+
+    closed, users = 0, set()
+    for event_id, user_id, last_value_at in rows:
+        if _close(event_id, last_value_at):
+            closed += 1
+            users.add(user_id)
+    for user_id in users:
+        episodes.invalidate(user_id)
+        _refresh_dashboard(user_id)
+    return closed
+
+
+def _at(ts: float) -> datetime:
+    return datetime.fromtimestamp(ts, tz=dt_timezone.utc)
+
+
+def _refresh_dashboard(user_id) -> None:
+    from apps.dashboard.services.summary_snapshot import DashboardSnapshotService as Snapshot
+
+    Snapshot.schedule_refresh(user_id, Snapshot.ALERTS)
+
+
+def _extend(event_id: int, decision: dict, observed_at, now, push_ok: bool) -> bool:
+    """Met à jour l'épisode sur place ; False s'il n'existe plus (ou a été clos)."""
+    value = decision["glycemia_value"]
+    fields = {
+        "glycemia_value": value,
+        "readings_count": F("readings_count") + 1,
+        "min_value": Least("min_value", Value(value)),
+        "max_value": Greatest("max_value", Value(value)),
+        # Lectures dans le désordre : la dernière mesure ne recule jamais.
+        "last_value_at": Greatest("last_value_at", Value(observed_at)),
+    }
+    if decision.get("risk") is not None:
+        fields["risk"] = Greatest("risk", Value(decision["risk"]))
+    if push_ok:
+        fields["push_sent_at"] = now
+    return AlertEvent.objects.filter(pk=event_id, resolved_at__isnull=True).update(**fields) > 0
+
+
+def _close(event_id: int, at) -> bool:
+    return (
+        AlertEvent.objects.filter(pk=event_id, resolved_at__isnull=True).update(
+            resolved_at=at, status=AlertEventStatus.RESOLVED
+        )
+        > 0
+    )
 
 
 @transaction.atomic
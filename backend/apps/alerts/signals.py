@@ -1,8 +1,16 @@
 from django.conf import settings
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
+from apps.doctors.models import PatientCareTeam
+from apps.profiles.models import PatientProfile, Profile
+from apps.users.models import User as UserIdentity
+
 from .models import AlertRule, UserAlertRule
+from .services import fanout, rule_engine
+
+# Champs d'AuthAccount qui changent la liste des proches joignables.
+_FANOUT_ACCOUNT_FIELDS = {"is_active", "email", "user"}
 
 
 @receiver(post_save, sender=settings.AUTH_USER_MODEL)
@@ -16,3 +24,47 @@ def subscribe_new_user_to_alert_rules(sender, instance, created, **kwargs):
         [UserAlertRule(user=instance, rule=rule) for rule in active_rules],
         ignore_conflicts=True,
     )
+    # bulk_create n'émet pas de post_save : invalider explicitement.
+    rule_engine.invalidate_user(instance.pk)
+
+
+@receiver(post_save, sender=UserAlertRule)
+@receiver(post_delete, sender=UserAlertRule)
+def invalidate_user_compiled_rules(sender, instance, **kwargs):
+    rule_engine.invalidate_user(instance.user_id)
+
+
+@receiver(post_save, sender=AlertRule)
+@receiver(post_delete, sender=AlertRule)
+def invalidate_all_compiled_rules(sender, instance, **kwargs):
+    rule_engine.invalidate_all()
+
+
+@receiver(post_save, sender=PatientCareTeam)
+@receiver(post_delete, sender=PatientCareTeam)
+def invalidate_care_team_fanout(sender, instance, **kwargs):
+    patient = (
+        PatientProfile.objects.filter(pk=instance.patient_profile_id)
+        .values_list("profile__user_id", flat=True)
+        .first()
+    )
+    if patient is not None:
+        fanout.invalidate(patient)
+
+
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def invalidate_member_profile_fanout(sender, instance, **kwargs):
+    fanout.invalidate_for_member_identities([instance.user_id])
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def invalidate_member_account_fanout(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not _FANOUT_ACCOUNT_FIELDS & set(update_fields):
+        return  # ex. mise à jour de last_login à la connexion
+    fanout.invalidate_for_member_identities([instance.user_id])
+
+
+@receiver(post_save, sender=UserIdentity)
+def invalidate_patient_name_fanout(sender, instance, **kwargs):
+    fanout.invalidate(instance.pk)
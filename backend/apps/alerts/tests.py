@@ -8,6 +8,7 @@ from rest_framework.test import APIClient
 
 from apps.alerts.models import AlertEvent, AlertRule, AlertSeverity, UserAlertRule
 from apps.alerts.services.trigger import trigger_for_value
+from apps.notifications.models import PushToken
 
 User = get_user_model()
 
@@ -65,7 +66,7 @@ def test_ack_endpoint_sets_acked_at():
 
 
 @pytest.mark.django_db
-def test_push_title_includes_app_name_and_rule():
+def test_push_title_includes_app_name_and_rule(settings, django_capture_on_commit_callbacks):
     """Le titre du push doit être 'Glycopilot: 🩸 <rule.name>'."""
     user = mk_user("push_title@test.com")
     rule = mk_rule(code="HYPO", max_g=80)
@@ -75,7 +76,8 @@ def test_push_title_includes_app_name_and_rule():
         user=user, rule=rule, enabled=True, cooldown_seconds=0
     )
 
-    with patch("apps.alerts.services.trigger.send_push") as mock_push:
+    settings.BACKGROUND_TASKS_EAGER = True
+    with patch("apps.alerts.services.dispatcher.send_push") as mock_push, django_capture_on_commit_callbacks(execute=True):
         mock_push.return_value = None
         trigger_for_value(user=user, glycemia_value=70)
 
@@ -85,7 +87,7 @@ def test_push_title_includes_app_name_and_rule():
 
 
 @pytest.mark.django_db
-def test_push_title_reflects_rule_name():
+def test_push_title_reflects_rule_name(settings, django_capture_on_commit_callbacks):
     """Le titre change selon le nom de la règle (hyper vs hypo)."""
     user = mk_user("push_title2@test.com")
     rule = AlertRule.objects.create(
@@ -100,7 +102,8 @@ def test_push_title_reflects_rule_name():
         user=user, rule=rule, enabled=True, cooldown_seconds=0
     )
 
-    with patch("apps.alerts.services.trigger.send_push") as mock_push:
+    settings.BACKGROUND_TASKS_EAGER = True
+    with patch("apps.alerts.services.dispatcher.send_push") as mock_push, django_capture_on_commit_callbacks(execute=True):
         mock_push.return_value = None
         trigger_for_value(user=user, glycemia_value=300)
 
@@ -118,16 +121,339 @@ def test_cooldown_allows_history_but_limits_push():
     )
 
     trigger_for_value(user=user, glycemia_value=70)
-    trigger_for_value(user=user, glycemia_value=70)
+    trigger_for_value(user=user, glycemia_value=65)
+
+    # Historique conservé dans un seul épisode, mis à jour sur place
+    assert AlertEvent.objects.count() == 1
+    episode = AlertEvent.objects.get()
+    assert episode.readings_count == 2
+    assert (episode.min_value, episode.max_value) == (65, 70)
+
+    # Push limité : réservé (push_sent_at) à l'ouverture, pas de rappel
+    # avant la fin du cooldown.
+    assert episode.push_sent_at is not None
+    assert episode.push_sent_at == episode.inapp_created_at
+
+
+@pytest.fixture
+def empty_cache():
+    from django.core.cache import cache
+
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.mark.django_db
+def test_trigger_without_match_runs_no_query_once_rules_are_compiled(empty_cache, django_assert_num_queries):
+    user = mk_user()
+    UserAlertRule.objects.create(user=user, rule=mk_rule(), enabled=True)
+    trigger_for_value(user=user, glycemia_value=120)  # compile + met en cache
+
+    with django_assert_num_queries(0):
+        assert trigger_for_value(user=user, glycemia_value=130) == []
+
+
+@pytest.mark.django_db
+def test_compiled_rules_apply_overrides_and_follow_invalidation(empty_cache):
+    from apps.alerts.services import rule_engine
+
+    user = mk_user()
+    rule = mk_rule(max_g=70)
+    user_rule = UserAlertRule.objects.create(user=user, rule=rule, enabled=True, max_glycemia_override=80)
+
+    assert [r.code for r in rule_engine.matching_rules(user.pk, 75)] == ["HYPO"]
+
+    user_rule.enabled = False
+    user_rule.save()
+    assert rule_engine.matching_rules(user.pk, 75) == []
+
+    user_rule.enabled = True
+    user_rule.max_glycemia_override = None
+    user_rule.save()
+    assert rule_engine.matching_rules(user.pk, 75) == []
+
+    rule.max_glycemia = 90
+    rule.save()
+    assert [r.max_value for r in rule_engine.matching_rules(user.pk, 75)] == [90]
+
+    rule.is_active = False
+    rule.save()
+    assert rule_engine.matching_rules(user.pk, 75) == []
+
+
+@pytest.mark.django_db
+def test_push_is_dispatched_after_commit_and_failure_releases_cooldown(empty_cache, settings, django_capture_on_commit_callbacks):
+    from apps.alerts.services.push import PushSendError
+
+    settings.BACKGROUND_TASKS_EAGER = True
+    user = mk_user()
+    UserAlertRule.objects.create(user=user, rule=mk_rule(), enabled=True, cooldown_seconds=600)
+
+    with patch("apps.alerts.services.dispatcher.send_push", side_effect=PushSendError("expo down")) as mock_push:
+        with django_capture_on_commit_callbacks(execute=False) as callbacks:
+            event = trigger_for_value(user=user, glycemia_value=60)[0]
+        mock_push.assert_not_called()  # rien n'est envoyé avant le commit
+        for callback in callbacks:
+            callback()
+
+    mock_push.assert_called_once()
+    event.refresh_from_db()
+    assert event.status == "FAILED"
+    assert event.push_sent_at is None
+    assert event.error_message == "expo down"
+
+    with patch("apps.alerts.services.dispatcher.send_push") as mock_push, django_capture_on_commit_callbacks(execute=True):
+        trigger_for_value(user=user, glycemia_value=60)
+    mock_push.assert_called_once()
+    assert AlertEvent.objects.filter(status="SENT").count() == 1
+
+
+@pytest.mark.django_db
+def test_failed_reminder_keeps_the_sent_episode_untouched(empty_cache):
+    from django.utils import timezone
+
+    from apps.alerts.services.dispatcher import deliver_alert_pushes
+    from apps.alerts.services.push import PushSendError
+
+    user = mk_user()
+    UserAlertRule.objects.create(user=user, rule=mk_rule(), enabled=True, cooldown_seconds=600)
+    event = trigger_for_value(user=user, glycemia_value=60)[0]  # push planifié après commit, non exécuté
+    sent_at = timezone.now()
+    AlertEvent.objects.filter(pk=event.pk).update(status="SENT", push_sent_at=sent_at)
+
+    with patch("apps.alerts.services.dispatcher.send_push", side_effect=PushSendError("expo down")):
+        deliver_alert_pushes([event.pk])
+
+    event.refresh_from_db()
+    assert event.status == "SENT"
+    assert event.push_sent_at == sent_at
+    assert event.error_message == "expo down"
+
+
+@pytest.mark.django_db
+def test_cooldown_store_blocks_without_query_and_recovers_from_cold_cache(empty_cache, django_assert_num_queries):
+    from django.core.cache import cache
+
+    from apps.alerts.services import cooldown
+
+    user = mk_user()
+    rule = mk_rule()
+    UserAlertRule.objects.create(user=user, rule=rule, enabled=True, cooldown_seconds=600)
+    trigger_for_value(user=user, glycemia_value=60)
+
+    assert cooldown.acquire(user.pk, rule.pk, 600) is False
+    with django_assert_num_queries(0):
+        assert cooldown.acquire(user.pk, rule.pk, 600) is False
+
+    # Cache perdu (redémarrage) : la base fait foi et la clé est reposée.
+    cache.clear()
+    assert cooldown.acquire(user.pk, rule.pk, 600) is False
+    with django_assert_num_queries(0):
+        assert cooldown.acquire(user.pk, rule.pk, 600) is False
+
+    cooldown.release(user.pk, rule.pk)
+    AlertEvent.objects.update(push_sent_at=None)
+    assert cooldown.acquire(user.pk, rule.pk, 600) is True
+    assert cooldown.acquire(user.pk, rule.pk, 0) is True
+
+
+@pytest.mark.django_db
+def test_rate_rule_fires_on_fast_drop_only(empty_cache):
+    user = mk_user()
+    rule = AlertRule.objects.create(code="FAST_DROP", name="Chute rapide", kind="RATE", rate_limit=-2.0)
+    UserAlertRule.objects.create(user=user, rule=rule, enabled=True)
+
+    assert trigger_for_value(user=user, glycemia_value=140, rate=-1.0) == []
+    assert trigger_for_value(user=user, glycemia_value=140, rate=None) == []
+    events = trigger_for_value(user=user, glycemia_value=140, rate=-2.5)
+
+    assert [e.rule.code for e in events] == ["FAST_DROP"]
+    assert events[0].glycemia_value == 140
+
+
+@pytest.mark.django_db
+def test_new_prediction_fires_predictive_rule_with_risk_and_push_body(
+    empty_cache, settings, django_capture_on_commit_callbacks
+):
+    from django.utils import timezone
+
+    from apps.glycemia.models import GlycemiaDataIA
+
+    settings.BACKGROUND_TASKS_EAGER = True
+    user = mk_user()
+    rule = AlertRule.objects.create(
+        code="PRED_HYPO_30",
+        name="Hypoglycémie probable",
+        kind="PREDICTED_HYPO",
+        horizon_minutes=30,
+        risk_threshold=0.7,
+    )
+    UserAlertRule.objects.create(user=user, rule=rule, enabled=True, cooldown_seconds=600)
+    base = {"user": user, "model_version": "v1", "input_start": timezone.now(), "input_end": timezone.now()}
+
+    GlycemiaDataIA.objects.create(for_time=timezone.now(), risk_hypo_30=0.4, y_hat_30=85, **base)
+    assert AlertEvent.objects.count() == 0
+
+    with patch("apps.alerts.services.dispatcher.send_push") as mock_push, django_capture_on_commit_callbacks(execute=True):
+        GlycemiaDataIA.objects.create(
+            for_time=timezone.now() + timezone.timedelta(seconds=1), risk_hypo_30=0.82, y_hat_30=64.6, **base
+        )
+
+    event = AlertEvent.objects.get()
+    assert event.rule == rule
+    assert event.risk == 0.82
+    assert event.horizon_minutes == 30
+    assert event.glycemia_value == 65
+    assert mock_push.call_args.kwargs["body"] == "Risque d'hypoglycémie dans 30 min : 82 % (prévision 65 mg/dL)"
+
+
+@pytest.mark.django_db
+def test_stale_or_failed_prediction_does_not_alert(empty_cache):
+    from django.utils import timezone
 
-    # Historique conservé
+    from apps.glycemia.models import GlycemiaDataIA
+
+    user = mk_user()
+    rule = AlertRule.objects.create(
+        code="PRED_HYPER_60", name="Hyper probable", kind="PREDICTED_HYPER", horizon_minutes=60, risk_threshold=0.5
+    )
+    UserAlertRule.objects.create(user=user, rule=rule, enabled=True)
+    base = {"user": user, "model_version": "v1", "input_start": timezone.now(), "input_end": timezone.now()}
+
+    GlycemiaDataIA.objects.create(for_time=timezone.now() - timezone.timedelta(hours=2), risk_hyper_60=0.9, **base)
+    GlycemiaDataIA.objects.create(for_time=timezone.now(), risk_hyper_60=0.9, status="error", **base)
+
+    assert AlertEvent.objects.count() == 0
+
+
+@pytest.mark.django_db
+def test_episode_closes_only_past_hysteresis_and_next_match_opens_new_one(empty_cache):
+    user = mk_user()
+    UserAlertRule.objects.create(user=user, rule=mk_rule(max_g=69), enabled=True, cooldown_seconds=600)
+
+    assert len(trigger_for_value(user=user, glycemia_value=62)) == 1
+    assert trigger_for_value(user=user, glycemia_value=55) == []  # même épisode
+    trigger_for_value(user=user, glycemia_value=75)  # zone d'hystérésis : reste ouvert
+    episode = AlertEvent.objects.get()
+    assert episode.resolved_at is None
+    assert (episode.readings_count, episode.min_value, episode.max_value) == (2, 55, 62)
+
+    trigger_for_value(user=user, glycemia_value=85)  # > 69 + 10 : clôture
+    episode.refresh_from_db()
+    assert episode.status == "RESOLVED"
+    assert episode.resolved_at is not None
+
+    assert len(trigger_for_value(user=user, glycemia_value=60)) == 1
     assert AlertEvent.objects.count() == 2
 
-    # Push limité : comme send_push est un stub, push_sent_at sera mis quand même (logique interne),
-    # mais la 2e occurrence doit normalement être bloquée par can_send_push.
-    events = list(AlertEvent.objects.order_by("triggered_at"))
-    assert events[0].push_sent_at is not None
-    assert events[1].push_sent_at is None
+
+@pytest.mark.django_db
+def test_episode_state_survives_cache_loss_and_closes_after_gap(empty_cache):
+    from datetime import timedelta
+
+    from django.core.cache import cache
+    from django.utils import timezone
+
+    from apps.alerts.services.trigger import EPISODE_GAP
+
+    user = mk_user()
+    UserAlertRule.objects.create(user=user, rule=mk_rule(max_g=69), enabled=True, cooldown_seconds=600)
+    first = trigger_for_value(user=user, glycemia_value=60)[0]
+
+    cache.clear()  # état rechargé depuis AlertEvent
+    assert trigger_for_value(user=user, glycemia_value=58) == []
+    first.refresh_from_db()
+    assert first.readings_count == 2
+
+    stale_at = timezone.now() - EPISODE_GAP - timedelta(minutes=5)
+    AlertEvent.objects.filter(pk=first.pk).update(last_value_at=stale_at)
+    cache.clear()
+    second = trigger_for_value(user=user, glycemia_value=61)
+
+    first.refresh_from_db()
+    assert first.resolved_at == stale_at
+    assert len(second) == 1 and second[0].pk != first.pk
+
+
+@pytest.mark.django_db
+def test_backfilled_readings_are_split_and_timed_by_measured_at(empty_cache):
+    from datetime import timedelta
+
+    from django.utils import timezone
+
+    user = mk_user()
+    UserAlertRule.objects.create(user=user, rule=mk_rule(max_g=69), enabled=True, cooldown_seconds=600)
+    start = timezone.now() - timedelta(hours=3)
+
+    # Lot de lectures arrivées en même temps : deux épisodes séparés d'un trou > EPISODE_GAP.
+    first = trigger_for_value(user=user, glycemia_value=60, measured_at=start)[0]
+    trigger_for_value(user=user, glycemia_value=58, measured_at=start + timedelta(minutes=20))
+    second = trigger_for_value(user=user, glycemia_value=62, measured_at=start + timedelta(hours=2))
+
+    first.refresh_from_db()
+    assert first.resolved_at == start + timedelta(minutes=20)
+    assert first.duration_seconds == 20 * 60
+    assert len(second) == 1 and second[0].first_value_at == start + timedelta(hours=2)
+
+
+@pytest.mark.django_db
+def test_stale_episode_closes_on_next_reading_of_any_rule(empty_cache):
+    from datetime import timedelta
+
+    from django.utils import timezone
+
+    user = mk_user()
+    UserAlertRule.objects.create(user=user, rule=mk_rule(max_g=69), enabled=True, cooldown_seconds=600)
+    measured_at = timezone.now() - timedelta(hours=2)
+    event = trigger_for_value(user=user, glycemia_value=60, measured_at=measured_at)[0]
+
+    # Mesure normale, hors zone de clôture de la règle : l'épisode expiré est clos quand même.
+    with patch("apps.dashboard.services.summary_snapshot.DashboardSnapshotService.schedule_refresh") as refresh:
+        assert trigger_for_value(user=user, glycemia_value=75) == []
+
+    event.refresh_from_db()
+    assert event.status == "RESOLVED" and event.resolved_at == measured_at
+    refresh.assert_called_once_with(user.pk, "alerts")
+
+
+@pytest.mark.django_db
+def test_close_stale_episodes_closes_episodes_without_readings(empty_cache):
+    from datetime import timedelta
+
+    from io import StringIO
+
+    from django.utils import timezone
+
+    from apps.alerts.services import episodes
+
+    user = mk_user()
+    UserAlertRule.objects.create(user=user, rule=mk_rule(max_g=69), enabled=True, cooldown_seconds=600)
+    stale_at = timezone.now() - timedelta(hours=1)
+    stale = trigger_for_value(user=user, glycemia_value=60, measured_at=stale_at)[0]
+    assert episodes.get_open(user.pk)
+
+    with patch("apps.dashboard.services.summary_snapshot.DashboardSnapshotService.schedule_refresh") as refresh:
+        call_command("close_stale_alert_episodes", stdout=StringIO())
+
+    stale.refresh_from_db()
+    assert stale.resolved_at == stale_at
+    assert episodes.get_open(user.pk) == {}
+    refresh.assert_called_once_with(user.pk, "alerts")
+
+
+@pytest.mark.django_db
+def test_extend_and_resolve_refresh_the_dashboard_alerts_section(empty_cache):
+    user = mk_user()
+    UserAlertRule.objects.create(user=user, rule=mk_rule(max_g=69), enabled=True, cooldown_seconds=600)
+    trigger_for_value(user=user, glycemia_value=60)
+
+    with patch("apps.dashboard.services.summary_snapshot.DashboardSnapshotService.schedule_refresh") as refresh:
+        trigger_for_value(user=user, glycemia_value=58)
+        trigger_for_value(user=user, glycemia_value=85)
+
+    assert refresh.call_count == 2
+    assert AlertEvent.objects.get().status == "RESOLVED"
 
 
 # ---------------------------------------------------------------------------
@@ -181,17 +507,69 @@ def _make_event(patient_auth, code="HYPO"):
 def test_notify_proches_sends_push_to_active_proche():
     patient = _make_patient_with_profile("pat_notif@test.com")
     proche = _make_proche_with_account(patient, "proche_notif@test.com")
+    PushToken.objects.create(user=proche, token="ExponentPushToken[proche]")
     event = _make_event(patient)
 
-    with patch("apps.alerts.services.notify_proches.send_push_to_user") as mock_push:
-        mock_push.return_value = {"success": True}
+    with patch("apps.notifications.services.push._client.post") as mock_push:
+        mock_push.return_value.json.return_value = {"data": [{"status": "ok"}]}
         from apps.alerts.services.notify_proches import notify_proches_of_alert
         notify_proches_of_alert(patient, [event])
 
     mock_push.assert_called_once()
-    call_args = mock_push.call_args
-    assert call_args[0][0].email == "proche_notif@test.com"
-    assert "Patient Test" in call_args[0][1]  # title contient le nom du patient
+    [message] = mock_push.call_args.kwargs["json"]
+    assert message["to"] == "ExponentPushToken[proche]"
+    assert "Patient Test" in message["title"]  # title contient le nom du patient
+    assert message["data"]["event_id"] == event.id
+
+
+@pytest.mark.django_db
+def test_notify_proches_batches_events_and_proches_in_one_request(django_assert_max_num_queries):
+    patient = _make_patient_with_profile("pat_batch@test.com")
+    for i in range(3):
+        proche = _make_proche_with_account(patient, f"proche_batch{i}@test.com")
+        PushToken.objects.create(user=proche, token=f"ExponentPushToken[batch{i}]")
+    events = [_make_event(patient, code="HYPO_B1"), _make_event(patient, code="HYPO_B2")]
+
+    def respond(url, json):
+        response = MagicMock()
+        response.json.return_value = {"data": [{"status": "ok"} for _ in json]}
+        return response
+
+    from apps.alerts.services.notify_proches import notify_proches_of_alert
+
+    with patch("apps.notifications.services.push._client.post", side_effect=respond) as mock_push:
+        # cache froid : proches (1 requête) + tokens (1 requête)
+        with django_assert_max_num_queries(2):
+            notify_proches_of_alert(patient, events)
+        # cache chaud : aucune requête, quelle que soit la taille de l'équipe
+        with django_assert_max_num_queries(0):
+            notify_proches_of_alert(patient, events)
+
+    assert mock_push.call_count == 2
+    assert len(mock_push.call_args.kwargs["json"]) == 6
+
+
+@pytest.mark.django_db
+def test_proche_fanout_follows_care_team_and_account_changes():
+    from apps.alerts.services import fanout
+    from apps.doctors.models import PatientCareTeam
+
+    patient = _make_patient_with_profile("pat_fanout@test.com")
+    first = _make_proche_with_account(patient, "fanout1@test.com")
+    assert [r.email for r in fanout.get(patient).recipients] == ["fanout1@test.com"]
+    assert fanout.get(patient).patient_name == "Patient Test"
+
+    second = _make_proche_with_account(patient, "fanout2@test.com")
+    assert [r.email for r in fanout.get(patient).recipients] == ["fanout1@test.com", "fanout2@test.com"]
+
+    first.is_active = False
+    first.save(update_fields=["is_active"])
+    assert [r.email for r in fanout.get(patient).recipients] == ["fanout2@test.com"]
+
+    member = PatientCareTeam.objects.get(member_profile__user=second.user)
+    member.role = "REFERENT_DOCTOR"
+    member.save()
+    assert fanout.get(patient).recipients == ()
 
 
 @pytest.mark.django_db
@@ -215,7 +593,7 @@ def test_notify_proches_ignores_proche_without_account():
     )
     event = _make_event(patient, code="HYPO2")
 
-    with patch("apps.alerts.services.notify_proches.send_push_to_user") as mock_push:
+    with patch("apps.notifications.services.push._client.post") as mock_push:
         from apps.alerts.services.notify_proches import notify_proches_of_alert
         notify_proches_of_alert(patient, [event])
 
@@ -228,7 +606,7 @@ def test_notify_proches_ignores_inactive_proche_account():
     _make_proche_with_account(patient, "proche_inactive@test.com", is_active=False)
     event = _make_event(patient, code="HYPO3")
 
-    with patch("apps.alerts.services.notify_proches.send_push_to_user") as mock_push:
+    with patch("apps.notifications.services.push._client.post") as mock_push:
         from apps.alerts.services.notify_proches import notify_proches_of_alert
         notify_proches_of_alert(patient, [event])
 
@@ -240,7 +618,7 @@ def test_notify_proches_empty_events_does_nothing():
     patient = _make_patient_with_profile("pat_empty@test.com")
     _make_proche_with_account(patient, "proche_empty@test.com")
 
-    with patch("apps.alerts.services.notify_proches.send_push_to_user") as mock_push:
+    with patch("apps.notifications.services.push._client.post") as mock_push:
         from apps.alerts.services.notify_proches import notify_proches_of_alert
         notify_proches_of_alert(patient, [])
 
@@ -248,6 +626,39 @@ def test_notify_proches_empty_events_does_nothing():
 
 
 @pytest.mark.django_db
+def test_proche_notifications_wait_for_commit_and_load_rules_with_events(
+    settings, django_capture_on_commit_callbacks, django_assert_max_num_queries
+):
+    from apps.alerts.services import fanout
+    from apps.alerts.services.notify_proches import schedule_proche_notifications
+    from apps.notifications.services import tokens
+
+    settings.BACKGROUND_TASKS_EAGER = True
+
+    patient = _make_patient_with_profile("pat_commit@test.com")
+    proche = _make_proche_with_account(patient, "proche_commit@test.com")
+    PushToken.objects.create(user=proche, token="ExponentPushToken[commit]")
+    events = [_make_event(patient, code="HYPO_C1"), _make_event(patient, code="HYPO_C2")]
+    tokens.active_tokens_for([m.account_id for m in fanout.get(patient).recipients])  # caches chauds
+
+    with patch("apps.notifications.services.push._client.post") as mock_push:
+        mock_push.return_value.json.return_value = {"data": [{"status": "ok"}, {"status": "ok"}]}
+        with django_capture_on_commit_callbacks(execute=False) as callbacks:
+            schedule_proche_notifications(patient, events)
+        # rien ne part tant que la transaction n'est pas validée
+        mock_push.assert_not_called()
+
+        # épisodes relus avec leur règle : une seule requête
+        with django_assert_max_num_queries(1):
+            for callback in callbacks:
+                callback()
+
+    mock_push.assert_called_once()
+    bodies = [message["body"] for message in mock_push.call_args.kwargs["json"]]
+    assert bodies == ["HYPO_C1 : 65 mg/dL", "HYPO_C2 : 65 mg/dL"]
+
+
+@pytest.mark.django_db
 def test_init_alert_rules_creates_and_updates_defaults():
     call_command("init_alert_rules")
 
@@ -256,6 +667,8 @@ def test_init_alert_rules_creates_and_updates_defaults():
     ).exists()
     assert AlertRule.objects.filter(code="HYPER", severity=AlertSeverity.HIGH).exists()
     assert AlertRule.objects.get(code="HYPO").name == "Hypoglycémie"
+    assert AlertRule.objects.get(code="HYPO").max_glycemia == 69
+    assert AlertRule.objects.get(code="PRED_HYPO_30").kind == "PREDICTED_HYPO"
 
 
 @pytest.mark.django_db
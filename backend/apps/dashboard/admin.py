@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import UserWidget, UserWidgetLayout
+from .models import DashboardSnapshot, UserWidget, UserWidgetLayout
 
 
 @admin.register(UserWidget)
@@ -23,3 +23,10 @@ class UserWidgetLayoutAdmin(admin.ModelAdmin):
     list_filter = ["size", "pinned", "widget_id"]
     search_fields = ["user__email", "widget_id"]
     ordering = ["user", "column", "row"]
+
+
+@admin.register(DashboardSnapshot)
+class DashboardSnapshotAdmin(admin.ModelAdmin):
+    list_display = ["user", "built_at", "updated_at"]
+    search_fields = ["user__email"]
+    readonly_fields = ["data", "built_at", "updated_at"]
@@ -1,4 +1,5 @@
 from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
 from django.core.validators import MinValueValidator
 from django.db import models
 
@@ -82,3 +83,28 @@ class UserWidgetLayout(models.Model):
 
     def __str__(self):
         return f"{self.user} - {self.widget_id} @ ({self.column}, {self.row})"
+
+
+class DashboardSnapshot(models.Model):
+    """
+    Summary du dashboard matérialisé par utilisateur.
+    Chaque section est mise à jour par les événements de son domaine
+    (services/summary_snapshot.py) ; la lecture ne recalcule rien.
+    Table: DASHBOARD_SNAPSHOTS
+    """
+
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="dashboard_snapshot",
+    )
+    data = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    built_at = models.DateTimeField(help_text="Last full rebuild")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "dashboard_snapshots"
+
+    def __str__(self):
+        return f"{self.user} - snapshot @ {self.updated_at}"
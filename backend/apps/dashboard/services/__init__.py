@@ -1,5 +1,6 @@
 from .dashboard_cache import DashboardCache
 from .health_score_service import HealthScoreService
+from .summary_snapshot import DashboardSnapshotService
 from .widget_catalog import WidgetCatalog
 
-__all__ = ["HealthScoreService", "WidgetCatalog", "DashboardCache"]
+__all__ = ["HealthScoreService", "WidgetCatalog", "DashboardCache", "DashboardSnapshotService"]
@@ -1,38 +1,109 @@
+import threading
 from typing import Optional
 
 from django.core.cache import cache
 
+from utils import data_versions
+
+from .widget_catalog import WidgetCatalog
+
 
 class DashboardCache:
     """
     Gère le cache par utilisateur pour les données du dashboard.
-    Clef: dashboard:summary:<user_id>
+
+    Le summary est mis en cache section par section :
+        dashboard:<section>:<user_id>   (version de clé KEY_VERSION)
+    Chaque section a son TTL, celui du widget qui l'affiche
+    (WidgetCatalog.default_refresh_interval) : une requête partielle ne
+    lit et n'écrit que ses sections, sans empoisonner les autres.
+    Changer le format d'une section : incrémenter KEY_VERSION.
     """
 
     CACHE_PREFIX = "dashboard"
     DEFAULT_TTL = 30  # 30 secondes
+    KEY_VERSION = 2
+
+    SECTION_WIDGETS = {
+        "glucose": "glucose_live",
+        "alerts": "alerts",
+        "medication": "medications",
+        "nutrition": "nutrition",
+        "activity": "activity",
+        "healthScore": "health_score",
+    }
+
+    _hits: dict = {}
+    _misses: dict = {}
+    _metrics_lock = threading.Lock()
 
     @classmethod
     def _make_key(cls, user_id: int, data_type: str) -> str:
         return f"{cls.CACHE_PREFIX}:{data_type}:{user_id}"
 
     @classmethod
-    def get_summary(cls, user_id: int) -> Optional[dict]:
-        """Récupère le summary du cache."""
-        key = cls._make_key(user_id, "summary")
-        return cache.get(key)
+    def section_ttl(cls, section: str) -> int:
+        widget = WidgetCatalog.get_widget(cls.SECTION_WIDGETS.get(section, ""))
+        return widget.default_refresh_interval if widget else cls.DEFAULT_TTL
 
     @classmethod
-    def set_summary(cls, user_id: int, data: dict, ttl: int = None) -> None:
-        """Stocke le summary dans le cache."""
-        key = cls._make_key(user_id, "summary")
-        cache.set(key, data, ttl or cls.DEFAULT_TTL)
+    def get_many(cls, user_id: int, sections, record: bool = True) -> dict:
+        """
+        Sections présentes en cache : {section: valeur}, en un aller-retour.
+        record=False : lecture opportuniste, hors métriques de hit.
+        """
+        keys = {cls._make_key(user_id, section): section for section in sections}
+        found = cache.get_many(list(keys), version=cls.KEY_VERSION)
+        hits = {keys[key]: value for key, value in found.items()}
+        if record:
+            cls._record(sections, hits)
+        return hits
 
     @classmethod
-    def invalidate_summary(cls, user_id: int) -> None:
-        """Invalide le cache du summary."""
-        key = cls._make_key(user_id, "summary")
-        cache.delete(key)
+    def set_many(cls, user_id: int, sections: dict) -> None:
+        """Stocke des sections ; un set_many par TTL distinct."""
+        by_ttl: dict = {}
+        for section, value in sections.items():
+            by_ttl.setdefault(cls.section_ttl(section), {})[cls._make_key(user_id, section)] = value
+        for ttl, entries in by_ttl.items():
+            cache.set_many(entries, ttl, version=cls.KEY_VERSION)
+
+    @classmethod
+    def invalidate_sections(cls, user_id: int, sections=None) -> None:
+        """Invalide les sections données (toutes par défaut)."""
+        sections = cls.SECTION_WIDGETS if sections is None else sections
+        cache.delete_many(
+            [cls._make_key(user_id, section) for section in sections], version=cls.KEY_VERSION
+        )
+        data_versions.bump(user_id, data_versions.DASHBOARD)
+
+    @classmethod
+    def _record(cls, sections, hits: dict) -> None:
+        with cls._metrics_lock:
+            for section in sections:
+                counter = cls._hits if section in hits else cls._misses
+                counter[section] = counter.get(section, 0) + 1
+
+    @classmethod
+    def metrics_snapshot(cls) -> dict:
+        """Hits / misses / taux de hit par section (compteurs du process)."""
+        with cls._metrics_lock:
+            hits, misses = dict(cls._hits), dict(cls._misses)
+        snapshot = {}
+        for section in sorted(set(hits) | set(misses)):
+            total = hits.get(section, 0) + misses.get(section, 0)
+            snapshot[section] = {
+                "hits": hits.get(section, 0),
+                "misses": misses.get(section, 0),
+                "hit_rate": round(hits.get(section, 0) / total, 4) if total else 0.0,
+            }
+        return snapshot
+
+    @classmethod
+    def reset_metrics(cls) -> None:
+        with cls._metrics_lock:
+            cls._hits.clear()
+            cls._misses.clear()
 
     @classmethod
     def get_widgets(cls, user_id: int) -> Optional[list]:
@@ -51,9 +122,10 @@ class DashboardCache:
         """Invalide le cache des widgets."""
         key = cls._make_key(user_id, "widgets")
         cache.delete(key)
+        data_versions.bump(user_id, data_versions.WIDGETS)
 
     @classmethod
     def invalidate_all(cls, user_id: int) -> None:
         """Invalide tout le cache dashboard pour un utilisateur."""
-        cls.invalidate_summary(user_id)
+        cls.invalidate_sections(user_id)
         cls.invalidate_widgets(user_id)
@@ -1,12 +1,28 @@
 from datetime import timedelta
 
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, DurationField, ExpressionWrapper, F, IntegerField, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 
+from apps.glycemia.thresholds import HYPER_THRESHOLD, HYPO_THRESHOLD
+
 
 class HealthScoreService:
     """
     Calcule le score de santé 0-100.
     Pondération: glycémie 40%, observance 20%, nutrition 20%, activité 20%.
+
+    Les composantes sont calculées par agrégation conditionnelle, pour un
+    ou plusieurs utilisateurs à la fois :
+    - glycémie : une requête sur les comptes, sur exactement les 24
+      dernières heures (rollups horaires des heures pleines, lectures
+      brutes des deux heures partielles) ;
+    - observance, nutrition, activité : une requête sur les comptes, une
+      sous-requête agrégée par composante.
+    Chaque composante est mise en cache (COMPONENT_TTL) et invalidée par les
+    événements de son domaine (apps/dashboard/signals.py).
     """
 
     WEIGHT_GLYCEMIA = 0.40
@@ -14,83 +30,225 @@ class HealthScoreService:
     WEIGHT_NUTRITION = 0.20
     WEIGHT_ACTIVITY = 0.20
 
-    GLYCEMIA_TARGET_MIN = 70
-    GLYCEMIA_TARGET_MAX = 180
+    # Cible utilisée par les rollups (apps.glycemia.services.rollups)
+    GLYCEMIA_TARGET_MIN = HYPO_THRESHOLD
+    GLYCEMIA_TARGET_MAX = HYPER_THRESHOLD
+
+    GLYCEMIA = "glycemia"
+    ADHERENCE = "adherence"
+    NUTRITION = "nutrition"
+    ACTIVITY = "activity"
+    COMPONENTS = (GLYCEMIA, ADHERENCE, NUTRITION, ACTIVITY)
+
+    CACHE_PREFIX = "health_score"
+    # Les fenêtres sont glissantes (24h, 7 jours) : le TTL borne la dérive.
+    COMPONENT_TTL = 10 * 60
 
     @classmethod
     def calculate(cls, user) -> int:
-        glycemia_score = cls._calculate_glycemia_score(user)
-        adherence_score = cls._calculate_adherence_score(user)
-        nutrition_score = cls._calculate_nutrition_score(user)
-        activity_score = cls._calculate_activity_score(user)
+        user_id = getattr(user, "pk", user)
+        return cls.calculate_many([user_id])[user_id]
+
+    @classmethod
+    def calculate_many(cls, user_ids) -> dict:
+        """{user_id: score} pour une liste de patients (listes médecin), en 2 requêtes au plus."""
+        user_ids = list(dict.fromkeys(user_ids))
+        components = cls.components_many(user_ids)
+        return {user_id: cls._total(components[user_id]) for user_id in user_ids}
+
+    @classmethod
+    def components_many(cls, user_ids) -> dict:
+        """{user_id: {composante: score}} ; seules les composantes absentes du cache sont calculées."""
+        keys = {
+            cls._key(component, user_id): (user_id, component)
+            for user_id in user_ids
+            for component in cls.COMPONENTS
+        }
+        components = {user_id: {} for user_id in user_ids}
+        for key, score in cache.get_many(list(keys)).items():
+            user_id, component = keys[key]
+            components[user_id][component] = score
+
+        missing = {
+            user_id: [c for c in cls.COMPONENTS if c not in scores]
+            for user_id, scores in components.items()
+            if len(scores) < len(cls.COMPONENTS)
+        }
+        if missing:
+            computed = cls._compute(missing)
+            cache.set_many(
+                {
+                    cls._key(component, user_id): score
+                    for user_id, scores in computed.items()
+                    for component, score in scores.items()
+                },
+                cls.COMPONENT_TTL,
+            )
+            for user_id, scores in computed.items():
+                components[user_id].update(scores)
+        return components
+
+    @classmethod
+    def invalidate(cls, user_id, *components) -> None:
+        cache.delete_many([cls._key(component, user_id) for component in components or cls.COMPONENTS])
+
+    @classmethod
+    def invalidate_on_commit(cls, user_id, *components) -> None:
+        """Invalide après commit : un recalcul concurrent ne doit pas remettre l'ancienne valeur."""
+        transaction.on_commit(lambda: cls.invalidate(user_id, *components))
 
+    @classmethod
+    def _key(cls, component: str, user_id) -> str:
+        return f"{cls.CACHE_PREFIX}:{component}:{user_id}"
+
+    @classmethod
+    def _total(cls, components: dict) -> int:
         total = (
-            glycemia_score * cls.WEIGHT_GLYCEMIA
-            + adherence_score * cls.WEIGHT_ADHERENCE
-            + nutrition_score * cls.WEIGHT_NUTRITION
-            + activity_score * cls.WEIGHT_ACTIVITY
+            components[cls.GLYCEMIA] * cls.WEIGHT_GLYCEMIA
+            + components[cls.ADHERENCE] * cls.WEIGHT_ADHERENCE
+            + components[cls.NUTRITION] * cls.WEIGHT_NUTRITION
+            + components[cls.ACTIVITY] * cls.WEIGHT_ACTIVITY
         )
-
         return round(total)
 
     @classmethod
-    def _calculate_glycemia_score(cls, user) -> float:
+    def _compute(cls, missing: dict) -> dict:
+        """Calcule les composantes manquantes : {user_id: [composantes]} -> {user_id: {composante: score}}."""
+        computed = {user_id: {} for user_id in missing}
+        by_str = {str(user_id): user_id for user_id in missing}
+
+        glycemia_users = [user_id for user_id, components in missing.items() if cls.GLYCEMIA in components]
+        if glycemia_users:
+            tir = cls._glycemia_tir(glycemia_users)
+            for user_id in glycemia_users:
+                computed[user_id][cls.GLYCEMIA] = cls._calculate_glycemia_score(tir.get(str(user_id)))
+
+        other_users = [
+            user_id for user_id, components in missing.items() if set(components) - {cls.GLYCEMIA}
+        ]
+        if other_users:
+            for row in cls._account_aggregates(other_users):
+                user_id = by_str[str(row["pk"])]
+                wanted = missing[user_id]
+                scores = computed[user_id]
+                if cls.ADHERENCE in wanted:
+                    scores[cls.ADHERENCE] = cls._calculate_adherence_score(row["medications"], row["taken"])
+                if cls.NUTRITION in wanted:
+                    scores[cls.NUTRITION] = cls._calculate_nutrition_score(row["meals"])
+                if cls.ACTIVITY in wanted:
+                    scores[cls.ACTIVITY] = cls._calculate_activity_score(row["active_duration"])
+            for user_id in other_users:
+                # Compte inexistant : valeurs neutres plutôt qu'une KeyError.
+                for component in missing[user_id]:
+                    computed[user_id].setdefault(component, cls._default_score(component))
+        return computed
+
+    @staticmethod
+    def _glycemia_tir(user_ids) -> dict:
         """
-        Score basé sur le Time In Range (TIR) des dernières 24h.
+        TIR de [maintenant - 24h, maintenant] par utilisateur, en une requête :
+        rollups horaires des heures pleines, lectures brutes des heures
+        partielles aux deux bords (mêmes valeurs qu'un calcul sur les lectures).
         """
-        from apps.glycemia.models import Glycemia
+        from apps.glycemia.models import GlycemiaHisto, GlycemiaRollup, RollupPeriod
+        from apps.glycemia.services.rollups import hour_start
+        from apps.users.models import AuthAccount
 
-        since = timezone.now() - timedelta(hours=24)
-        readings = Glycemia.objects.filter(user=user, measured_at__gte=since)
+        now = timezone.now()
+        since = now - timedelta(hours=24)
+        first_hour = hour_start(since)
+        if first_hour < since:
+            first_hour += timedelta(hours=1)
+        last_hour = hour_start(now)
 
-        if not readings.exists():
-            return 50.0
+        def per_user(queryset, value):
+            subquery = Subquery(
+                queryset.filter(user=OuterRef("pk")).order_by().values("user").annotate(v=value).values("v"),
+                output_field=IntegerField(),
+            )
+            return Coalesce(subquery, 0)
 
-        total = readings.count()
-        in_range = readings.filter(
-            value__gte=cls.GLYCEMIA_TARGET_MIN, value__lte=cls.GLYCEMIA_TARGET_MAX
-        ).count()
+        rollups = GlycemiaRollup.objects.filter(
+            period=RollupPeriod.HOUR, bucket_start__gte=first_hour, bucket_start__lt=last_hour
+        )
+        raw = GlycemiaHisto.objects.filter(
+            Q(measured_at__gte=since, measured_at__lt=first_hour) | Q(measured_at__gte=last_hour, measured_at__lte=now)
+        )
+        in_range = Q(value__gte=HYPO_THRESHOLD, value__lte=HYPER_THRESHOLD)
+        rows = AuthAccount.objects.filter(pk__in=user_ids).values("pk").annotate(
+            readings=per_user(rollups, Sum("count")) + per_user(raw, Count("pk")),
+            in_range=per_user(rollups, Sum("in_range_count")) + per_user(raw, Count("pk", filter=in_range)),
+        )
+        return {str(row["pk"]): row["in_range"] / row["readings"] * 100 for row in rows if row["readings"]}
 
-        tir = (in_range / total) * 100
-        return min(100, tir)
+    @staticmethod
+    def _account_aggregates(user_ids):
+        """Observance, repas et durée d'activité des 7 derniers jours, une ligne par compte."""
+        from apps.activities.models import UserActivity
+        from apps.meals.models import UserMeal
+        from apps.medications.models import UserMedication
+        from apps.users.models import AuthAccount
+
+        now = timezone.now()
+        since = now - timedelta(days=7)
+
+        def aggregate(queryset, value, default=0):
+            subquery = Subquery(
+                queryset.filter(user=OuterRef("pk")).order_by().values("user").annotate(v=value).values("v"),
+                output_field=value.output_field,
+            )
+            return subquery if default is None else Coalesce(subquery, default)
+
+        active_medications = UserMedication.objects.filter(statut=True, start_date__lte=now.date())
+        duration = ExpressionWrapper(F("end") - F("start"), output_field=DurationField())
+        return AuthAccount.objects.filter(pk__in=user_ids).values("pk").annotate(
+            medications=aggregate(active_medications, Count("pk")),
+            taken=aggregate(active_medications, Count("pk", filter=Q(taken_at__gte=since))),
+            meals=aggregate(UserMeal.objects.filter(taken_at__gte=since), Count("pk")),
+            # None : aucune activité (≠ activités de durée nulle)
+            active_duration=aggregate(UserActivity.objects.filter(start__gte=since), Sum(duration), default=None),
+        )
 
     @classmethod
-    def _calculate_adherence_score(cls, user) -> float:
+    def _default_score(cls, component: str) -> float:
+        return {
+            cls.GLYCEMIA: cls._calculate_glycemia_score(None),
+            cls.ADHERENCE: cls._calculate_adherence_score(0, 0),
+            cls.NUTRITION: cls._calculate_nutrition_score(0),
+            cls.ACTIVITY: cls._calculate_activity_score(None),
+        }[component]
+
+    @staticmethod
+    def _calculate_glycemia_score(tir) -> float:
         """
-        Score basé sur l'observance médicamenteuse.
+        Score basé sur le Time In Range (TIR) des dernières 24h exactes.
         """
-        from apps.medications.models import UserMedication
+        if tir is None:
+            return 50.0
 
-        since = timezone.now() - timedelta(days=7)
-        medications = UserMedication.objects.filter(
-            user=user, start_date__lte=timezone.now().date(), statut=True
-        )
+        return min(100, tir)
 
-        if not medications.exists():
+    @staticmethod
+    def _calculate_adherence_score(medications: int, taken: int) -> float:
+        """
+        Score basé sur l'observance médicamenteuse.
+        """
+        if not medications:
             return 100.0
 
-        taken = medications.filter(taken_at__gte=since).count()
-        total = medications.count() * 7
-
-        if total == 0:
-            return 100.0
+        total = medications * 7
 
         return min(100, (taken / total) * 100)
 
-    @classmethod
-    def _calculate_nutrition_score(cls, user) -> float:
+    @staticmethod
+    def _calculate_nutrition_score(meals: int) -> float:
         """
         Score basé sur la régularité des repas.
         """
-        from apps.meals.models import UserMeal
-
-        since = timezone.now() - timedelta(days=7)
-        meals = UserMeal.objects.filter(user=user, taken_at__gte=since)
-
-        if not meals.exists():
+        if not meals:
             return 50.0
 
-        meals_per_day = meals.count() / 7
+        meals_per_day = meals / 7
         ideal_meals = 3
 
         ratio = meals_per_day / ideal_meals
@@ -99,23 +257,15 @@ class HealthScoreService:
 
         return min(100, max(0, ratio * 100))
 
-    @classmethod
-    def _calculate_activity_score(cls, user) -> float:
+    @staticmethod
+    def _calculate_activity_score(active_duration) -> float:
         """
         Score basé sur l'activité physique.
         """
-        from apps.activities.models import UserActivity
-
-        since = timezone.now() - timedelta(days=7)
-        activities = UserActivity.objects.filter(user=user, start__gte=since)
-
-        if not activities.exists():
+        if active_duration is None:
             return 30.0
 
-        total_minutes = 0
-        for activity in activities:
-            duration = (activity.end - activity.start).total_seconds() / 60
-            total_minutes += duration
+        total_minutes = active_duration.total_seconds() / 60
 
         avg_daily_minutes = total_minutes / 7
         target_minutes = 30
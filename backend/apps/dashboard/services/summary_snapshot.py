@@ -0,0 +1,319 @@
+"""
+Summary du dashboard matérialisé (DashboardSnapshot) et maintenu par
+événements.
+
+Lecture : sections en cache (DashboardCache, TTL par section), sinon la
+ligne DashboardSnapshot ; seules les sections absentes des deux sont
+calculées, puis ajoutées au document. Une requête partielle (`include[]`)
+ne calcule que ses sections ; la réponse y ajoute les autres sections déjà
+matérialisées (cache ou document) et omet celles qui ne le sont pas encore
+(`get_full_summary`) : aucune valeur inventée n'est servie sous un ETag.
+
+Écriture : chaque événement de domaine (mesure, repas, activité, prise de
+médicament, alerte) recalcule seulement ses sections déjà matérialisées
+(signals.py), après commit et hors requête (utils.background). Le
+healthScore dépend des mesures, repas, activités et prises : il suit ces
+événements.
+
+Les sections portent sur des fenêtres glissantes (24 h, jour courant) :
+un document démarré depuis plus de MAX_AGE, ou un autre jour, est
+repris de zéro à la lecture suivante.
+
+Toute écriture de sections dans un document déjà servi incrémente la
+version de données "dashboard" (utils.data_versions) : l'ETag du summary
+change avec son contenu, y compris quand une section jusque-là omise des
+réponses partielles apparaît. Les
+sections recalculées par un événement sont aussi poussées aux widgets
+sur le WebSocket (widget_push.py).
+"""
+
+from __future__ import annotations
+
+import logging
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from utils import background, data_versions
+
+from . import widget_push
+from .dashboard_cache import DashboardCache
+from .health_score_service import HealthScoreService
+
+logger = logging.getLogger(__name__)
+
+
+class DashboardSnapshotService:
+    GLUCOSE = "glucose"
+    ALERTS = "alerts"
+    MEDICATION = "medication"
+    NUTRITION = "nutrition"
+    ACTIVITY = "activity"
+    HEALTH_SCORE = "healthScore"
+
+    SECTIONS = (GLUCOSE, ALERTS, MEDICATION, NUTRITION, ACTIVITY, HEALTH_SCORE)
+    # Sections qui entrent dans le calcul du healthScore.
+    SCORED_SECTIONS = frozenset({GLUCOSE, MEDICATION, NUTRITION, ACTIVITY})
+
+    MAX_AGE = timedelta(hours=1)
+
+    # ── Lecture ──────────────────────────────────────────────────────
+
+    @classmethod
+    def get_summary(cls, user_id, sections=None) -> dict:
+        """Sections demandées (toutes par défaut) : cache, puis document, puis calcul des manquantes."""
+        sections = [section for section in cls.SECTIONS if sections is None or section in sections]
+        found = DashboardCache.get_many(user_id, sections)
+        missing = [section for section in sections if section not in found]
+        if missing:
+            found.update(cls._fill(user_id, missing))
+        return {section: found[section] for section in sections}
+
+    @classmethod
+    def get_full_summary(cls, user_id, sections=None) -> dict:
+        """
+        Réponse de l'API : les sections demandées, calculées si besoin, plus
+        les autres déjà matérialisées (cache ou document). Une section ni
+        demandée ni matérialisée est omise.
+        """
+        summary = cls.get_summary(user_id, sections)
+        others = [section for section in cls.SECTIONS if section not in summary]
+        if not others:
+            return summary
+
+        found = DashboardCache.get_many(user_id, others, record=False)
+        missing = [section for section in others if section not in found]
+        if missing:
+            document = cls._load(user_id)
+            if document is not None and not cls._is_stale(document):
+                materialized = document["sections"]
+                found.update({section: materialized[section] for section in missing if section in materialized})
+        summary.update(found)
+        return {section: summary[section] for section in cls.SECTIONS if section in summary}
+
+    @classmethod
+    def _fill(cls, user_id, missing) -> dict:
+        document = cls._load(user_id)
+        stale = document is not None and cls._is_stale(document)
+        found = {}
+        if document is not None and not stale:
+            materialized = document["sections"]
+            found = {section: materialized[section] for section in missing if section in materialized}
+
+        to_build = [section for section in missing if section not in found]
+        if to_build:
+            built = cls.build_sections(user_id, to_build)
+            cls._store(user_id, built)
+            found.update(built)
+            if document is not None:
+                # Document déjà servi, remplacé ou complété de sections que les
+                # réponses précédentes omettaient : leurs ETag ne valent plus.
+                data_versions.bump(user_id, data_versions.DASHBOARD)
+
+        DashboardCache.set_many(user_id, found)
+        return found
+
+    @classmethod
+    def _load(cls, user_id) -> dict | None:
+        from apps.dashboard.models import DashboardSnapshot
+
+        return DashboardSnapshot.objects.filter(user_id=user_id).values_list("data", flat=True).first()
+
+    @classmethod
+    def _is_stale(cls, document: dict) -> bool:
+        built_at = parse_datetime(document.get("built_at") or "")
+        if built_at is None:
+            return True
+        now = timezone.now()
+        return now - built_at > cls.MAX_AGE or timezone.localdate(built_at) != timezone.localdate(now)
+
+    # ── Écriture ─────────────────────────────────────────────────────
+
+    @classmethod
+    def _store(cls, user_id, built: dict) -> None:
+        """Ajoute des sections au document ; un document périmé est repris de zéro."""
+        from apps.dashboard.models import DashboardSnapshot
+
+        now = timezone.now()
+        with transaction.atomic():
+            snapshot, created = DashboardSnapshot.objects.select_for_update().get_or_create(
+                user_id=user_id,
+                defaults={"data": {"built_at": now.isoformat(), "sections": built}, "built_at": now},
+            )
+            if created:
+                return
+            if cls._is_stale(snapshot.data):
+                snapshot.data = {"built_at": now.isoformat(), "sections": built}
+                snapshot.built_at = now
+            else:
+                snapshot.data["sections"].update(built)
+            snapshot.save()
+
+    @classmethod
+    def refresh_sections(cls, user_id, sections) -> None:
+        """
+        Recalcule les sections touchées par un événement, parmi celles déjà
+        matérialisées ; les autres seront calculées à leur première lecture.
+        """
+        from apps.dashboard.models import DashboardSnapshot
+
+        sections = set(sections)
+        if sections & cls.SCORED_SECTIONS:
+            sections.add(cls.HEALTH_SCORE)
+
+        with transaction.atomic():
+            snapshot = DashboardSnapshot.objects.select_for_update().filter(user_id=user_id).first()
+            if snapshot is None:
+                return
+            sections &= set(snapshot.data["sections"])
+            if not sections:
+                return
+            built = cls.build_sections(user_id, sections)
+            snapshot.data["sections"].update(built)
+            snapshot.save(update_fields=["data", "updated_at"])
+        DashboardCache.set_many(user_id, built)
+        data_versions.bump(user_id, data_versions.DASHBOARD)
+        widget_push.notify(user_id, built)
+
+    @classmethod
+    def schedule_refresh(cls, user_id, *sections) -> None:
+        """Rafraîchit les sections après commit, sur le pool de fond (signaux)."""
+        transaction.on_commit(lambda: background.submit(cls.refresh_sections, user_id, sections))
+
+    # ── Sections ─────────────────────────────────────────────────────
+
+    @classmethod
+    def build_sections(cls, user_id, sections) -> dict:
+        from apps.dashboard.serializers import DashboardSummarySerializer
+
+        fields = DashboardSummarySerializer().fields
+        builders = {
+            cls.GLUCOSE: cls._glucose,
+            cls.ALERTS: cls._alerts,
+            cls.MEDICATION: cls._medication,
+            cls.NUTRITION: cls._nutrition,
+            cls.ACTIVITY: cls._activity,
+            cls.HEALTH_SCORE: HealthScoreService.calculate,
+        }
+        built = {}
+        for section in sections:
+            value = builders[section](user_id)
+            built[section] = None if value is None else fields[section].to_representation(value)
+        return built
+
+    @staticmethod
+    def _glucose(user_id) -> dict | None:
+        from apps.glycemia.models import Glycemia
+
+        latest = Glycemia.objects.filter(user_id=user_id).first()
+        if not latest:
+            return None
+
+        return {
+            "value": latest.value,
+            "unit": latest.unit,
+            "trend": latest.trend,
+            "recordedAt": latest.measured_at,
+        }
+
+    @staticmethod
+    def _alerts(user_id) -> list:
+        from apps.alerts.models import AlertEvent, AlertSeverity
+
+        severity_map = {
+            AlertSeverity.CRITICAL: "critical",
+            AlertSeverity.HIGH: "high",
+            AlertSeverity.MEDIUM: "medium",
+            AlertSeverity.LOW: "low",
+            AlertSeverity.INFO: "info",
+        }
+        alerts = (
+            AlertEvent.objects.filter(user_id=user_id, status__in=["TRIGGERED", "SENT"])
+            .select_related("rule")
+            .order_by("-rule__severity", "-triggered_at")[:3]
+        )
+        return [
+            {
+                "alertId": str(alert.id),
+                "type": alert.rule.code.lower(),
+                "severity": severity_map.get(alert.rule.severity, "medium"),
+            }
+            for alert in alerts
+        ]
+
+    @staticmethod
+    def _medication(user_id) -> dict:
+        from apps.medications.models import UserMedication
+
+        # Récupérer la prochaine dose
+        next_dose = (
+            UserMedication.objects.filter(user_id=user_id, statut=True, taken_at__isnull=True)
+            .select_related("medication")
+            .first()
+        )
+
+        # Calculer les médicaments pris aujourd'hui
+        today = timezone.now().date()
+        taken_today = UserMedication.objects.filter(
+            user_id=user_id, statut=True, taken_at__date=today
+        ).count()
+
+        # Calculer le total de médicaments actifs pour aujourd'hui
+        total_today = UserMedication.objects.filter(
+            user_id=user_id, statut=True, start_date__lte=today
+        ).count()
+
+        result = {
+            "taken_count": taken_today,
+            "total_count": total_today,
+            "nextDose": None,
+        }
+
+        if next_dose:
+            result["nextDose"] = {
+                "name": next_dose.medication.name,
+                "scheduledAt": timezone.now(),
+                "status": "pending",
+            }
+
+        return result
+
+    @staticmethod
+    def _nutrition(user_id) -> dict:
+        from apps.meals.models import UserMeal
+
+        since = timezone.now() - timedelta(hours=24)
+        meals = UserMeal.objects.filter(user_id=user_id, taken_at__gte=since).select_related("meal")
+
+        total_calories = 0
+        total_carbs = 0
+
+        for user_meal in meals:
+            if user_meal.meal.calories:
+                total_calories += user_meal.meal.calories
+            if user_meal.meal.glucose:
+                total_carbs += int(user_meal.meal.glucose)
+
+        return {
+            "calories": {"consumed": total_calories, "goal": 1800},
+            "carbs": {"grams": total_carbs, "goal": 200},
+        }
+
+    @staticmethod
+    def _activity(user_id) -> dict:
+        from apps.activities.models import UserActivity
+
+        today = timezone.now().date()
+        activities = UserActivity.objects.filter(user_id=user_id, start__date=today)
+
+        total_minutes = 0
+        for activity in activities:
+            duration = (activity.end - activity.start).total_seconds() / 60
+            total_minutes += duration
+
+        return {
+            "steps": {"value": 0, "goal": 8000},
+            "activeMinutes": int(total_minutes),
+        }
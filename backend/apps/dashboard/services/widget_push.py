@@ -0,0 +1,165 @@
+"""
+Mises à jour des widgets poussées sur le WebSocket existant.
+
+Quand un événement de domaine recalcule des sections du summary
+(DashboardSnapshotService.refresh_sections), chaque widget concerné
+reçoit une trame `widget_update` ne contenant que sa section, sur le
+groupe WebSocket de l'utilisateur (glycemia_user_<id_auth>) ; le
+consumer ne la transmet qu'au propriétaire du tableau de bord.
+
+Regroupement par widget sur `min_refresh_interval` (WidgetCatalog) :
+- premier envoi immédiat, puis un bail en cache (partagé entre
+  processus) bloque les envois suivants pendant l'intervalle ;
+- un événement pendant le bail est différé : à l'échéance, la section
+  est relue (cache, sinon document) et envoyée une seule fois, quel que
+  soit le nombre d'événements accumulés.
+
+WS_BATCH_WINDOW = 0 (tests) : pas de thread, les envois différés
+attendent flush().
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections
+from django.utils import timezone
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+
+from .dashboard_cache import DashboardCache
+from .widget_catalog import WidgetCatalog
+
+logger = logging.getLogger(__name__)
+
+MESSAGE_TYPE = "widget_update"
+LEASE_PREFIX = "widget_push"
+
+
+def _lease_key(user_id, widget_id) -> str:
+    return f"{LEASE_PREFIX}:{widget_id}:{user_id}"
+
+
+def widget_for(section):
+    """WidgetDefinition affichant la section, ou None."""
+    return WidgetCatalog.get_widget(DashboardCache.SECTION_WIDGETS.get(section, ""))
+
+
+def send(user_id, sections: dict) -> None:
+    """Envoie une trame widget_update : {section: données} -> un élément par widget."""
+    from apps.glycemia.services.broadcaster import group_for
+
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        logger.warning("Channel layer not configured, skipping widget push")
+        return
+
+    updated_at = timezone.now().isoformat()
+    widgets = [
+        {"widgetId": widget_for(section).widget_id, "section": section, "data": data, "updatedAt": updated_at}
+        for section, data in sections.items()
+    ]
+    try:
+        async_to_sync(channel_layer.group_send)(
+            group_for(user_id), {"type": MESSAGE_TYPE, "user_id": str(user_id), "widgets": widgets}
+        )
+    except Exception as e:
+        logger.error(f"Failed to push widget update to user {user_id}: {e}")
+
+
+class WidgetPusher:
+    def __init__(self):
+        self._due: dict = {}  # (user_id, section) -> échéance (time.time())
+        self._cond = threading.Condition()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def deferred_in_background(self) -> bool:
+        return getattr(settings, "WS_BATCH_WINDOW", 0.25) > 0
+
+    def notify(self, user_id, sections: dict) -> None:
+        """Sections recalculées : envoi immédiat hors bail, sinon différé à la fin du bail."""
+        now = time.time()
+        ready = {}
+        for section, data in sections.items():
+            widget = widget_for(section)
+            if widget is None:
+                continue
+            key = _lease_key(user_id, widget.widget_id)
+            if cache.add(key, now, widget.min_refresh_interval):
+                ready[section] = data
+            else:
+                leased_at = cache.get(key) or now
+                self._defer(user_id, section, leased_at + widget.min_refresh_interval)
+        if ready:
+            send(user_id, ready)
+
+    def _defer(self, user_id, section, due: float) -> None:
+        with self._cond:
+            self._due.setdefault((user_id, section), due)
+            if self.deferred_in_background and (self._thread is None or not self._thread.is_alive()):
+                self._thread = threading.Thread(target=self._run, name="glyco-widget-push", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def pending(self) -> dict:
+        with self._cond:
+            return dict(self._due)
+
+    def flush(self, force: bool = True) -> None:
+        """Envoie les widgets différés (tous, ou seulement ceux arrivés à échéance)."""
+        now = time.time()
+        with self._cond:
+            due = [key for key, deadline in self._due.items() if force or deadline <= now]
+            for key in due:
+                del self._due[key]
+
+        by_user: dict = {}
+        for user_id, section in due:
+            by_user.setdefault(user_id, []).append(section)
+        for user_id, user_sections in by_user.items():
+            self._send_current(user_id, user_sections)
+
+    def _send_current(self, user_id, user_sections) -> None:
+        from .summary_snapshot import DashboardSnapshotService
+
+        # Données au moment de l'envoi : les événements du bail sont fusionnés.
+        sections = DashboardSnapshotService.get_summary(user_id, user_sections)
+        now = time.time()
+        for section in sections:
+            widget = widget_for(section)
+            cache.set(_lease_key(user_id, widget.widget_id), now, widget.min_refresh_interval)
+        send(user_id, sections)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._due:
+                    self._cond.wait()
+                wait = min(self._due.values()) - time.time()
+                if wait > 0:
+                    # Réveillé plus tôt si un envoi plus proche est ajouté.
+                    self._cond.wait(wait)
+                    continue
+            try:
+                self.flush(force=False)
+            except Exception:
+                logger.exception("Deferred widget push failed")
+            finally:
+                close_old_connections()
+
+
+_pusher = WidgetPusher()
+
+
+def notify(user_id, sections: dict) -> None:
+    _pusher.notify(user_id, sections)
+
+
+def flush() -> None:
+    _pusher.flush()
@@ -0,0 +1,73 @@
+"""
+Maintien du summary matérialisé (services/summary_snapshot.py) : chaque
+événement de domaine rafraîchit uniquement ses sections, après commit.
+Les composantes du score de santé en cache sont invalidées avant.
+Les widgets en cache (et leur version de données) suivent UserWidget.
+"""
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.activities.models import UserActivity
+from apps.alerts.models import AlertEvent
+from apps.glycemia.models import Glycemia, GlycemiaHisto
+from apps.meals.models import UserMeal
+from apps.medications.models import MedicationIntake, UserMedication
+
+from .models import UserWidget
+from .services.dashboard_cache import DashboardCache
+from .services.health_score_service import HealthScoreService as Score
+from .services.summary_snapshot import DashboardSnapshotService as Snapshot
+
+
+@receiver(post_save, sender=GlycemiaHisto)
+@receiver(post_delete, sender=GlycemiaHisto)
+def invalidate_glycemia_score(sender, instance, **kwargs):
+    # Le TIR est lu dans les rollups, tenus à jour depuis GlycemiaHisto.
+    Score.invalidate_on_commit(instance.user_id, Score.GLYCEMIA)
+
+
+@receiver(post_save, sender=Glycemia)
+@receiver(post_delete, sender=Glycemia)
+def refresh_glucose_section(sender, instance, **kwargs):
+    Snapshot.schedule_refresh(instance.user_id, Snapshot.GLUCOSE)
+
+
+@receiver(post_save, sender=UserMeal)
+@receiver(post_delete, sender=UserMeal)
+def refresh_nutrition_section(sender, instance, **kwargs):
+    Score.invalidate_on_commit(instance.user_id, Score.NUTRITION)
+    Snapshot.schedule_refresh(instance.user_id, Snapshot.NUTRITION)
+
+
+@receiver(post_save, sender=UserActivity)
+@receiver(post_delete, sender=UserActivity)
+def refresh_activity_section(sender, instance, **kwargs):
+    Score.invalidate_on_commit(instance.user_id, Score.ACTIVITY)
+    Snapshot.schedule_refresh(instance.user_id, Snapshot.ACTIVITY)
+
+
+@receiver(post_save, sender=UserMedication)
+@receiver(post_delete, sender=UserMedication)
+def refresh_medication_section(sender, instance, **kwargs):
+    Score.invalidate_on_commit(instance.user_id, Score.ADHERENCE)
+    Snapshot.schedule_refresh(instance.user_id, Snapshot.MEDICATION)
+
+
+@receiver(post_save, sender=MedicationIntake)
+def refresh_medication_section_on_intake(sender, instance, **kwargs):
+    Snapshot.schedule_refresh(instance.user_medication.user_id, Snapshot.MEDICATION)
+
+
+@receiver(post_save, sender=AlertEvent)
+@receiver(post_delete, sender=AlertEvent)
+def refresh_alerts_section(sender, instance, **kwargs):
+    Snapshot.schedule_refresh(instance.user_id, Snapshot.ALERTS)
+
+
+@receiver(post_save, sender=UserWidget)
+@receiver(post_delete, sender=UserWidget)
+def invalidate_widgets(sender, instance, **kwargs):
+    user_id = instance.user_id
+    transaction.on_commit(lambda: DashboardCache.invalidate_widgets(user_id))
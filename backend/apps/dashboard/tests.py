@@ -1,13 +1,19 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest.mock import MagicMock, patch
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
 from django.urls import reverse
+from django.utils import timezone
 
 from rest_framework import status
 from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
 
 from apps.users.models import AuthAccount
 
-from .models import UserWidget, UserWidgetLayout, WidgetSize
-from .services import HealthScoreService, WidgetCatalog
+from .models import DashboardSnapshot, UserWidget, UserWidgetLayout, WidgetSize
+from .services import DashboardCache, DashboardSnapshotService, HealthScoreService, WidgetCatalog, widget_push
 
 
 class WidgetCatalogTest(TestCase):
@@ -37,6 +43,84 @@ class WidgetCatalogTest(TestCase):
         self.assertEqual(WidgetCatalog.MAX_WIDGETS, 10)
 
 
+
+@override_settings(BACKGROUND_TASKS_EAGER=True)
+class HealthScoreServiceTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = AuthAccount.objects.create_user(
+            email="score@example.com", password="testpass123"
+        )
+        self.empty = AuthAccount.objects.create_user(
+            email="score-empty@example.com", password="testpass123"
+        )
+
+    def _populate(self):
+        from apps.activities.models import Activity, UserActivity
+        from apps.glycemia.models import GlycemiaHisto
+        from apps.meals.models import Meal, UserMeal
+        from apps.medications.models import Medication, UserMedication
+
+        now = timezone.now()
+        for minutes, value in ((5, 110), (10, 150), (15, 55)):
+            GlycemiaHisto.objects.create(user=self.user, measured_at=now - timedelta(minutes=minutes), value=value)
+        UserMedication.objects.create(
+            user=self.user,
+            medication=Medication.objects.create(name="Metformine"),
+            start_date=now.date() - timedelta(days=3),
+            taken_at=now,
+        )
+        meal = Meal.objects.create(name="Salade")
+        for i in range(21):
+            UserMeal.objects.create(user=self.user, meal=meal, taken_at=now - timedelta(hours=i * 7))
+        UserActivity.objects.create(
+            user=self.user,
+            activity=Activity.objects.create(name="Marche"),
+            start=now - timedelta(hours=5),
+            end=now - timedelta(hours=5) + timedelta(minutes=210),
+        )
+
+    def test_components_are_aggregated_in_two_queries(self):
+        self._populate()
+
+        with self.assertNumQueries(2):
+            scores = HealthScoreService.calculate_many([self.user.pk, self.empty.pk])
+
+        # TIR 2/3, 1 prise sur 7, 3 repas/jour, 30 min/jour
+        self.assertEqual(scores[self.user.pk], 70)
+        self.assertEqual(scores[self.empty.pk], 56)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(HealthScoreService.calculate(self.user), 70)
+
+    def test_glycemia_component_covers_exactly_the_last_24_hours(self):
+        from apps.glycemia.models import GlycemiaHisto
+
+        now = timezone.now().replace(minute=30, second=0, microsecond=0)
+        with patch("django.utils.timezone.now", return_value=now):
+            # Même heure de rollup que la borne, mais hors des 24 h : ignorée.
+            GlycemiaHisto.objects.create(user=self.user, measured_at=now - timedelta(hours=24, minutes=20), value=300)
+            GlycemiaHisto.objects.create(user=self.user, measured_at=now - timedelta(hours=23, minutes=50), value=100)
+            GlycemiaHisto.objects.create(user=self.user, measured_at=now - timedelta(hours=3), value=60)
+            GlycemiaHisto.objects.create(user=self.user, measured_at=now - timedelta(minutes=10), value=120)
+
+            components = HealthScoreService.components_many([self.user.pk])[self.user.pk]
+
+        self.assertAlmostEqual(components[HealthScoreService.GLYCEMIA], 200 / 3)
+
+    def test_event_invalidates_only_its_component(self):
+        from apps.meals.models import Meal, UserMeal
+
+        HealthScoreService.calculate(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            UserMeal.objects.create(user=self.user, meal=Meal.objects.create(name="Pomme"), taken_at=timezone.now())
+
+        components = HealthScoreService.components_many([self.user.pk])[self.user.pk]
+        self.assertEqual(round(components[HealthScoreService.NUTRITION], 2), round(100 / 21, 2))
+        with self.assertNumQueries(0):
+            HealthScoreService.calculate(self.user)
+
+
 class UserWidgetModelTest(TestCase):
     def setUp(self):
         self.user = AuthAccount.objects.create_user(
@@ -108,6 +192,237 @@ class DashboardSummaryAPITest(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
 
+
+@override_settings(BACKGROUND_TASKS_EAGER=True)
+class DashboardSnapshotTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = AuthAccount.objects.create_user(
+            email="snapshot@example.com", password="testpass123"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse("dashboard-summary")
+
+    def test_reads_are_one_cache_or_db_fetch(self):
+        first = self.client.get(self.url)
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertTrue(DashboardSnapshot.objects.filter(user=self.user).exists())
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(self.url).data, first.data)
+
+        cache.clear()  # perte du cache : la ligne matérialisée suffit
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(self.url).data, first.data)
+
+    def test_reading_refreshes_only_affected_sections(self):
+        from apps.glycemia.models import Glycemia
+
+        self.client.get(self.url)
+        with patch.object(DashboardSnapshotService, "_nutrition") as nutrition, patch.object(
+            DashboardSnapshotService, "_alerts"
+        ) as alerts, self.captureOnCommitCallbacks(execute=True):
+            Glycemia.objects.create(user=self.user, measured_at=timezone.now(), value=142)
+        nutrition.assert_not_called()
+        alerts.assert_not_called()
+
+        with self.assertNumQueries(0):
+            data = self.client.get(self.url).data
+        self.assertEqual(data["glucose"]["value"], 142)
+
+    def test_partial_request_computes_and_caches_only_its_sections(self):
+        with patch.object(DashboardSnapshotService, "_nutrition") as nutrition:
+            response = self.client.get(self.url, {"include[]": ["glucose", "alerts"]})
+        nutrition.assert_not_called()
+        # Sections ni demandées ni matérialisées : omises, pas de valeur inventée.
+        self.assertEqual(set(response.data), {"glucose", "alerts"})
+        snapshot = DashboardSnapshot.objects.get(user=self.user)
+        self.assertEqual(set(snapshot.data["sections"]), {"glucose", "alerts"})
+
+        # Requête complète ensuite : les sections déjà là ne sont pas recalculées.
+        with patch.object(DashboardSnapshotService, "_alerts") as alerts:
+            full = self.client.get(self.url).data
+        alerts.assert_not_called()
+        self.assertEqual(set(full), set(DashboardSnapshotService.SECTIONS))
+        self.assertEqual(full["nutrition"]["calories"]["goal"], 1800)
+
+    def test_partial_request_returns_materialized_sections_it_did_not_ask_for(self):
+        full = self.client.get(self.url).data
+        cache.clear()
+
+        with patch.object(DashboardSnapshotService, "_nutrition") as nutrition:
+            partial = self.client.get(self.url, {"include[]": ["glucose"]}).data
+        nutrition.assert_not_called()
+        self.assertEqual(partial, full)
+
+    def test_section_ttls_follow_widget_refresh_intervals(self):
+        self.assertEqual(DashboardCache.section_ttl("glucose"), 60)
+        self.assertEqual(DashboardCache.section_ttl("medication"), 300)
+        self.assertEqual(DashboardCache.section_ttl("healthScore"), 600)
+
+    def test_cache_hit_metrics_per_section(self):
+        DashboardCache.reset_metrics()
+        self.client.get(self.url, {"include[]": ["glucose"]})
+        self.client.get(self.url, {"include[]": ["glucose"]})
+        self.client.get(self.url, {"include[]": ["glucose", "alerts"]})
+
+        metrics = DashboardCache.metrics_snapshot()
+        self.assertEqual(metrics["glucose"], {"hits": 2, "misses": 1, "hit_rate": 0.6667})
+        self.assertEqual(metrics["alerts"]["misses"], 1)
+
+    def test_stale_snapshot_is_rebuilt_on_read(self):
+        self.client.get(self.url)
+        snapshot = DashboardSnapshot.objects.get(user=self.user)
+        old = timezone.now() - DashboardSnapshotService.MAX_AGE - timedelta(minutes=1)
+        snapshot.data["built_at"] = old.isoformat()
+        snapshot.save()
+        cache.clear()
+
+        self.client.get(self.url)
+
+        snapshot.refresh_from_db()
+        self.assertGreater(snapshot.built_at, old)
+
+
+@override_settings(BACKGROUND_TASKS_EAGER=True)
+class DashboardConditionalGetTest(APITestCase):
+    """ETag / If-None-Match sur le summary et les widgets (utils.data_versions)."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = AuthAccount.objects.create_user(
+            email="etag@example.com", password="testpass123"
+        )
+        token = AccessToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        self.url = reverse("dashboard-summary")
+
+    def test_unchanged_summary_is_304_without_database(self):
+        first = self.client.get(self.url)
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(first["Cache-Control"], "private, no-cache")
+        etag = first["ETag"]
+
+        # Jeton réel : le compte vient de utils.user_cache, pas de la base.
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response["ETag"], etag)
+        self.assertEqual(response.content, b"")
+
+    def test_write_changes_the_etag(self):
+        from apps.glycemia.models import Glycemia
+
+        etag = self.client.get(self.url)["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            Glycemia.objects.create(user=self.user, measured_at=timezone.now(), value=150)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(response.data["glucose"]["value"], 150)
+        self.assertIn("Last-Modified", response)
+
+    def test_etag_depends_on_query(self):
+        full = self.client.get(self.url)["ETag"]
+        partial = self.client.get(self.url, {"include[]": ["glucose"]}, HTTP_IF_NONE_MATCH=full)
+        self.assertEqual(partial.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(partial["ETag"], full)
+
+    def test_section_built_elsewhere_invalidates_partial_etags(self):
+        first = self.client.get(self.url, {"include[]": ["alerts"]})
+        self.assertNotIn("nutrition", first.data)
+
+        self.client.get(self.url, {"include[]": ["nutrition"]})
+
+        again = self.client.get(self.url, {"include[]": ["alerts"]}, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(again.status_code, status.HTTP_200_OK)
+        self.assertEqual(again.data["nutrition"]["calories"]["goal"], 1800)
+
+    def test_widgets_etag_follows_user_widgets(self):
+        url = reverse("dashboard-widgets")
+        etag = self.client.get(url)["ETag"]
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            UserWidget.objects.create(user=self.user, widget_id="glucose_live", refresh_interval=60)
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([w["widgetId"] for w in response.data["widgets"]], ["glucose_live"])
+
+    def test_inactive_account_is_rejected_from_cache(self):
+        self.client.get(self.url)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_other_views_read_the_account_from_the_database(self):
+        self.client.get(self.url)  # compte mis en cache
+        # Écriture en masse : contourne les signaux d'invalidation du cache.
+        AuthAccount.objects.filter(pk=self.user.pk).update(is_active=False)
+
+        response = self.client.get(reverse("dashboard-widgets-layout"))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+@override_settings(BACKGROUND_TASKS_EAGER=True)
+class WidgetPushTest(APITestCase):
+    """Sections recalculées poussées aux widgets, regroupées par min_refresh_interval."""
+
+    def setUp(self):
+        cache.clear()
+        widget_push.flush()
+        self.user = AuthAccount.objects.create_user(
+            email="push@example.com", password="testpass123"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.client.get(reverse("dashboard-summary"))
+
+    def _reading(self, value):
+        from apps.glycemia.models import Glycemia
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Glycemia.objects.create(user=self.user, measured_at=timezone.now(), value=value)
+
+    def test_event_pushes_only_its_widgets(self):
+        with patch.object(widget_push, "send") as send:
+            self._reading(142)
+
+        send.assert_called_once()
+        user_id, sections = send.call_args.args
+        self.assertEqual(user_id, self.user.pk)
+        self.assertEqual(set(sections), {"glucose", "healthScore"})
+        self.assertEqual(sections["glucose"]["value"], 142)
+
+    def test_events_within_interval_are_coalesced(self):
+        with patch.object(widget_push, "send") as send:
+            self._reading(120)
+            self._reading(130)
+            self._reading(150)
+        self.assertEqual(send.call_count, 1)
+        self.assertIn((self.user.pk, "glucose"), widget_push._pusher.pending())
+
+        with patch.object(widget_push, "send") as send:
+            widget_push.flush()
+        send.assert_called_once()
+        self.assertEqual(send.call_args.args[1]["glucose"]["value"], 150)
+        self.assertEqual(widget_push._pusher.pending(), {})
+
+    def test_frame_lists_one_entry_per_widget(self):
+        layer = MagicMock()
+        with patch.object(widget_push, "get_channel_layer", return_value=layer), patch.object(
+            widget_push, "async_to_sync", side_effect=lambda fn: fn
+        ):
+            widget_push.send(self.user.pk, {"glucose": {"value": 110}})
+
+        group, frame = layer.group_send.call_args.args
+        self.assertEqual(group, f"glycemia_user_{self.user.pk}")
+        self.assertEqual(frame["type"], "widget_update")
+        self.assertEqual(frame["widgets"][0]["widgetId"], "glucose_live")
+        self.assertEqual(frame["widgets"][0]["data"], {"value": 110})
+
+
 class DashboardWidgetsAPITest(APITestCase):
     def setUp(self):
         self.user = AuthAccount.objects.create_user(
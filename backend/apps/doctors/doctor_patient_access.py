@@ -1,17 +1,66 @@
-"""Vérification d'accès : médecin ou proche vérifié + patient dans l'équipe de soins (ACTIVE)."""
+"""
+Vérification d'accès : médecin ou proche vérifié + patient dans l'équipe de soins (ACTIVE).
 
+Les décisions sont mises en cache ACCESS_TTL secondes, par identité du
+membre (et par patient pour les médecins) : une requête médecin/proche
+répétée ne relit ni les profils ni l'équipe de soins, et le compte patient
+vient de utils.user_cache. Toute écriture sur PatientCareTeam (ajout,
+invitation acceptée, mise à jour, retrait) invalide les décisions du
+couple membre/patient (apps/doctors/signals.py) ; le TTL borne l'écart
+pour les changements de rôle ou de profil.
+
+Les connexions WebSocket d'un membre rejoignent son groupe
+`access_group_for(identité)` : après chaque écriture sur son équipe de
+soins, elles revérifient leurs abonnements patients (consumers.py).
+"""
+
+import uuid
+
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
 
 from rest_framework.response import Response
 
 from apps.doctors.models import PatientCareTeam
 from apps.users.models import AuthAccount
+from utils import user_cache
+
+ACCESS_PREFIX = "care_access"
+ACCESS_TTL = 60
+ACCESS_CHANGED_TYPE = "care_team_changed"
+
+_DOCTOR_ROLES = ["REFERENT_DOCTOR", "SPECIALIST"]
 
 
 def _get_identity(user_obj):
     return getattr(user_obj, "user", None) or user_obj
 
 
+def _doctor_key(member_identity_id, patient_user_id) -> str | None:
+    """Clé sur la forme canonique de l'UUID patient ; None si l'identifiant est invalide."""
+    try:
+        patient_user_id = uuid.UUID(str(patient_user_id))
+    except ValueError:
+        return None
+    return f"{ACCESS_PREFIX}:doctor:{member_identity_id}:{patient_user_id}"
+
+
+def _proche_key(member_identity_id) -> str:
+    return f"{ACCESS_PREFIX}:proche:{member_identity_id}"
+
+
+def access_group_for(member_identity_id) -> str:
+    return f"{ACCESS_PREFIX}_{member_identity_id}"
+
+
+def invalidate_access(member_identity_id, patient_user_id=None):
+    """Oublie les décisions d'accès d'un membre (pour un patient donné, côté médecin)."""
+    keys = [_proche_key(member_identity_id)]
+    if patient_user_id is not None:
+        keys.append(_doctor_key(member_identity_id, patient_user_id))
+    cache.delete_many([key for key in keys if key])
+
+
 def verify_doctor_can_access_patient(request, patient_user_id=None):
     """
     Retourne (patient_auth_account, None) si le médecin connecté a accès au patient,
@@ -27,46 +76,106 @@ def verify_doctor_can_access_patient(request, patient_user_id=None):
     if not patient_user_id:
         return None, Response({"error": "patient_user_id is required"}, status=400)
 
-    doctor_user = _get_identity(request.user)
+    # Identité lue sur le compte, sans requête : clé de la décision en cache.
+    member_identity_id = getattr(request.user, "user_id", None)
+    key = _doctor_key(member_identity_id, patient_user_id) if member_identity_id else None
+    decision = cache.get(key) if key else None
+    if decision is not None:
+        if not decision["allowed"]:
+            return None, _doctor_denied(decision["reason"])
+        patient_user = user_cache.get_user(decision["patient"])
+        if patient_user is not None:
+            return patient_user, None
+
+    decision, patient_user, error = _resolve_doctor_access(request.user, patient_user_id)
+    if key and decision is not None:
+        cache.set(key, decision, ACCESS_TTL)
+        if patient_user is not None:
+            user_cache.store(decision["patient"], patient_user)
+    return patient_user, error
+
+
+def _doctor_denied(reason):
+    if reason == "not_doctor":
+        return Response({"error": "Access denied. Doctors only."}, status=403)
+    return Response(
+        {
+            "error": "Access denied. You are not an active doctor for this patient."
+        },
+        status=403,
+    )
+
+
+def _resolve_doctor_access(user, patient_user_id):
+    """
+    (décision à mettre en cache | None, patient_auth_account, Response d'erreur).
+    Les erreurs de format et les comptes introuvables ne sont pas mis en cache.
+    """
+    doctor_user = _get_identity(user)
     doctor_role = (
         doctor_user.profiles.filter(role__name__iexact="DOCTOR").first()
         if doctor_user
         else None
     )
 
-    if not doctor_role:
-        return None, Response({"error": "Access denied. Doctors only."}, status=403)
-
-    if not hasattr(doctor_role, "doctor_profile"):
-        return None, Response({"error": "Access denied. Doctors only."}, status=403)
+    if not doctor_role or not hasattr(doctor_role, "doctor_profile"):
+        return {"allowed": False, "reason": "not_doctor"}, None, _doctor_denied("not_doctor")
 
     try:
-        can_access = PatientCareTeam.objects.filter(
-            member_profile=doctor_role,
-            patient_profile__profile__user__id_user=patient_user_id,
-            status__label="ACTIVE",
-            role__in=["REFERENT_DOCTOR", "SPECIALIST"],
-        ).exists()
+        care_team_role = (
+            PatientCareTeam.objects.filter(
+                member_profile=doctor_role,
+                patient_profile__profile__user__id_user=patient_user_id,
+                status__label="ACTIVE",
+                role__in=_DOCTOR_ROLES,
+            )
+            .values_list("role", flat=True)
+            .first()
+        )
     except ValidationError:
-        return None, Response(
+        return None, None, Response(
             {"error": "Invalid patient_user_id format (UUID required)."}, status=400
         )
 
-    if not can_access:
-        return None, Response(
-            {
-                "error": "Access denied. You are not an active doctor for this patient."
-            },
-            status=403,
-        )
+    if not care_team_role:
+        return {"allowed": False, "reason": "not_member"}, None, _doctor_denied("not_member")
 
     try:
         patient_user = AuthAccount.objects.get(user__pk=patient_user_id)
-        return patient_user, None
     except (AuthAccount.DoesNotExist, ValidationError):
-        return None, Response(
+        return None, None, Response(
             {"error": "Patient user or account_auth not found"}, status=404
         )
+    return {"allowed": True, "patient": patient_user.pk, "role": care_team_role}, patient_user, None
+
+
+def doctor_accessible_patient_accounts(doctor_identity_id, patient_user_ids) -> dict:
+    """
+    {patient_user_id: id_auth} des patients (parmi ceux demandés) dont le
+    médecin est membre ACTIVE de l'équipe de soins, en une requête.
+    Les identifiants mal formés sont ignorés.
+    """
+    valid = set()
+    for patient_user_id in patient_user_ids:
+        try:
+            valid.add(uuid.UUID(str(patient_user_id)))
+        except ValueError:
+            continue
+    if not valid:
+        return {}
+
+    rows = doctor_patient_accounts(doctor_identity_id).filter(user_id__in=valid).values_list("user_id", "id_auth")
+    return {str(patient_user_id): id_auth for patient_user_id, id_auth in rows}
+
+
+def doctor_patient_accounts(doctor_identity_id):
+    """Comptes des patients dont le médecin est membre ACTIVE de l'équipe de soins (queryset)."""
+    return AuthAccount.objects.filter(
+        user__profiles__patient_profile__care_team_members__member_profile__user_id=doctor_identity_id,
+        user__profiles__patient_profile__care_team_members__member_profile__role__name__iexact="DOCTOR",
+        user__profiles__patient_profile__care_team_members__status__label="ACTIVE",
+        user__profiles__patient_profile__care_team_members__role__in=_DOCTOR_ROLES,
+    ).distinct()
 
 
 _PROCHE_ROLES = {"FAMILY", "CAREGIVER", "NURSE"}
@@ -80,18 +189,47 @@ def verify_proche_can_access_patient(request):
     Le proche n'a pas besoin de passer de patient_user_id : son patient est dérivé
     automatiquement depuis PatientCareTeam.
     """
-    proche_user = _get_identity(request.user)
+    member_identity_id = getattr(request.user, "user_id", None)
+    key = _proche_key(member_identity_id) if member_identity_id else None
+    decision = cache.get(key) if key else None
+    if decision is not None:
+        if decision.get("reason"):
+            return None, None, _proche_denied(decision["reason"])
+        patient_auth = user_cache.get_user(decision["patient"])
+        if patient_auth is not None:
+            return patient_auth, decision["entry"], None
+
+    decision, patient_auth, entry, error = _resolve_proche_access(request.user)
+    if key and decision is not None:
+        cache.set(key, decision, ACCESS_TTL)
+        if patient_auth is not None:
+            user_cache.store(decision["patient"], patient_auth)
+    return patient_auth, entry, error
+
+
+def _proche_denied(reason):
+    if reason == "no_role":
+        return Response(
+            {"error": "Accès réservé aux proches (FAMILY, CAREGIVER, NURSE)."},
+            status=403,
+        )
+    return Response(
+        {"error": "Aucun patient lié et actif trouvé pour ce proche."},
+        status=403,
+    )
+
+
+def _resolve_proche_access(user):
+    """(décision à mettre en cache | None, patient_auth_account, care_team_entry, Response d'erreur)."""
+    proche_user = _get_identity(user)
     if not proche_user:
-        return None, None, Response({"error": "Authentification requise."}, status=401)
+        return None, None, None, Response({"error": "Authentification requise."}, status=401)
 
     has_proche_role = proche_user.profiles.filter(
         role__name__in=_PROCHE_ROLES
     ).exists()
     if not has_proche_role:
-        return None, None, Response(
-            {"error": "Accès réservé aux proches (FAMILY, CAREGIVER, NURSE)."},
-            status=403,
-        )
+        return {"reason": "no_role"}, None, None, _proche_denied("no_role")
 
     entry = (
         PatientCareTeam.objects.select_related(
@@ -106,17 +244,14 @@ def verify_proche_can_access_patient(request):
         .first()
     )
     if not entry:
-        return None, None, Response(
-            {"error": "Aucun patient lié et actif trouvé pour ce proche."},
-            status=403,
-        )
+        return {"reason": "no_link"}, None, None, _proche_denied("no_link")
 
     try:
         patient_auth = AuthAccount.objects.get(
             user=entry.patient_profile.profile.user
         )
-        return patient_auth, entry, None
     except AuthAccount.DoesNotExist:
-        return None, None, Response(
+        return None, None, None, Response(
             {"error": "Compte patient introuvable."}, status=404
         )
+    return {"patient": patient_auth.pk, "entry": entry}, patient_auth, entry, None
@@ -1,3 +1,4 @@
 from .patient_data_service import DoctorPatientDataService
+from .patient_panel import PatientPanelService
 
-__all__ = ["DoctorPatientDataService"]
+__all__ = ["DoctorPatientDataService", "PatientPanelService"]
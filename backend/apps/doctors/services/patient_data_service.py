@@ -8,8 +8,11 @@ from apps.activities.models import UserActivity
 from apps.alerts.models import AlertEvent, AlertSeverity
 from apps.dashboard.services import HealthScoreService
 from apps.glycemia.models import Glycemia, GlycemiaHisto
+from apps.glycemia.services.downsampling import minmax_buckets
+from apps.glycemia.services.rollups import window_stats
 from apps.meals.models import UserMeal
 from apps.medications.models import UserMedication
+from utils.keyset import paginate
 
 
 class DoctorPatientDataService:
@@ -18,6 +21,8 @@ class DoctorPatientDataService:
     Isole la logique du Dashboard Patient pour garantir l'indépendance.
     """
 
+    GLUCOSE_STATS_DAYS = 14
+
     @staticmethod
     def get_patient_dashboard(patient_user) -> dict:
         """
@@ -25,7 +30,9 @@ class DoctorPatientDataService:
         """
         return {
             "glucose": DoctorPatientDataService._get_glucose_data(patient_user),
+            "glucoseStats": DoctorPatientDataService._get_glucose_stats(patient_user),
             "alerts": DoctorPatientDataService._get_alerts_data(patient_user),
+            "alertEpisodes": DoctorPatientDataService._get_alert_episodes(patient_user),
             "medication": DoctorPatientDataService._get_medication_data(patient_user),
             "nutrition": DoctorPatientDataService._get_nutrition_data(patient_user),
             "activity": DoctorPatientDataService._get_activity_data(patient_user),
@@ -45,6 +52,15 @@ class DoctorPatientDataService:
             "recordedAt": latest.measured_at,
         }
 
+    @staticmethod
+    def _get_glucose_stats(user) -> dict | None:
+        """TIR / moyenne / CV / GMI sur 14 jours, depuis les rollups."""
+        days = DoctorPatientDataService.GLUCOSE_STATS_DAYS
+        stats = window_stats(user, timezone.now() - timedelta(days=days))
+        if not stats.count:
+            return None
+        return {"days": days, **stats.as_dict()}
+
     @staticmethod
     def _get_alerts_data(user) -> list:
         # Récupère les 3 dernières alertes déclenchées/envoyées
@@ -73,6 +89,26 @@ class DoctorPatientDataService:
 
         return result
 
+    @staticmethod
+    def _get_alert_episodes(user) -> list:
+        """Nombre et durée des épisodes d'alerte par règle sur 14 jours."""
+        since = timezone.now() - timedelta(days=DoctorPatientDataService.GLUCOSE_STATS_DAYS)
+        episodes = AlertEvent.objects.filter(user=user, triggered_at__gte=since).select_related("rule")
+
+        by_rule: dict = {}
+        for episode in episodes:
+            entry = by_rule.setdefault(
+                episode.rule.code,
+                {"type": episode.rule.code.lower(), "count": 0, "totalMinutes": 0, "longestMinutes": 0, "ongoing": 0},
+            )
+            minutes = round(episode.duration_seconds / 60)
+            entry["count"] += 1
+            entry["totalMinutes"] += minutes
+            entry["longestMinutes"] = max(entry["longestMinutes"], minutes)
+            entry["ongoing"] += int(episode.resolved_at is None and episode.last_value_at is not None)
+
+        return sorted(by_rule.values(), key=lambda e: (-e["count"], e["type"]))
+
     @staticmethod
     def _get_medication_data(user) -> dict:
         next_dose = (
@@ -129,60 +165,100 @@ class DoctorPatientDataService:
             "activeMinutes": int(total_minutes),
         }
 
+    # Historiques : pagination keyset (utils.keyset), colonnes projetées.
+    HISTORY_LIMIT = 50
+    HISTORY_MAX_LIMIT = 200
+
     @staticmethod
-    def get_glycemia_history(user, limit=50) -> list:
-        history = GlycemiaHisto.objects.filter(user=user).order_by("-measured_at")[
-            :limit
-        ]
+    def get_glycemia_history(user, limit=HISTORY_LIMIT, cursor=None) -> tuple[list, str | None]:
+        """(lectures, curseur de la page suivante | None), des plus récentes aux plus anciennes."""
+        rows, next_cursor = paginate(
+            GlycemiaHisto.objects.filter(user=user).values(
+                "id",
+                "value",
+                "unit",
+                "trend",
+                "rate",
+                "context",
+                "measured_at",
+                "source",
+                "notes",
+                "photo_url",
+                "location_lat",
+                "location_lng",
+            ),
+            "measured_at",
+            cursor,
+            limit,
+        )
         return [
             {
-                "value": h.value,
-                "unit": h.unit,
-                "trend": h.trend,
-                "rate": h.rate,
-                "context": h.context,
-                "measuredAt": h.measured_at,
-                "source": h.source,
-                "notes": h.notes,
-                "photo": h.photo_url,
-                "location": {"lat": h.location_lat, "lng": h.location_lng}
-                if h.location_lat and h.location_lng
+                "value": h["value"],
+                "unit": h["unit"],
+                "trend": h["trend"],
+                "rate": h["rate"],
+                "context": h["context"],
+                "measuredAt": h["measured_at"],
+                "source": h["source"],
+                "notes": h["notes"],
+                "photo": h["photo_url"],
+                "location": {"lat": h["location_lat"], "lng": h["location_lng"]}
+                if h["location_lat"] and h["location_lng"]
                 else None,
             }
-            for h in history
-        ]
+            for h in rows
+        ], next_cursor
 
     @staticmethod
-    def get_meals_history(user, limit=50) -> list:
-        meals = (
-            UserMeal.objects.filter(user=user)
-            .select_related("meal")
-            .order_by("-taken_at")[:limit]
+    def get_glycemia_chart(user, days, bucket_minutes) -> list:
+        """Min / max / moyenne par seau de bucket_minutes sur `days` jours (graphiques)."""
+        since = timezone.now() - timedelta(days=days)
+        return minmax_buckets(user.pk, since, bucket_minutes=bucket_minutes)
+
+    @staticmethod
+    def get_meals_history(user, limit=HISTORY_LIMIT, cursor=None) -> tuple[list, str | None]:
+        rows, next_cursor = paginate(
+            UserMeal.objects.filter(user=user).values(
+                "id", "taken_at", "meal__name", "meal__calories", "meal__glucose", "meal__link_photo"
+            ),
+            "taken_at",
+            cursor,
+            limit,
         )
         return [
             {
-                "name": m.meal.name,
-                "calories": m.meal.calories,
-                "carbs": m.meal.glucose,
-                "takenAt": m.taken_at,
-                "photo": m.meal.link_photo,
+                "name": m["meal__name"],
+                "calories": m["meal__calories"],
+                "carbs": m["meal__glucose"],
+                "takenAt": m["taken_at"],
+                "photo": m["meal__link_photo"],
             }
-            for m in meals
-        ]
+            for m in rows
+        ], next_cursor
 
     @staticmethod
-    def get_medications_history(user, limit=50) -> list:
-        meds = (
-            UserMedication.objects.filter(user=user)
-            .select_related("medication")
-            .order_by("-taken_at")[:limit]
+    def get_medications_history(user, limit=HISTORY_LIMIT, cursor=None) -> tuple[list, str | None]:
+        rows, next_cursor = paginate(
+            UserMedication.objects.filter(user=user).values(
+                "id",
+                "taken_at",
+                "statut",
+                "medication__name",
+                "medication__dosage",
+                "custom_name",
+                "custom_dosage",
+            ),
+            "taken_at",
+            cursor,
+            limit,
         )
         return [
             {
-                "name": m.medication.name,
-                "dosage": m.medication.dosage,
-                "takenAt": m.taken_at,
-                "status": m.statut,
+                # Traitement saisi à la main : pas de médicament de référence.
+                "name": m["medication__name"] or m["custom_name"],
+                "dosage": m["medication__dosage"] or m["custom_dosage"],
+                "takenAt": m["taken_at"],
+                "status": m["statut"],
             }
-            for m in meds
-        ]
+            for m in rows
+        ], next_cursor
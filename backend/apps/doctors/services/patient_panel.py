@@ -0,0 +1,174 @@
+"""
+Vue d'ensemble des patients d'un médecin (panel), en un nombre de requêtes
+constant quel que soit le nombre de patients :
+
+- une requête sur les comptes des patients ACTIVE : identité, dernière
+  glycémie et nombre d'alertes actives en sous-requêtes ;
+- une requête groupée sur les rollups journaliers pour le TIR ;
+- HealthScoreService.calculate_many (cache par composante, 2 requêtes au plus).
+
+Le tri (risque ou nom) se fait en Python sur le panel complet, puis la
+page est découpée par curseur : le curseur porte la clé de tri de la
+dernière ligne servie, la page suivante reprend strictement après.
+"""
+
+from __future__ import annotations
+
+from datetime import timedelta
+
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from apps.alerts.models import AlertEvent
+from apps.dashboard.services import HealthScoreService
+from apps.doctors.doctor_patient_access import doctor_patient_accounts
+from apps.glycemia.models import Glycemia, GlycemiaRollup, RollupPeriod
+from apps.glycemia.services.rollups import day_start
+from apps.glycemia.thresholds import HYPER_THRESHOLD, HYPO_THRESHOLD
+from utils.keyset import InvalidCursor, decode_cursor, encode_cursor
+
+
+class PatientPanelService:
+    SORT_RISK = "risk"
+    SORT_NAME = "name"
+    SORTS = (SORT_RISK, SORT_NAME)
+
+    DEFAULT_LIMIT = 50
+    MAX_LIMIT = 200
+
+    # Fenêtre du TIR : jours locaux, aujourd'hui compris (cf. patient-dashboard).
+    TIR_DAYS = 14
+    ACTIVE_ALERT_STATUSES = ("TRIGGERED", "SENT")
+
+    @classmethod
+    def get_panel(cls, doctor_identity_id, sort=SORT_RISK, cursor=None, limit=DEFAULT_LIMIT) -> dict:
+        """
+        {"results": [...], "next": curseur | None, "count": total}.
+        Lève InvalidCursor si le curseur est illisible ou d'un autre tri.
+        """
+        after = cls.decode_cursor(cursor, sort) if cursor else None
+        rows = cls.build_rows(doctor_identity_id)
+        keyed = sorted(((cls._sort_key(row, sort), row) for row in rows), key=lambda item: item[0])
+
+        if after is not None:
+            try:
+                keyed = [item for item in keyed if item[0] > after]
+            except TypeError as exc:  # curseur forgé : types incomparables
+                raise InvalidCursor("cursor invalide") from exc
+        page = keyed[:limit]
+        has_more = len(keyed) > limit
+        return {
+            "results": [row for _, row in page],
+            "next": cls.encode_cursor(page[-1][0], sort) if has_more else None,
+            "count": len(rows),
+        }
+
+    @classmethod
+    def build_rows(cls, doctor_identity_id) -> list:
+        accounts = list(cls._accounts(doctor_identity_id))
+        if not accounts:
+            return []
+
+        account_ids = [account["id_auth"] for account in accounts]
+        tir = cls._tir(account_ids)
+        scores = HealthScoreService.calculate_many(account_ids)
+
+        rows = []
+        for account in accounts:
+            latest = None
+            if account["latest_at"] is not None:
+                latest = {
+                    "value": account["latest_value"],
+                    "unit": account["latest_unit"],
+                    "trend": account["latest_trend"],
+                    "recordedAt": account["latest_at"],
+                }
+            rows.append(
+                {
+                    "patient_user_id": str(account["user_id"]),
+                    "first_name": account["user__first_name"],
+                    "last_name": account["user__last_name"],
+                    "email": account["email"],
+                    "glucose": latest,
+                    "tir": tir.get(str(account["id_auth"])),
+                    "activeAlerts": account["active_alerts"],
+                    "healthScore": scores[account["id_auth"]],
+                }
+            )
+        return rows
+
+    @classmethod
+    def _accounts(cls, doctor_identity_id):
+        latest = Glycemia.objects.filter(user=OuterRef("pk")).order_by("-measured_at")
+        alerts = (
+            AlertEvent.objects.filter(user=OuterRef("pk"), status__in=cls.ACTIVE_ALERT_STATUSES)
+            .order_by()
+            .values("user")
+            .annotate(n=Count("pk"))
+            .values("n")
+        )
+        return doctor_patient_accounts(doctor_identity_id).values(
+            "id_auth",
+            "user_id",
+            "email",
+            "user__first_name",
+            "user__last_name",
+        ).annotate(
+            latest_value=Subquery(latest.values("value")[:1]),
+            latest_unit=Subquery(latest.values("unit")[:1]),
+            latest_trend=Subquery(latest.values("trend")[:1]),
+            latest_at=Subquery(latest.values("measured_at")[:1]),
+            active_alerts=Coalesce(Subquery(alerts), 0),
+        )
+
+    @classmethod
+    def _tir(cls, account_ids) -> dict:
+        """TIR (%) des TIR_DAYS derniers jours par compte, depuis les rollups journaliers."""
+        since = day_start(timezone.now() - timedelta(days=cls.TIR_DAYS - 1))
+        rows = (
+            GlycemiaRollup.objects.filter(
+                user_id__in=account_ids,
+                period=RollupPeriod.DAY,
+                bucket_start__gte=since,
+            )
+            .values("user_id")
+            .annotate(readings=Sum("count"), in_range=Sum("in_range_count"))
+        )
+        return {
+            str(row["user_id"]): round(row["in_range"] / row["readings"] * 100, 1)
+            for row in rows
+            if row["readings"]
+        }
+
+    # ── Tri / curseur ────────────────────────────────────────────────
+
+    @staticmethod
+    def _sort_key(row: dict, sort: str) -> tuple:
+        """
+        Clé croissante. Risque : alertes actives, dernière mesure hors cible,
+        TIR bas (sans données en dernier), score bas ; l'identifiant départage.
+        """
+        if sort == PatientPanelService.SORT_NAME:
+            return (row["last_name"].lower(), row["first_name"].lower(), row["patient_user_id"])
+        glucose = row["glucose"]
+        out_of_range = bool(glucose) and not (HYPO_THRESHOLD <= glucose["value"] <= HYPER_THRESHOLD)
+        return (
+            -row["activeAlerts"],
+            -int(out_of_range),
+            row["tir"] if row["tir"] is not None else 101.0,
+            row["healthScore"],
+            row["patient_user_id"],
+        )
+
+    @staticmethod
+    def encode_cursor(key: tuple, sort: str) -> str:
+        return encode_cursor({"s": sort, "k": list(key)})
+
+    @classmethod
+    def decode_cursor(cls, cursor: str, sort: str) -> tuple:
+        payload = decode_cursor(cursor)
+        key = payload.get("k")
+        if payload.get("s") != sort or not isinstance(key, list) or len(key) != (3 if sort == cls.SORT_NAME else 5):
+            raise InvalidCursor("cursor invalide")
+        return tuple(key)
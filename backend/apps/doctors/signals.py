@@ -0,0 +1,52 @@
+"""
+Invalidation du cache des décisions d'accès (doctor_patient_access) à
+chaque écriture sur l'équipe de soins : ajout, invitation acceptée, mise
+à jour ou retrait d'un membre. Après commit, les connexions WebSocket du
+membre sont prévenues et retirent les abonnements patients révoqués.
+"""
+
+import logging
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+
+from apps.doctors.doctor_patient_access import ACCESS_CHANGED_TYPE, access_group_for, invalidate_access
+from apps.doctors.models import PatientCareTeam
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(post_save, sender=PatientCareTeam)
+@receiver(post_delete, sender=PatientCareTeam)
+def invalidate_care_team_access(sender, instance, **kwargs):
+    from apps.profiles.models import PatientProfile, Profile
+
+    member_identity_id = (
+        Profile.objects.filter(pk=instance.member_profile_id).values_list("user_id", flat=True).first()
+    )
+    if member_identity_id is None:
+        return
+    patient_user_id = (
+        PatientProfile.objects.filter(pk=instance.patient_profile_id)
+        .values_list("profile__user_id", flat=True)
+        .first()
+    )
+    invalidate_access(member_identity_id, patient_user_id)
+    transaction.on_commit(lambda: notify_access_changed(member_identity_id))
+
+
+def notify_access_changed(member_identity_id):
+    """Les sockets du membre revérifient leurs abonnements patients."""
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    try:
+        async_to_sync(channel_layer.group_send)(
+            access_group_for(member_identity_id), {"type": ACCESS_CHANGED_TYPE}
+        )
+    except Exception as e:
+        logger.error(f"Failed to notify care team change to member {member_identity_id}: {e}")
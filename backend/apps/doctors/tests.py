@@ -2,6 +2,8 @@
 Tests : création compte patient, invitations, admin valide le docteur,
 docteur non validé = indisponible pour le patient, docteur validé peut ajouter un patient.
 """
+from datetime import timedelta
+
 from django.contrib.auth import get_user_model
 from django.test import TestCase, override_settings
 from types import SimpleNamespace
@@ -18,7 +20,10 @@ from apps.doctors.models import (
     PatientCareTeam,
     VerificationStatus,
 )
-from apps.doctors.doctor_patient_access import verify_doctor_can_access_patient
+from apps.doctors.doctor_patient_access import (
+    doctor_accessible_patient_accounts,
+    verify_doctor_can_access_patient,
+)
 from apps.doctors.services.verification import DoctorVerificationService
 from apps.profiles.models import Profile, Role
 from apps.users.models import User as UserIdentity
@@ -593,7 +598,7 @@ class DoctorPatientAccessTests(TestCase):
         doctor_profile = SimpleNamespace(doctor_profile=SimpleNamespace())
         doctor = SimpleNamespace(profiles=MagicMock())
         doctor.profiles.filter.return_value.first.return_value = doctor_profile
-        filter_mock.return_value.exists.return_value = False
+        filter_mock.return_value.values_list.return_value.first.return_value = None
 
         patient, response = verify_doctor_can_access_patient(
             self._request(user=doctor, query={"patient_user_id": "patient-1"})
@@ -611,8 +616,8 @@ class DoctorPatientAccessTests(TestCase):
         doctor_profile = SimpleNamespace(doctor_profile=SimpleNamespace())
         doctor = SimpleNamespace(profiles=MagicMock())
         doctor.profiles.filter.return_value.first.return_value = doctor_profile
-        filter_mock.return_value.exists.return_value = True
-        patient_account = SimpleNamespace(email="patient@example.com")
+        filter_mock.return_value.values_list.return_value.first.return_value = "REFERENT_DOCTOR"
+        patient_account = SimpleNamespace(pk="patient-auth", email="patient@example.com")
         get_mock.return_value = patient_account
 
         patient, response = verify_doctor_can_access_patient(
@@ -621,3 +626,371 @@ class DoctorPatientAccessTests(TestCase):
 
         self.assertIs(patient, patient_account)
         self.assertIsNone(response)
+
+
+class DoctorAccessiblePatientAccountsTests(CareTeamIntegrationTests):
+    def _account(self, email, role):
+        identity = UserIdentity.objects.create(first_name="X", last_name=email.split("@")[0])
+        account = User.objects.create_user(email=email, password="pass123", user_identity=identity)
+        profile = Profile.objects.create(user=identity, role=role)
+        return account, profile
+
+    def test_returns_only_patients_of_active_care_teams(self):
+        _, doctor_profile = self._account("ws_doc@test.com", self.doctor_role)
+        active, active_profile = self._account("ws_p1@test.com", self.patient_role)
+        pending, pending_profile = self._account("ws_p2@test.com", self.patient_role)
+        stranger, _ = self._account("ws_p3@test.com", self.patient_role)
+        PatientCareTeam.objects.create(
+            patient_profile=active_profile.patient_profile,
+            member_profile=doctor_profile,
+            role="REFERENT_DOCTOR",
+            status=InvitationStatus.objects.get(label="ACTIVE"),
+        )
+        PatientCareTeam.objects.create(
+            patient_profile=pending_profile.patient_profile,
+            member_profile=doctor_profile,
+            role="SPECIALIST",
+            status=InvitationStatus.objects.get(label="PENDING"),
+        )
+
+        with self.assertNumQueries(1):
+            allowed = doctor_accessible_patient_accounts(
+                doctor_profile.user_id,
+                [active.user_id, pending.user_id, stranger.user_id, "not-a-uuid"],
+            )
+
+        self.assertEqual(allowed, {str(active.user_id): active.id_auth})
+
+
+class DoctorAccessCacheTests(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+
+        cache.clear()
+        self.patient_role, _ = Role.objects.get_or_create(name="PATIENT")
+        self.doctor_role, _ = Role.objects.get_or_create(name="DOCTOR")
+        InvitationStatus.objects.get_or_create(label="ACTIVE")
+        InvitationStatus.objects.get_or_create(label="PENDING")
+        VerificationStatus.objects.get_or_create(label="PENDING")
+        self.doctor, self.doctor_profile = self._account("acl_doc@test.com", self.doctor_role)
+        self.patient, patient_profile = self._account("acl_p@test.com", self.patient_role)
+        self.entry = PatientCareTeam.objects.create(
+            patient_profile=patient_profile.patient_profile,
+            member_profile=self.doctor_profile,
+            role="REFERENT_DOCTOR",
+            status=InvitationStatus.objects.get(label="ACTIVE"),
+        )
+
+    _account = DoctorAccessiblePatientAccountsTests._account
+
+    def _verify(self):
+        request = SimpleNamespace(user=self.doctor, query_params={}, data={})
+        return verify_doctor_can_access_patient(request, str(self.patient.user_id))
+
+    def test_decision_is_cached_until_the_care_team_changes(self):
+        patient, error = self._verify()
+        self.assertIsNone(error)
+
+        with self.assertNumQueries(0):
+            cached, error = self._verify()
+        self.assertIsNone(error)
+        self.assertEqual(cached.pk, patient.pk)
+
+        self.entry.status = InvitationStatus.objects.get(label="PENDING")
+        self.entry.save()
+
+        patient, error = self._verify()
+        self.assertIsNone(patient)
+        self.assertEqual(error.status_code, 403)
+        with self.assertNumQueries(0):
+            _, error = self._verify()
+        self.assertEqual(error.status_code, 403)
+
+        self.entry.status = InvitationStatus.objects.get(label="ACTIVE")
+        self.entry.save()
+        patient, error = self._verify()
+        self.assertIsNone(error)
+
+        self.entry.delete()
+        _, error = self._verify()
+        self.assertEqual(error.status_code, 403)
+
+    def test_revocation_applies_to_every_spelling_of_the_patient_id(self):
+        request = SimpleNamespace(user=self.doctor, query_params={}, data={})
+        upper = str(self.patient.user_id).upper()
+        patient, error = verify_doctor_can_access_patient(request, upper)
+        self.assertIsNone(error)
+
+        self.entry.delete()
+
+        patient, error = verify_doctor_can_access_patient(request, upper)
+        self.assertIsNone(patient)
+        self.assertEqual(error.status_code, 403)
+
+    def test_care_team_change_notifies_member_sockets_after_commit(self):
+        layer = MagicMock()
+        with patch("apps.doctors.signals.get_channel_layer", return_value=layer), patch(
+            "apps.doctors.signals.async_to_sync", side_effect=lambda func: func
+        ):
+            with self.captureOnCommitCallbacks(execute=False) as callbacks:
+                self.entry.delete()
+            layer.group_send.assert_not_called()
+            for callback in callbacks:
+                callback()
+
+        layer.group_send.assert_called_once_with(
+            f"care_access_{self.doctor.user_id}", {"type": "care_team_changed"}
+        )
+
+    def test_account_activation_invalidates_the_cached_decision(self):
+        from django.utils.encoding import force_bytes
+        from django.utils.http import urlsafe_base64_encode
+
+        from apps.auth.tokens import email_verification_token
+
+        self.entry.status = InvitationStatus.objects.get(label="PENDING")
+        self.entry.save()
+        _, error = self._verify()
+        self.assertEqual(error.status_code, 403)  # refus mis en cache
+
+        layer = MagicMock()
+        with patch("apps.doctors.signals.get_channel_layer", return_value=layer), patch(
+            "apps.doctors.signals.async_to_sync", side_effect=lambda func: func
+        ), self.captureOnCommitCallbacks(execute=True):
+            response = APIClient().post(
+                "/api/doctors/care-team/activate-proche/",
+                {
+                    "uid": urlsafe_base64_encode(force_bytes(self.doctor.pk)),
+                    "token": email_verification_token.make_token(self.doctor),
+                    "password": "NewPass123!",
+                },
+                format="json",
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.entry.refresh_from_db()
+        self.assertEqual(self.entry.status.label, "ACTIVE")
+        patient, error = self._verify()
+        self.assertIsNone(error)
+        self.assertEqual(patient.pk, self.patient.pk)
+        layer.group_send.assert_called_once_with(
+            f"care_access_{self.doctor.user_id}", {"type": "care_team_changed"}
+        )
+
+
+class DoctorPatientAgpTests(TestCase):
+    def setUp(self):
+        self.patient = User.objects.create_user(email="agp-patient@test.com", password="pass123")
+        self.doctor = User.objects.create_user(email="agp-doctor@test.com", password="pass123")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.doctor)
+
+    @patch("apps.doctors.views.care_team_views.verify_doctor_can_access_patient")
+    def test_patient_agp_returns_profile_for_accessible_patient(self, access_mock):
+        access_mock.return_value = (self.patient, None)
+
+        response = self.client.get("/api/doctors/care-team/patient-agp/?patient_user_id=p&days=30")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["days"], 30)
+        self.assertEqual(len(response.data["profile"]), 48)
+
+    @patch("apps.doctors.views.care_team_views.verify_doctor_can_access_patient")
+    def test_patient_agp_rejects_out_of_range_days(self, access_mock):
+        access_mock.return_value = (self.patient, None)
+
+        response = self.client.get("/api/doctors/care-team/patient-agp/?patient_user_id=p&days=120")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get("/api/doctors/care-team/patient-agp/?patient_user_id=p&days=7")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class DoctorPatientHistoryTests(TestCase):
+    def setUp(self):
+        from datetime import datetime, timezone as dt_timezone
+
+        from apps.glycemia.models import GlycemiaHisto
+
+        self.patient = User.objects.create_user(email="history-patient@test.com", password="pass123")
+        self.doctor = User.objects.create_user(email="history-doctor@test.com", password="pass123")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.doctor)
+        base = datetime(2026, 3, 2, 10, 0, tzinfo=dt_timezone.utc)
+        # 10:00 et 10:40 (deux lectures à la même seconde), puis 11:20
+        for minutes, value in ((0, 100), (40, 180), (40, 60), (80, 140)):
+            GlycemiaHisto.objects.create(
+                user=self.patient, value=value, measured_at=base + timedelta(minutes=minutes), notes="x" * 500
+            )
+        self.now = base + timedelta(hours=3)
+
+    @patch("apps.doctors.views.care_team_views.verify_doctor_can_access_patient")
+    def test_glycemia_history_pages_with_keyset_cursor(self, access_mock):
+        import re
+
+        access_mock.return_value = (self.patient, None)
+
+        url = "/api/doctors/care-team/patient-glycemia/?patient_user_id=p&limit=3"
+        seen = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            seen.extend(row["value"] for row in response.data)
+            link = response.get("Link")
+            url = re.match(r"<([^>]+)>", link).group(1) if link else None
+
+        self.assertEqual(sorted(seen), [60, 100, 140, 180])
+        self.assertEqual(seen[0], 140)
+
+        response = self.client.get("/api/doctors/care-team/patient-glycemia/?patient_user_id=p&cursor=abc")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        # Curseurs forgés bien formés mais à date impossible ou sans fuseau.
+        from utils.keyset import encode_cursor
+
+        for forged in ("2024-02-30T00:00:00+00:00", "2024-02-28T00:00:00"):
+            cursor = encode_cursor({"v": forged, "id": 1})
+            response = self.client.get(f"/api/doctors/care-team/patient-glycemia/?patient_user_id=p&cursor={cursor}")
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @patch("apps.doctors.views.care_team_views.verify_doctor_can_access_patient")
+    def test_glycemia_chart_buckets_from_rollups_and_readings(self, access_mock):
+        from django.utils import timezone
+
+        access_mock.return_value = (self.patient, None)
+
+        with patch.object(timezone, "now", return_value=self.now):
+            hourly = self.client.get("/api/doctors/care-team/patient-glycemia/?patient_user_id=p&bucket=60&days=1")
+            half_hourly = self.client.get(
+                "/api/doctors/care-team/patient-glycemia/?patient_user_id=p&bucket=30&days=1"
+            )
+
+        self.assertEqual(
+            [(b["min"], b["max"], b["mean"], b["count"]) for b in hourly.data],
+            [(60, 180, 113.3, 3), (140, 140, 140, 1)],
+        )
+        self.assertEqual([(b["min"], b["max"]) for b in half_hourly.data], [(100, 100), (60, 180), (140, 140)])
+
+        response = self.client.get("/api/doctors/care-team/patient-glycemia/?patient_user_id=p&bucket=1")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class DoctorPatientAlertEpisodesTests(TestCase):
+    def test_episode_counts_and_durations_per_rule(self):
+        from datetime import timedelta
+
+        from django.utils import timezone
+
+        from apps.alerts.models import AlertEvent, AlertRule
+        from apps.doctors.services.patient_data_service import DoctorPatientDataService
+
+        patient = User.objects.create_user(email="episodes@test.com", password="pass123")
+        hypo = AlertRule.objects.create(code="HYPO", name="Hypo", max_glycemia=69)
+        now = timezone.now()
+        closed = AlertEvent.objects.create(user=patient, rule=hypo, glycemia_value=60, last_value_at=now)
+        AlertEvent.objects.filter(pk=closed.pk).update(
+            triggered_at=now - timedelta(minutes=50), resolved_at=now - timedelta(minutes=5)
+        )
+        ongoing = AlertEvent.objects.create(user=patient, rule=hypo, glycemia_value=65)
+        AlertEvent.objects.filter(pk=ongoing.pk).update(
+            triggered_at=now - timedelta(minutes=20), last_value_at=now
+        )
+
+        episodes = DoctorPatientDataService._get_alert_episodes(patient)
+
+        self.assertEqual(
+            episodes,
+            [{"type": "hypo", "count": 2, "totalMinutes": 65, "longestMinutes": 45, "ongoing": 1}],
+        )
+
+
+class DoctorPatientPanelTests(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+
+        cache.clear()
+        self.client = APIClient()
+        self.patient_role, _ = Role.objects.get_or_create(name="PATIENT")
+        self.doctor_role, _ = Role.objects.get_or_create(name="DOCTOR")
+        InvitationStatus.objects.get_or_create(label="ACTIVE")
+        InvitationStatus.objects.get_or_create(label="PENDING")
+        VerificationStatus.objects.get_or_create(label="PENDING")
+        self.doctor, self.doctor_profile = self._account("panel_doc@test.com", "Doc", self.doctor_role)
+        self.client.force_authenticate(user=self.doctor)
+
+    def _account(self, email, last_name, role):
+        identity = UserIdentity.objects.create(first_name="X", last_name=last_name)
+        account = User.objects.create_user(email=email, password="pass123", user_identity=identity)
+        profile = Profile.objects.create(user=identity, role=role)
+        return account, profile
+
+    def _patient(self, email, last_name, glucose, status_label="ACTIVE"):
+        from django.utils import timezone
+
+        from apps.glycemia.models import Glycemia, GlycemiaHisto
+
+        account, profile = self._account(email, last_name, self.patient_role)
+        PatientCareTeam.objects.create(
+            patient_profile=profile.patient_profile,
+            member_profile=self.doctor_profile,
+            role="REFERENT_DOCTOR",
+            status=InvitationStatus.objects.get(label=status_label),
+        )
+        reading = {"user": account, "value": glucose, "unit": "mg/dL", "measured_at": timezone.now()}
+        Glycemia.objects.create(**reading)
+        GlycemiaHisto.objects.create(**reading)  # alimente les rollups
+        return account
+
+    @override_settings(BACKGROUND_TASKS_EAGER=True)
+    def test_panel_sorts_by_risk_with_constant_queries_and_cursor(self):
+        from apps.alerts.models import AlertEvent, AlertRule
+
+        calm = self._patient("panel_calm@test.com", "Calme", 110)
+        hyper = self._patient("panel_hyper@test.com", "Haut", 260)
+        alerted = self._patient("panel_alert@test.com", "Alerte", 120)
+        self._patient("panel_pending@test.com", "Attente", 300, status_label="PENDING")
+        rule = AlertRule.objects.create(code="HYPO", name="Hypo", max_glycemia=69)
+        AlertEvent.objects.create(user=alerted, rule=rule, glycemia_value=60)
+
+        # droit d'accès, comptes, TIR, score de santé (2 requêtes à froid)
+        with self.assertNumQueries(5):
+            response = self.client.get("/api/doctors/care-team/patient-panel/?limit=2")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["count"], 3)
+        first = response.data["results"]
+        self.assertEqual(
+            [row["patient_user_id"] for row in first], [str(alerted.user_id), str(hyper.user_id)]
+        )
+        self.assertEqual(first[0]["activeAlerts"], 1)
+        self.assertEqual(first[1]["glucose"]["value"], 260)
+        self.assertEqual(first[1]["tir"], 0.0)
+        self.assertIsInstance(first[1]["healthScore"], int)
+
+        response = self.client.get(
+            "/api/doctors/care-team/patient-panel/", {"limit": 2, "cursor": response.data["next"]}
+        )
+        self.assertEqual([row["patient_user_id"] for row in response.data["results"]], [str(calm.user_id)])
+        self.assertIsNone(response.data["next"])
+
+    def test_panel_sorts_by_name(self):
+        self._patient("panel_b@test.com", "Bernard", 110)
+        self._patient("panel_a@test.com", "Arnaud", 110)
+
+        response = self.client.get("/api/doctors/care-team/patient-panel/?sort=name")
+
+        self.assertEqual([row["last_name"] for row in response.data["results"]], ["Arnaud", "Bernard"])
+
+    def test_panel_rejects_invalid_parameters_and_non_doctors(self):
+        from apps.doctors.services import PatientPanelService
+
+        risk_cursor = PatientPanelService.encode_cursor((0, 0, 50.0, 50, "id"), PatientPanelService.SORT_RISK)
+        for query in ("sort=age", "limit=0", "cursor=abc", f"sort=name&cursor={risk_cursor}"):
+            response = self.client.get(f"/api/doctors/care-team/patient-panel/?{query}")
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, query)
+
+        patient, _ = self._account("panel_not_doc@test.com", "Patient", self.patient_role)
+        self.client.force_authenticate(user=patient)
+        response = self.client.get("/api/doctors/care-team/patient-panel/")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
@@ -6,16 +6,18 @@ from rest_framework import viewsets
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
 logger = logging.getLogger(__name__)
 
 from apps.doctors.doctor_patient_access import verify_doctor_can_access_patient, verify_proche_can_access_patient
 from apps.doctors.models import InvitationStatus, PatientCareTeam
 from apps.doctors.serializers import PatientCareTeamSerializer
-from apps.doctors.services import DoctorPatientDataService
+from apps.doctors.services import DoctorPatientDataService, PatientPanelService
 from apps.doctors.utils import send_care_team_invitation, send_proche_invitation
 from apps.profiles.models import Profile, Role
 from apps.users.models import AuthAccount, User
+from utils.keyset import InvalidCursor
 
 
 def _get_identity(user_obj):
@@ -208,11 +210,17 @@ class CareTeamViewSet(viewsets.ViewSet):
         auth_account.is_active = True
         auth_account.save(update_fields=["password", "is_active"])
 
+        # save() par ligne (et non update()) : post_save invalide l'index de
+        # diffusion des alertes, le cache d'accès et prévient les sockets du membre.
         active_status = _get_invitation_status("ACTIVE")
-        PatientCareTeam.objects.filter(
-            member_profile__user=auth_account.user,
-            status__label="PENDING",
-        ).update(status=active_status)
+        with transaction.atomic():
+            pending = PatientCareTeam.objects.select_for_update().filter(
+                member_profile__user=auth_account.user,
+                status__label="PENDING",
+            )
+            for team_member in pending:
+                team_member.status = active_status
+                team_member.save(update_fields=["status"])
 
         return Response({"message": "Compte activé avec succès."}, status=200)
 
@@ -663,9 +671,107 @@ class CareTeamViewSet(viewsets.ViewSet):
         data = DoctorPatientDataService.get_patient_dashboard(user)
         return Response(data)
 
+    @action(detail=False, methods=["get"], url_path="patient-panel")
+    def get_patient_panel(self, request):
+        """
+        GET /api/doctors/care-team/patient-panel/?sort=risk|name&limit=50&cursor=<next>
+        Vue d'ensemble de tous les patients ACTIVE du médecin : dernière
+        glycémie, TIR 14 jours, alertes actives, score de santé.
+        Tri par risque (défaut) ou par nom, pagination par curseur.
+        """
+        doctor_identity_id = getattr(request.user, "user_id", None)
+        is_doctor = doctor_identity_id and Profile.objects.filter(
+            user_id=doctor_identity_id,
+            role__name__iexact="DOCTOR",
+            doctor_profile__isnull=False,
+        ).exists()
+        if not is_doctor:
+            return Response({"error": "Access denied. Doctors only."}, status=403)
+
+        sort = request.query_params.get("sort") or PatientPanelService.SORT_RISK
+        if sort not in PatientPanelService.SORTS:
+            return Response(
+                {"error": f"sort doit être l'une des valeurs : {', '.join(PatientPanelService.SORTS)}"},
+                status=400,
+            )
+        try:
+            limit = int(request.query_params.get("limit") or PatientPanelService.DEFAULT_LIMIT)
+        except ValueError:
+            limit = 0
+        if not 1 <= limit <= PatientPanelService.MAX_LIMIT:
+            return Response(
+                {"error": f"limit doit être un entier entre 1 et {PatientPanelService.MAX_LIMIT}"},
+                status=400,
+            )
+
+        try:
+            data = PatientPanelService.get_panel(
+                doctor_identity_id,
+                sort=sort,
+                cursor=request.query_params.get("cursor"),
+                limit=limit,
+            )
+        except InvalidCursor:
+            return Response({"error": "cursor invalide"}, status=400)
+        return Response(data)
+
     def _verify_doctor_access(self, request, patient_user_id):
         return verify_doctor_can_access_patient(request, patient_user_id)
 
+    def _history_response(self, request, fetch, user):
+        """
+        Historique paginé par curseur : ?limit=1..HISTORY_MAX_LIMIT&cursor=<next>.
+        Le corps reste une liste ; la page suivante est annoncée dans l'en-tête
+        Link (rel="next").
+        """
+        try:
+            limit = int(request.query_params.get("limit") or DoctorPatientDataService.HISTORY_LIMIT)
+        except ValueError:
+            limit = 0
+        if not 1 <= limit <= DoctorPatientDataService.HISTORY_MAX_LIMIT:
+            return Response(
+                {"error": f"limit doit être un entier entre 1 et {DoctorPatientDataService.HISTORY_MAX_LIMIT}"},
+                status=400,
+            )
+
+        try:
+            rows, next_cursor = fetch(user, limit=limit, cursor=request.query_params.get("cursor"))
+        except InvalidCursor:
+            return Response({"error": "cursor invalide"}, status=400)
+
+        response = Response(rows)
+        if next_cursor:
+            next_url = replace_query_param(request.build_absolute_uri(), "cursor", next_cursor)
+            response["Link"] = f'<{next_url}>; rel="next"'
+        return response
+
+    def _glycemia_response(self, request, user):
+        """
+        Lectures paginées, ou ?bucket=<minutes>&days=<1..90> : min / max /
+        moyenne par seau pour les graphiques longue durée.
+        """
+        if "bucket" not in request.query_params:
+            return self._history_response(request, DoctorPatientDataService.get_glycemia_history, user)
+
+        from apps.glycemia.services import agp, downsampling
+
+        try:
+            bucket_minutes = downsampling.parse_bucket(request.query_params.get("bucket"))
+        except (ValueError, TypeError):
+            return Response(
+                {
+                    "error": f"bucket doit être un entier entre {downsampling.MIN_BUCKET_MINUTES} "
+                    f"et {downsampling.MAX_BUCKET_MINUTES} (minutes)"
+                },
+                status=400,
+            )
+        try:
+            days = agp.parse_days(request.query_params.get("days"))
+        except (ValueError, TypeError):
+            return Response({"error": f"days doit être un entier entre 1 et {agp.MAX_DAYS}"}, status=400)
+
+        return Response(DoctorPatientDataService.get_glycemia_chart(user, days, bucket_minutes))
+
     @action(detail=False, methods=["get"], url_path="patient-meals")
     def get_patient_meals(self, request):
         patient_id = request.query_params.get("patient_user_id")
@@ -673,10 +779,7 @@ class CareTeamViewSet(viewsets.ViewSet):
         if error_response:
             return error_response
 
-        from apps.doctors.services import DoctorPatientDataService
-
-        data = DoctorPatientDataService.get_meals_history(user)
-        return Response(data)
+        return self._history_response(request, DoctorPatientDataService.get_meals_history, user)
 
     @action(detail=False, methods=["get"], url_path="patient-medications")
     def get_patient_medications(self, request):
@@ -685,22 +788,42 @@ class CareTeamViewSet(viewsets.ViewSet):
         if error_response:
             return error_response
 
-        from apps.doctors.services import DoctorPatientDataService
-
-        data = DoctorPatientDataService.get_medications_history(user)
-        return Response(data)
+        return self._history_response(request, DoctorPatientDataService.get_medications_history, user)
 
     @action(detail=False, methods=["get"], url_path="patient-glycemia")
     def get_patient_glycemia(self, request):
+        """
+        GET /api/doctors/care-team/patient-glycemia/?patient_user_id=<id>[&limit=50&cursor=<next>]
+        GET /api/doctors/care-team/patient-glycemia/?patient_user_id=<id>&bucket=60&days=90
+        """
         patient_id = request.query_params.get("patient_user_id")
         user, error_response = self._verify_doctor_access(request, patient_id)
         if error_response:
             return error_response
 
-        from apps.doctors.services import DoctorPatientDataService
+        return self._glycemia_response(request, user)
 
-        data = DoctorPatientDataService.get_glycemia_history(user)
-        return Response(data)
+    @action(detail=False, methods=["get"], url_path="patient-agp")
+    def get_patient_agp(self, request):
+        """
+        GET /api/doctors/care-team/patient-agp/?patient_user_id=<id>&days=14
+        Ambulatory Glucose Profile du patient (14 ≤ days ≤ 90).
+        """
+        patient_id = request.query_params.get("patient_user_id")
+        user, error_response = self._verify_doctor_access(request, patient_id)
+        if error_response:
+            return error_response
+
+        from apps.glycemia.services import agp
+
+        try:
+            days = agp.parse_days(request.query_params.get("days"), agp.MIN_DAYS)
+        except (ValueError, TypeError):
+            return Response(
+                {"error": f"days doit être un entier entre {agp.MIN_DAYS} et {agp.MAX_DAYS}"}, status=400
+            )
+
+        return Response(agp.build_agp(user, days))
 
     # ------------------------------------------------------------------ #
     #  Endpoints Proche                                                    #
@@ -735,13 +858,13 @@ class CareTeamViewSet(viewsets.ViewSet):
         """
         GET /api/doctors/care-team/proche-glycemia/
         Historique glycémie du patient lié, accessible au proche connecté.
+        Mêmes paramètres que patient-glycemia (limit/cursor, bucket/days).
         """
         patient_auth, _, error = verify_proche_can_access_patient(request)
         if error:
             return error
 
-        from apps.doctors.services import DoctorPatientDataService
-        return Response(DoctorPatientDataService.get_glycemia_history(patient_auth))
+        return self._glycemia_response(request, patient_auth)
 
     @action(detail=False, methods=["get"], url_path="proche-dashboard")
     def get_proche_dashboard(self, request):
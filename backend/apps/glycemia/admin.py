@@ -3,7 +3,7 @@ import requests
 from django.contrib import admin
 from django.utils import timezone
 
-from .models import Glycemia, GlycemiaDataIA, GlycemiaHisto, PersonalModelApproval
+from .models import Glycemia, GlycemiaDataIA, GlycemiaHisto, GlycemiaRollup, PersonalModelApproval
 
 
 @admin.register(Glycemia)
@@ -25,6 +25,16 @@ class GlycemiaHistoAdmin(admin.ModelAdmin):
     list_per_page = 50
 
 
+@admin.register(GlycemiaRollup)
+class GlycemiaRollupAdmin(admin.ModelAdmin):
+    list_display = ("user", "period", "bucket_start", "count", "min_value", "max_value", "in_range_count")
+    list_filter = ("period",)
+    search_fields = ("user__email",)
+    raw_id_fields = ("user",)
+    date_hierarchy = "bucket_start"
+    list_per_page = 50
+
+
 @admin.register(GlycemiaDataIA)
 class GlycemiaDataIAAdmin(admin.ModelAdmin):
     list_display = (
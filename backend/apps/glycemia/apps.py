@@ -1,4 +1,12 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+def ensure_glycemia_partitions(sender, using="default", **kwargs):
+    """Crée les partitions mensuelles à venir à chaque `migrate` (déploiement)."""
+    from .services.partitioning import ensure_partitions
+
+    ensure_partitions(using=using)
 
 
 class GlycemiaConfig(AppConfig):
@@ -8,3 +16,5 @@ class GlycemiaConfig(AppConfig):
     def ready(self):
         """Register signals when the app is ready."""
         from . import signals  # noqa: F401
+
+        post_migrate.connect(ensure_glycemia_partitions, sender=self)
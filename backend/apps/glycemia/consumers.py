@@ -4,7 +4,9 @@ WebSocket consumer for real-time glycemia updates.
 Handles:
 - User connection/disconnection
 - Adding users to their personal channel group
-- Broadcasting glycemia updates and alerts
+- Doctor multi-patient subscriptions (one socket, many patient groups)
+- Broadcasting glycemia updates and alerts (batched glycemia_batch frames)
+- Pushing dashboard widget updates to the socket owner (widget_update frames)
 - Ping/pong for connection health checks
 """
 
@@ -13,10 +15,18 @@ import logging
 
 from django.contrib.auth.models import AnonymousUser
 
+from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
 
+from apps.doctors.doctor_patient_access import access_group_for, doctor_accessible_patient_accounts
+
+from .services.broadcaster import group_for
+
 logger = logging.getLogger(__name__)
 
+# Nombre maximal de patients suivis par une même connexion.
+MAX_SUBSCRIPTIONS = 200
+
 
 class GlycemiaConsumer(AsyncWebsocketConsumer):
     """
@@ -24,6 +34,13 @@ class GlycemiaConsumer(AsyncWebsocketConsumer):
 
     Each authenticated user joins their own group: glycemia_user_{user_id}
     Messages are broadcast to users when new glycemia readings are recorded.
+
+    A doctor can also follow several patients on the same socket:
+        {"type": "subscribe", "patient_ids": ["<patient_user_id>", ...]}
+        {"type": "unsubscribe", "patient_ids": [...]}
+    Only patients of an ACTIVE care team of the doctor are joined. The
+    socket also joins the member's care_access group: on any care team
+    change, subscriptions are re-verified and revoked ones are dropped.
     """
 
     async def connect(self):
@@ -37,11 +54,18 @@ class GlycemiaConsumer(AsyncWebsocketConsumer):
             return
 
         # Create user-specific group name
-        self.group_name = f"glycemia_user_{self.user.id_auth}"
+        self.group_name = group_for(self.user.id_auth)
+        self.subscriptions = {}
 
         # Join the user's personal group
         await self.channel_layer.group_add(self.group_name, self.channel_name)
 
+        # Care team changes of the user (subscription revocation)
+        identity_id = getattr(self.user, "user_id", None)
+        self.access_group = access_group_for(identity_id) if identity_id else None
+        if self.access_group:
+            await self.channel_layer.group_add(self.access_group, self.channel_name)
+
         await self.accept()
 
         # Send connection confirmation
@@ -51,6 +75,8 @@ class GlycemiaConsumer(AsyncWebsocketConsumer):
                     "type": "connection_established",
                     "message": "Connected to glycemia WebSocket",
                     "user_id": str(self.user.id_auth),
+                    # Widgets are pushed on change: clients can stop polling them.
+                    "widget_updates": True,
                 }
             )
         )
@@ -61,6 +87,10 @@ class GlycemiaConsumer(AsyncWebsocketConsumer):
         """Handle WebSocket disconnection."""
         if hasattr(self, "group_name"):
             await self.channel_layer.group_discard(self.group_name, self.channel_name)
+            if getattr(self, "access_group", None):
+                await self.channel_layer.group_discard(self.access_group, self.channel_name)
+            for group in getattr(self, "subscriptions", {}).values():
+                await self.channel_layer.group_discard(group, self.channel_name)
             logger.info(
                 f"WebSocket disconnected: user {self.user.id_auth}, code {close_code}"
             )
@@ -80,9 +110,78 @@ class GlycemiaConsumer(AsyncWebsocketConsumer):
                         }
                     )
                 )
+            elif message_type == "subscribe":
+                await self.subscribe(data.get("patient_ids") or [])
+            elif message_type == "unsubscribe":
+                await self.unsubscribe(data.get("patient_ids") or [])
         except json.JSONDecodeError:
             logger.warning(f"Invalid JSON received: {text_data[:100]}")
 
+    async def subscribe(self, patient_ids):
+        """Join the groups of the requested patients the doctor has access to."""
+        requested = [str(p) for p in patient_ids if str(p) not in self.subscriptions]
+        room = MAX_SUBSCRIPTIONS - len(self.subscriptions)
+        allowed = await database_sync_to_async(doctor_accessible_patient_accounts)(
+            self.user.user_id, requested[: max(room, 0)]
+        )
+        for patient_id, patient_auth_id in allowed.items():
+            group = group_for(patient_auth_id)
+            await self.channel_layer.group_add(group, self.channel_name)
+            self.subscriptions[patient_id] = group
+
+        await self.send(
+            text_data=json.dumps(
+                {
+                    "type": "subscribed",
+                    "patient_ids": sorted(allowed),
+                    "denied": sorted(set(requested) - set(allowed)),
+                }
+            )
+        )
+
+    async def unsubscribe(self, patient_ids):
+        removed = []
+        for patient_id in map(str, patient_ids):
+            group = self.subscriptions.pop(patient_id, None)
+            if group:
+                await self.channel_layer.group_discard(group, self.channel_name)
+                removed.append(patient_id)
+        await self.send(text_data=json.dumps({"type": "unsubscribed", "patient_ids": sorted(removed)}))
+
+    async def care_team_changed(self, event):
+        """
+        Handle care_team_changed message from channel layer (apps/doctors/signals.py).
+        Re-verifies every subscription and leaves the groups of patients no
+        longer accessible.
+        """
+        if not self.subscriptions:
+            return
+        allowed = await database_sync_to_async(doctor_accessible_patient_accounts)(
+            self.user.user_id, list(self.subscriptions)
+        )
+        revoked = sorted(set(self.subscriptions) - set(allowed))
+        for patient_id in revoked:
+            await self.channel_layer.group_discard(self.subscriptions.pop(patient_id), self.channel_name)
+        if revoked:
+            await self.send(
+                text_data=json.dumps({"type": "unsubscribed", "patient_ids": revoked, "reason": "access_revoked"})
+            )
+
+    async def glycemia_batch(self, event):
+        """
+        Handle glycemia_batch message from channel layer (services/broadcaster.py).
+        One frame carries every update/alert of a patient for the batching window.
+        """
+        await self.send(
+            text_data=json.dumps(
+                {
+                    "type": "glycemia_batch",
+                    "user_id": event["user_id"],
+                    "messages": event["messages"],
+                }
+            )
+        )
+
     async def glycemia_update(self, event):
         """
         Handle glycemia_update message from channel layer.
@@ -111,3 +210,20 @@ class GlycemiaConsumer(AsyncWebsocketConsumer):
                 }
             )
         )
+
+    async def widget_update(self, event):
+        """
+        Handle widget_update message from channel layer (dashboard/services/widget_push.py).
+        Sent on the owner's group, which subscribed doctors also join: only
+        the socket owner gets their dashboard widgets.
+        """
+        if event["user_id"] != str(self.user.id_auth):
+            return
+        await self.send(
+            text_data=json.dumps(
+                {
+                    "type": "widget_update",
+                    "widgets": event["widgets"],
+                }
+            )
+        )
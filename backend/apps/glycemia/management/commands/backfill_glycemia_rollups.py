@@ -0,0 +1,50 @@
+from datetime import datetime
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.glycemia.models import GlycemiaHisto
+from apps.glycemia.services import agp, rollups
+
+User = get_user_model()
+
+
+def parse_since(value):
+    if not value:
+        return None
+    try:
+        return timezone.make_aware(datetime.strptime(value, "%Y-%m-%d"))
+    except ValueError:
+        raise CommandError("--since doit être au format YYYY-MM-DD")
+
+
+def target_user_ids(email):
+    if email:
+        user = User.objects.filter(email=email).first()
+        if user is None:
+            raise CommandError(f"Utilisateur {email} introuvable")
+        return [user.pk]
+    return list(GlycemiaHisto.objects.order_by().values_list("user_id", flat=True).distinct())
+
+
+class Command(BaseCommand):
+    help = "Recalcule les rollups glycémiques horaires/journaliers et les sketches AGP depuis GlycemiaHisto"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", help="Email d'un utilisateur (défaut: tous)")
+        parser.add_argument("--since", help="YYYY-MM-DD : ne reconstruit qu'à partir de ce jour")
+
+    def handle(self, *args, **options):
+        since = parse_since(options["since"])
+        user_ids = target_user_ids(options["user"])
+
+        total = days = 0
+        for user_id in user_ids:
+            buckets = rollups.compute_user_buckets(user_id, since)
+            total += rollups.replace_user_buckets(user_id, buckets, since)
+            days += agp.replace_user_sketches(user_id, agp.compute_user_sketches(user_id, since), since)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Rollups reconstruits: {total} seaux, {days} sketches AGP ({len(user_ids)} utilisateurs)")
+        )
@@ -0,0 +1,163 @@
+import json
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from apps.glycemia.services import partitioning
+
+SCHEMA = "bench_glycemia"
+
+COLUMNS = """
+    id bigint GENERATED BY DEFAULT AS IDENTITY,
+    user_id integer NOT NULL,
+    measured_at timestamptz NOT NULL,
+    value double precision NOT NULL,
+    trend varchar(20),
+    rate double precision,
+    context varchar(30) NOT NULL DEFAULT ''
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark insertion / range-scan de glycemia_histo : table simple vs partitionnée par mois. "
+        "Travaille dans un schéma jetable, jamais sur les données réelles (PostgreSQL)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=100_000_000, help="Lectures générées par table")
+        parser.add_argument("--users", type=int, default=20_000)
+        parser.add_argument("--months", type=int, default=36, help="Profondeur d'historique générée")
+        parser.add_argument("--batch", type=int, default=10_000, help="Taille du lot d'insertion mesuré")
+        parser.add_argument("--samples", type=int, default=50, help="Requêtes mesurées par scénario")
+        parser.add_argument("--keep", action="store_true", help="Conserver le schéma après le benchmark")
+
+    def handle(self, *args, **options):
+        if not partitioning.is_supported():
+            raise CommandError("Benchmark disponible uniquement sur PostgreSQL.")
+
+        now = timezone.now()
+        first = partitioning.add_months(partitioning.month_start(now), -(options["months"] - 1))
+        span_seconds = int((now - first).total_seconds())
+
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+            cursor.execute(f"CREATE SCHEMA {SCHEMA}")
+            cursor.execute(f"CREATE TABLE {SCHEMA}.plain ({COLUMNS}, PRIMARY KEY (id))")
+            cursor.execute(f"CREATE TABLE {SCHEMA}.partitioned ({COLUMNS}, PRIMARY KEY (id, measured_at)) PARTITION BY RANGE (measured_at)")
+            for start in partitioning.month_range(first, partitioning.add_months(now, 1)):
+                cursor.execute(
+                    f"CREATE TABLE {SCHEMA}.p_{start:%Y%m} PARTITION OF {SCHEMA}.partitioned FOR VALUES FROM (%s) TO (%s)",
+                    [start, partitioning.add_months(start, 1)],
+                )
+
+            results = {}
+            for table in ("plain", "partitioned"):
+                self.stdout.write(f"[{table}] chargement de {options['rows']:,} lectures...")
+                started = time.perf_counter()
+                cursor.execute(
+                    f"""
+                    INSERT INTO {SCHEMA}.{table} (user_id, measured_at, value, trend, rate)
+                    SELECT mod(g, %s) + 1,
+                           %s::timestamptz + mod(g::bigint * 7919, %s) * interval '1 second',
+                           40 + mod(g, 300),
+                           'flat',
+                           0
+                    FROM generate_series(1, %s) AS g
+                    """,
+                    [options["users"], first, span_seconds, options["rows"]],
+                )
+                load_seconds = time.perf_counter() - started
+                cursor.execute(f"CREATE INDEX ON {SCHEMA}.{table} (user_id, measured_at)")
+                cursor.execute(f"CREATE INDEX ON {SCHEMA}.{table} (measured_at)")
+                cursor.execute(f"ANALYZE {SCHEMA}.{table}")
+                results[table] = self._measure(cursor, table, now, options)
+                results[table]["load_s"] = load_seconds
+
+            if not options["keep"]:
+                cursor.execute(f"DROP SCHEMA {SCHEMA} CASCADE")
+
+        self._report(results, options)
+
+    def _measure(self, cursor, table, now, options):
+        users = [random.randint(1, options["users"]) for _ in range(options["samples"])]
+
+        # Insertion d'un lot dans le mois courant (chemin d'ingestion).
+        started = time.perf_counter()
+        cursor.execute(
+            f"""
+            INSERT INTO {SCHEMA}.{table} (user_id, measured_at, value)
+            SELECT mod(g, %s) + 1, %s::timestamptz - mod(g, 3600) * interval '1 second', 120
+            FROM generate_series(1, %s) AS g
+            """,
+            [options["users"], now, options["batch"]],
+        )
+        insert_rate = options["batch"] / (time.perf_counter() - started)
+
+        # Range scan "measured_after" : 7 derniers jours d'un patient.
+        range_ms = self._timed(
+            cursor,
+            f"SELECT measured_at, value FROM {SCHEMA}.{table} WHERE user_id = %s AND measured_at >= %s ORDER BY measured_at DESC",
+            [[user_id, now - timedelta(days=7)] for user_id in users],
+        )
+
+        # Fenêtre IA : 24 dernières lectures bornées à 7 jours.
+        recent_ms = self._timed(
+            cursor,
+            f"SELECT measured_at, value FROM {SCHEMA}.{table} WHERE user_id = %s AND measured_at > %s AND measured_at <= %s ORDER BY measured_at DESC LIMIT 24",
+            [[user_id, now - timedelta(days=7), now] for user_id in users],
+        )
+
+        # Nombre de tables effectivement lues après élagage des partitions.
+        cursor.execute(
+            f"EXPLAIN (FORMAT JSON) SELECT 1 FROM {SCHEMA}.{table} WHERE user_id = 1 AND measured_at >= %s",
+            [now - timedelta(days=7)],
+        )
+        plan = cursor.fetchone()[0]
+        scanned = len(_relations(plan[0]["Plan"] if isinstance(plan, list) else json.loads(plan)[0]["Plan"]))
+
+        return {
+            "insert_rows_s": insert_rate,
+            "range_p50_ms": statistics.median(range_ms),
+            "range_p95_ms": _p95(range_ms),
+            "recent_p50_ms": statistics.median(recent_ms),
+            "recent_p95_ms": _p95(recent_ms),
+            "relations_scanned": scanned,
+        }
+
+    @staticmethod
+    def _timed(cursor, sql, params_list):
+        timings = []
+        for params in params_list:
+            started = time.perf_counter()
+            cursor.execute(sql, params)
+            cursor.fetchall()
+            timings.append((time.perf_counter() - started) * 1000)
+        return timings
+
+    def _report(self, results, options):
+        self.stdout.write("")
+        self.stdout.write(f"{options['rows']:,} lectures / {options['users']:,} patients / {options['months']} mois")
+        header = f"{'métrique':<20}{'plain':>14}{'partitioned':>14}"
+        self.stdout.write(header)
+        self.stdout.write("-" * len(header))
+        for key in ("load_s", "insert_rows_s", "range_p50_ms", "range_p95_ms", "recent_p50_ms", "recent_p95_ms", "relations_scanned"):
+            plain, partitioned = results["plain"][key], results["partitioned"][key]
+            self.stdout.write(f"{key:<20}{plain:>14,.2f}{partitioned:>14,.2f}")
+
+
+def _relations(node):
+    names = {node["Relation Name"]} if "Relation Name" in node else set()
+    for child in node.get("Plans", []):
+        names |= _relations(child)
+    return names
+
+
+def _p95(values):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
@@ -0,0 +1,101 @@
+import random
+import statistics
+import time
+import uuid
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from rest_framework.renderers import JSONRenderer
+
+from apps.glycemia.models import GlycemiaHisto
+from apps.glycemia.serializers import GlycemiaHistoSerializer
+from utils import fast_json
+
+FIELDS = tuple(GlycemiaHistoSerializer.Meta.fields)
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark de sérialisation d'une liste de lectures : ModelSerializer + JSONRenderer "
+        "vs tuples values_list + utils.fast_json (objets, puis colonnes). "
+        "Lignes générées en mémoire : mesure la sérialisation seule, sans la base."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", default="1000,10000,100000", help="Nombres de lignes, séparés par des virgules")
+        parser.add_argument("--repeat", type=int, default=3, help="Mesures par scénario (médiane retenue)")
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in options["sizes"].split(",") if size.strip()]
+        except ValueError:
+            raise CommandError("--sizes attend des entiers séparés par des virgules.")
+
+        self.stdout.write(f"encodeur rapide : {'orjson' if fast_json.orjson else 'json (orjson absent)'}")
+        header = f"{'lignes':>10}{'scénario':>14}{'ms':>12}{'octets':>14}{'gain':>8}"
+        self.stdout.write(header)
+        self.stdout.write("-" * len(header))
+
+        for size in sizes:
+            rows = _rows(size)
+            results = {
+                "serializer": self._measure(lambda: _serializer(rows), options["repeat"]),
+                "compact": self._measure(lambda: _compact(rows), options["repeat"]),
+                "columnar": self._measure(lambda: _columnar(rows), options["repeat"]),
+            }
+            baseline = results["serializer"][0]
+            for name, (ms, payload) in results.items():
+                self.stdout.write(f"{size:>10,}{name:>14}{ms:>12,.1f}{payload:>14,}{baseline / ms:>7.1f}x")
+
+    @staticmethod
+    def _measure(func, repeat):
+        timings, payload = [], b""
+        for _ in range(repeat):
+            started = time.perf_counter()
+            payload = func()
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings), len(payload)
+
+
+def _rows(size):
+    """Tuples au format de values_list(*FIELDS), lectures CGM toutes les 5 minutes."""
+    start = timezone.now() - timedelta(minutes=5 * size)
+    rows = []
+    for i in range(size):
+        measured_at = start + timedelta(minutes=5 * i)
+        values = {
+            "id": i + 1,
+            "reading_id": uuid.uuid4(),
+            "device": None,
+            "measured_at": measured_at,
+            "recorded_at": measured_at + timedelta(seconds=30),
+            "value": round(random.uniform(50, 300), 1),
+            "unit": "mg/dL",
+            "trend": random.choice(("rising", "falling", "flat")),
+            "rate": round(random.uniform(-3, 3), 2),
+            "source": "cgm",
+            "context": "",
+            "notes": "",
+            "photo_url": None,
+            "location_lat": None,
+            "location_lng": None,
+        }
+        rows.append(tuple(values[field] for field in FIELDS))
+    return rows
+
+
+def _serializer(rows):
+    # Chemin actuel : instances de modèle, ModelSerializer, JSONRenderer.
+    attnames = ["device_id" if field == "device" else field for field in FIELDS]
+    instances = [GlycemiaHisto(**dict(zip(attnames, row))) for row in rows]
+    return JSONRenderer().render(GlycemiaHistoSerializer(instances, many=True).data)
+
+
+def _compact(rows):
+    return fast_json.dumps([dict(zip(FIELDS, row)) for row in rows])
+
+
+def _columnar(rows):
+    return fast_json.dumps(fast_json.to_columns([dict(zip(FIELDS, row)) for row in rows]))
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.glycemia.services import agp, rollups
+
+from .backfill_glycemia_rollups import parse_since, target_user_ids
+
+
+class Command(BaseCommand):
+    help = "Vérifie la cohérence des rollups glycémiques et sketches AGP avec GlycemiaHisto (--fix pour corriger)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", help="Email d'un utilisateur (défaut: tous)")
+        parser.add_argument("--since", help="YYYY-MM-DD : ne vérifie qu'à partir de ce jour")
+        parser.add_argument("--fix", action="store_true", help="Reconstruit les utilisateurs incohérents")
+
+    def handle(self, *args, **options):
+        since = parse_since(options["since"])
+        user_ids = target_user_ids(options["user"])
+
+        inconsistent = 0
+        for user_id in user_ids:
+            problems = [
+                f"{p['period']} {p['bucket_start'].isoformat()} {p['issue']}" for p in rollups.diff_user_buckets(user_id, since)
+            ] + [f"agp {p['day'].isoformat()} {p['issue']}" for p in agp.diff_user_sketches(user_id, since)]
+            if not problems:
+                continue
+            inconsistent += 1
+            for problem in problems[:20]:
+                self.stdout.write(self.style.WARNING(f"{user_id} {problem}"))
+            if len(problems) > 20:
+                self.stdout.write(self.style.WARNING(f"{user_id} ... {len(problems) - 20} autres"))
+            if options["fix"]:
+                rollups.replace_user_buckets(user_id, rollups.compute_user_buckets(user_id, since), since)
+                agp.replace_user_sketches(user_id, agp.compute_user_sketches(user_id, since), since)
+
+        if inconsistent and not options["fix"]:
+            raise CommandError(f"{inconsistent} utilisateur(s) avec des rollups incohérents ({len(user_ids)} vérifiés)")
+        verb = "corrigés" if options["fix"] else "incohérents"
+        self.stdout.write(self.style.SUCCESS(f"{len(user_ids)} utilisateurs vérifiés, {inconsistent} {verb}"))
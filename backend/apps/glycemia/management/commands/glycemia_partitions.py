@@ -0,0 +1,50 @@
+from datetime import datetime, timezone
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from apps.glycemia.services import partitioning
+
+
+class Command(BaseCommand):
+    help = "Crée les partitions mensuelles à venir de glycemia_histo et archive les anciennes (PostgreSQL)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--months-ahead",
+            type=int,
+            default=partitioning.MONTHS_AHEAD,
+            help="Nombre de mois à venir à pré-créer",
+        )
+        parser.add_argument(
+            "--archive-before",
+            help="YYYY-MM : déplace les partitions antérieures à ce mois vers --tablespace",
+        )
+        parser.add_argument("--tablespace", help="Tablespace cible de l'archivage (stockage froid)")
+        parser.add_argument("--list", action="store_true", help="Affiche les partitions existantes")
+
+    def handle(self, *args, **options):
+        if not partitioning.is_supported():
+            self.stdout.write(self.style.WARNING("Partitionnement disponible uniquement sur PostgreSQL, rien à faire."))
+            return
+
+        created = partitioning.ensure_partitions(months_ahead=options["months_ahead"])
+        self.stdout.write(self.style.SUCCESS(f"Partitions créées: {len(created)} {', '.join(created)}"))
+
+        if options["archive_before"]:
+            if not options["tablespace"]:
+                raise CommandError("--tablespace est requis avec --archive-before")
+            try:
+                before = datetime.strptime(options["archive_before"], "%Y-%m").replace(tzinfo=timezone.utc)
+            except ValueError:
+                raise CommandError("--archive-before doit être au format YYYY-MM")
+            moved = partitioning.archive_partitions(before, options["tablespace"])
+            self.stdout.write(self.style.SUCCESS(f"Partitions archivées: {len(moved)} {', '.join(moved)}"))
+
+        if options["list"]:
+            with connection.cursor() as cursor:
+                for partition in partitioning.list_partitions(cursor):
+                    self.stdout.write(
+                        f"{partition['name']:<32} {partition['tablespace'] or 'pg_default':<12} "
+                        f"{partition['size_bytes'] / 1024 / 1024:>10.1f} MB  {partition['bounds']}"
+                    )
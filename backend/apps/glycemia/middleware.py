@@ -3,44 +3,47 @@ JWT authentication middleware for WebSocket connections.
 
 Extracts JWT token from query string and authenticates the user.
 Usage: wss://host/ws/glycemia/?token=<jwt_access_token>
+
+A reconnect storm (every mobile client after a deploy) stays cheap:
+- the token is decoded once, in the event loop, without touching the DB;
+- reconnects are rate-limited per user (WS_CONNECT_RATE) before any lookup;
+- the account comes from a short-TTL cache (utils/user_cache.py), invalidated
+  on save/delete; only a cache miss hops to the DB thread.
 """
 
 from urllib.parse import parse_qs
 
 from django.conf import settings
-from django.contrib.auth import get_user_model
-from django.contrib.auth.models import AnonymousUser
 
 import jwt
+from asgiref.sync import sync_to_async
 from channels.db import database_sync_to_async
 from channels.middleware import BaseMiddleware
 from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 from rest_framework_simplejwt.tokens import AccessToken
 
-User = get_user_model()
+from utils import user_cache
+from utils.throttles import WebSocketConnectThrottle
+
+CLOSE_UNAUTHORIZED = 4001
+CLOSE_RATE_LIMITED = 4029
 
 
-@database_sync_to_async
-def get_user_from_token(token_str):
+def decode_user_id(token_str):
     """
-    Validate JWT token and return the associated user.
+    Validate the JWT and return its user id claim, without any DB access.
     Supports dual-key authentication (SECRET_KEY and SECRET_KEY_ADMIN).
     """
     if not token_str:
         return None
 
     # USER_ID_CLAIM is the claim name in the token (default: "user_id")
-    # USER_ID_FIELD is the model field name (e.g., "id_auth")
     user_id_claim = settings.SIMPLE_JWT.get("USER_ID_CLAIM", "user_id")
-    user_id_field = settings.SIMPLE_JWT.get("USER_ID_FIELD", "id")
 
     # Try with main SECRET_KEY first
     try:
-        token = AccessToken(token_str)
-        user_id = token.get(user_id_claim)
-        user = User.objects.get(**{user_id_field: user_id})
-        return user
-    except (InvalidToken, TokenError, User.DoesNotExist):
+        return AccessToken(token_str).get(user_id_claim)
+    except (InvalidToken, TokenError):
         pass
     except Exception:
         pass
@@ -49,23 +52,26 @@ def get_user_from_token(token_str):
     admin_key = getattr(settings, "SECRET_KEY_ADMIN", None)
     if admin_key:
         try:
-            payload = jwt.decode(
-                token_str,
-                admin_key,
-                algorithms=["HS256"],
-            )
-            user_id = payload.get(user_id_claim)
-            user = User.objects.get(**{user_id_field: user_id})
-            return user
+            payload = jwt.decode(token_str, admin_key, algorithms=["HS256"])
+            return payload.get(user_id_claim)
         except Exception:
             pass
 
     return None
 
 
+async def get_user(user_id):
+    """Cached account first (no DB thread), DB lookup on a miss only."""
+    user = await sync_to_async(user_cache.get_cached, thread_sensitive=False)(user_id)
+    if user is None:
+        user = await database_sync_to_async(user_cache.load)(user_id)
+    return user
+
+
 class JWTAuthMiddleware(BaseMiddleware):
     """
     Middleware that authenticates WebSocket connections using JWT from query string.
+    Closes with 4001 (invalid token / inactive account) or 4029 (too many reconnects).
     """
 
     async def __call__(self, scope, receive, send):
@@ -76,9 +82,21 @@ class JWTAuthMiddleware(BaseMiddleware):
         token = token_list[0] if token_list else None
 
         # Authenticate user — reject if no valid token
-        user = await get_user_from_token(token)
-        if user is None:
-            await send({"type": "websocket.close", "code": 4001})
+        user_id = decode_user_id(token)
+        if user_id is None:
+            await send({"type": "websocket.close", "code": CLOSE_UNAUTHORIZED})
+            return
+
+        # Throttle state lives on the instance: one per connection attempt.
+        throttle = WebSocketConnectThrottle()
+        allowed = await sync_to_async(throttle.allow_connect, thread_sensitive=False)(user_id)
+        if not allowed:
+            await send({"type": "websocket.close", "code": CLOSE_RATE_LIMITED})
+            return
+
+        user = await get_user(user_id)
+        if user is None or not user.is_active:
+            await send({"type": "websocket.close", "code": CLOSE_UNAUTHORIZED})
             return
 
         scope["user"] = user
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.7 on 2026-10-19 09:12
+
+from django.db import migrations
+
+
+def partition_glycemia_histo(apps, schema_editor):
+    """PostgreSQL uniquement : glycemia_histo devient une table partitionnée par mois."""
+    from apps.glycemia.services.partitioning import convert_to_partitioned
+
+    convert_to_partitioned(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("glycemia", "0002_initial"),
+    ]
+
+    operations = [
+        # Le retour arrière est un no-op : la table partitionnée reste
+        # compatible avec le modèle, seule la disposition physique change.
+        migrations.RunPython(partition_glycemia_histo, migrations.RunPython.noop),
+    ]
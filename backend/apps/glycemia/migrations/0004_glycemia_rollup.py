@@ -0,0 +1,43 @@
+# Generated by Django 4.2.7 on 2026-10-19 15:06
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('glycemia', '0003_partition_glycemia_histo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GlycemiaRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('hour', 'Hour'), ('day', 'Day')], max_length=4)),
+                ('bucket_start', models.DateTimeField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('sum_values', models.FloatField(default=0)),
+                ('sum_squares', models.FloatField(default=0)),
+                ('min_value', models.FloatField(blank=True, null=True)),
+                ('max_value', models.FloatField(blank=True, null=True)),
+                ('low_count', models.PositiveIntegerField(default=0)),
+                ('in_range_count', models.PositiveIntegerField(default=0)),
+                ('high_count', models.PositiveIntegerField(default=0)),
+                ('histogram', models.JSONField(blank=True, default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='glycemia_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'glycemia_rollup',
+                'ordering': ['-bucket_start'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='glycemiarollup',
+            constraint=models.UniqueConstraint(fields=('user', 'period', 'bucket_start'), name='uniq_glycemia_rollup_bucket'),
+        ),
+    ]
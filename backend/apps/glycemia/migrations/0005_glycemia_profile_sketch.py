@@ -0,0 +1,35 @@
+# Generated by Django 4.2.7 on 2026-10-19 15:10
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('glycemia', '0004_glycemia_rollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GlycemiaProfileSketch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('slots', models.JSONField(blank=True, default=dict)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='glycemia_profile_sketches', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'glycemia_profile_sketch',
+                'ordering': ['-day'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='glycemiaprofilesketch',
+            constraint=models.UniqueConstraint(fields=('user', 'day'), name='uniq_glycemia_profile_sketch_day'),
+        ),
+    ]
@@ -0,0 +1,75 @@
+import uuid
+
+from django.db import migrations, models
+
+CONSTRAINT = models.UniqueConstraint(fields=["reading_id", "measured_at"], name="glycemia_histo_reading_uniq")
+
+
+def adopt_reading_constraint(apps, schema_editor):
+    """
+    Aligne le schéma sur l'état : unicité (reading_id, measured_at).
+
+    PostgreSQL : la migration 0003 a déjà remplacé UNIQUE (reading_id) par
+    UNIQUE (reading_id, measured_at) en gardant l'ancien nom ; on la renomme.
+    Autres moteurs : l'unicité simple est remplacée par la composite.
+    """
+    from apps.glycemia.services import partitioning
+
+    connection = schema_editor.connection
+    model = apps.get_model("glycemia", "GlycemiaHisto")
+    table = model._meta.db_table
+
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            if partitioning.is_partitioned(cursor):
+                cursor.execute(
+                    """
+                    SELECT c.conname
+                    FROM pg_constraint c
+                    WHERE c.conrelid = %s::regclass AND c.contype = 'u'
+                      AND (
+                        SELECT array_agg(a.attname::text ORDER BY a.attname)
+                        FROM pg_attribute a
+                        WHERE a.attrelid = c.conrelid AND a.attnum = ANY (c.conkey)
+                      ) = ARRAY['measured_at', 'reading_id']
+                    """,
+                    [table],
+                )
+                row = cursor.fetchone()
+                if row is not None:
+                    qn = connection.ops.quote_name
+                    cursor.execute(
+                        f"ALTER TABLE {qn(table)} RENAME CONSTRAINT {qn(row[0])} TO {qn(CONSTRAINT.name)}"
+                    )
+                    return
+
+    old_field = model._meta.get_field("reading_id")
+    new_field = models.UUIDField(default=uuid.uuid4, editable=False)
+    new_field.set_attributes_from_name("reading_id")
+    new_field.model = model
+    schema_editor.alter_field(model, old_field, new_field)
+    schema_editor.add_constraint(model, CONSTRAINT)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("glycemia", "0005_glycemia_profile_sketch"),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                # Pas de retour arrière : une table partitionnée ne peut pas
+                # porter d'unicité sur reading_id seul.
+                migrations.RunPython(adopt_reading_constraint, migrations.RunPython.noop),
+            ],
+            state_operations=[
+                migrations.AlterField(
+                    model_name="glycemiahisto",
+                    name="reading_id",
+                    field=models.UUIDField(default=uuid.uuid4, editable=False),
+                ),
+                migrations.AddConstraint(model_name="glycemiahisto", constraint=CONSTRAINT),
+            ],
+        ),
+    ]
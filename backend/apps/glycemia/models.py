@@ -94,7 +94,11 @@ class GlycemiaHisto(models.Model):
     ]
 
     id = models.BigAutoField(primary_key=True)
-    reading_id = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
+    # Unicité portée par (reading_id, measured_at) : la clé de partition doit
+    # figurer dans toute contrainte unique (migration 0003, services/partitioning.py).
+    # Pour la même raison la PK PostgreSQL est (id, measured_at) ; id reste
+    # unique en pratique (séquence).
+    reading_id = models.UUIDField(default=uuid.uuid4, editable=False)
 
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -137,11 +141,94 @@ class GlycemiaHisto(models.Model):
             models.Index(fields=["user", "source", "measured_at"]),
             models.Index(fields=["user", "device", "measured_at"]),
         ]
+        constraints = [
+            models.UniqueConstraint(fields=["reading_id", "measured_at"], name="glycemia_histo_reading_uniq"),
+        ]
 
     def __str__(self):
         return f"{self.user.email} - {self.value} {self.unit} at {self.measured_at}"
 
 
+# ──────────────────────────────────────────────────────────
+# Agrégats incrémentaux (rollups) de GlycemiaHisto
+# 1 ligne = 1 utilisateur × 1 heure (UTC) ou 1 jour (heure locale)
+# Maintenus à l'ingestion, cf. services/rollups.py
+# ──────────────────────────────────────────────────────────
+
+
+class RollupPeriod(models.TextChoices):
+    HOUR = "hour", "Hour"
+    DAY = "day", "Day"
+
+
+class GlycemiaRollup(models.Model):
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="glycemia_rollups",
+    )
+    period = models.CharField(max_length=4, choices=RollupPeriod.choices)
+    bucket_start = models.DateTimeField()
+
+    count = models.PositiveIntegerField(default=0)
+    sum_values = models.FloatField(default=0)
+    sum_squares = models.FloatField(default=0)
+    min_value = models.FloatField(null=True, blank=True)
+    max_value = models.FloatField(null=True, blank=True)
+
+    low_count = models.PositiveIntegerField(default=0)
+    in_range_count = models.PositiveIntegerField(default=0)
+    high_count = models.PositiveIntegerField(default=0)
+
+    # Histogramme creux : {"<index de classe de 10 mg/dL>": nombre de lectures}
+    histogram = models.JSONField(default=dict, blank=True)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "glycemia_rollup"
+        ordering = ["-bucket_start"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "period", "bucket_start"],
+                name="uniq_glycemia_rollup_bucket",
+            ),
+        ]
+
+    def __str__(self):
+        return f"Rollup {self.period} {self.user_id} @ {self.bucket_start} (n={self.count})"
+
+
+class GlycemiaProfileSketch(models.Model):
+    """
+    Sketches de quantiles d'un jour local, par tranche horaire (AGP).
+    slots = {"<tranche>": {"<valeur mg/dL>": nombre}}, cf. services/agp.py
+    """
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="glycemia_profile_sketches",
+    )
+    day = models.DateField()
+    slots = models.JSONField(default=dict, blank=True)
+    count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "glycemia_profile_sketch"
+        ordering = ["-day"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "day"],
+                name="uniq_glycemia_profile_sketch_day",
+            ),
+        ]
+
+    def __str__(self):
+        return f"AGP sketch {self.user_id} @ {self.day} (n={self.count})"
+
+
 # ──────────────────────────────────────────────────────────
 # Sorties des modèles prédictifs IA
 # 1 ligne = 1 run de prédiction (multi-horizon : 15 / 30 / 60 min)
@@ -0,0 +1,247 @@
+"""
+Ambulatory Glucose Profile (AGP) à partir de sketches de quantiles journaliers.
+
+Chaque jour local d'un utilisateur a une ligne GlycemiaProfileSketch :
+pour chaque tranche horaire de 30 min, un sketch des valeurs mesurées.
+L'AGP d'une période quelconque fusionne au plus 90 lignes, quel que soit
+le volume d'historique.
+
+Sketch : les glycémies sont bornées (validées entre 20 et 600 mg/dL) et
+rapportées à l'unité, donc un histogramme exact à 1 mg/dL tient en
+quelques centaines d'entrées au pire, se fusionne par addition et donne
+des quantiles exacts. Sur ce domaine, c'est plus compact et plus précis
+qu'un t-digest ou un KLL.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from apps.glycemia.models import GlycemiaHisto, GlycemiaProfileSketch
+
+from .rollups import day_start, window_stats
+
+SLOT_MINUTES = 30
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+PERCENTILES = (5, 25, 50, 75, 95)
+
+DEFAULT_DAYS = 14
+# Un AGP sur moins de 14 jours n'est pas cliniquement interprétable.
+MIN_DAYS = 14
+MAX_DAYS = 90
+
+
+class QuantileSketch:
+    """Histogramme exact {valeur mg/dL arrondie: nombre}, fusionnable."""
+
+    __slots__ = ("counts", "count")
+
+    def __init__(self, counts: dict | None = None):
+        self.counts = {int(k): int(v) for k, v in (counts or {}).items() if v}
+        self.count = sum(self.counts.values())
+
+    def add(self, value: float, n: int = 1):
+        key = int(round(value))
+        self.counts[key] = self.counts.get(key, 0) + n
+        self.count += n
+
+    def merge(self, other: "QuantileSketch"):
+        for key, n in other.counts.items():
+            self.counts[key] = self.counts.get(key, 0) + n
+        self.count += other.count
+        return self
+
+    def value_at(self, rank: int) -> int:
+        """Valeur de rang `rank` (0-indexé) dans l'ordre croissant."""
+        cumulative = 0
+        for value in sorted(self.counts):
+            cumulative += self.counts[value]
+            if rank < cumulative:
+                return value
+        return max(self.counts)
+
+    def quantile(self, q: float) -> float | None:
+        """Interpolation linéaire entre rangs (méthode par défaut de numpy)."""
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        lower = int(rank)
+        low = self.value_at(lower)
+        if rank == lower:
+            return float(low)
+        return low + (self.value_at(lower + 1) - low) * (rank - lower)
+
+    def to_json(self) -> dict:
+        return {str(k): v for k, v in sorted(self.counts.items())}
+
+
+def slot_of(measured_at: datetime) -> int:
+    local = timezone.localtime(measured_at)
+    return (local.hour * 60 + local.minute) // SLOT_MINUTES
+
+
+# ──────────────────────────────────────────────────────────
+# Maintenance à l'ingestion
+# ──────────────────────────────────────────────────────────
+
+
+def record_reading(user_id, measured_at: datetime, value: float):
+    """Ajoute une lecture au sketch de son jour local / sa tranche horaire."""
+    with transaction.atomic():
+        profile, _ = GlycemiaProfileSketch.objects.select_for_update().get_or_create(
+            user_id=user_id, day=timezone.localtime(measured_at).date()
+        )
+        key = str(slot_of(measured_at))
+        sketch = QuantileSketch(profile.slots.get(key))
+        sketch.add(value)
+        profile.slots[key] = sketch.to_json()
+        profile.count += 1
+        profile.save()
+
+
+def rebuild_day(user_id, day):
+    """Recalcule le sketch d'un jour depuis GlycemiaHisto (modification/suppression)."""
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    end = timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min))
+    sketches = _sketches_from(
+        GlycemiaHisto.objects.filter(user_id=user_id, measured_at__gte=start, measured_at__lt=end)
+    ).get(day, {})
+
+    with transaction.atomic():
+        if not sketches:
+            GlycemiaProfileSketch.objects.filter(user_id=user_id, day=day).delete()
+            return
+        GlycemiaProfileSketch.objects.update_or_create(
+            user_id=user_id,
+            day=day,
+            defaults={
+                "slots": {str(slot): s.to_json() for slot, s in sketches.items()},
+                "count": sum(s.count for s in sketches.values()),
+            },
+        )
+
+
+def rebuild_days_for(user_id, *measured_ats: datetime):
+    for day in {timezone.localtime(m).date() for m in measured_ats}:
+        rebuild_day(user_id, day)
+
+
+# ──────────────────────────────────────────────────────────
+# Lecture
+# ──────────────────────────────────────────────────────────
+
+
+def build_agp(user, days: int = DEFAULT_DAYS) -> dict:
+    """AGP des `days` derniers jours locaux (aujourd'hui inclus)."""
+    end = timezone.localdate()
+    start = end - timedelta(days=days - 1)
+
+    merged = [QuantileSketch() for _ in range(SLOTS_PER_DAY)]
+    readings = 0
+    days_with_data = 0
+    for slots, count in GlycemiaProfileSketch.objects.filter(
+        user=user, day__gte=start, day__lte=end
+    ).values_list("slots", "count"):
+        days_with_data += 1
+        readings += count
+        for key, counts in slots.items():
+            merged[int(key)].merge(QuantileSketch(counts))
+
+    profile = []
+    for slot, sketch in enumerate(merged):
+        minutes = slot * SLOT_MINUTES
+        entry = {"time": f"{minutes // 60:02d}:{minutes % 60:02d}", "count": sketch.count}
+        for p in PERCENTILES:
+            value = sketch.quantile(p / 100)
+            entry[f"p{p}"] = round(value, 1) if value is not None else None
+        profile.append(entry)
+
+    return {
+        "start": start,
+        "end": end,
+        "days": days,
+        "days_with_data": days_with_data,
+        "readings": readings,
+        "slot_minutes": SLOT_MINUTES,
+        "stats": window_stats(user, timezone.make_aware(datetime.combine(start, time.min))).as_dict(),
+        "profile": profile,
+    }
+
+
+def parse_days(raw, min_days: int = 1) -> int:
+    """
+    Valide ?days= (min_days..MAX_DAYS, défaut DEFAULT_DAYS). Lève ValueError.
+    AGP : min_days=MIN_DAYS ; graphiques : à partir d'un jour.
+    """
+    days = int(raw) if raw not in (None, "") else DEFAULT_DAYS
+    if days < min_days or days > MAX_DAYS:
+        raise ValueError(f"days must be between {min_days} and {MAX_DAYS}")
+    return days
+
+
+# ──────────────────────────────────────────────────────────
+# Backfill / vérification
+# ──────────────────────────────────────────────────────────
+
+
+def _sketches_from(readings) -> dict:
+    by_day: dict = {}
+    for measured_at, value in readings.order_by("measured_at").values_list("measured_at", "value").iterator(chunk_size=5000):
+        day = timezone.localtime(measured_at).date()
+        slot = slot_of(measured_at)
+        by_day.setdefault(day, {}).setdefault(slot, QuantileSketch()).add(value)
+    return by_day
+
+
+def compute_user_sketches(user_id, since: datetime | None = None) -> dict:
+    """{jour local: {tranche: QuantileSketch}} recalculé depuis GlycemiaHisto."""
+    readings = GlycemiaHisto.objects.filter(user_id=user_id)
+    if since is not None:
+        readings = readings.filter(measured_at__gte=day_start(since))
+    return _sketches_from(readings)
+
+
+def _stored(user_id, since):
+    profiles = GlycemiaProfileSketch.objects.filter(user_id=user_id)
+    if since is not None:
+        profiles = profiles.filter(day__gte=timezone.localtime(since).date())
+    return profiles
+
+
+@transaction.atomic
+def replace_user_sketches(user_id, by_day: dict, since: datetime | None = None) -> int:
+    _stored(user_id, since).delete()
+    GlycemiaProfileSketch.objects.bulk_create(
+        [
+            GlycemiaProfileSketch(
+                user_id=user_id,
+                day=day,
+                slots={str(slot): s.to_json() for slot, s in slots.items()},
+                count=sum(s.count for s in slots.values()),
+            )
+            for day, slots in by_day.items()
+        ],
+        batch_size=500,
+    )
+    return len(by_day)
+
+
+def diff_user_sketches(user_id, since: datetime | None = None) -> list[dict]:
+    expected = {
+        day: {str(slot): s.to_json() for slot, s in slots.items()}
+        for day, slots in compute_user_sketches(user_id, since).items()
+    }
+    stored = {p.day: p.slots for p in _stored(user_id, since)}
+
+    problems = []
+    for day in sorted(expected.keys() | stored.keys()):
+        if day not in stored:
+            problems.append({"day": day, "issue": "missing"})
+        elif day not in expected:
+            problems.append({"day": day, "issue": "orphan"})
+        elif expected[day] != stored[day]:
+            problems.append({"day": day, "issue": "mismatch"})
+    return problems
@@ -0,0 +1,130 @@
+"""
+Diffusion WebSocket groupée des lectures de glycémie.
+
+`publish()` ne touche pas au channel layer : le message est ajouté au
+tampon du groupe de l'utilisateur (glycemia_user_<id_auth>) et le thread
+requête continue. Un thread de fond vide le tampon toutes les
+WS_BATCH_WINDOW secondes : une trame `glycemia_batch` par groupe,
+contenant tous les messages accumulés (mise à jour + alerte, rafale de
+lectures d'un capteur), et tous les group_send du lot partent dans une
+seule boucle asyncio.
+
+Les médecins abonnés à plusieurs patients (consumers.py) reçoivent une
+trame par patient et par fenêtre, au lieu d'un message par lecture.
+
+WS_BATCH_WINDOW = 0 : envoi immédiat et synchrone (tests).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+
+from django.conf import settings
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+
+logger = logging.getLogger(__name__)
+
+BATCH_TYPE = "glycemia_batch"
+# Borne la taille d'une trame (backfill massif d'un capteur).
+MAX_MESSAGES_PER_FRAME = 100
+
+
+def group_for(user_id) -> str:
+    return f"glycemia_user_{user_id}"
+
+
+def _frames(batches: dict) -> list[tuple[str, dict]]:
+    frames = []
+    for user_id, messages in batches.items():
+        for start in range(0, len(messages), MAX_MESSAGES_PER_FRAME):
+            frames.append(
+                (
+                    group_for(user_id),
+                    {
+                        "type": BATCH_TYPE,
+                        "user_id": str(user_id),
+                        "messages": messages[start : start + MAX_MESSAGES_PER_FRAME],
+                    },
+                )
+            )
+    return frames
+
+
+def send_batches(batches: dict):
+    """Envoie {user_id: [messages]} : une trame par groupe, en une seule boucle."""
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        logger.warning("Channel layer not configured, skipping WebSocket broadcast")
+        return
+
+    frames = _frames(batches)
+
+    async def send_all():
+        return await asyncio.gather(
+            *(channel_layer.group_send(group, frame) for group, frame in frames),
+            return_exceptions=True,
+        )
+
+    results = async_to_sync(send_all)()
+    for (group, frame), result in zip(frames, results):
+        if isinstance(result, Exception):
+            logger.error(f"Failed to broadcast {BATCH_TYPE} to {group}: {result}")
+        else:
+            logger.debug(f"Broadcast {BATCH_TYPE} to {group}: {len(frame['messages'])} message(s)")
+
+
+class Broadcaster:
+    def __init__(self):
+        self._pending: dict = {}
+        self._cond = threading.Condition()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def window(self) -> float:
+        return getattr(settings, "WS_BATCH_WINDOW", 0.25)
+
+    def publish(self, user_id, *messages: dict):
+        if self.window <= 0:
+            send_batches({user_id: list(messages)})
+            return
+        with self._cond:
+            self._pending.setdefault(user_id, []).extend(messages)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="glyco-ws-broadcast", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def flush(self):
+        """Envoie immédiatement le tampon courant."""
+        with self._cond:
+            batches, self._pending = self._pending, {}
+        if batches:
+            send_batches(batches)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+            time.sleep(self.window)  # fenêtre d'accumulation
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("WebSocket batch broadcast failed")
+
+
+_broadcaster = Broadcaster()
+
+
+def publish(user_id, *messages: dict):
+    """Met en file des messages (glycemia_update, glycemia_alert…) pour le groupe de l'utilisateur."""
+    _broadcaster.publish(user_id, *messages)
+
+
+def flush():
+    _broadcaster.flush()
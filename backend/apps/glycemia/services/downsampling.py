@@ -0,0 +1,183 @@
+"""
+Sous-échantillonnage des lectures pour les graphiques longue durée.
+
+`minmax_buckets` résume une fenêtre en seaux de `bucket_minutes` :
+min / max / moyenne / nombre de lectures par seau, seaux vides omis.
+90 jours en seaux de 60 min font 2160 points au plus, au lieu de ~26 000
+lectures CGM.
+
+- bucket_minutes multiple de 60 : fusion des rollups horaires
+  (GlycemiaRollup), sans relire les mesures ; la première heure est prise
+  en entier (les seaux sont des multiples de l'heure) ;
+- sinon : lecture projetée (measured_at, value) de GlycemiaHisto, en flux.
+
+Les seaux sont alignés sur l'époque UTC (un seau de 1440 min = un jour UTC).
+
+`lttb_series` garde au plus N lectures réelles choisies par
+Largest-Triangle-Three-Buckets : la forme de la courbe (pics, creux) est
+conservée, ce que la moyenne par seau lisse. `chart_series` choisit la
+méthode et, pour min/max, la largeur de seau qui donne au plus N points.
+Calcul en Python pur, en un passage sur les lectures projetées.
+"""
+
+from __future__ import annotations
+
+import math
+from datetime import datetime, timezone as dt_timezone
+
+from django.utils import timezone
+
+from apps.glycemia.models import GlycemiaHisto, GlycemiaRollup, RollupPeriod
+from apps.glycemia.services.rollups import hour_start
+
+MIN_BUCKET_MINUTES = 5
+MAX_BUCKET_MINUTES = 1440
+STREAM_CHUNK_SIZE = 2000
+
+METHOD_LTTB = "lttb"
+METHOD_MINMAX = "minmax"
+METHODS = (METHOD_LTTB, METHOD_MINMAX)
+
+MIN_POINTS = 10
+MAX_POINTS = 2000
+DEFAULT_POINTS = 300
+
+
+def parse_bucket(raw) -> int:
+    """Valide ?bucket= (minutes, MIN..MAX_BUCKET_MINUTES). Lève ValueError."""
+    minutes = int(raw)
+    if minutes < MIN_BUCKET_MINUTES or minutes > MAX_BUCKET_MINUTES:
+        raise ValueError(f"bucket must be between {MIN_BUCKET_MINUTES} and {MAX_BUCKET_MINUTES} minutes")
+    return minutes
+
+
+def bucket_floor(dt: datetime, bucket_minutes: int) -> datetime:
+    seconds = bucket_minutes * 60
+    ts = int(dt.timestamp())
+    return datetime.fromtimestamp(ts - ts % seconds, tz=dt_timezone.utc)
+
+
+def minmax_buckets(user_id, since: datetime, until: datetime | None = None, bucket_minutes: int = 60) -> list[dict]:
+    until = until or timezone.now()
+    buckets: dict = {}
+
+    def add(start, low, high, total, count):
+        bucket = buckets.get(start)
+        if bucket is None:
+            buckets[start] = [low, high, total, count]
+        else:
+            bucket[0] = min(bucket[0], low)
+            bucket[1] = max(bucket[1], high)
+            bucket[2] += total
+            bucket[3] += count
+
+    if bucket_minutes % 60 == 0:
+        rows = GlycemiaRollup.objects.filter(
+            user_id=user_id,
+            period=RollupPeriod.HOUR,
+            bucket_start__gte=hour_start(since),
+            bucket_start__lte=until,
+            count__gt=0,
+        ).values_list("bucket_start", "min_value", "max_value", "sum_values", "count")
+        for start, low, high, total, count in rows:
+            add(bucket_floor(start, bucket_minutes), low, high, total, count)
+    else:
+        rows = (
+            GlycemiaHisto.objects.filter(user_id=user_id, measured_at__gte=since, measured_at__lte=until)
+            .order_by()
+            .values_list("measured_at", "value")
+            .iterator(chunk_size=STREAM_CHUNK_SIZE)
+        )
+        for measured_at, value in rows:
+            add(bucket_floor(measured_at, bucket_minutes), value, value, value, 1)
+
+    return [
+        {
+            "bucketStart": start,
+            "min": round(low, 1),
+            "max": round(high, 1),
+            "mean": round(total / count, 1),
+            "count": count,
+        }
+        for start, (low, high, total, count) in sorted(buckets.items())
+    ]
+
+
+def parse_points(raw) -> int:
+    """Valide ?points= (MIN..MAX_POINTS, défaut DEFAULT_POINTS). Lève ValueError."""
+    points = int(raw) if raw not in (None, "") else DEFAULT_POINTS
+    if points < MIN_POINTS or points > MAX_POINTS:
+        raise ValueError(f"points must be between {MIN_POINTS} and {MAX_POINTS}")
+    return points
+
+
+def bucket_minutes_for(since: datetime, until: datetime, points: int) -> int:
+    """
+    Largeur de seau donnant au plus `points` seaux sur [since, until] :
+    multiple de 5 min, et d'une heure au-delà (lecture des rollups). Non
+    bornée par MAX_BUCKET_MINUTES (limite de ?bucket=) : 90 jours en 10
+    points font des seaux de 10 jours. Les seaux étant alignés sur
+    l'époque, la fenêtre en chevauche un de plus que sa durée n'en
+    contient : d'où `points - 1`.
+    """
+    minutes = max(math.ceil((until - since).total_seconds() / 60 / (points - 1)), MIN_BUCKET_MINUTES)
+    step = 60 if minutes > 60 else MIN_BUCKET_MINUTES
+    return math.ceil(minutes / step) * step
+
+
+def lttb(points: list, threshold: int) -> list:
+    """
+    Largest-Triangle-Three-Buckets sur [(datetime, valeur)] triés par date.
+    Retourne au plus `threshold` points de l'entrée (premier et dernier inclus).
+    """
+    n = len(points)
+    if threshold >= n or threshold < 3:
+        return list(points)
+
+    xs = [p[0].timestamp() for p in points]
+    ys = [p[1] for p in points]
+    every = (n - 2) / (threshold - 2)
+
+    sampled = [points[0]]
+    a = 0
+    for i in range(threshold - 2):
+        # Moyenne du seau suivant : troisième sommet du triangle.
+        next_start = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        span = next_end - next_start
+        avg_x = sum(xs[next_start:next_end]) / span
+        avg_y = sum(ys[next_start:next_end]) / span
+
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        ax, ay = xs[a], ys[a]
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            area = abs((ax - avg_x) * (ys[j] - ay) - (ax - xs[j]) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        sampled.append(points[best])
+        a = best
+
+    sampled.append(points[-1])
+    return sampled
+
+
+def lttb_series(user_id, since: datetime, until: datetime | None = None, points: int = DEFAULT_POINTS) -> list[dict]:
+    until = until or timezone.now()
+    readings = list(
+        GlycemiaHisto.objects.filter(user_id=user_id, measured_at__gte=since, measured_at__lte=until)
+        .order_by("measured_at", "id")
+        .values_list("measured_at", "value")
+        .iterator(chunk_size=STREAM_CHUNK_SIZE)
+    )
+    return [{"t": measured_at, "v": value} for measured_at, value in lttb(readings, points)]
+
+
+def chart_series(user_id, since: datetime, until: datetime, points: int, method: str = METHOD_LTTB) -> dict:
+    if method == METHOD_MINMAX:
+        bucket_minutes = bucket_minutes_for(since, until, points)
+        series = minmax_buckets(user_id, since, until, bucket_minutes)
+        return {"method": method, "bucketMinutes": bucket_minutes, "series": series}
+    return {"method": METHOD_LTTB, "series": lttb_series(user_id, since, until, points)}
+
@@ -4,30 +4,64 @@ HTTP client for the Glycopilot AI microservice (port 8001).
 Call `request_prediction(instance)` after a new GlycemiaHisto is saved.
 It fetches the last N readings for the user, POSTs to /predict, and
 persists the result as a GlycemiaDataIA row.
+
+Readings come from the per-user recent window (services/recent_readings.py)
+kept up to date on ingest; the database is only queried on a cache miss
+the window cannot answer (e.g. predictions anchored far in the past).
 """
 
 import logging
-import urllib.request
-import urllib.error
-import json
-from datetime import timezone
+from datetime import timedelta, timezone
 
+import requests
 from django.conf import settings
 from django.utils import timezone as django_timezone
 
+from utils import http_client
+
 logger = logging.getLogger(__name__)
 
 AI_SERVICE_URL = getattr(settings, "AI_SERVICE_URL", "http://localhost:8001")
 AI_SERVICE_TOKEN = getattr(settings, "AI_SERVICE_TOKEN", "dev_secret")
 READINGS_WINDOW = 24  # number of recent readings to send
+# Lower bound on measured_at: lets PostgreSQL prune glycemia_histo down to
+# the current (and at most previous) monthly partition instead of walking
+# the whole history for users with sparse data.
+READINGS_LOOKBACK = timedelta(days=7)
+
+# Pooled keep-alive session. /predict is safe to replay: the result is
+# upserted on (user, for_time, model_version).
+_client = http_client.get_client(
+    "ai_service",
+    AI_SERVICE_URL,
+    timeout=(2.0, 10.0),
+    max_concurrency=8,
+    retries=1,
+    retry_unsafe=True,
+    headers={"X-Internal-Token": AI_SERVICE_TOKEN},
+)
 
 
 def _fetch_recent_readings(user, anchor_dt):
-    """Return up to READINGS_WINDOW GlycemiaHisto rows before anchor_dt."""
+    """Return up to READINGS_WINDOW readings in the READINGS_LOOKBACK before anchor_dt, newest first."""
+    from apps.glycemia.services import recent_readings
+
+    readings = recent_readings.window(user.pk, anchor_dt, READINGS_WINDOW, READINGS_LOOKBACK)
+    if readings is not None:
+        return readings
+    return _query_recent_readings(user, anchor_dt)
+
+
+def _query_recent_readings(user, anchor_dt):
+    """Database fallback for _fetch_recent_readings."""
     from apps.glycemia.models import GlycemiaHisto
 
     return list(
-        GlycemiaHisto.objects.filter(user=user, measured_at__lte=anchor_dt)
+        GlycemiaHisto.objects.filter(
+            user=user,
+            measured_at__gt=anchor_dt - READINGS_LOOKBACK,
+            measured_at__lte=anchor_dt,
+        )
         .order_by("-measured_at")
         .values("measured_at", "value", "trend", "rate", "context")[:READINGS_WINDOW]
     )
@@ -53,23 +87,13 @@ def _build_payload(user, instance, readings):
 
 def _post_predict(payload: dict) -> dict:
     """POST payload to AI service; returns parsed JSON response."""
-    url = f"{AI_SERVICE_URL}/predict"
-    body = json.dumps(payload).encode("utf-8")
-    req = urllib.request.Request(
-        url,
-        data=body,
-        method="POST",
-        headers={
-            "Content-Type": "application/json",
-            "X-Internal-Token": AI_SERVICE_TOKEN,
-        },
-    )
-    with urllib.request.urlopen(req, timeout=10) as resp:
-        return json.loads(resp.read().decode("utf-8"))
+    response = _client.post("/predict", json=payload)
+    response.raise_for_status()
+    return response.json()
 
 
-def _persist_prediction(user, instance, response: dict):
-    """Create or update GlycemiaDataIA from AI service response."""
+def _persist_prediction(user, instance, response: dict, readings=None):
+    """Create or update GlycemiaDataIA from AI service response (readings = the window sent)."""
     from apps.glycemia.models import GlycemiaDataIA, PredictionStatus
 
     preds = response.get("predictions") or {}
@@ -85,7 +109,8 @@ def _persist_prediction(user, instance, response: dict):
     }
     status = status_map.get(response.get("status", "ok"), PredictionStatus.OK)
 
-    readings = _fetch_recent_readings(user, instance.measured_at)
+    if readings is None:
+        readings = _fetch_recent_readings(user, instance.measured_at)
     input_start = readings[-1]["measured_at"] if readings else instance.measured_at
     input_end = readings[0]["measured_at"] if readings else instance.measured_at
 
@@ -147,14 +172,14 @@ def request_prediction(instance) -> None:
     try:
         payload = _build_payload(user, instance, readings)
         response = _post_predict(payload)
-        _persist_prediction(user, instance, response)
+        _persist_prediction(user, instance, response, readings)
         logger.info(
             "AI prediction saved for user %s @ %s (source=%s)",
             user.id_auth,
             instance.measured_at,
             response.get("source", "?"),
         )
-    except urllib.error.URLError as exc:
+    except requests.exceptions.RequestException as exc:
         logger.warning("AI service unreachable for user %s: %s", user.id_auth, exc)
     except Exception as exc:
         logger.error(
@@ -0,0 +1,333 @@
+"""
+Partitionnement mensuel de `glycemia_histo` (PostgreSQL uniquement).
+
+L'historique n'est jamais purgé : sans partitionnement, chaque index
+grossit indéfiniment et les requêtes récentes (`measured_after`, fenêtre
+de l'IA) paient le coût de toute l'histoire. La table parente est
+partitionnée par RANGE sur `measured_at`, une partition par mois UTC,
+plus une partition DEFAULT qui sert de filet de sécurité si les
+partitions à venir n'ont pas encore été créées. Les partitions à venir
+sont créées au `migrate` (post_migrate) et chaque jour par le scheduler
+(`run_medication_scheduler`), sans attendre un déploiement.
+
+Sur les autres moteurs (SQLite en tests, MySQL en dev) toutes les
+fonctions sont des no-op.
+"""
+
+import logging
+from datetime import datetime, timezone
+
+from django.db import connections, transaction
+from django.utils import timezone as django_timezone
+
+logger = logging.getLogger(__name__)
+
+PARENT_TABLE = "glycemia_histo"
+LEGACY_TABLE = "glycemia_histo_legacy"
+DEFAULT_PARTITION = "glycemia_histo_default"
+PARTITION_KEY = "measured_at"
+
+MONTHS_AHEAD = 3  # partitions créées d'avance
+MAX_MONTHS_BACK = 120  # au-delà, les lectures (souvent erronées) restent dans DEFAULT
+
+
+# ──────────────────────────────────────────────────────────
+# Helpers de calendrier
+# ──────────────────────────────────────────────────────────
+
+
+def month_start(dt: datetime) -> datetime:
+    """Premier instant (UTC) du mois contenant `dt`."""
+    dt = dt.astimezone(timezone.utc)
+    return datetime(dt.year, dt.month, 1, tzinfo=timezone.utc)
+
+
+def add_months(dt: datetime, months: int) -> datetime:
+    """Décale un début de mois de `months` mois (positif ou négatif)."""
+    index = dt.year * 12 + (dt.month - 1) + months
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=timezone.utc)
+
+
+def partition_name(start: datetime) -> str:
+    """Nom de la partition couvrant le mois de `start` (ex: glycemia_histo_y2026m05)."""
+    return f"{PARENT_TABLE}_y{start.year:04d}m{start.month:02d}"
+
+
+def month_range(first: datetime, last: datetime):
+    """Débuts de mois de `first` à `last` inclus."""
+    current = month_start(first)
+    last = month_start(last)
+    while current <= last:
+        yield current
+        current = add_months(current, 1)
+
+
+# ──────────────────────────────────────────────────────────
+# Introspection
+# ──────────────────────────────────────────────────────────
+
+
+def is_supported(using: str = "default") -> bool:
+    return connections[using].vendor == "postgresql"
+
+
+def is_partitioned(cursor) -> bool:
+    cursor.execute(
+        """
+        SELECT 1
+        FROM pg_partitioned_table pt
+        JOIN pg_class c ON c.oid = pt.partrelid
+        WHERE c.relname = %s AND pg_table_is_visible(c.oid)
+        """,
+        [PARENT_TABLE],
+    )
+    return cursor.fetchone() is not None
+
+
+def list_partitions(cursor) -> list[dict]:
+    """Partitions attachées à la table parente, avec bornes et tablespace."""
+    cursor.execute(
+        """
+        SELECT c.relname,
+               pg_get_expr(c.relpartbound, c.oid),
+               COALESCE(ts.spcname, ''),
+               pg_total_relation_size(c.oid)
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        JOIN pg_class p ON p.oid = i.inhparent
+        LEFT JOIN pg_tablespace ts ON ts.oid = c.reltablespace
+        WHERE p.relname = %s
+        ORDER BY c.relname
+        """,
+        [PARENT_TABLE],
+    )
+    return [
+        {"name": name, "bounds": bounds, "tablespace": tablespace, "size_bytes": size}
+        for name, bounds, tablespace, size in cursor.fetchall()
+    ]
+
+
+def _table_exists(cursor, name: str) -> bool:
+    cursor.execute("SELECT to_regclass(%s) IS NOT NULL", [name])
+    return cursor.fetchone()[0]
+
+
+# ──────────────────────────────────────────────────────────
+# Création des partitions
+# ──────────────────────────────────────────────────────────
+
+
+def _create_month_partition(cursor, start: datetime) -> bool:
+    """
+    Crée la partition du mois `start` si elle n'existe pas.
+
+    Si la partition DEFAULT contient déjà des lectures de ce mois (partition
+    manquante au moment de l'insertion), elles sont déplacées dans la
+    nouvelle table avant l'ATTACH, sinon PostgreSQL refuserait la création.
+    """
+    name = partition_name(start)
+    if _table_exists(cursor, name):
+        return False
+
+    end = add_months(start, 1)
+    qn = cursor.db.ops.quote_name
+
+    cursor.execute(
+        f"SELECT EXISTS (SELECT 1 FROM {qn(DEFAULT_PARTITION)} WHERE {qn(PARTITION_KEY)} >= %s AND {qn(PARTITION_KEY)} < %s)",
+        [start, end],
+    )
+    has_orphans = cursor.fetchone()[0]
+
+    if not has_orphans:
+        cursor.execute(
+            f"CREATE TABLE {qn(name)} PARTITION OF {qn(PARENT_TABLE)} FOR VALUES FROM (%s) TO (%s)",
+            [start, end],
+        )
+        return True
+
+    cursor.execute(f"CREATE TABLE {qn(name)} (LIKE {qn(PARENT_TABLE)} INCLUDING DEFAULTS INCLUDING STORAGE)")
+    cursor.execute(
+        f"""
+        WITH moved AS (
+            DELETE FROM {qn(DEFAULT_PARTITION)}
+            WHERE {qn(PARTITION_KEY)} >= %s AND {qn(PARTITION_KEY)} < %s
+            RETURNING *
+        )
+        INSERT INTO {qn(name)} SELECT * FROM moved
+        """,
+        [start, end],
+    )
+    moved = cursor.rowcount
+    cursor.execute(
+        f"ALTER TABLE {qn(PARENT_TABLE)} ATTACH PARTITION {qn(name)} FOR VALUES FROM (%s) TO (%s)",
+        [start, end],
+    )
+    logger.warning("Partition %s créée : %s lectures rapatriées depuis %s", name, moved, DEFAULT_PARTITION)
+    return True
+
+
+def ensure_partitions(months_ahead: int = MONTHS_AHEAD, now: datetime | None = None, using: str = "default") -> list[str]:
+    """
+    Garantit l'existence des partitions du mois courant et des
+    `months_ahead` mois suivants. Idempotent ; retourne les partitions créées.
+    """
+    if not is_supported(using):
+        return []
+
+    current = month_start(now or django_timezone.now())
+    created = []
+    with transaction.atomic(using=using), connections[using].cursor() as cursor:
+        if not is_partitioned(cursor):
+            return []
+        for start in month_range(current, add_months(current, months_ahead)):
+            if _create_month_partition(cursor, start):
+                created.append(partition_name(start))
+
+    if created:
+        logger.info("Partitions glycemia_histo créées : %s", ", ".join(created))
+    return created
+
+
+# ──────────────────────────────────────────────────────────
+# Archivage (stockage froid)
+# ──────────────────────────────────────────────────────────
+
+
+def archive_partitions(before: datetime, tablespace: str, using: str = "default") -> list[str]:
+    """
+    Déplace les partitions entièrement antérieures à `before` (et leurs
+    index) vers `tablespace`, typiquement un volume moins cher. Les
+    partitions restent attachées : les données sont toujours interrogeables.
+    """
+    if not is_supported(using):
+        return []
+
+    cutoff = month_start(before)
+    moved = []
+    with connections[using].cursor() as cursor:
+        if not is_partitioned(cursor):
+            return []
+        qn = cursor.db.ops.quote_name
+        for partition in list_partitions(cursor):
+            name = partition["name"]
+            if name == DEFAULT_PARTITION or partition["tablespace"] == tablespace:
+                continue
+            start = _parse_partition_month(name)
+            if start is None or add_months(start, 1) > cutoff:
+                continue
+
+            with transaction.atomic(using=using):
+                cursor.execute(f"ALTER TABLE {qn(name)} SET TABLESPACE {qn(tablespace)}")
+                cursor.execute("SELECT indexname FROM pg_indexes WHERE tablename = %s", [name])
+                for (index_name,) in cursor.fetchall():
+                    cursor.execute(f"ALTER INDEX {qn(index_name)} SET TABLESPACE {qn(tablespace)}")
+            moved.append(name)
+            logger.info("Partition %s déplacée vers le tablespace %s", name, tablespace)
+    return moved
+
+
+def _parse_partition_month(name: str) -> datetime | None:
+    prefix = f"{PARENT_TABLE}_y"
+    if not name.startswith(prefix):
+        return None
+    try:
+        year, month = name[len(prefix):].split("m")
+        return datetime(int(year), int(month), 1, tzinfo=timezone.utc)
+    except ValueError:
+        return None
+
+
+# ──────────────────────────────────────────────────────────
+# Migration d'une table existante
+# ──────────────────────────────────────────────────────────
+
+
+def convert_to_partitioned(connection, months_ahead: int = MONTHS_AHEAD, now: datetime | None = None):
+    """
+    Transforme la table ordinaire `glycemia_histo` en table partitionnée,
+    en conservant les données, la séquence des ids, les index et les FK.
+
+    PostgreSQL impose que la clé de partition fasse partie des contraintes
+    d'unicité : la PK devient (id, measured_at) et l'unicité de
+    `reading_id` devient (reading_id, measured_at). Les deux restent
+    uniques en pratique (BigAutoField / uuid4).
+
+    Appelé depuis la migration 0003, dans sa transaction.
+    """
+    if connection.vendor != "postgresql":
+        return
+
+    now = now or django_timezone.now()
+    with connection.cursor() as cursor:
+        if is_partitioned(cursor):
+            return
+        qn = connection.ops.quote_name
+
+        # 1. Relever ce qui doit être recréé sur la nouvelle table
+        cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [PARENT_TABLE])
+        sequence = cursor.fetchone()[0]
+
+        cursor.execute(
+            """
+            SELECT conname, contype, pg_get_constraintdef(oid)
+            FROM pg_constraint
+            WHERE conrelid = %s::regclass AND contype IN ('p', 'u', 'f')
+            """,
+            [PARENT_TABLE],
+        )
+        constraints = cursor.fetchall()
+        constraint_names = {name for name, _, _ in constraints}
+
+        cursor.execute(
+            "SELECT indexname, indexdef FROM pg_indexes WHERE tablename = %s",
+            [PARENT_TABLE],
+        )
+        indexes = [(name, definition) for name, definition in cursor.fetchall() if name not in constraint_names]
+
+        # 2. Mettre l'ancienne table de côté
+        cursor.execute(f"LOCK TABLE {qn(PARENT_TABLE)} IN ACCESS EXCLUSIVE MODE")
+        cursor.execute(f"ALTER TABLE {qn(PARENT_TABLE)} RENAME TO {qn(LEGACY_TABLE)}")
+        if sequence:
+            cursor.execute(f"ALTER SEQUENCE {sequence} RENAME TO {qn(LEGACY_TABLE + '_id_seq')}")
+        for name, _ in indexes:
+            cursor.execute(f"ALTER INDEX {qn(name)} RENAME TO {qn(name + '_legacy')}")
+        for name, _, _ in constraints:
+            cursor.execute(f"ALTER TABLE {qn(LEGACY_TABLE)} RENAME CONSTRAINT {qn(name)} TO {qn(name + '_legacy')}")
+
+        # 3. Table parente + partitions couvrant les données existantes
+        cursor.execute(
+            f"""
+            CREATE TABLE {qn(PARENT_TABLE)} (
+                LIKE {qn(LEGACY_TABLE)} INCLUDING DEFAULTS INCLUDING IDENTITY INCLUDING STORAGE
+            ) PARTITION BY RANGE ({qn(PARTITION_KEY)})
+            """
+        )
+        cursor.execute(f"CREATE TABLE {qn(DEFAULT_PARTITION)} PARTITION OF {qn(PARENT_TABLE)} DEFAULT")
+
+        cursor.execute(f"SELECT MIN({qn(PARTITION_KEY)}) FROM {qn(LEGACY_TABLE)}")
+        oldest = cursor.fetchone()[0] or now
+        first = max(month_start(oldest), add_months(month_start(now), -MAX_MONTHS_BACK))
+        last = max(add_months(month_start(now), months_ahead), month_start(first))
+        for start in month_range(first, last):
+            _create_month_partition(cursor, start)
+
+        # 4. Copie des données puis recalage de la séquence
+        cursor.execute(f"INSERT INTO {qn(PARENT_TABLE)} SELECT * FROM {qn(LEGACY_TABLE)}")
+        logger.info("glycemia_histo : %s lectures migrées vers la table partitionnée", cursor.rowcount)
+        cursor.execute(
+            f"SELECT setval(pg_get_serial_sequence(%s, 'id'), COALESCE(MAX(id), 0) + 1, false) FROM {qn(PARENT_TABLE)}",
+            [PARENT_TABLE],
+        )
+        cursor.execute(f"DROP TABLE {qn(LEGACY_TABLE)}")
+
+        # 5. Contraintes et index, construits après le chargement
+        for name, contype, definition in constraints:
+            if contype == "p":
+                definition = f"PRIMARY KEY (id, {qn(PARTITION_KEY)})"
+            elif contype == "u":
+                columns = definition[definition.index("(") + 1 : definition.rindex(")")]
+                definition = f"UNIQUE ({columns}, {qn(PARTITION_KEY)})"
+            cursor.execute(f"ALTER TABLE {qn(PARENT_TABLE)} ADD CONSTRAINT {qn(name)} {definition}")
+        # Définitions relevées avant le renommage : elles visent déjà la nouvelle table.
+        for _, definition in indexes:
+            cursor.execute(definition)
@@ -0,0 +1,183 @@
+"""
+Fenêtre glissante des dernières lectures par utilisateur (entrée du modèle IA).
+
+Le cache (Redis en production, LocMem sinon) garde pour chaque utilisateur
+actif les BUFFER_SIZE lectures les plus récentes sous forme de tuples
+compacts (timestamp, valeur, tendance, pente, contexte), triés du plus
+récent au plus ancien, ainsi qu'un plancher `floor` : toute lecture dont
+measured_at > floor est présente dans le buffer.
+
+- l'ingestion ajoute la lecture (append) ;
+- une modification/suppression invalide le buffer ;
+- `window()` répond depuis le buffer quand il couvre la fenêtre demandée,
+  sinon retourne None et l'appelant interroge la base.
+
+Écritures après commit (`*_on_commit`) : une lecture annulée n'entre
+jamais dans le buffer. Concurrence : chaque écriture incrémente
+atomiquement un compteur par utilisateur (`cache.incr`) et le buffer
+porte la version qu'il reflète. Un append ne réécrit le buffer que s'il
+était exactement à la version précédente ; sinon (autre worker entre
+deux) il n'y touche pas, et `window()` recharge depuis la base tout
+buffer dont la version n'est pas la version courante. Une lecture
+perdue par une écriture concurrente provoque donc un rechargement, pas
+une fenêtre incomplète.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = "glycemia:recent"
+# Marge au-delà des 24 lectures envoyées à l'IA pour absorber les lectures
+# arrivées dans le désordre (backfill capteur).
+BUFFER_SIZE = 48
+TTL = 24 * 60 * 60
+LOOKBACK = timedelta(days=7)
+# Profondeur chargée sur miss : un jour de plus que LOOKBACK, pour que les
+# lectures arrivées en retard (measured_at < instant du chargement) restent
+# couvertes pour un utilisateur peu actif.
+LOAD_HORIZON = LOOKBACK + timedelta(days=1)
+
+
+def _key(user_id) -> str:
+    return f"{CACHE_PREFIX}:{user_id}"
+
+
+def _version_key(user_id) -> str:
+    return f"{CACHE_PREFIX}:version:{user_id}"
+
+
+def _seed_version(user_id):
+    # Un compteur perdu (éviction) repart de l'horloge : jamais une valeur déjà vue.
+    cache.add(_version_key(user_id), time.time_ns(), TTL)
+
+
+def _current_version(user_id) -> int:
+    version = cache.get(_version_key(user_id))
+    if version is None:
+        _seed_version(user_id)
+        version = cache.get(_version_key(user_id))
+    return version
+
+
+def _bump(user_id) -> int:
+    try:
+        return cache.incr(_version_key(user_id))
+    except ValueError:
+        _seed_version(user_id)
+        return cache.incr(_version_key(user_id))
+
+
+def _pack(measured_at: datetime, value, trend, rate, context) -> tuple:
+    return (measured_at.timestamp(), value, trend or "", rate, context or "")
+
+
+def _unpack(item) -> dict:
+    ts, value, trend, rate, context = item
+    return {
+        "measured_at": datetime.fromtimestamp(ts, tz=dt_timezone.utc),
+        "value": value,
+        "trend": trend,
+        "rate": rate,
+        "context": context,
+    }
+
+
+def load(user_id) -> dict:
+    """Charge le buffer depuis GlycemiaHisto et le met en cache."""
+    from apps.glycemia.models import GlycemiaHisto
+
+    # Version relevée avant la requête : une écriture concurrente la dépasse.
+    version = _current_version(user_id)
+    since = timezone.now() - LOAD_HORIZON
+    rows = list(
+        GlycemiaHisto.objects.filter(user_id=user_id, measured_at__gt=since)
+        .order_by("-measured_at")
+        .values_list("measured_at", "value", "trend", "rate", "context")[:BUFFER_SIZE]
+    )
+    items = [_pack(*row) for row in rows]
+    # Buffer plein : les lectures à égalité avec la plus ancienne peuvent
+    # manquer, le plancher est donc cette lecture elle-même.
+    floor = items[-1][0] if len(items) == BUFFER_SIZE else since.timestamp()
+    buffer = {"floor": floor, "items": items, "version": version}
+    cache.set(_key(user_id), buffer, TTL)
+    return buffer
+
+
+def append(user_id, measured_at: datetime, value, trend=None, rate=None, context=None):
+    """
+    Ajoute une lecture (déjà commitée) au buffer s'il est à jour. Sans
+    buffer, ou buffer déjà dépassé, rien à faire : il sera rechargé depuis
+    la base à la prochaine lecture.
+    """
+    try:
+        version = _bump(user_id)
+        buffer = cache.get(_key(user_id))
+        if buffer is None or buffer.get("version") != version - 1:
+            return
+
+        item = _pack(measured_at, value, trend, rate, context)
+        items, floor = buffer["items"], buffer["floor"]
+        # Sous le plancher : hors de la zone couverte, l'invariant reste vrai.
+        if item[0] > floor:
+            items = sorted([*items, item], key=lambda i: i[0], reverse=True)
+            if len(items) > BUFFER_SIZE:
+                floor = max(floor, items[BUFFER_SIZE][0])
+                items = items[:BUFFER_SIZE]
+        cache.set(_key(user_id), {"floor": floor, "items": items, "version": version}, TTL)
+    except Exception as e:
+        logger.warning(f"Failed to append to recent readings buffer for user {user_id}: {e}")
+        invalidate(user_id)
+
+
+def invalidate(user_id):
+    try:
+        _bump(user_id)
+        cache.delete(_key(user_id))
+    except Exception as e:
+        logger.warning(f"Failed to invalidate recent readings buffer for user {user_id}: {e}")
+
+
+def append_on_commit(user_id, measured_at: datetime, value, trend=None, rate=None, context=None):
+    transaction.on_commit(lambda: append(user_id, measured_at, value, trend, rate, context))
+
+
+def invalidate_on_commit(user_id):
+    # Immédiatement (lectures de la transaction en cours) et après commit
+    # (un rechargement concurrent a pu relire l'état d'avant).
+    invalidate(user_id)
+    transaction.on_commit(lambda: invalidate(user_id))
+
+
+def window(user_id, anchor: datetime, size: int, lookback: timedelta = LOOKBACK) -> list[dict] | None:
+    """
+    Jusqu'à `size` lectures dans (anchor - lookback, anchor], de la plus
+    récente à la plus ancienne, ou None si le buffer ne couvre pas la fenêtre.
+    """
+    try:
+        found = cache.get_many([_key(user_id), _version_key(user_id)])
+        buffer = found.get(_key(user_id))
+        if buffer is None or buffer.get("version") != found.get(_version_key(user_id)):
+            buffer = load(user_id)
+    except Exception as e:
+        logger.warning(f"Recent readings buffer unavailable for user {user_id}: {e}")
+        return None
+
+    upper = anchor.timestamp()
+    lower = (anchor - lookback).timestamp()
+    selected = [i for i in buffer["items"] if lower < i[0] <= upper][:size]
+
+    # Complet si la fenêtre entière est au-dessus du plancher, ou si l'on a
+    # déjà `size` lectures au-dessus du plancher (aucune plus récente ne manque).
+    if lower >= buffer["floor"] or len(selected) == size:
+        return [_unpack(i) for i in selected]
+    return None
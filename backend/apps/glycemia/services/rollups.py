@@ -0,0 +1,395 @@
+"""
+Agrégats glycémiques incrémentaux (rollups) par utilisateur.
+
+Chaque lecture GlycemiaHisto met à jour deux lignes GlycemiaRollup :
+l'heure UTC et le jour local qui la contiennent. Chaque ligne porte
+count / somme / somme des carrés / min / max / compteurs bas-cible-haut
+et un histogramme par classes de 10 mg/dL. Ces champs sont additifs : une
+fenêtre quelconque se calcule en fusionnant O(jours) lignes au lieu de
+relire O(lectures) mesures (TIR, moyenne, écart-type, CV, GMI, médiane
+approchée).
+
+Les modifications / suppressions de lectures (rares) reconstruisent les
+seaux concernés depuis GlycemiaHisto. `backfill_glycemia_rollups` et
+`check_glycemia_rollups` couvrent l'historique et la vérification.
+"""
+
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass, field
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.glycemia.models import GlycemiaHisto, GlycemiaRollup, RollupPeriod
+from apps.glycemia.thresholds import HYPER_THRESHOLD, HYPO_THRESHOLD
+
+# Cible consensus internationale (mg/dL)
+TARGET_MIN = HYPO_THRESHOLD
+TARGET_MAX = HYPER_THRESHOLD
+
+HISTOGRAM_BIN_WIDTH = 10
+HISTOGRAM_BINS = 41  # 0–399 mg/dL + une classe ouverte ≥ 400
+
+
+# ──────────────────────────────────────────────────────────
+# Seaux temporels
+# ──────────────────────────────────────────────────────────
+
+
+def hour_start(dt: datetime) -> datetime:
+    dt = dt.astimezone(dt_timezone.utc)
+    return dt.replace(minute=0, second=0, microsecond=0)
+
+
+def day_start(dt: datetime) -> datetime:
+    """Minuit local (TIME_ZONE) du jour contenant `dt`."""
+    local_date = timezone.localtime(dt).date()
+    return timezone.make_aware(datetime.combine(local_date, time.min))
+
+
+def next_day_start(start: datetime) -> datetime:
+    # +26 h couvre les journées de 23 h et 25 h des changements d'heure.
+    return day_start(start + timedelta(hours=26))
+
+
+def bucket_starts(measured_at: datetime) -> dict[str, datetime]:
+    return {
+        RollupPeriod.HOUR: hour_start(measured_at),
+        RollupPeriod.DAY: day_start(measured_at),
+    }
+
+
+def bucket_end(period: str, start: datetime) -> datetime:
+    if period == RollupPeriod.HOUR:
+        return start + timedelta(hours=1)
+    return next_day_start(start)
+
+
+def histogram_bin(value: float) -> int:
+    return min(max(int(value // HISTOGRAM_BIN_WIDTH), 0), HISTOGRAM_BINS - 1)
+
+
+# ──────────────────────────────────────────────────────────
+# Accumulateur fusionnable
+# ──────────────────────────────────────────────────────────
+
+
+@dataclass
+class RollupStats:
+    count: int = 0
+    sum_values: float = 0.0
+    sum_squares: float = 0.0
+    min_value: float | None = None
+    max_value: float | None = None
+    low_count: int = 0
+    in_range_count: int = 0
+    high_count: int = 0
+    histogram: dict = field(default_factory=dict)
+
+    @classmethod
+    def from_values(cls, values) -> "RollupStats":
+        stats = cls()
+        for value in values:
+            stats.add(value)
+        return stats
+
+    def add(self, value: float):
+        self.count += 1
+        self.sum_values += value
+        self.sum_squares += value * value
+        self.min_value = value if self.min_value is None else min(self.min_value, value)
+        self.max_value = value if self.max_value is None else max(self.max_value, value)
+        if value < TARGET_MIN:
+            self.low_count += 1
+        elif value > TARGET_MAX:
+            self.high_count += 1
+        else:
+            self.in_range_count += 1
+        key = str(histogram_bin(value))
+        self.histogram[key] = self.histogram.get(key, 0) + 1
+
+    def merge(self, other):
+        """Fusionne un autre RollupStats ou une ligne GlycemiaRollup."""
+        if not other.count:
+            return self
+        self.count += other.count
+        self.sum_values += other.sum_values
+        self.sum_squares += other.sum_squares
+        self.min_value = other.min_value if self.min_value is None else min(self.min_value, other.min_value)
+        self.max_value = other.max_value if self.max_value is None else max(self.max_value, other.max_value)
+        self.low_count += other.low_count
+        self.in_range_count += other.in_range_count
+        self.high_count += other.high_count
+        for key, n in other.histogram.items():
+            self.histogram[key] = self.histogram.get(key, 0) + n
+        return self
+
+    def apply_to(self, rollup: GlycemiaRollup):
+        for name in (
+            "count",
+            "sum_values",
+            "sum_squares",
+            "min_value",
+            "max_value",
+            "low_count",
+            "in_range_count",
+            "high_count",
+            "histogram",
+        ):
+            setattr(rollup, name, getattr(self, name))
+
+    def matches(self, rollup: GlycemiaRollup) -> bool:
+        """Comparaison tolérante aux arrondis flottants (vérificateur de cohérence)."""
+        return (
+            self.count == rollup.count
+            and math.isclose(self.sum_values, rollup.sum_values, rel_tol=1e-9, abs_tol=1e-6)
+            and math.isclose(self.sum_squares, rollup.sum_squares, rel_tol=1e-9, abs_tol=1e-6)
+            and self.min_value == rollup.min_value
+            and self.max_value == rollup.max_value
+            and self.low_count == rollup.low_count
+            and self.in_range_count == rollup.in_range_count
+            and self.high_count == rollup.high_count
+            and {k: v for k, v in self.histogram.items() if v} == {k: v for k, v in rollup.histogram.items() if v}
+        )
+
+    # ── Métriques dérivées ──
+
+    @property
+    def mean(self) -> float | None:
+        return self.sum_values / self.count if self.count else None
+
+    @property
+    def std(self) -> float | None:
+        if not self.count:
+            return None
+        variance = self.sum_squares / self.count - self.mean**2
+        return math.sqrt(max(variance, 0.0))
+
+    @property
+    def cv(self) -> float | None:
+        """Coefficient de variation (%)."""
+        return self.std / self.mean * 100 if self.count and self.mean else None
+
+    @property
+    def gmi(self) -> float | None:
+        """Glucose Management Indicator (%), formule de Bergenstal 2018 en mg/dL."""
+        return 3.31 + 0.02392 * self.mean if self.count else None
+
+    def percentage(self, n: int) -> float | None:
+        return n / self.count * 100 if self.count else None
+
+    @property
+    def tir(self) -> float | None:
+        return self.percentage(self.in_range_count)
+
+    def quantile(self, q: float) -> float | None:
+        """Quantile approché par interpolation dans l'histogramme (± 5 mg/dL)."""
+        if not self.count:
+            return None
+        target = q * self.count
+        cumulative = 0
+        for index in sorted(int(k) for k in self.histogram):
+            n = self.histogram[str(index)]
+            if cumulative + n >= target:
+                low = index * HISTOGRAM_BIN_WIDTH
+                high = low + HISTOGRAM_BIN_WIDTH if index < HISTOGRAM_BINS - 1 else self.max_value
+                value = low + (high - low) * ((target - cumulative) / n)
+                return min(max(value, self.min_value), self.max_value)
+            cumulative += n
+        return self.max_value
+
+    def as_dict(self) -> dict:
+        if not self.count:
+            return {}
+        return {
+            "min": self.min_value,
+            "max": self.max_value,
+            "avg": round(self.mean, 2),
+            "median": round(self.quantile(0.5), 2),
+            "count": self.count,
+            "std": round(self.std, 2),
+            "cv": round(self.cv, 2) if self.cv is not None else None,
+            "gmi": round(self.gmi, 2),
+            "tir": round(self.tir, 2),
+            "tbr": round(self.percentage(self.low_count), 2),
+            "tar": round(self.percentage(self.high_count), 2),
+        }
+
+
+# ──────────────────────────────────────────────────────────
+# Maintenance à l'ingestion
+# ──────────────────────────────────────────────────────────
+
+
+def record_reading(user_id, measured_at: datetime, value: float):
+    """Ajoute une lecture aux seaux horaire et journalier (verrou ligne)."""
+    for period, start in bucket_starts(measured_at).items():
+        with transaction.atomic():
+            rollup, _ = GlycemiaRollup.objects.select_for_update().get_or_create(
+                user_id=user_id, period=period, bucket_start=start
+            )
+            stats = RollupStats().merge(rollup)
+            stats.add(value)
+            stats.apply_to(rollup)
+            rollup.save()
+
+
+def rebuild_bucket(user_id, period: str, start: datetime):
+    """Recalcule un seau depuis GlycemiaHisto (après modification/suppression)."""
+    values = GlycemiaHisto.objects.filter(
+        user_id=user_id, measured_at__gte=start, measured_at__lt=bucket_end(period, start)
+    ).values_list("value", flat=True)
+    stats = RollupStats.from_values(values)
+
+    with transaction.atomic():
+        if not stats.count:
+            GlycemiaRollup.objects.filter(user_id=user_id, period=period, bucket_start=start).delete()
+            return
+        rollup, _ = GlycemiaRollup.objects.select_for_update().get_or_create(
+            user_id=user_id, period=period, bucket_start=start
+        )
+        stats.apply_to(rollup)
+        rollup.save()
+
+
+def rebuild_buckets_for(user_id, *measured_ats: datetime):
+    seen = set()
+    for measured_at in measured_ats:
+        for period, start in bucket_starts(measured_at).items():
+            if (period, start) not in seen:
+                seen.add((period, start))
+                rebuild_bucket(user_id, period, start)
+
+
+# ──────────────────────────────────────────────────────────
+# Lecture
+# ──────────────────────────────────────────────────────────
+
+
+def window_stats(user, since: datetime, until: datetime | None = None) -> RollupStats:
+    """
+    Statistiques exactes de [since, until] :
+    - lignes journalières pour les jours locaux entièrement couverts,
+      horaires pour les heures pleines des bords ;
+    - lectures brutes pour les heures partielles aux deux extrémités
+      (au plus deux heures de mesures) ;
+    - lectures brutes aussi pour la partie de la fenêtre antérieure au
+      premier rollup (historique non encore backfillé), même si le reste
+      de la fenêtre est couvert.
+    """
+    until = until or timezone.now()
+    stats = RollupStats()
+
+    first_rollup = (
+        GlycemiaRollup.objects.filter(user=user, period=RollupPeriod.HOUR)
+        .order_by("bucket_start")
+        .values_list("bucket_start", flat=True)
+        .first()
+    )
+    covered_from = until if first_rollup is None else min(max(first_rollup, since), until)
+
+    raw = Q(measured_at__gte=since, measured_at__lt=covered_from)
+    first_hour = hour_start(covered_from)
+    if first_hour < covered_from:
+        first_hour += timedelta(hours=1)
+    last_hour = hour_start(until)
+
+    if first_hour >= last_hour:
+        # Moins d'une heure pleine : tout en lectures brutes.
+        raw |= Q(measured_at__gte=covered_from, measured_at__lte=until)
+    else:
+        raw |= Q(measured_at__gte=covered_from, measured_at__lt=first_hour)
+        raw |= Q(measured_at__gte=last_hour, measured_at__lte=until)
+
+        first_full_day = day_start(first_hour)
+        if first_full_day < first_hour:
+            first_full_day = next_day_start(first_full_day)
+        last_day_end = day_start(last_hour)
+        if first_full_day < last_day_end:
+            buckets = (
+                Q(period=RollupPeriod.DAY, bucket_start__gte=first_full_day, bucket_start__lt=last_day_end)
+                | Q(period=RollupPeriod.HOUR, bucket_start__gte=first_hour, bucket_start__lt=first_full_day)
+                | Q(period=RollupPeriod.HOUR, bucket_start__gte=last_day_end, bucket_start__lt=last_hour)
+            )
+        else:
+            buckets = Q(period=RollupPeriod.HOUR, bucket_start__gte=first_hour, bucket_start__lt=last_hour)
+
+        for rollup in GlycemiaRollup.objects.filter(buckets, user=user).only(
+            "count",
+            "sum_values",
+            "sum_squares",
+            "min_value",
+            "max_value",
+            "low_count",
+            "in_range_count",
+            "high_count",
+            "histogram",
+        ):
+            stats.merge(rollup)
+
+    for value in GlycemiaHisto.objects.filter(raw, user=user).values_list("value", flat=True):
+        stats.add(value)
+    return stats
+
+
+# ──────────────────────────────────────────────────────────
+# Backfill / vérification
+# ──────────────────────────────────────────────────────────
+
+
+def compute_user_buckets(user_id, since: datetime | None = None) -> dict[tuple[str, datetime], RollupStats]:
+    """Recalcule en mémoire tous les seaux d'un utilisateur (flux trié, sans modèles)."""
+    readings = GlycemiaHisto.objects.filter(user_id=user_id)
+    if since is not None:
+        readings = readings.filter(measured_at__gte=day_start(since))
+
+    buckets: dict[tuple[str, datetime], RollupStats] = {}
+    for measured_at, value in readings.order_by("measured_at").values_list("measured_at", "value").iterator(chunk_size=5000):
+        for period, start in bucket_starts(measured_at).items():
+            buckets.setdefault((period, start), RollupStats()).add(value)
+    return buckets
+
+
+def stored_user_buckets(user_id, since: datetime | None = None) -> dict[tuple[str, datetime], GlycemiaRollup]:
+    rollups = GlycemiaRollup.objects.filter(user_id=user_id)
+    if since is not None:
+        rollups = rollups.filter(bucket_start__gte=day_start(since))
+    return {(r.period, r.bucket_start): r for r in rollups}
+
+
+@transaction.atomic
+def replace_user_buckets(user_id, buckets: dict[tuple[str, datetime], RollupStats], since: datetime | None = None) -> int:
+    """Remplace les rollups d'un utilisateur (depuis `since`) par `buckets`."""
+    existing = GlycemiaRollup.objects.filter(user_id=user_id)
+    if since is not None:
+        existing = existing.filter(bucket_start__gte=day_start(since))
+    existing.delete()
+
+    rows = []
+    for (period, start), stats in buckets.items():
+        rollup = GlycemiaRollup(user_id=user_id, period=period, bucket_start=start)
+        stats.apply_to(rollup)
+        rows.append(rollup)
+    GlycemiaRollup.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def diff_user_buckets(user_id, since: datetime | None = None) -> list[dict]:
+    """Seaux manquants, en trop ou divergents par rapport aux lectures brutes."""
+    expected = compute_user_buckets(user_id, since)
+    stored = stored_user_buckets(user_id, since)
+
+    problems = []
+    for key in expected.keys() | stored.keys():
+        period, start = key
+        if key not in stored:
+            problems.append({"period": period, "bucket_start": start, "issue": "missing"})
+        elif key not in expected:
+            problems.append({"period": period, "bucket_start": start, "issue": "orphan"})
+        elif not expected[key].matches(stored[key]):
+            problems.append({"period": period, "bucket_start": start, "issue": "mismatch"})
+    return sorted(problems, key=lambda p: (p["bucket_start"], p["period"]))
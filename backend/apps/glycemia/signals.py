@@ -1,28 +1,93 @@
 """
 Django signals for broadcasting glycemia updates via WebSocket.
 
-When a GlycemiaHisto record is created, this signal broadcasts the data
-to the user's WebSocket channel for real-time updates AND triggers
+When a GlycemiaHisto record is created, this signal queues the data for
+the user's WebSocket group (services/broadcaster.py batches and sends it
+from a background thread) AND triggers
 alert rules to create AlertEvent entries in the database.
-It also fires an async AI prediction request (fire-and-forget thread).
+It also fires an async AI prediction request after commit (fire-and-forget,
+shared background pool).
+
+Hourly/daily rollups (services/rollups.py), daily AGP sketches
+(services/agp.py) and the recent readings window used as AI input
+(services/recent_readings.py) are kept in sync on create, update and delete.
+
+New GlycemiaDataIA rows are evaluated against the predictive alert rules.
+
+Every write bumps the user's "glucose" / "predictions" data version
+(utils/data_versions.py) after commit, so polled GETs answer 304 until then.
 """
 
 import logging
-import threading
 
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 
-from asgiref.sync import async_to_sync
-from channels.layers import get_channel_layer
+from utils import background, data_versions
 
-from .models import GlycemiaHisto
+from .models import Glycemia, GlycemiaDataIA, GlycemiaHisto, PredictionStatus
+from .services import broadcaster
+from .thresholds import HYPER_THRESHOLD, HYPO_THRESHOLD
 
 logger = logging.getLogger(__name__)
 
-# Thresholds for glycemia alerts (mg/dL)
-HYPO_THRESHOLD = 70
-HYPER_THRESHOLD = 180
+
+@receiver(pre_save, sender=GlycemiaHisto)
+def remember_previous_measured_at(sender, instance, **kwargs):
+    """Mémorise l'ancien measured_at pour reconstruire le bon seau en cas de modification."""
+    if instance.pk and not instance._state.adding:
+        instance._previous_measured_at = (
+            GlycemiaHisto.objects.filter(pk=instance.pk).values_list("measured_at", flat=True).first()
+        )
+
+
+def _sync(label, user_id, func, *args):
+    """
+    Une mise à jour dérivée par appel : l'échec de l'une (rollups) ne fait
+    pas sauter les autres (sketch AGP, fenêtre récente).
+    """
+    try:
+        func(*args)
+    except Exception as e:
+        logger.error(f"Failed to update {label} for user {user_id}: {e}")
+
+
+@receiver(post_save, sender=GlycemiaHisto)
+def update_glycemia_rollups(sender, instance, created, **kwargs):
+    """Met à jour les agrégats horaires/journaliers, le sketch AGP et la fenêtre récente."""
+    from .services import agp, recent_readings, rollups
+
+    user_id = instance.user_id
+    if created:
+        _sync(
+            "recent readings", user_id, recent_readings.append_on_commit,
+            user_id, instance.measured_at, instance.value, instance.trend, instance.rate, instance.context,
+        )
+        _sync("glycemia rollups", user_id, rollups.record_reading, user_id, instance.measured_at, instance.value)
+        _sync("AGP sketch", user_id, agp.record_reading, user_id, instance.measured_at, instance.value)
+    else:
+        previous = getattr(instance, "_previous_measured_at", None) or instance.measured_at
+        _sync("recent readings", user_id, recent_readings.invalidate_on_commit, user_id)
+        _sync("glycemia rollups", user_id, rollups.rebuild_buckets_for, user_id, previous, instance.measured_at)
+        _sync("AGP sketch", user_id, agp.rebuild_days_for, user_id, previous, instance.measured_at)
+
+
+@receiver(post_delete, sender=GlycemiaHisto)
+def remove_from_glycemia_rollups(sender, instance, origin=None, **kwargs):
+    """
+    Reconstruit les seaux de la lecture supprimée. Ignoré quand la
+    suppression vient de celle du compte : ses rollups partent en cascade.
+    """
+    if origin is not None and not isinstance(origin, GlycemiaHisto) and getattr(origin, "model", None) is not GlycemiaHisto:
+        return
+
+    from .services import agp, recent_readings, rollups
+
+    user_id = instance.user_id
+    _sync("recent readings", user_id, recent_readings.invalidate_on_commit, user_id)
+    _sync("glycemia rollups", user_id, rollups.rebuild_buckets_for, user_id, instance.measured_at)
+    _sync("AGP sketch", user_id, agp.rebuild_days_for, user_id, instance.measured_at)
 
 
 @receiver(post_save, sender=GlycemiaHisto)
@@ -47,6 +112,8 @@ def broadcast_glycemia_update(sender, instance, created, **kwargs):
         events = trigger_for_value(
             user=instance.user,
             glycemia_value=int(instance.value),
+            rate=instance.rate,
+            measured_at=instance.measured_at,
         )
         if events:
             logger.info(
@@ -59,25 +126,13 @@ def broadcast_glycemia_update(sender, instance, created, **kwargs):
     # ── 1b. Notifier les proches (non-bloquant) ───────────────────
     if events:
         try:
-            from apps.alerts.services.notify_proches import notify_proches_of_alert
+            from apps.alerts.services.notify_proches import schedule_proche_notifications
 
-            threading.Thread(
-                target=notify_proches_of_alert,
-                args=(instance.user, events),
-                daemon=True,
-            ).start()
+            schedule_proche_notifications(instance.user, events)
         except Exception as e:
-            logger.error(f"Failed to start proche alert notification thread: {e}")
-
-    # ── 2. WebSocket broadcast ───────────────────────────────────
-    channel_layer = get_channel_layer()
-    if channel_layer is None:
-        logger.warning("Channel layer not configured, skipping WebSocket broadcast")
-        return
-
-    group_name = f"glycemia_user_{instance.user.id_auth}"
+            logger.error(f"Failed to schedule proche alert notification: {e}")
 
-    # Prepare the data payload
+    # ── 2. WebSocket broadcast (regroupé, thread de fond) ───────
     data = {
         "reading_id": str(instance.reading_id),
         "value": instance.value,
@@ -92,22 +147,6 @@ def broadcast_glycemia_update(sender, instance, created, **kwargs):
         "context": instance.context,
     }
 
-    # Send glycemia update
-    try:
-        async_to_sync(channel_layer.group_send)(
-            group_name,
-            {
-                "type": "glycemia_update",
-                "data": data,
-            },
-        )
-        logger.info(
-            f"Broadcast glycemia_update to {group_name}: {instance.value} {instance.unit}"
-        )
-    except Exception as e:
-        logger.error(f"Failed to broadcast glycemia_update: {e}")
-
-    # Check for alerts
     if instance.value < HYPO_THRESHOLD:
         alert_type = "hypoglycemia"
     elif instance.value > HYPER_THRESHOLD:
@@ -115,30 +154,53 @@ def broadcast_glycemia_update(sender, instance, created, **kwargs):
     else:
         alert_type = None
 
+    messages = [{"type": "glycemia_update", "data": data}]
     if alert_type:
-        try:
-            async_to_sync(channel_layer.group_send)(
-                group_name,
-                {
-                    "type": "glycemia_alert",
-                    "alert_type": alert_type,
-                    "data": data,
-                },
-            )
-            logger.warning(
-                f"Broadcast glycemia_alert ({alert_type}) to {group_name}: {instance.value} {instance.unit}"
-            )
-        except Exception as e:
-            logger.error(f"Failed to broadcast glycemia_alert: {e}")
+        messages.append({"type": "glycemia_alert", "alert_type": alert_type, "data": data})
+        logger.warning(
+            f"Queued glycemia_alert ({alert_type}) for user {instance.user_id}: {instance.value} {instance.unit}"
+        )
+    try:
+        broadcaster.publish(instance.user_id, *messages)
+    except Exception as e:
+        logger.error(f"Failed to broadcast glycemia update: {e}")
 
     # ── 3. AI prediction (non-blocking) ─────────────────────────
+    # After commit, once the reading is in the recent window (appended by
+    # update_glycemia_rollups, whose on_commit callback is registered first).
     try:
         from apps.glycemia.services.ia_client import request_prediction
 
-        threading.Thread(
-            target=request_prediction,
-            args=(instance,),
-            daemon=True,
-        ).start()
+        transaction.on_commit(lambda: background.submit(request_prediction, instance))
     except Exception as e:
-        logger.error(f"Failed to start AI prediction thread: {e}")
+        logger.error(f"Failed to schedule AI prediction: {e}")
+
+
+@receiver(post_save, sender=GlycemiaDataIA)
+def trigger_predictive_alerts(sender, instance, created, **kwargs):
+    """Évalue les règles prédictives (risque hypo/hyper) sur une nouvelle prédiction."""
+    if not created or instance.status not in (PredictionStatus.OK, PredictionStatus.LOW_CONFIDENCE):
+        return
+
+    try:
+        from apps.alerts.services.trigger import trigger_for_prediction
+
+        events = trigger_for_prediction(user=instance.user, prediction=instance)
+        if events:
+            logger.info(f"Created {len(events)} predictive alert event(s) for user {instance.user_id}")
+    except Exception as e:
+        logger.error(f"Failed to trigger predictive alert rules: {e}")
+
+
+@receiver(post_save, sender=Glycemia)
+@receiver(post_delete, sender=Glycemia)
+@receiver(post_save, sender=GlycemiaHisto)
+@receiver(post_delete, sender=GlycemiaHisto)
+def bump_glucose_version(sender, instance, **kwargs):
+    data_versions.bump_on_commit(instance.user_id, data_versions.GLUCOSE)
+
+
+@receiver(post_save, sender=GlycemiaDataIA)
+@receiver(post_delete, sender=GlycemiaDataIA)
+def bump_predictions_version(sender, instance, **kwargs):
+    data_versions.bump_on_commit(instance.user_id, data_versions.PREDICTIONS)
@@ -1,19 +1,23 @@
 import asyncio
 import json
+from io import StringIO
 from types import SimpleNamespace
 from unittest.mock import AsyncMock, MagicMock, patch
 
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.utils.timezone import now, timedelta
 
 import pytest
 from rest_framework.test import APIClient
 
 from apps.devices.models import Device
-from apps.glycemia.models import Glycemia, GlycemiaDataIA, GlycemiaHisto
+from apps.glycemia.models import Glycemia, GlycemiaDataIA, GlycemiaHisto, GlycemiaRollup, RollupPeriod
 from apps.glycemia.consumers import GlycemiaConsumer
 from apps.glycemia.middleware import JWTAuthMiddleware
-from apps.glycemia.services import ia_client
+from apps.glycemia.services import agp, ia_client, partitioning, recent_readings, rollups
 from apps.glycemia.signals import HYPER_THRESHOLD, HYPO_THRESHOLD
 
 User = get_user_model()
@@ -88,6 +92,19 @@ class TestGlycemiaModels:
         h2 = GlycemiaHisto.objects.create(user=user, measured_at=now(), value=110)
         assert h1.reading_id != h2.reading_id
 
+    def test_glycemia_histo_reading_unique_with_measured_at(self, user):
+        from django.core.exceptions import ValidationError
+        from django.db import IntegrityError, transaction
+
+        t = now()
+        h1 = GlycemiaHisto.objects.create(user=user, measured_at=t, value=100)
+        # Même état que le schéma (0006) : unicité (reading_id, measured_at).
+        dup = GlycemiaHisto(user=user, reading_id=h1.reading_id, measured_at=t, value=100)
+        with pytest.raises(ValidationError):
+            dup.validate_constraints()
+        with pytest.raises(IntegrityError), transaction.atomic():
+            dup.save()
+
     def test_glycemia_ordering(self, user):
         old = Glycemia.objects.create(
             user=user,
@@ -413,70 +430,76 @@ class TestGlycemiaAPI:
 # ═══════════════════════════════════════════════════════════════════
 
 
+@pytest.fixture
+def channel_layer():
+    layer = SimpleNamespace(group_send=AsyncMock())
+    with patch("apps.glycemia.services.broadcaster.get_channel_layer", return_value=layer):
+        yield layer
+
+
 @pytest.mark.django_db
 class TestGlycemiaSignals:
-    @patch("apps.glycemia.signals.get_channel_layer")
-    def test_broadcast_on_create(self, mock_layer, user):
-        mock_send = mock_layer.return_value.group_send
+    def test_broadcast_on_create(self, channel_layer, user):
+        mock_send = channel_layer.group_send
         GlycemiaHisto.objects.create(
             user=user,
             measured_at=now(),
             value=120,
         )
-        mock_send.assert_called_once()
+        mock_send.assert_awaited_once()
         call_args = mock_send.call_args[0]
         assert f"glycemia_user_{user.id_auth}" == call_args[0]
-        assert call_args[1]["type"] == "glycemia_update"
+        assert call_args[1]["type"] == "glycemia_batch"
+        assert call_args[1]["user_id"] == str(user.id_auth)
+        assert [m["type"] for m in call_args[1]["messages"]] == ["glycemia_update"]
 
-    @patch("apps.glycemia.signals.get_channel_layer")
-    def test_no_broadcast_on_update(self, mock_layer, user):
+    def test_no_broadcast_on_update(self, channel_layer, user):
         h = GlycemiaHisto.objects.create(
             user=user,
             measured_at=now(),
             value=120,
         )
-        mock_layer.return_value.group_send.reset_mock()
+        channel_layer.group_send.reset_mock()
         h.value = 130
         h.save()
-        mock_layer.return_value.group_send.assert_not_called()
+        channel_layer.group_send.assert_not_called()
 
-    @patch("apps.glycemia.signals.get_channel_layer")
-    def test_hypo_alert_sent(self, mock_layer, user):
-        mock_send = mock_layer.return_value.group_send
+    def test_hypo_alert_sent(self, channel_layer, user):
+        mock_send = channel_layer.group_send
         GlycemiaHisto.objects.create(
             user=user,
             measured_at=now(),
             value=HYPO_THRESHOLD - 1,
         )
-        assert mock_send.call_count == 2
-        alert_call = mock_send.call_args_list[1][0][1]
+        assert mock_send.call_count == 1  # mise à jour + alerte dans une seule trame
+        update, alert_call = mock_send.call_args[0][1]["messages"]
+        assert update["type"] == "glycemia_update"
         assert alert_call["type"] == "glycemia_alert"
         assert alert_call["alert_type"] == "hypoglycemia"
 
-    @patch("apps.glycemia.signals.get_channel_layer")
-    def test_hyper_alert_sent(self, mock_layer, user):
-        mock_send = mock_layer.return_value.group_send
+    def test_hyper_alert_sent(self, channel_layer, user):
+        mock_send = channel_layer.group_send
         GlycemiaHisto.objects.create(
             user=user,
             measured_at=now(),
             value=HYPER_THRESHOLD + 1,
         )
-        assert mock_send.call_count == 2
-        alert_call = mock_send.call_args_list[1][0][1]
+        assert mock_send.call_count == 1
+        alert_call = mock_send.call_args[0][1]["messages"][1]
         assert alert_call["type"] == "glycemia_alert"
         assert alert_call["alert_type"] == "hyperglycemia"
 
-    @patch("apps.glycemia.signals.get_channel_layer")
-    def test_no_alert_for_normal_value(self, mock_layer, user):
-        mock_send = mock_layer.return_value.group_send
+    def test_no_alert_for_normal_value(self, channel_layer, user):
+        mock_send = channel_layer.group_send
         GlycemiaHisto.objects.create(
             user=user,
             measured_at=now(),
             value=100,
         )
-        assert mock_send.call_count == 1  # only glycemia_update, no alert
+        assert mock_send.call_count == 1
+        assert len(mock_send.call_args[0][1]["messages"]) == 1  # only glycemia_update, no alert
 
-    @patch("apps.glycemia.signals.get_channel_layer")
+    @patch("apps.glycemia.services.broadcaster.get_channel_layer")
     def test_no_crash_when_channel_layer_none(self, mock_layer, user):
         mock_layer.return_value = None
         GlycemiaHisto.objects.create(
@@ -486,6 +509,33 @@ class TestGlycemiaSignals:
         )
         # Should not raise
 
+    def test_readings_are_batched_per_group_over_the_window(self, channel_layer, user, settings):
+        from apps.glycemia.services import broadcaster
+
+        other = User.objects.create_user(email="ws_batch_other@example.com", password="pass1234")
+        settings.WS_BATCH_WINDOW = 60  # le thread de fond n'enverra pas avant flush()
+        for i, value in enumerate((120, 125, 60)):
+            GlycemiaHisto.objects.create(user=user, measured_at=now() - timedelta(minutes=i), value=value)
+        GlycemiaHisto.objects.create(user=other, measured_at=now(), value=110)
+        channel_layer.group_send.assert_not_called()  # rien dans le thread requête
+
+        broadcaster.flush()
+
+        frames = {c[0][0]: c[0][1] for c in channel_layer.group_send.call_args_list}
+        assert len(frames) == 2
+        mine = frames[f"glycemia_user_{user.id_auth}"]["messages"]
+        assert [m["type"] for m in mine] == ["glycemia_update", "glycemia_update", "glycemia_update", "glycemia_alert"]
+        assert len(frames[f"glycemia_user_{other.id_auth}"]["messages"]) == 1
+
+    def test_large_batches_are_split_into_bounded_frames(self, channel_layer):
+        from apps.glycemia.services import broadcaster
+
+        messages = [{"type": "glycemia_update", "data": {"value": i}} for i in range(broadcaster.MAX_MESSAGES_PER_FRAME + 5)]
+        broadcaster.send_batches({"u1": messages})
+
+        sizes = [len(c[0][1]["messages"]) for c in channel_layer.group_send.call_args_list]
+        assert sizes == [broadcaster.MAX_MESSAGES_PER_FRAME, 5]
+
 
 # ═══════════════════════════════════════════════════════════════════
 # 4. SERIALIZERS
@@ -548,10 +598,11 @@ def test_jwt_auth_middleware_closes_connection_without_valid_user():
         async def send(message):
             sent.append(message)
 
-        with patch("apps.glycemia.middleware.get_user_from_token", new=AsyncMock(return_value=None)):
+        with patch("apps.glycemia.middleware.get_user", new=AsyncMock()) as get_user:
             await middleware({"query_string": b"token=bad"}, AsyncMock(), send)
 
         assert sent == [{"type": "websocket.close", "code": 4001}]
+        get_user.assert_not_called()
         app.assert_not_called()
 
     asyncio.run(run())
@@ -559,7 +610,7 @@ def test_jwt_auth_middleware_closes_connection_without_valid_user():
 
 def test_jwt_auth_middleware_sets_user_and_calls_inner_app():
     async def run():
-        user_obj = SimpleNamespace(id_auth="user-1")
+        user_obj = SimpleNamespace(id_auth="user-1", is_active=True)
         scopes = []
 
         async def app(scope, receive, send):
@@ -567,16 +618,82 @@ def test_jwt_auth_middleware_sets_user_and_calls_inner_app():
 
         middleware = JWTAuthMiddleware(app)
 
-        with patch(
-            "apps.glycemia.middleware.get_user_from_token",
+        with patch("apps.glycemia.middleware.decode_user_id", return_value="user-1") as decode, patch(
+            "apps.glycemia.middleware.get_user",
             new=AsyncMock(return_value=user_obj),
         ) as get_user:
             await middleware({"query_string": b"token=good"}, AsyncMock(), AsyncMock())
 
-        get_user.assert_awaited_once_with("good")
+        decode.assert_called_once_with("good")
+        get_user.assert_awaited_once_with("user-1")
         assert scopes[0]["user"] is user_obj
 
     asyncio.run(run())
+
+
+def test_jwt_auth_middleware_rate_limits_reconnects_per_user(settings):
+    from utils.throttles import WebSocketConnectThrottle
+
+    settings.TESTING = False
+    cache.clear()
+
+    async def run():
+        codes = []
+
+        async def send(message):
+            codes.append(message["code"])
+
+        middleware = JWTAuthMiddleware(AsyncMock())
+        user_obj = SimpleNamespace(id_auth="user-1", is_active=True)
+        with patch.object(WebSocketConnectThrottle, "THROTTLE_RATES", {"ws_connect": "2/minute"}), patch(
+            "apps.glycemia.middleware.decode_user_id", side_effect=lambda token: token
+        ), patch("apps.glycemia.middleware.get_user", new=AsyncMock(return_value=user_obj)) as get_user:
+            for token in (b"user-1", b"user-1", b"user-1", b"user-2"):
+                await middleware({"query_string": b"token=" + token}, AsyncMock(), send)
+
+        assert codes == [4029]  # 3e reconnexion de user-1 ; user-2 a son propre quota
+        assert get_user.await_count == 3  # pas de lecture du compte pour une connexion refusée
+
+    asyncio.run(run())
+
+
+@pytest.mark.django_db(transaction=True)
+def test_websocket_auth_serves_account_from_cache_until_deactivated(user):
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    from apps.glycemia.middleware import decode_user_id, get_user
+
+    cache.clear()
+    token = str(AccessToken.for_user(user))
+    user_id = decode_user_id(token)
+    assert user_id == str(user.id_auth)
+    assert decode_user_id("not-a-jwt") is None
+
+    async def connect():
+        sent = []
+        scopes = []
+
+        async def app(scope, receive, send):
+            scopes.append(scope)
+
+        async def send(message):
+            sent.append(message)
+
+        await JWTAuthMiddleware(app)({"query_string": f"token={token}".encode()}, AsyncMock(), send)
+        return scopes, sent
+
+    scopes, _ = asyncio.run(connect())
+    assert scopes[0]["user"].pk == user.pk
+
+    with patch("utils.user_cache.load") as load:  # connexion suivante : pas de lecture en base
+        assert asyncio.run(get_user(user_id)).pk == user.pk
+    load.assert_not_called()
+
+    user.is_active = False
+    user.save(update_fields=["is_active"])
+    scopes, sent = asyncio.run(connect())
+    assert scopes == []
+    assert sent == [{"type": "websocket.close", "code": 4001}]
 
 
 def test_glycemia_consumer_rejects_unauthenticated_user():
@@ -668,7 +785,120 @@ def test_glycemia_consumer_forwards_update_and_alert_events():
 
     asyncio.run(run())
 
-
+
+
+def test_glycemia_consumer_forwards_widget_updates_to_owner_only():
+    async def run():
+        consumer = GlycemiaConsumer()
+        consumer.user = SimpleNamespace(id_auth="auth-1")
+        consumer.send = AsyncMock()
+        widgets = [{"widgetId": "glucose_live", "section": "glucose", "data": {"value": 120}}]
+
+        await consumer.widget_update({"user_id": "auth-2", "widgets": widgets})
+        consumer.send.assert_not_awaited()
+
+        await consumer.widget_update({"user_id": "auth-1", "widgets": widgets})
+        sent_payload = json.loads(consumer.send.await_args.kwargs["text_data"])
+        assert sent_payload == {"type": "widget_update", "widgets": widgets}
+
+    asyncio.run(run())
+
+
+def test_glycemia_consumer_forwards_batch_frames():
+    async def run():
+        consumer = GlycemiaConsumer()
+        consumer.send = AsyncMock()
+        messages = [
+            {"type": "glycemia_update", "data": {"value": 60}},
+            {"type": "glycemia_alert", "alert_type": "hypoglycemia", "data": {"value": 60}},
+        ]
+
+        await consumer.glycemia_batch({"type": "glycemia_batch", "user_id": "auth-2", "messages": messages})
+
+        payload = json.loads(consumer.send.await_args.kwargs["text_data"])
+        assert payload == {"type": "glycemia_batch", "user_id": "auth-2", "messages": messages}
+
+    asyncio.run(run())
+
+
+@pytest.mark.django_db
+def test_glycemia_consumer_subscribes_doctor_to_accessible_patients_only():
+    async def run():
+        consumer = GlycemiaConsumer()
+        consumer.user = SimpleNamespace(id_auth="doc-auth", user_id="doc-identity")
+        consumer.group_name = "glycemia_user_doc-auth"
+        consumer.subscriptions = {}
+        consumer.channel_name = "channel-1"
+        consumer.channel_layer = SimpleNamespace(group_add=AsyncMock(), group_discard=AsyncMock())
+        consumer.send = AsyncMock()
+
+        with patch(
+            "apps.glycemia.consumers.doctor_accessible_patient_accounts",
+            return_value={"p1": "auth-p1"},
+        ) as access:
+            await consumer.receive(json.dumps({"type": "subscribe", "patient_ids": ["p1", "p2"]}))
+
+        access.assert_called_once_with("doc-identity", ["p1", "p2"])
+        consumer.channel_layer.group_add.assert_awaited_once_with("glycemia_user_auth-p1", "channel-1")
+        payload = json.loads(consumer.send.await_args.kwargs["text_data"])
+        assert payload == {"type": "subscribed", "patient_ids": ["p1"], "denied": ["p2"]}
+
+        await consumer.receive(json.dumps({"type": "unsubscribe", "patient_ids": ["p1", "p2"]}))
+        consumer.channel_layer.group_discard.assert_awaited_once_with("glycemia_user_auth-p1", "channel-1")
+        assert consumer.subscriptions == {}
+
+        consumer.subscriptions = {"p3": "glycemia_user_auth-p3"}
+        await consumer.disconnect(1000)
+        discarded = [c.args[0] for c in consumer.channel_layer.group_discard.await_args_list[1:]]
+        assert discarded == ["glycemia_user_doc-auth", "glycemia_user_auth-p3"]
+
+    asyncio.run(run())
+
+
+def test_glycemia_consumer_joins_care_access_group_of_the_member():
+    async def run():
+        consumer = GlycemiaConsumer()
+        consumer.scope = {"user": SimpleNamespace(is_authenticated=True, id_auth="doc-auth", user_id="doc-identity")}
+        consumer.channel_name = "channel-1"
+        consumer.channel_layer = SimpleNamespace(group_add=AsyncMock(), group_discard=AsyncMock())
+        consumer.accept = AsyncMock()
+        consumer.send = AsyncMock()
+
+        await consumer.connect()
+        joined = [c.args[0] for c in consumer.channel_layer.group_add.await_args_list]
+        assert joined == ["glycemia_user_doc-auth", "care_access_doc-identity"]
+
+        await consumer.disconnect(1000)
+        discarded = [c.args[0] for c in consumer.channel_layer.group_discard.await_args_list]
+        assert discarded == ["glycemia_user_doc-auth", "care_access_doc-identity"]
+
+    asyncio.run(run())
+
+
+@pytest.mark.django_db
+def test_glycemia_consumer_drops_revoked_subscriptions_on_care_team_change():
+    async def run():
+        consumer = GlycemiaConsumer()
+        consumer.user = SimpleNamespace(id_auth="doc-auth", user_id="doc-identity")
+        consumer.subscriptions = {"p1": "glycemia_user_auth-p1", "p2": "glycemia_user_auth-p2"}
+        consumer.channel_name = "channel-1"
+        consumer.channel_layer = SimpleNamespace(group_discard=AsyncMock())
+        consumer.send = AsyncMock()
+
+        with patch(
+            "apps.glycemia.consumers.doctor_accessible_patient_accounts",
+            return_value={"p1": "auth-p1"},
+        ) as access:
+            await consumer.care_team_changed({"type": "care_team_changed"})
+
+        access.assert_called_once_with("doc-identity", ["p1", "p2"])
+        consumer.channel_layer.group_discard.assert_awaited_once_with("glycemia_user_auth-p2", "channel-1")
+        assert consumer.subscriptions == {"p1": "glycemia_user_auth-p1"}
+        payload = json.loads(consumer.send.await_args.kwargs["text_data"])
+        assert payload == {"type": "unsubscribed", "patient_ids": ["p2"], "reason": "access_revoked"}
+
+    asyncio.run(run())
+
 # ═══════════════════════════════════════════════════════════════════
 # 6. AI CLIENT
 # ═══════════════════════════════════════════════════════════════════
@@ -697,16 +927,110 @@ def test_ai_client_build_payload_normalizes_datetimes_and_optional_fields():
 
 
 def test_ai_client_post_predict_sends_json_and_token():
-    response = MagicMock()
-    response.__enter__.return_value.read.return_value = b'{"status": "ok"}'
+    response = MagicMock(status_code=200)
+    response.json.return_value = {"status": "ok"}
 
-    with patch("apps.glycemia.services.ia_client.urllib.request.urlopen", return_value=response) as urlopen:
+    with patch.object(ia_client._client.session, "request", return_value=response) as request:
         result = ia_client._post_predict({"user_id": "auth-1"})
 
-    request = urlopen.call_args.args[0]
+    method, url = request.call_args.args
     assert result == {"status": "ok"}
-    assert request.full_url.endswith("/predict")
-    assert request.headers["X-internal-token"] == ia_client.AI_SERVICE_TOKEN
+    assert method == "POST"
+    assert url.endswith("/predict")
+    assert request.call_args.kwargs["json"] == {"user_id": "auth-1"}
+    assert ia_client._client.session.headers["X-Internal-Token"] == ia_client.AI_SERVICE_TOKEN
+
+
+def test_http_client_retries_transient_status_then_succeeds():
+    from utils.http_client import HttpClient
+
+    client = HttpClient("test-retry", "http://ai.local", retries=2, backoff=0)
+    responses = [MagicMock(status_code=503), MagicMock(status_code=200)]
+
+    with patch.object(client.session, "request", side_effect=responses) as request:
+        response = client.get("/health")
+
+    assert response.status_code == 200
+    assert request.call_count == 2
+    metrics = client.snapshot()
+    assert metrics["requests"] == 2
+    assert metrics["retries"] == 1
+    assert metrics["status_counts"] == {503: 1, 200: 1}
+    assert metrics["circuit"] == "closed"
+
+
+def test_http_client_does_not_replay_unsafe_post_after_read_timeout():
+    import requests
+    from utils.http_client import HttpClient
+
+    client = HttpClient("test-post", "http://push.local", retries=2, backoff=0)
+
+    with patch.object(client.session, "request", side_effect=requests.exceptions.ReadTimeout("slow")) as request:
+        with pytest.raises(requests.exceptions.ReadTimeout):
+            client.post("/send", json={})
+
+    assert request.call_count == 1
+
+
+def test_http_client_circuit_opens_and_short_circuits():
+    import requests
+    from utils.http_client import CircuitOpenError, HttpClient
+
+    client = HttpClient("test-breaker", "http://ai.local", retries=0, failure_threshold=2, reset_timeout=60)
+
+    with patch.object(client.session, "request", side_effect=requests.exceptions.ConnectionError("down")) as request:
+        for _ in range(2):
+            with pytest.raises(requests.exceptions.ConnectionError):
+                client.get("/predict")
+        with pytest.raises(CircuitOpenError):
+            client.get("/predict")
+
+    assert request.call_count == 2
+    assert client.snapshot()["circuit"] == "open"
+    assert client.snapshot()["rejected"] == 1
+
+    client.breaker.opened_at -= 60  # fenêtre écoulée : une requête d'essai passe
+    with patch.object(client.session, "request", return_value=MagicMock(status_code=200)):
+        client.get("/predict")
+    assert client.snapshot()["circuit"] == "closed"
+
+
+def test_http_client_half_open_trial_never_sticks():
+    import requests
+    from utils.http_client import CircuitOpenError, HttpClient
+
+    client = HttpClient("test-breaker-trial", "http://ai.local", retries=0, failure_threshold=1, reset_timeout=60)
+    with patch.object(client.session, "request", side_effect=requests.exceptions.ConnectionError("down")):
+        with pytest.raises(requests.exceptions.ConnectionError):
+            client.get("/predict")
+
+    # Essai HALF_OPEN qui lève autre chose qu'une RequestException : compté en échec.
+    client.breaker.opened_at -= 60
+    with patch.object(client.session, "request", side_effect=ValueError("bad payload")):
+        with pytest.raises(ValueError):
+            client.get("/predict")
+    assert client.snapshot()["circuit"] == "open"
+
+    # Essai resté sans issue : un nouvel essai est admis après reset_timeout.
+    client.breaker.opened_at -= 60
+    assert client.breaker.allow() is True
+    with pytest.raises(CircuitOpenError):
+        client.get("/predict")
+    client.breaker.opened_at -= 60
+    with patch.object(client.session, "request", return_value=MagicMock(status_code=200)):
+        client.get("/predict")
+    assert client.snapshot()["circuit"] == "closed"
+
+
+def test_http_metrics_endpoint_is_admin_only(client, user):
+    assert client.get("/api/internal/http-metrics/").status_code == 403
+
+    user.is_staff = True
+    user.save()
+    r = client.get("/api/internal/http-metrics/")
+
+    assert r.status_code == 200
+    assert "ai_service" in r.data
 
 
 @patch("apps.glycemia.services.ia_client.logger")
@@ -734,12 +1058,12 @@ def test_request_prediction_posts_and_persists_when_enough_readings(
     build_payload.assert_called_once_with(instance.user, instance, [1, 2, 3, 4, 5, 6])
     post_predict.assert_called_once_with({"payload": True})
     persist_prediction.assert_called_once_with(
-        instance.user, instance, {"status": "ok", "source": "baseline"}
+        instance.user, instance, {"status": "ok", "source": "baseline"}, [1, 2, 3, 4, 5, 6]
     )
 
 
 @patch("apps.glycemia.services.ia_client.logger")
-@patch("apps.glycemia.services.ia_client._post_predict", side_effect=ia_client.urllib.error.URLError("down"))
+@patch("apps.glycemia.services.ia_client._post_predict", side_effect=ia_client.requests.exceptions.ConnectionError("down"))
 @patch("apps.glycemia.services.ia_client._build_payload", return_value={"payload": True})
 @patch("apps.glycemia.services.ia_client._fetch_recent_readings", return_value=[1, 2, 3, 4, 5, 6])
 def test_request_prediction_logs_unreachable_ai_service(
@@ -795,3 +1119,558 @@ def test_persist_prediction_maps_response_to_model_defaults(update_or_create, fe
         "recommendation_level": "watch",
         "sub_models": {"baseline": "ok"},
     }
+
+
+def test_fetch_recent_readings_is_bounded_by_lookback(user):
+    anchor = now()
+    GlycemiaHisto.objects.bulk_create(
+        [
+            GlycemiaHisto(user=user, measured_at=anchor - timedelta(minutes=5), value=110),
+            GlycemiaHisto(user=user, measured_at=anchor - ia_client.READINGS_LOOKBACK - timedelta(minutes=1), value=90),
+            GlycemiaHisto(user=user, measured_at=anchor + timedelta(minutes=5), value=130),
+        ]
+    )
+
+    readings = ia_client._fetch_recent_readings(user, anchor)
+
+    assert [r["value"] for r in readings] == [110]
+
+
+
+@pytest.fixture
+def empty_cache():
+    from django.core.cache import cache
+
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def test_recent_readings_window_served_from_buffer_after_ingest(
+    user, empty_cache, quiet_signals, django_capture_on_commit_callbacks
+):
+    anchor = now()
+    for minutes in range(30, 0, -5):
+        GlycemiaHisto.objects.create(user=user, measured_at=anchor - timedelta(minutes=minutes), value=100 + minutes)
+    expected = ia_client._query_recent_readings(user, anchor)
+
+    recent_readings.load(user.pk)
+    with django_capture_on_commit_callbacks(execute=True), patch("apps.glycemia.services.ia_client.request_prediction"):
+        GlycemiaHisto.objects.create(user=user, measured_at=anchor, value=150, trend="rising")
+
+    with CaptureQueriesContext(connection) as queries:
+        readings = ia_client._fetch_recent_readings(user, anchor)
+
+    assert len(queries) == 0, queries.captured_queries
+    assert [r["value"] for r in readings] == [150] + [r["value"] for r in expected]
+    assert readings[0]["measured_at"] == anchor
+    assert readings[0]["trend"] == "rising"
+
+
+def test_recent_readings_buffer_is_trimmed_and_falls_back_for_old_anchor(user, empty_cache, quiet_signals):
+    anchor = now()
+    recent_readings.load(user.pk)
+    for i in range(recent_readings.BUFFER_SIZE + 5):
+        reading = GlycemiaHisto.objects.create(user=user, measured_at=anchor - timedelta(minutes=5 * i), value=100)
+        recent_readings.append(user.pk, reading.measured_at, reading.value)
+
+    buffer = cache.get(f"{recent_readings.CACHE_PREFIX}:{user.pk}")
+    assert len(buffer["items"]) == recent_readings.BUFFER_SIZE
+
+    # Fenêtre récente : couverte par le buffer.
+    assert len(recent_readings.window(user.pk, anchor, ia_client.READINGS_WINDOW)) == ia_client.READINGS_WINDOW
+    # Fenêtre ancrée sous le plancher : le buffer ne peut pas répondre.
+    assert recent_readings.window(user.pk, anchor - timedelta(hours=4), ia_client.READINGS_WINDOW) is None
+    old = ia_client._fetch_recent_readings(user, anchor - timedelta(hours=4))
+    assert len(old) == 5
+
+
+def test_recent_readings_buffer_invalidated_on_update_and_delete(user, empty_cache, quiet_signals):
+    reading = GlycemiaHisto.objects.create(user=user, measured_at=now(), value=100)
+    recent_readings.load(user.pk)
+
+    reading.value = 140
+    reading.save()
+    assert cache.get(f"{recent_readings.CACHE_PREFIX}:{user.pk}") is None
+    assert ia_client._fetch_recent_readings(user, now())[0]["value"] == 140
+
+    reading.delete()
+    assert cache.get(f"{recent_readings.CACHE_PREFIX}:{user.pk}") is None
+    assert ia_client._fetch_recent_readings(user, now()) == []
+
+
+def test_recent_readings_ignores_rolled_back_reading(user, empty_cache, quiet_signals, django_capture_on_commit_callbacks):
+    from django.db import transaction
+
+    recent_readings.load(user.pk)
+    with django_capture_on_commit_callbacks(execute=True):
+        with pytest.raises(RuntimeError), transaction.atomic():
+            GlycemiaHisto.objects.create(user=user, measured_at=now(), value=300)
+            raise RuntimeError("rollback")
+
+    assert recent_readings.window(user.pk, now(), ia_client.READINGS_WINDOW) == []
+
+
+def test_recent_readings_concurrent_append_forces_reload(user, empty_cache, quiet_signals):
+    anchor = now()
+    recent_readings.load(user.pk)
+    first = GlycemiaHisto.objects.create(user=user, measured_at=anchor - timedelta(minutes=5), value=120)
+    second = GlycemiaHisto.objects.create(user=user, measured_at=anchor, value=130)
+
+    # Deux workers : le second relit le buffer avant l'écriture du premier
+    # et la perd ; le buffer n'est plus à la version courante.
+    stale = cache.get(f"{recent_readings.CACHE_PREFIX}:{user.pk}")
+    recent_readings.append(user.pk, first.measured_at, first.value)
+    with patch.object(recent_readings.cache, "get", return_value=stale):
+        recent_readings.append(user.pk, second.measured_at, second.value)
+
+    readings = recent_readings.window(user.pk, anchor, ia_client.READINGS_WINDOW)
+    assert [r["value"] for r in readings] == [130, 120]
+
+# ═══════════════════════════════════════════════════════════════════
+# 7. PARTITIONNEMENT (glycemia_histo)
+# ═══════════════════════════════════════════════════════════════════
+
+
+def test_partition_month_helpers_roll_over_years():
+    from datetime import datetime, timezone
+
+    start = partitioning.month_start(datetime(2026, 12, 31, 23, 30, tzinfo=timezone.utc))
+
+    assert start == datetime(2026, 12, 1, tzinfo=timezone.utc)
+    assert partitioning.add_months(start, 1) == datetime(2027, 1, 1, tzinfo=timezone.utc)
+    assert partitioning.add_months(start, -12) == datetime(2025, 12, 1, tzinfo=timezone.utc)
+    assert partitioning.partition_name(start) == "glycemia_histo_y2026m12"
+    assert len(list(partitioning.month_range(start, partitioning.add_months(start, 3)))) == 4
+
+
+def test_partition_name_round_trips():
+    from datetime import datetime, timezone
+
+    start = datetime(2027, 3, 1, tzinfo=timezone.utc)
+
+    assert partitioning._parse_partition_month(partitioning.partition_name(start)) == start
+    assert partitioning._parse_partition_month(partitioning.DEFAULT_PARTITION) is None
+
+
+@pytest.mark.django_db
+def test_partitioning_is_noop_outside_postgresql():
+    assert partitioning.is_supported() is False
+    assert partitioning.ensure_partitions() == []
+    assert partitioning.archive_partitions(now(), "cold") == []
+
+
+# ═══════════════════════════════════════════════════════════════════
+# 8. ROLLUPS (agrégats horaires / journaliers)
+# ═══════════════════════════════════════════════════════════════════
+
+
+@pytest.fixture
+def quiet_signals():
+    with patch("apps.glycemia.services.broadcaster.get_channel_layer", return_value=None):
+        yield
+
+
+def test_rollup_stats_derived_metrics():
+    stats = rollups.RollupStats.from_values([60, 100, 140, 200])
+
+    assert stats.count == 4
+    assert stats.low_count == 1
+    assert stats.in_range_count == 2
+    assert stats.high_count == 1
+    assert stats.tir == 50
+    assert stats.mean == 125
+    assert round(stats.gmi, 2) == round(3.31 + 0.02392 * 125, 2)
+    assert stats.cv == pytest.approx(stats.std / 125 * 100)
+    assert 95 <= stats.quantile(0.5) <= 145
+
+
+def test_rollup_stats_merge_equals_single_pass():
+    merged = rollups.RollupStats.from_values([80, 90]).merge(rollups.RollupStats.from_values([250, 65]))
+
+    assert merged.as_dict() == rollups.RollupStats.from_values([80, 90, 250, 65]).as_dict()
+
+
+@pytest.mark.django_db
+def test_ingest_updates_hourly_and_daily_rollups(user, quiet_signals):
+    measured_at = now().replace(minute=10)
+    GlycemiaHisto.objects.create(user=user, measured_at=measured_at, value=60)
+    GlycemiaHisto.objects.create(user=user, measured_at=measured_at + timedelta(minutes=5), value=150)
+
+    hourly = GlycemiaRollup.objects.get(user=user, period=RollupPeriod.HOUR)
+    daily = GlycemiaRollup.objects.get(user=user, period=RollupPeriod.DAY)
+    for rollup in (hourly, daily):
+        assert rollup.count == 2
+        assert rollup.min_value == 60
+        assert rollup.max_value == 150
+        assert rollup.low_count == 1
+        assert rollup.in_range_count == 1
+        assert sum(rollup.histogram.values()) == 2
+
+
+@pytest.mark.django_db
+def test_update_and_delete_rebuild_rollups(user, quiet_signals):
+    reading = GlycemiaHisto.objects.create(user=user, measured_at=now() - timedelta(days=3), value=60)
+
+    reading.measured_at = now()
+    reading.value = 120
+    reading.save()
+
+    assert rollups.diff_user_buckets(user.pk) == []
+    assert GlycemiaRollup.objects.filter(user=user).count() == 2
+
+    reading.delete()
+
+    assert not GlycemiaRollup.objects.filter(user=user).exists()
+
+
+@pytest.mark.django_db
+def test_window_stats_matches_raw_readings(user, quiet_signals):
+    values = []
+    for hours in range(0, 24 * 5, 7):
+        value = 50 + (hours * 13) % 250
+        GlycemiaHisto.objects.create(user=user, measured_at=now() - timedelta(hours=hours, minutes=1), value=value)
+        if hours < 24 * 4:
+            values.append(value)
+
+    stats = rollups.window_stats(user, now() - timedelta(days=4))
+    expected = rollups.RollupStats.from_values(values)
+
+    assert stats.count == expected.count
+    assert stats.in_range_count == expected.in_range_count
+    assert stats.sum_values == pytest.approx(expected.sum_values)
+
+
+@pytest.mark.django_db
+def test_window_stats_clips_edge_hours_to_the_window(user, quiet_signals):
+    since = now().replace(minute=30, second=0, microsecond=0) - timedelta(hours=5)
+    GlycemiaHisto.objects.create(user=user, measured_at=since - timedelta(minutes=10), value=300)
+    GlycemiaHisto.objects.create(user=user, measured_at=since + timedelta(minutes=10), value=100)
+    GlycemiaHisto.objects.create(user=user, measured_at=since + timedelta(hours=2), value=120)
+
+    stats = rollups.window_stats(user, since)
+
+    assert stats.count == 2
+    assert stats.max_value == 120
+
+
+@pytest.mark.django_db
+def test_window_stats_reads_raw_rows_before_first_rollup(user, quiet_signals):
+    old = GlycemiaHisto.objects.create(user=user, measured_at=now() - timedelta(days=3), value=90)
+    GlycemiaHisto.objects.create(user=user, measured_at=now() - timedelta(days=1), value=150)
+    # Historique antérieur au backfill : la lecture ancienne n'a pas de rollup.
+    GlycemiaRollup.objects.filter(user=user, bucket_start__lte=old.measured_at + timedelta(days=1)).filter(
+        bucket_start__lt=now() - timedelta(days=2)
+    ).delete()
+
+    stats = rollups.window_stats(user, now() - timedelta(days=7))
+
+    assert stats.count == 2
+    assert stats.min_value == 90
+
+
+@pytest.mark.django_db
+def test_range_stats_match_returned_entries(client, user, quiet_signals):
+    for v in [60, 120, 200]:
+        measured_at = now() - timedelta(hours=v // 10)
+        GlycemiaHisto.objects.create(user=user, measured_at=measured_at, value=v)
+        Glycemia.objects.create(user=user, measured_at=measured_at, value=v)
+    # Lecture présente seulement dans l'historique complet : ni entrée, ni statistique.
+    GlycemiaHisto.objects.create(user=user, measured_at=now() - timedelta(hours=1), value=250)
+
+    r = client.get("/api/glycemia/range/?days=7")
+
+    assert r.status_code == 200
+    assert len(r.data["entries"]) == 3
+    assert r.data["stats"]["count"] == 3
+    assert r.data["stats"]["min"] == 60
+    assert r.data["stats"]["tir"] == pytest.approx(33.33)
+    assert "gmi" in r.data["stats"] and "cv" in r.data["stats"]
+
+
+@pytest.mark.django_db
+def test_backfill_and_check_rollup_commands(user):
+    from django.core.management import call_command
+    from django.core.management.base import CommandError
+
+    GlycemiaHisto.objects.bulk_create(
+        [GlycemiaHisto(user=user, measured_at=now() - timedelta(hours=h), value=100 + h) for h in range(48)]
+    )
+
+    with pytest.raises(CommandError):
+        call_command("check_glycemia_rollups", stdout=StringIO())
+
+    call_command("backfill_glycemia_rollups", stdout=StringIO())
+
+    call_command("check_glycemia_rollups", stdout=StringIO())
+    assert GlycemiaRollup.objects.filter(user=user, period=RollupPeriod.HOUR).count() == 48
+    assert sum(GlycemiaRollup.objects.filter(user=user, period=RollupPeriod.DAY).values_list("count", flat=True)) == 48
+
+
+# ═══════════════════════════════════════════════════════════════════
+# 9. AGP (sketches de quantiles journaliers)
+# ═══════════════════════════════════════════════════════════════════
+
+
+def test_quantile_sketch_matches_linear_interpolation():
+    import statistics
+
+    values = [55, 70, 70, 88, 101, 120, 145, 180, 181, 240, 310]
+    sketch = agp.QuantileSketch()
+    for v in values:
+        sketch.add(v)
+
+    expected = statistics.quantiles(values, n=4, method="inclusive")
+    assert [sketch.quantile(q) for q in (0.25, 0.5, 0.75)] == pytest.approx(expected)
+    assert sketch.quantile(0) == 55
+    assert sketch.quantile(1) == 310
+
+
+def test_quantile_sketch_merge_is_lossless():
+    left, right, both = agp.QuantileSketch(), agp.QuantileSketch(), agp.QuantileSketch()
+    for i, v in enumerate(range(60, 260, 7)):
+        (left if i % 2 else right).add(v)
+        both.add(v)
+
+    merged = agp.QuantileSketch(left.to_json()).merge(agp.QuantileSketch(right.to_json()))
+
+    assert merged.to_json() == both.to_json()
+    assert merged.quantile(0.95) == both.quantile(0.95)
+
+
+@pytest.mark.django_db
+def test_ingest_updates_daily_profile_sketch(user, quiet_signals):
+    from apps.glycemia.models import GlycemiaProfileSketch
+
+    measured_at = now()
+    GlycemiaHisto.objects.create(user=user, measured_at=measured_at, value=101.4)
+    GlycemiaHisto.objects.create(user=user, measured_at=measured_at, value=101)
+
+    sketch = GlycemiaProfileSketch.objects.get(user=user)
+    assert sketch.count == 2
+    assert sketch.slots == {str(agp.slot_of(measured_at)): {"101": 2}}
+    assert agp.diff_user_sketches(user.pk) == []
+
+
+@pytest.mark.django_db
+def test_agp_endpoint_returns_percentile_bands(client, user, quiet_signals):
+    for day in range(3):
+        for value in (80, 120, 160):
+            GlycemiaHisto.objects.create(user=user, measured_at=now() - timedelta(days=day), value=value)
+
+    r = client.get("/api/glycemia/agp/?days=14")
+
+    assert r.status_code == 200
+    assert r.data["readings"] == 9
+    assert r.data["days_with_data"] == 3
+    assert len(r.data["profile"]) == agp.SLOTS_PER_DAY
+    slot = r.data["profile"][agp.slot_of(now())]
+    assert slot["count"] >= 3
+    assert slot["p5"] <= slot["p50"] <= slot["p95"]
+    assert r.data["stats"]["count"] == 9
+
+
+def test_agp_endpoint_rejects_invalid_days(client):
+    assert client.get("/api/glycemia/agp/?days=0").status_code == 400
+    assert client.get("/api/glycemia/agp/?days=13").status_code == 400
+    assert client.get("/api/glycemia/agp/?days=91").status_code == 400
+    assert client.get("/api/glycemia/agp/?days=abc").status_code == 400
+
+
+# ═══════════════════════════════════════════════════════════════════
+# Séries sous-échantillonnées (graphiques)
+# ═══════════════════════════════════════════════════════════════════
+
+
+def test_lttb_keeps_endpoints_and_spikes():
+    from apps.glycemia.services import downsampling
+
+    start = now()
+    readings = [(start + timedelta(minutes=5 * i), 100 + (i % 7)) for i in range(1000)]
+    readings[500] = (readings[500][0], 350)
+    readings[700] = (readings[700][0], 45)
+
+    sampled = downsampling.lttb(readings, 50)
+
+    assert len(sampled) == 50
+    assert sampled[0] == readings[0] and sampled[-1] == readings[-1]
+    assert readings[500] in sampled and readings[700] in sampled
+    assert downsampling.lttb(readings[:10], 50) == readings[:10]
+
+
+@pytest.mark.django_db
+def test_chart_endpoint_downsamples_with_lttb_and_minmax(client, user, quiet_signals):
+    start = now() - timedelta(minutes=5 * 200)
+    for i in range(200):
+        GlycemiaHisto.objects.create(user=user, measured_at=start + timedelta(minutes=5 * i), value=80 + i % 50)
+
+    r = client.get("/api/glycemia/chart/?days=1&points=20")
+    assert r.status_code == 200
+    assert r.data["method"] == "lttb"
+    assert len(r.data["series"]) == 20
+
+    r = client.get("/api/glycemia/chart/?days=1&points=20&format=columnar")
+    series = json.loads(r.content)["series"]
+    assert set(series) == {"t", "v"}
+    assert len(series["t"]) == len(series["v"]) == 20
+
+    r = client.get("/api/glycemia/chart/?days=1&points=12&method=minmax")
+    assert r.data["bucketMinutes"] == 180
+    assert len(r.data["series"]) <= 12
+    assert sum(bucket["count"] for bucket in r.data["series"]) == 200
+    assert min(bucket["min"] for bucket in r.data["series"]) == 80
+
+
+@pytest.mark.parametrize("days,points", [(90, 10), (1, 12), (7, 300), (30, 17)])
+def test_minmax_bucket_width_keeps_at_most_points_buckets(days, points):
+    from datetime import datetime, timezone
+
+    from apps.glycemia.services import downsampling
+
+    until = datetime(2026, 3, 2, 10, 17, tzinfo=timezone.utc)
+    since = until - timedelta(days=days)
+    minutes = downsampling.bucket_minutes_for(since, until, points)
+
+    first = downsampling.bucket_floor(since, minutes)
+    last = downsampling.bucket_floor(until, minutes)
+    assert (last - first) / timedelta(minutes=minutes) + 1 <= points
+    assert minutes % (60 if minutes > 60 else downsampling.MIN_BUCKET_MINUTES) == 0
+
+
+def test_chart_endpoint_rejects_invalid_parameters(client):
+    for query in (
+        "points=5",
+        "days=91",
+        "method=mean",
+        "since=yesterday",
+        "since=2024-02-30T10:00:00Z",
+        "since=2024-02-01T10:00:00Z&until=2024-02-30T10:00:00Z",
+        "since=2026-03-01T00:00:00Z&until=2026-07-01T00:00:00Z",
+    ):
+        assert client.get(f"/api/glycemia/chart/?{query}").status_code == 400, query
+
+
+# ═══════════════════════════════════════════════════════════════════
+# Rendu compact / columnar
+# ═══════════════════════════════════════════════════════════════════
+
+
+def test_fast_json_fallback_matches_orjson_output():
+    import datetime
+    import decimal
+    import uuid
+
+    from utils import fast_json
+
+    data = {
+        "measured_at": [datetime.datetime(2026, 3, 2, 10, 0, 0, 123456, tzinfo=datetime.timezone.utc)],
+        "day": datetime.date(2026, 3, 2),
+        "reading_id": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+        "dose": decimal.Decimal("1.50"),
+        "value": 142.5,
+        "notes": "café",
+        "device": None,
+    }
+    if fast_json.orjson is None:
+        pytest.skip("orjson non installé")
+
+    with patch.object(fast_json, "orjson", None):
+        fallback = fast_json.dumps(data)
+
+    assert fast_json.dumps(data) == fallback
+    # Heure locale (TIME_ZONE Europe/Paris) avec décalage, comme DRF.
+    assert json.loads(fallback)["measured_at"] == ["2026-03-02T11:00:00.123456+01:00"]
+
+
+@pytest.mark.django_db
+def test_fast_path_rows_are_identical_to_serializer_rows(client, user, quiet_signals):
+    GlycemiaHisto.objects.create(user=user, measured_at=now() - timedelta(minutes=5), value=123, notes="n")
+
+    [regular] = json.loads(client.get("/api/glycemia/", HTTP_ACCEPT="application/json").content)["results"]
+    [compact] = json.loads(client.get("/api/glycemia/?format=compact").content)["results"]
+
+    assert compact == regular
+
+
+@pytest.mark.django_db
+def test_list_and_range_fast_formats_match_serializers(client, user, quiet_signals):
+    for minutes in (5, 10, 15):
+        measured_at = now() - timedelta(minutes=minutes)
+        GlycemiaHisto.objects.create(user=user, measured_at=measured_at, value=100 + minutes, notes="n")
+        Glycemia.objects.create(user=user, measured_at=measured_at, value=100 + minutes)
+
+    regular = client.get("/api/glycemia/").data
+    compact = json.loads(client.get("/api/glycemia/?format=compact").content)
+    columnar = json.loads(
+        client.get("/api/glycemia/", HTTP_ACCEPT="application/vnd.glycopilot.columnar+json").content
+    )
+
+    assert compact["count"] == columnar["count"] == regular["count"] == 3
+    assert [row["id"] for row in compact["results"]] == [row["id"] for row in regular["results"]]
+    assert set(compact["results"][0]) == set(regular["results"][0])
+    assert columnar["results"]["value"] == [row["value"] for row in regular["results"]]
+    assert columnar["results"]["reading_id"] == [row["reading_id"] for row in regular["results"]]
+
+    r = client.get("/api/glycemia/range/?days=1&format=columnar")
+    body = json.loads(r.content)
+    assert r["Content-Type"].startswith("application/vnd.glycopilot.columnar+json")
+    assert body["entries"]["value"] == [105, 110, 115]
+    assert body["stats"]["count"] == 3
+
+
+@pytest.mark.django_db
+def test_current_answers_304_until_a_new_reading(client, user, quiet_signals, django_capture_on_commit_callbacks):
+    cache.clear()
+    Glycemia.objects.create(user=user, measured_at=now() - timedelta(minutes=5), value=120)
+
+    first = client.get("/api/glycemia/current/")
+    etag = first["ETag"]
+    with CaptureQueriesContext(connection) as queries:
+        r = client.get("/api/glycemia/current/", HTTP_IF_NONE_MATCH=f'"other", {etag}')
+    assert r.status_code == 304
+    assert len(queries) == 0
+
+    with django_capture_on_commit_callbacks(execute=True):
+        GlycemiaHisto.objects.create(user=user, measured_at=now(), value=180)
+        Glycemia.objects.create(user=user, measured_at=now(), value=180)
+
+    r = client.get("/api/glycemia/current/", HTTP_IF_NONE_MATCH=etag)
+    assert r.status_code == 200
+    assert r.data["value"] == 180
+    assert r["ETag"] != etag
+
+
+@pytest.mark.django_db
+def test_latest_prediction_etag_follows_predictions_only(client, user, django_capture_on_commit_callbacks):
+    cache.clear()
+    t = now()
+    with django_capture_on_commit_callbacks(execute=True):
+        GlycemiaDataIA.objects.create(
+            user=user, for_time=t, input_start=t - timedelta(hours=2), input_end=t, model_version="v1.0"
+        )
+
+    etag = client.get("/api/glycemia/predictions/latest/")["ETag"]
+    assert client.get("/api/glycemia/predictions/latest/", HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+    with django_capture_on_commit_callbacks(execute=True):
+        GlycemiaDataIA.objects.create(
+            user=user,
+            for_time=t + timedelta(minutes=30),
+            input_start=t - timedelta(hours=1),
+            input_end=t,
+            model_version="v1.1",
+        )
+    r = client.get("/api/glycemia/predictions/latest/", HTTP_IF_NONE_MATCH=etag)
+    assert r.status_code == 200
+    assert r.data["model_version"] == "v1.1"
+
+
+@pytest.mark.django_db
+def test_rollup_failure_does_not_skip_agp_sketch(user, quiet_signals):
+    from apps.glycemia.models import GlycemiaProfileSketch
+
+    with patch.object(rollups, "record_reading", side_effect=RuntimeError("db down")):
+        GlycemiaHisto.objects.create(user=user, measured_at=now() - timedelta(minutes=5), value=110)
+
+    assert not GlycemiaRollup.objects.filter(user=user).exists()
+    assert GlycemiaProfileSketch.objects.get(user=user).count == 1
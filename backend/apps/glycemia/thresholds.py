@@ -0,0 +1,9 @@
+"""
+Seuils glycémiques de référence (mg/dL), partagés par les alertes, le
+temps dans la cible (rollups, AGP) et le score de santé.
+
+Hypoglycémie : valeur < HYPO_THRESHOLD ; hyperglycémie : valeur > HYPER_THRESHOLD.
+"""
+
+HYPO_THRESHOLD = 70
+HYPER_THRESHOLD = 180
@@ -8,8 +8,10 @@ from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
-from apps.dashboard.services import DashboardCache
+from utils import data_versions
 from utils.helpers import format_serializer_errors
+from utils.jwt_auth import CACHED_AUTHENTICATION_CLASSES
+from utils.renderers import FastSerializationMixin
 from .models import Glycemia, GlycemiaDataIA, GlycemiaHisto, PersonalModelApproval
 from .serializers import (
     GlycemiaDataIASerializer,
@@ -17,13 +19,16 @@ from .serializers import (
     GlycemiaHistoSerializer,
     GlycemiaSerializer,
 )
+from .services import agp, rollups
 
 
-class GlycemiaViewSet(viewsets.ModelViewSet):
+class GlycemiaViewSet(FastSerializationMixin, viewsets.ModelViewSet):
     """
     ViewSet principal pour gérer la glycémie :
     - Glycemia = historique limité à 30 jours (cache étendu)
     - GlycemiaHisto = historique complet (jamais supprimé)
+
+    list, range et chart acceptent ?format=compact|columnar (utils.renderers).
     """
 
     permission_classes = [IsAuthenticated]
@@ -55,13 +60,17 @@ class GlycemiaViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
-    @action(detail=False, methods=["get"], url_path="current")
+    @action(
+        detail=False, methods=["get"], url_path="current", authentication_classes=CACHED_AUTHENTICATION_CLASSES
+    )
+    @data_versions.conditional(data_versions.GLUCOSE)
     def current(self, request):
         """
         GET /api/v1/glucose/current/
         Retourne la dernière valeur de glycémie :
         - Cherchée d'abord dans Glycemia (30 jours)
         - Sinon fallback dans GlycemiaHisto
+        ETag / If-None-Match : 304 tant qu'aucune lecture n'a été écrite.
         """
 
         # Dernière valeur dans Glycemia (30 jours)
@@ -87,6 +96,8 @@ class GlycemiaViewSet(viewsets.ModelViewSet):
         GET /api/v1/glucose/range/?days=X
         Retourne l'historique des X derniers jours (1 ≤ X ≤ 30).
         Utilise Glycemia (cache 30 jours avec context et notes).
+        Les statistiques (TIR, moyenne, CV, GMI...) sont calculées sur ces
+        mêmes lectures, déjà chargées : leur count est celui de `entries`.
         """
 
         try:
@@ -105,16 +116,91 @@ class GlycemiaViewSet(viewsets.ModelViewSet):
             user=request.user, measured_at__gte=limit
         ).order_by("-measured_at")
 
-        serializer = GlycemiaSerializer(entries, many=True)
+        if self.uses_fast_path():
+            fields = GlycemiaSerializer.Meta.fields
+            data = self.fast_rows(entries.values_list(*fields), fields)
+        else:
+            data = GlycemiaSerializer(entries, many=True).data
+
+        stats = self._calculate_stats([e["value"] for e in data])
 
         return Response(
             {
-                "entries": serializer.data,
-                "stats": self._calculate_stats(entries),
+                "entries": data,
+                "stats": stats,
                 "range_days": days,
             }
         )
 
+    @action(detail=False, methods=["get"], url_path="agp")
+    def agp(self, request):
+        """
+        GET /api/glycemia/agp/?days=X
+        Ambulatory Glucose Profile des X derniers jours (14 ≤ X ≤ 90, défaut 14) :
+        percentiles 5/25/50/75/95 par tranche de 30 min, fusionnés depuis
+        les sketches journaliers.
+        """
+        try:
+            days = agp.parse_days(request.query_params.get("days"), agp.MIN_DAYS)
+        except (ValueError, TypeError):
+            return Response(
+                {"error": f"Days must be an integer between {agp.MIN_DAYS} and {agp.MAX_DAYS}"}, status=400
+            )
+
+        return Response(agp.build_agp(request.user, days))
+
+    @action(detail=False, methods=["get"], url_path="chart")
+    def chart(self, request):
+        """
+        GET /api/glycemia/chart/?days=X&points=300&method=lttb|minmax[&format=columnar]
+        GET /api/glycemia/chart/?since=<iso>&until=<iso>&points=300
+        Série sous-échantillonnée pour les graphiques (au plus `points` points,
+        fenêtre de 90 jours au plus) : LTTB sur les lectures, ou min / max /
+        moyenne par seau depuis les rollups. format=columnar : tableaux
+        parallèles au lieu d'un objet par point.
+        """
+        from django.utils.dateparse import parse_datetime
+
+        from .services import downsampling
+
+        until = now()
+        if request.query_params.get("since"):
+            try:
+                since = parse_datetime(request.query_params["since"])
+                if request.query_params.get("until"):
+                    until = parse_datetime(request.query_params["until"])
+            except ValueError:  # bien formée mais impossible (2024-02-30)
+                since = None
+            if since is None or until is None or since.tzinfo is None or until.tzinfo is None:
+                return Response({"error": "since/until must be ISO 8601 datetimes with a timezone"}, status=400)
+            if since >= until or until - since > timedelta(days=agp.MAX_DAYS):
+                return Response(
+                    {"error": f"since must be before until, within {agp.MAX_DAYS} days"}, status=400
+                )
+        else:
+            try:
+                days = agp.parse_days(request.query_params.get("days"))
+            except (ValueError, TypeError):
+                return Response({"error": f"Days must be an integer between 1 and {agp.MAX_DAYS}"}, status=400)
+            since = until - timedelta(days=days)
+
+        try:
+            points = downsampling.parse_points(request.query_params.get("points"))
+        except (ValueError, TypeError):
+            return Response(
+                {
+                    "error": f"Points must be an integer between {downsampling.MIN_POINTS} "
+                    f"and {downsampling.MAX_POINTS}"
+                },
+                status=400,
+            )
+        method = request.query_params.get("method") or downsampling.METHOD_LTTB
+        if method not in downsampling.METHODS:
+            return Response({"error": f"Method must be one of: {', '.join(downsampling.METHODS)}"}, status=400)
+
+        data = downsampling.chart_series(self._resolve_user().pk, since, until, points, method)
+        return Response({"since": since, "until": until, **data})
+
     @action(detail=False, methods=["post"], url_path="manual-readings")
     def manual_readings(self, request):
         """
@@ -134,7 +220,6 @@ class GlycemiaViewSet(viewsets.ModelViewSet):
 
         self._add_to_month_history(histo_entry)
         self._clean_old_entries(request.user)
-        DashboardCache.invalidate_summary(request.user.pk)
 
         return Response(GlycemiaHistoSerializer(histo_entry).data, status=201)
 
@@ -157,7 +242,6 @@ class GlycemiaViewSet(viewsets.ModelViewSet):
 
         self._add_to_month_history(histo_entry)
         self._clean_old_entries(request.user)
-        DashboardCache.invalidate_summary(request.user.pk)
 
         return Response(GlycemiaHistoSerializer(histo_entry).data, status=201)
 
@@ -181,24 +265,19 @@ class GlycemiaViewSet(viewsets.ModelViewSet):
         limit = now() - timedelta(days=30)
         Glycemia.objects.filter(user=user, measured_at__lt=limit).delete()
 
-    def _calculate_stats(self, entries):
-        """Calcule des statistiques simples sur les valeurs renvoyées."""
-        values = [e.value for e in entries]
+    def _calculate_stats(self, values):
+        """Statistiques des valeurs renvoyées : format RollupStats, médiane exacte."""
         if not values:
             return {}
 
-        return {
-            "min": min(values),
-            "max": max(values),
-            "avg": round(sum(values) / len(values), 2),
-            "median": round(statistics.median(values), 2)
-            if len(values) > 1
-            else values[0],
-            "count": len(values),
-        }
+        stats = rollups.RollupStats.from_values(values).as_dict()
+        stats["median"] = (
+            round(statistics.median(values), 2) if len(values) > 1 else values[0]
+        )
+        return stats
 
 
-class GlycemiaDataIAViewSet(viewsets.ReadOnlyModelViewSet):
+class GlycemiaDataIAViewSet(FastSerializationMixin, viewsets.ReadOnlyModelViewSet):
     """
     GET /api/glycemia/predictions/          — liste des prédictions (paginée)
     GET /api/glycemia/predictions/{id}/     — détail d'une prédiction
@@ -208,6 +287,7 @@ class GlycemiaDataIAViewSet(viewsets.ReadOnlyModelViewSet):
       ?limit=N   — nombre de résultats (défaut pagination globale)
       ?status=ok|low_confidence|error
       ?source=baseline|lstm|transformer|ensemble
+      ?format=compact|columnar — liste lue en tuples, encodage rapide
     """
 
     permission_classes = [IsAuthenticated]
@@ -226,9 +306,12 @@ class GlycemiaDataIAViewSet(viewsets.ReadOnlyModelViewSet):
 
         return qs
 
-    @action(detail=False, methods=["get"], url_path="latest")
+    @action(
+        detail=False, methods=["get"], url_path="latest", authentication_classes=CACHED_AUTHENTICATION_CLASSES
+    )
+    @data_versions.conditional(data_versions.PREDICTIONS)
     def latest(self, request):
-        """GET /api/glycemia/predictions/latest/ — dernière prédiction."""
+        """GET /api/glycemia/predictions/latest/ — dernière prédiction (ETag / If-None-Match)."""
         prediction = self.get_queryset().first()
         if not prediction:
             return Response(
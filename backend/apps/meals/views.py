@@ -1,11 +1,10 @@
-import urllib.request
-import json as json_module
-
 from django.db.models import Q
 from rest_framework import permissions, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
+from utils import http_client
+
 from .models import Meal, UserMeal
 from .serializers import MealSerializer, UserMealSerializer
 
@@ -15,6 +14,14 @@ OPEN_FOOD_FACTS_SEARCH_URL = (
     "?search_terms={}&search_simple=1&action=process&json=1&page_size=10&lc=fr"
 )
 
+_off_client = http_client.get_client(
+    "open_food_facts",
+    timeout=(3.0, 8.0),
+    max_concurrency=4,
+    retries=1,
+    headers={"User-Agent": "GlycoPilot/1.0"},
+)
+
 
 def _parse_off_product(product, barcode=None):
     n = product.get("nutriments") or {}
@@ -34,9 +41,9 @@ def _parse_off_product(product, barcode=None):
 
 
 def _fetch_url(url):
-    req = urllib.request.Request(url, headers={"User-Agent": "GlycoPilot/1.0"})
-    with urllib.request.urlopen(req, timeout=8) as resp:
-        return json_module.loads(resp.read().decode())
+    response = _off_client.get(url)
+    response.raise_for_status()
+    return response.json()
 
 
 class MealViewSet(viewsets.ReadOnlyModelViewSet):
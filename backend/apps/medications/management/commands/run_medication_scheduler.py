@@ -0,0 +1,95 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.glycemia.services import partitioning
+from apps.medications.services.reminders import send_reminders
+from apps.medications.services.scheduler import (
+    ReminderQueue,
+    due_intakes,
+    mark_missed_intakes,
+    materialize_intakes,
+)
+
+# Le sommeil est plafonné pour détecter le changement de jour, les reports
+# (rechargement de la file) et l'arrêt.
+MAX_SLEEP_SECONDS = 15
+
+
+class Command(BaseCommand):
+    help = (
+        "Scheduler des rappels de médicaments : crée les prises du jour, "
+        "envoie chaque rappel à sa minute et marque les prises manquées ; "
+        "pré-crée chaque jour les partitions à venir de glycemia_histo"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--refresh",
+            type=int,
+            default=300,
+            help="Intervalle (s) de rechargement des prises et de marquage des oubliés",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Un seul passage (matérialisation, rappels échus, manqués) puis sortie",
+        )
+
+    def handle(self, *args, **options):
+        refresh = options["refresh"]
+        queue = ReminderQueue()
+        day = None
+        next_refresh = 0.0
+
+        while True:
+            now = timezone.now()
+            today = timezone.localdate(now)
+            if today != day:
+                self._ensure_partitions()
+            if today != day or time.monotonic() >= next_refresh:
+                created = materialize_intakes(today)
+                missed = mark_missed_intakes(now)
+                queue.reload(today, now)
+                day = today
+                next_refresh = time.monotonic() + refresh
+                self.stdout.write(
+                    f"[{timezone.localtime(now):%H:%M:%S}] prises créées: {created} | "
+                    f"manquées: {missed} | rappels en file: {len(queue)}"
+                )
+            elif queue.is_stale():
+                queue.reload(today, now)
+
+            due = queue.pop_due(now)
+            if due:
+                stats = send_reminders(due_intakes(due, now))
+                self.stdout.write(
+                    self.style.SUCCESS(
+                        f"Rappels envoyés: {stats['sent']} | skippés: {stats['skipped']} | "
+                        f"erreurs: {stats['errors']}"
+                    )
+                )
+
+            if options["once"]:
+                return
+
+            wake = min(next_refresh - time.monotonic(), MAX_SLEEP_SECONDS)
+            next_at = queue.next_at()
+            if next_at is not None:
+                wake = min(wake, (next_at - timezone.now()).total_seconds())
+            time.sleep(max(wake, 1))
+
+    def _ensure_partitions(self):
+        """
+        Partitions mensuelles de glycemia_histo (MONTHS_AHEAD mois d'avance) :
+        sans déploiement (post_migrate) pendant des mois, une insertion sans
+        partition échouerait. Idempotent ; une erreur n'arrête pas les rappels.
+        """
+        try:
+            created = partitioning.ensure_partitions()
+        except Exception as e:
+            self.stderr.write(f"Partitions glycemia_histo non vérifiées: {e}")
+            return
+        if created:
+            self.stdout.write(f"Partitions glycemia_histo créées: {', '.join(created)}")
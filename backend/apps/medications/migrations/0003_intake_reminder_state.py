@@ -0,0 +1,22 @@
+# Generated by Django 4.2.7 on 2026-10-19 15:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('medications', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='medicationintake',
+            name='reminder_sent_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='medicationintake',
+            index=models.Index(fields=['scheduled_date', 'scheduled_time'], name='med_intake_slot_idx'),
+        ),
+    ]
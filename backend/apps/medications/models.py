@@ -141,6 +141,8 @@ class MedicationIntake(models.Model):
     )
     taken_at = models.DateTimeField(blank=True, null=True)
     snoozed_until = models.DateTimeField(blank=True, null=True)
+    # Set once the push reminder has been handled (sent, or user without device)
+    reminder_sent_at = models.DateTimeField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -148,6 +150,9 @@ class MedicationIntake(models.Model):
         db_table = "medication_intakes"
         unique_together = ("user_medication", "scheduled_date", "scheduled_time")
         ordering = ["scheduled_date", "scheduled_time"]
+        indexes = [
+            models.Index(fields=["scheduled_date", "scheduled_time"], name="med_intake_slot_idx"),
+        ]
 
     def __str__(self):
         return (
@@ -1,8 +1,10 @@
 """
 Service d'envoi des rappels de médicaments via push notification.
 
-Appelé par la management command `send_medication_reminders`
-toutes les minutes (via le scheduler Docker).
+`send_reminders` est utilisé par le scheduler (services/scheduler.py,
+commande `run_medication_scheduler`) ; `send_due_medication_reminders`
+reste disponible pour un lancement ponctuel (`send_medication_reminders`).
+Tous les rappels d'un passage partent dans un seul PushBatch.
 """
 
 import logging  # NOSONAR
@@ -11,7 +13,8 @@ from datetime import timedelta
 from django.utils import timezone
 
 from apps.medications.models import IntakeStatus, MedicationIntake
-from apps.notifications.services.push import send_push_to_user
+from apps.notifications.services import PushBatch
+from apps.notifications.services.batch import NO_TOKENS
 
 logger = logging.getLogger(__name__)  # NOSONAR
 
@@ -19,6 +22,64 @@ logger = logging.getLogger(__name__)  # NOSONAR
 REMINDER_WINDOW_SECONDS = 30
 
 
+def send_reminders(intakes) -> dict:
+    """
+    Envoie en un seul PushBatch les rappels des prises données (queryset ou
+    liste, avec user_medication__medication chargé) et marque reminder_sent_at
+    sur celles traitées (envoyées, ou utilisateur sans appareil). Les prises
+    en erreur restent non marquées pour un nouvel essai.
+
+    Returns:
+        dict avec les stats : sent, skipped, errors
+    """
+    stats = {"sent": 0, "skipped": 0, "errors": 0}
+
+    batch = PushBatch("medication_reminders")
+    handles = []
+    for intake in intakes:
+        med_name = intake.user_medication.display_name
+        handle = batch.add(
+            intake.user_medication.user_id,
+            title=" Glycopilot: 💊 Rappel médicament",
+            body=f"C'est l'heure de prendre votre médicament {med_name}",
+            data={
+                "type": "medication_reminder",
+                "intake_id": intake.id,
+                "medication_name": med_name,
+                "scheduled_time": str(intake.scheduled_time),
+            },
+        )
+        handles.append((intake, handle))
+
+    try:
+        results = batch.flush()
+    except Exception as e:
+        logger.error("[REMINDER] batch error: %s", e)
+        stats["errors"] = len(handles)
+        return stats
+
+    handled = []
+    for intake, handle in handles:
+        result = results[handle]
+        if result.get("success"):
+            stats["sent"] += 1
+            handled.append(intake.id)
+            logger.info("[REMINDER] sent intake=%s at=%s", intake.id, intake.scheduled_time)
+        elif result.get("error") == NO_TOKENS:
+            stats["skipped"] += 1
+            handled.append(intake.id)
+            logger.info("[REMINDER] skipped intake=%s reason=%s", intake.id, result.get("error"))
+        else:
+            stats["errors"] += 1
+            logger.error("[REMINDER] error intake=%s: %s", intake.id, result.get("error"))
+
+    if handled:
+        MedicationIntake.objects.filter(id__in=handled).update(reminder_sent_at=timezone.now())
+
+    logger.info("[REMINDER] done sent=%s skipped=%s errors=%s", stats["sent"], stats["skipped"], stats["errors"])
+    return stats
+
+
 def send_due_medication_reminders() -> dict:
     """
     Envoie les rappels push pour les prises prévues dans la prochaine minute.
@@ -39,37 +100,8 @@ def send_due_medication_reminders() -> dict:
             scheduled_time__lte=window_end,
             status=IntakeStatus.PENDING,
             schedule__reminder_enabled=True,
+            reminder_sent_at__isnull=True,
         )
-        .select_related("user_medication__user", "user_medication__medication", "schedule")
+        .select_related("user_medication__medication", "schedule")
     )
-
-    stats = {"sent": 0, "skipped": 0, "errors": 0}
-
-    for intake in due_intakes:
-        user = intake.user_medication.user
-        med_name = intake.user_medication.display_name
-
-        try:
-            result = send_push_to_user(
-                user=user,
-                title=" Glycopilot: 💊 Rappel médicament",
-                body=f"C'est l'heure de prendre votre médicament {med_name}",
-                data={
-                    "type": "medication_reminder",
-                    "intake_id": intake.id,
-                    "medication_name": med_name,
-                    "scheduled_time": str(intake.scheduled_time),
-                },
-            )
-            if result.get("success"):
-                stats["sent"] += 1
-                logger.info("[REMINDER] sent intake=%s at=%s", intake.id, intake.scheduled_time)
-            else:
-                stats["skipped"] += 1
-                logger.info("[REMINDER] skipped intake=%s reason=%s", intake.id, result.get("error"))
-        except Exception as e:
-            stats["errors"] += 1
-            logger.error("[REMINDER] error intake=%s: %s", intake.id, e)
-
-    logger.info("[REMINDER] done sent=%s skipped=%s errors=%s", stats["sent"], stats["skipped"], stats["errors"])
-    return stats
+    return send_reminders(due_intakes)
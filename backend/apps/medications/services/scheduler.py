@@ -0,0 +1,172 @@
+"""
+Planification des rappels de médicaments.
+
+- `materialize_intakes` crée en masse les MedicationIntake du jour pour
+  tous les schedules actifs (ceux qui n'ont pas encore leur ligne), sans
+  attendre que le patient ouvre l'application ;
+- `ReminderQueue` est une file de priorité (tas) des rappels du jour par
+  instant de déclenchement : heure prévue, ou `snoozed_until` pour une
+  prise reportée ;
+- `mark_missed_intakes` passe en MISSED les prises restées sans réponse
+  MISSED_AFTER après leur heure.
+
+La boucle (commande `run_medication_scheduler`) recharge la file toutes les
+quelques minutes et dort jusqu'au prochain rappel : un rappel part à sa
+minute exacte, et un tour à vide ne coûte aucune requête. Un rechargement
+reprend tous les rappels non envoyés encore dans MISSED_AFTER : un arrêt du
+scheduler retarde les rappels sans les perdre. Un report (snooze) incrémente
+un compteur en cache (`notify_queue_changed`) : la boucle recharge sa file
+au tour suivant sans attendre l'intervalle.
+"""
+
+from __future__ import annotations
+
+import heapq
+from datetime import date, datetime, timedelta
+
+from django.core.cache import cache
+from django.db import models
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from apps.medications.models import IntakeStatus, MedicationIntake, MedicationSchedule
+
+MISSED_AFTER = timedelta(hours=2)
+QUEUE_VERSION_KEY = "medications:reminder_queue:version"
+
+
+def active_schedules(day: date):
+    """Schedules des traitements actifs ce jour-là."""
+    return MedicationSchedule.objects.filter(
+        user_medication__statut=True,
+        user_medication__start_date__lte=day,
+    ).filter(Q(user_medication__end_date__isnull=True) | Q(user_medication__end_date__gte=day))
+
+
+def materialize_intakes(day: date, user=None) -> int:
+    """
+    Crée les prises PENDING manquantes du jour ; retourne le nombre créé.
+    Une seule requête de lecture (anti-jointure) et un bulk_create.
+    """
+    existing = MedicationIntake.objects.filter(
+        user_medication=OuterRef("user_medication"),
+        scheduled_date=day,
+        scheduled_time=OuterRef("time"),
+    )
+    schedules = active_schedules(day).filter(~Exists(existing))
+    if user is not None:
+        schedules = schedules.filter(user_medication__user=user)
+
+    intakes = [
+        MedicationIntake(
+            user_medication_id=user_medication_id,
+            schedule_id=schedule_id,
+            scheduled_date=day,
+            scheduled_time=scheduled_time,
+            status=IntakeStatus.PENDING,
+        )
+        for schedule_id, user_medication_id, scheduled_time in schedules.values_list(
+            "id", "user_medication_id", "time"
+        )
+    ]
+    # ignore_conflicts : course possible avec la vue `today`.
+    MedicationIntake.objects.bulk_create(intakes, batch_size=1000, ignore_conflicts=True)
+    return len(intakes)
+
+
+def day_intakes(day: date, user) -> models.QuerySet:
+    """Prises du jour de l'utilisateur correspondant à un schedule actif (une requête)."""
+    scheduled = active_schedules(day).filter(
+        user_medication=OuterRef("user_medication"), time=OuterRef("scheduled_time")
+    )
+    return MedicationIntake.objects.filter(
+        Exists(scheduled), user_medication__user=user, scheduled_date=day
+    )
+
+
+def mark_missed_intakes(now: datetime | None = None) -> int:
+    """Passe en MISSED les prises sans réponse depuis MISSED_AFTER."""
+    cutoff = timezone.localtime((now or timezone.now()) - MISSED_AFTER)
+    overdue = Q(status=IntakeStatus.PENDING) & (
+        Q(scheduled_date__lt=cutoff.date())
+        | Q(scheduled_date=cutoff.date(), scheduled_time__lte=cutoff.time())
+    )
+    overdue |= Q(status=IntakeStatus.SNOOZED, snoozed_until__lte=cutoff)
+    return MedicationIntake.objects.filter(overdue).update(
+        status=IntakeStatus.MISSED, snoozed_until=None, updated_at=timezone.now()
+    )
+
+
+def notify_queue_changed() -> None:
+    """Une prise a changé d'échéance (report) : la file est rechargée au prochain tour."""
+    try:
+        cache.incr(QUEUE_VERSION_KEY)
+    except ValueError:
+        cache.add(QUEUE_VERSION_KEY, 1, None)
+
+
+def fire_at(day: date, scheduled_time, snoozed_until: datetime | None = None) -> datetime:
+    if snoozed_until is not None:
+        return snoozed_until
+    return timezone.make_aware(datetime.combine(day, scheduled_time))
+
+
+class ReminderQueue:
+    """Tas (instant de déclenchement, id de prise) des rappels du jour."""
+
+    def __init__(self):
+        self._heap: list[tuple[datetime, int]] = []
+        self._version = None
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def reload(self, day: date, now: datetime | None = None):
+        """
+        Reconstruit la file depuis la base : rappels non envoyés du jour (et
+        de la veille, pour le passage de minuit) échus depuis moins de
+        MISSED_AFTER ou à venir.
+        """
+        # Lu avant la requête : un report concurrent provoquera un nouveau rechargement.
+        self._version = cache.get(QUEUE_VERSION_KEY)
+        since = (now or timezone.now()) - MISSED_AFTER
+        rows = MedicationIntake.objects.filter(
+            scheduled_date__in=(day - timedelta(days=1), day),
+            status__in=(IntakeStatus.PENDING, IntakeStatus.SNOOZED),
+            schedule__reminder_enabled=True,
+            reminder_sent_at__isnull=True,
+        ).values_list("id", "scheduled_date", "scheduled_time", "status", "snoozed_until")
+
+        heap = []
+        for intake_id, scheduled_date, scheduled_time, status, snoozed_until in rows:
+            at = fire_at(scheduled_date, scheduled_time, snoozed_until if status == IntakeStatus.SNOOZED else None)
+            if at >= since:
+                heap.append((at, intake_id))
+        heapq.heapify(heap)
+        self._heap = heap
+
+    def is_stale(self) -> bool:
+        """Un report a eu lieu depuis le dernier rechargement (une lecture de cache)."""
+        return cache.get(QUEUE_VERSION_KEY) != self._version
+
+    def next_at(self) -> datetime | None:
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: datetime) -> list[int]:
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            due.append(heapq.heappop(self._heap)[1])
+        return due
+
+
+def due_intakes(intake_ids: list[int], now: datetime) -> models.QuerySet:
+    """
+    Prises encore à rappeler parmi celles sorties de la file. Une prise
+    reportée depuis le chargement de la file attend son `snoozed_until`.
+    """
+    return MedicationIntake.objects.filter(
+        Q(status=IntakeStatus.PENDING) | Q(status=IntakeStatus.SNOOZED, snoozed_until__lte=now),
+        id__in=intake_ids,
+        schedule__reminder_enabled=True,
+        reminder_sent_at__isnull=True,
+    ).select_related("user_medication__medication")
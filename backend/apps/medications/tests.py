@@ -1,8 +1,11 @@
 """Tests for medications app."""
 
 import datetime
+from io import StringIO
 from unittest.mock import MagicMock, patch
 
+import requests
+from django.core.management import call_command
 from django.test import TestCase
 from django.utils import timezone
 from rest_framework.test import APIClient
@@ -19,6 +22,9 @@ from apps.medications.models import (
 )
 from apps.medications.serializers import UserMedicationCreateSerializer
 from apps.medications.services.reminders import send_due_medication_reminders
+from apps.medications.services.scheduler import ReminderQueue, mark_missed_intakes, materialize_intakes
+from apps.notifications.models import PushToken
+from apps.notifications.services import tokens
 
 
 def make_user(email="test@example.com"):
@@ -169,6 +175,24 @@ class MedicationViewSetTest(TestCase):
         response = self.client.get("/api/medications/log/today/")
         self.assertEqual(response.status_code, 200)
 
+    def test_today_materializes_in_bulk_with_constant_queries(self):
+        for i in range(6):
+            make_user_medication(
+                self.user, f"Med {i}", [datetime.time(8, 0), datetime.time(13, 0), datetime.time(20, 0)]
+            )
+        ended = make_user_medication(self.user, "Fini")
+        ended.end_date = timezone.localdate() - datetime.timedelta(days=1)
+        ended.save()
+
+        with self.assertNumQueries(3):
+            response = self.client.get("/api/medications/log/today/")
+        self.assertEqual(len(response.data), 18)
+
+        with self.assertNumQueries(2):
+            response = self.client.get("/api/medications/log/today/")
+        self.assertEqual(len(response.data), 18)
+        self.assertEqual(MedicationIntake.objects.filter(scheduled_date=timezone.localdate()).count(), 18)
+
     def test_delete_medication(self):
         med = make_user_medication(self.user, "ToDelete")
         response = self.client.delete(f"/api/medications/log/{med.id}/")
@@ -295,9 +319,21 @@ FIXED_DATE = datetime.date(2026, 5, 9)
 FIXED_TIME = datetime.time(12, 0, 0)
 
 
+def expo_accepts_all(mock_post):
+    """Réponse Expo simulée : un ticket "ok" par message envoyé."""
+
+    def respond(url, json):
+        response = MagicMock()
+        response.json.return_value = {"data": [{"status": "ok"} for _ in json]}
+        return response
+
+    mock_post.side_effect = respond
+
+
 class MedicationReminderServiceTest(TestCase):
     def setUp(self):
         self.user = make_user("reminder@test.com")
+        PushToken.objects.create(user=self.user, token="ExponentPushToken[reminder]")
 
     def _create_intake(self, name="Doliprane", status=IntakeStatus.PENDING,
                        reminder_enabled=True, scheduled_time=FIXED_TIME):
@@ -314,9 +350,9 @@ class MedicationReminderServiceTest(TestCase):
         )
 
     @patch("apps.medications.services.reminders.timezone")
-    @patch("apps.medications.services.reminders.send_push_to_user")
+    @patch("apps.notifications.services.push._client.post")
     def test_sends_notification_for_due_intake(self, mock_push, mock_tz):
-        mock_push.return_value = {"success": True, "sent": 1}
+        expo_accepts_all(mock_push)
         mock_tz.now.return_value = FIXED_NOW
         mock_tz.localtime.return_value = FIXED_LOCAL
         mock_tz.localdate.return_value = FIXED_DATE
@@ -326,14 +362,15 @@ class MedicationReminderServiceTest(TestCase):
 
         self.assertEqual(stats["sent"], 1)
         self.assertEqual(stats["errors"], 0)
-        call_kwargs = mock_push.call_args[1]
-        self.assertIn("Doliprane", call_kwargs["body"])
-        self.assertEqual(call_kwargs["title"], " Glycopilot: 💊 Rappel médicament")
+        [message] = mock_push.call_args[1]["json"]
+        self.assertEqual(message["to"], "ExponentPushToken[reminder]")
+        self.assertIn("Doliprane", message["body"])
+        self.assertEqual(message["title"], " Glycopilot: 💊 Rappel médicament")
 
     @patch("apps.medications.services.reminders.timezone")
-    @patch("apps.medications.services.reminders.send_push_to_user")
+    @patch("apps.notifications.services.push._client.post")
     def test_skips_reminder_disabled(self, mock_push, mock_tz):
-        mock_push.return_value = {"success": True, "sent": 1}
+        expo_accepts_all(mock_push)
         mock_tz.now.return_value = FIXED_NOW
         mock_tz.localtime.return_value = FIXED_LOCAL
         mock_tz.localdate.return_value = FIXED_DATE
@@ -345,7 +382,7 @@ class MedicationReminderServiceTest(TestCase):
         mock_push.assert_not_called()
 
     @patch("apps.medications.services.reminders.timezone")
-    @patch("apps.medications.services.reminders.send_push_to_user")
+    @patch("apps.notifications.services.push._client.post")
     def test_skips_taken_intakes(self, mock_push, mock_tz):
         mock_tz.now.return_value = FIXED_NOW
         mock_tz.localtime.return_value = FIXED_LOCAL
@@ -358,9 +395,9 @@ class MedicationReminderServiceTest(TestCase):
         mock_push.assert_not_called()
 
     @patch("apps.medications.services.reminders.timezone")
-    @patch("apps.medications.services.reminders.send_push_to_user")
+    @patch("apps.notifications.services.push._client.post")
     def test_handles_push_error(self, mock_push, mock_tz):
-        mock_push.side_effect = Exception("Push failed")
+        mock_push.side_effect = requests.exceptions.ConnectionError("Push failed")
         mock_tz.now.return_value = FIXED_NOW
         mock_tz.localtime.return_value = FIXED_LOCAL
         mock_tz.localdate.return_value = FIXED_DATE
@@ -371,9 +408,10 @@ class MedicationReminderServiceTest(TestCase):
         self.assertEqual(stats["errors"], 1)
 
     @patch("apps.medications.services.reminders.timezone")
-    @patch("apps.medications.services.reminders.send_push_to_user")
+    @patch("apps.notifications.services.push._client.post")
     def test_no_tokens_counted_as_skipped(self, mock_push, mock_tz):
-        mock_push.return_value = {"success": False, "error": "No active tokens for user"}
+        PushToken.objects.filter(user=self.user).update(is_active=False)
+        tokens.invalidate(self.user.pk)
         mock_tz.now.return_value = FIXED_NOW
         mock_tz.localtime.return_value = FIXED_LOCAL
         mock_tz.localdate.return_value = FIXED_DATE
@@ -384,9 +422,9 @@ class MedicationReminderServiceTest(TestCase):
         self.assertEqual(stats["skipped"], 1)
 
     @patch("apps.medications.services.reminders.timezone")
-    @patch("apps.medications.services.reminders.send_push_to_user")
+    @patch("apps.notifications.services.push._client.post")
     def test_returns_stats_dict(self, mock_push, mock_tz):
-        mock_push.return_value = {"success": True, "sent": 1}
+        expo_accepts_all(mock_push)
         mock_tz.now.return_value = FIXED_NOW
         mock_tz.localtime.return_value = FIXED_LOCAL
         mock_tz.localdate.return_value = FIXED_DATE
@@ -397,9 +435,9 @@ class MedicationReminderServiceTest(TestCase):
         self.assertIn("errors", stats)
 
     @patch("apps.medications.services.reminders.timezone")
-    @patch("apps.medications.services.reminders.send_push_to_user")
+    @patch("apps.notifications.services.push._client.post")
     def test_ignores_future_intakes(self, mock_push, mock_tz):
-        mock_push.return_value = {"success": True, "sent": 1}
+        expo_accepts_all(mock_push)
         mock_tz.now.return_value = FIXED_NOW
         mock_tz.localtime.return_value = FIXED_LOCAL
         mock_tz.localdate.return_value = FIXED_DATE
@@ -409,3 +447,123 @@ class MedicationReminderServiceTest(TestCase):
         stats = send_due_medication_reminders()
 
         self.assertEqual(stats["sent"], 0)
+
+
+class MedicationSchedulerTest(TestCase):
+    def setUp(self):
+        self.user = make_user("scheduler@test.com")
+        PushToken.objects.create(user=self.user, token="ExponentPushToken[scheduler]")
+
+    def _intakes(self, day=FIXED_DATE):
+        return MedicationIntake.objects.filter(scheduled_date=day).order_by("scheduled_time")
+
+    def test_materialize_creates_missing_intakes_for_active_schedules(self):
+        with patch("django.utils.timezone.now", return_value=FIXED_NOW):
+            make_user_medication(self.user, "Metformine", [datetime.time(8, 0), datetime.time(20, 0)])
+            ended = make_user_medication(self.user, "Ancien")
+            ended.end_date = FIXED_DATE - datetime.timedelta(days=1)
+            ended.save()
+            paused = make_user_medication(make_user("paused@test.com"), "Pause")
+            paused.statut = False
+            paused.save()
+
+        with self.assertNumQueries(2):
+            self.assertEqual(materialize_intakes(FIXED_DATE), 2)
+        self.assertEqual(materialize_intakes(FIXED_DATE), 0)  # idempotent
+
+        intakes = self._intakes()
+        self.assertEqual([i.scheduled_time for i in intakes], [datetime.time(8, 0), datetime.time(20, 0)])
+        self.assertTrue(all(i.status == IntakeStatus.PENDING and i.schedule_id for i in intakes))
+
+    def test_queue_orders_reminders_and_uses_snoozed_until(self):
+        with patch("django.utils.timezone.now", return_value=FIXED_NOW):
+            make_user_medication(self.user, "Doliprane", [datetime.time(12, 30), datetime.time(14, 0)])
+        materialize_intakes(FIXED_DATE)
+        early, late = self._intakes()
+        late.status = IntakeStatus.SNOOZED
+        late.snoozed_until = FIXED_NOW + datetime.timedelta(minutes=10)
+        late.save()
+
+        queue = ReminderQueue()
+        queue.reload(FIXED_DATE, FIXED_NOW)
+
+        self.assertEqual(len(queue), 2)
+        self.assertEqual(queue.next_at(), FIXED_NOW + datetime.timedelta(minutes=10))
+        self.assertEqual(queue.pop_due(FIXED_NOW), [])
+        self.assertEqual(queue.pop_due(FIXED_NOW + datetime.timedelta(hours=1)), [late.id, early.id])
+
+    def test_queue_catches_up_unsent_reminders_within_missed_after(self):
+        with patch("django.utils.timezone.now", return_value=FIXED_NOW):
+            make_user_medication(self.user, "Doliprane", [datetime.time(9, 30), datetime.time(11, 0)])
+        materialize_intakes(FIXED_DATE)
+        too_old, late = self._intakes()
+
+        # Scheduler arrêté depuis 11:00 (12:00 locale) : le rappel d'il y a une heure part encore.
+        queue = ReminderQueue()
+        queue.reload(FIXED_DATE, FIXED_NOW)
+
+        self.assertEqual(queue.pop_due(FIXED_NOW), [late.id])
+        self.assertEqual(len(queue), 0)
+
+    def test_snooze_makes_the_queue_reload(self):
+        from django.core.cache import cache
+
+        cache.clear()
+        with patch("django.utils.timezone.now", return_value=FIXED_NOW):
+            make_user_medication(self.user, "Doliprane", [datetime.time(11, 0)])
+        materialize_intakes(FIXED_DATE)
+        intake = self._intakes().get()
+        queue = ReminderQueue()
+        queue.reload(FIXED_DATE, FIXED_NOW)
+        self.assertFalse(queue.is_stale())
+
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        snoozed_until = FIXED_NOW + datetime.timedelta(minutes=5)
+        with self.captureOnCommitCallbacks(execute=True):
+            client.post(
+                f"/api/medications/intakes/{intake.id}/action/",
+                {"action": "snoozed", "snoozed_until": snoozed_until.isoformat()},
+                format="json",
+            )
+
+        self.assertTrue(queue.is_stale())
+        queue.reload(FIXED_DATE, FIXED_NOW)
+        self.assertFalse(queue.is_stale())
+        self.assertEqual(queue.next_at(), snoozed_until)
+
+    def test_mark_missed_intakes_after_grace_period(self):
+        with patch("django.utils.timezone.now", return_value=FIXED_NOW):
+            make_user_medication(
+                self.user, "Insuline", [datetime.time(8, 0), datetime.time(9, 0), datetime.time(11, 0)]
+            )
+        materialize_intakes(FIXED_DATE)
+        MedicationIntake.objects.filter(scheduled_time=datetime.time(9, 0)).update(status=IntakeStatus.TAKEN)
+
+        self.assertEqual(mark_missed_intakes(FIXED_NOW), 1)  # 12:00 locale : seule 08:00 dépasse 2 h
+        statuses = list(self._intakes().values_list("status", flat=True))
+        self.assertEqual(statuses, [IntakeStatus.MISSED, IntakeStatus.TAKEN, IntakeStatus.PENDING])
+
+    @patch("apps.notifications.services.push._client.post")
+    def test_scheduler_command_sends_due_reminders_once(self, mock_post):
+        expo_accepts_all(mock_post)
+        with patch("django.utils.timezone.now", return_value=FIXED_NOW):
+            make_user_medication(self.user, "Doliprane", [datetime.time(11, 58), datetime.time(18, 0)])
+            call_command("run_medication_scheduler", "--once", stdout=StringIO())
+            call_command("run_medication_scheduler", "--once", stdout=StringIO())
+
+        mock_post.assert_called_once()
+        [message] = mock_post.call_args.kwargs["json"]
+        self.assertEqual(message["data"]["intake_id"], self._intakes()[0].id)
+        self.assertIsNotNone(self._intakes()[0].reminder_sent_at)
+        self.assertIsNone(self._intakes()[1].reminder_sent_at)
+
+    @patch("apps.glycemia.services.partitioning.ensure_partitions", return_value=["glycemia_histo_2026_08"])
+    def test_scheduler_command_ensures_glycemia_partitions_each_day(self, ensure):
+        with patch("django.utils.timezone.now", return_value=FIXED_NOW):
+            call_command("run_medication_scheduler", "--once", stdout=StringIO())
+        ensure.assert_called_once_with()
+
+        ensure.side_effect = RuntimeError("db down")
+        with patch("django.utils.timezone.now", return_value=FIXED_NOW):
+            call_command("run_medication_scheduler", "--once", stdout=StringIO(), stderr=StringIO())
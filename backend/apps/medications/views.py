@@ -1,6 +1,7 @@
 import datetime
 import logging
 
+from django.db import transaction
 from django.utils import timezone
 from rest_framework import permissions, viewsets
 from rest_framework.decorators import action, api_view, permission_classes
@@ -23,6 +24,7 @@ from .serializers import (
     UserMedicationCreateSerializer,
     UserMedicationSerializer,
 )
+from .services.scheduler import day_intakes, materialize_intakes, notify_queue_changed
 
 logger = logging.getLogger(__name__)
 
@@ -71,34 +73,13 @@ class UserMedicationViewSet(viewsets.ModelViewSet):
     def today(self, request):
         """
         Returns today's scheduled doses with their intake status.
-        Creates pending MedicationIntake records on demand if missing.
+        Missing pending MedicationIntake records are created in bulk:
+        2 queries when the day is already materialized, 3 otherwise.
         """
         today = timezone.localdate()
-        active_meds = self.get_queryset().filter(
-            statut=True,
-            start_date__lte=today,
-        ).filter(
-            models_end_date_filter(today)
-        )
-
-        intake_ids = []
-        for user_med in active_meds:
-            for schedule in user_med.schedules.all():
-                intake, _ = MedicationIntake.objects.get_or_create(
-                    user_medication=user_med,
-                    scheduled_date=today,
-                    scheduled_time=schedule.time,
-                    defaults={
-                        "schedule": schedule,
-                        "status": IntakeStatus.PENDING,
-                    },
-                )
-                intake_ids.append(intake.id)
-
-        # Re-requêter avec select_related pour garantir que
-        # user_medication.medication est chargé (évite display_name=None)
+        materialize_intakes(today, user=request.user)
         intakes = (
-            MedicationIntake.objects.filter(id__in=intake_ids)
+            day_intakes(today, request.user)
             .select_related(
                 "user_medication__medication",
                 "user_medication__user",
@@ -111,13 +92,6 @@ class UserMedicationViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
-def models_end_date_filter(today):
-    """Returns a Q object to filter medications active today."""
-    from django.db.models import Q
-
-    return Q(end_date__isnull=True) | Q(end_date__gte=today)
-
-
 class MedicationScheduleViewSet(viewsets.ModelViewSet):
     """
     CRUD ViewSet for medication schedules (dose times).
@@ -197,6 +171,8 @@ class MedicationIntakeViewSet(viewsets.ModelViewSet):
         elif action_value == IntakeStatus.SNOOZED:
             intake.status = IntakeStatus.SNOOZED
             intake.snoozed_until = serializer.validated_data["snoozed_until"]
+            intake.reminder_sent_at = None  # new reminder at snoozed_until
+            transaction.on_commit(notify_queue_changed)
 
         intake.save()
         return Response(MedicationIntakeSerializer(intake).data)
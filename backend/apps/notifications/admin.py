@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import Notification, PushToken, UserNotification
+from .models import Notification, PushTicket, PushToken, UserNotification
 
 
 @admin.register(Notification)
@@ -33,3 +33,10 @@ class PushTokenAdmin(admin.ModelAdmin):
     def token_preview(self, obj):
         return obj.token[:35] + "..."
     token_preview.short_description = "Token"
+
+
+@admin.register(PushTicket)
+class PushTicketAdmin(admin.ModelAdmin):
+    list_display = ("ticket_id", "token", "created_at")
+    search_fields = ("ticket_id", "token")
+    date_hierarchy = "created_at"
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from apps.notifications.services.receipts import process_receipts
+
+
+class Command(BaseCommand):
+    help = "Vérifie les reçus Expo des notifications envoyées et désactive les tokens morts"
+
+    def handle(self, *args, **kwargs):
+        stats = process_receipts()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Reçus vérifiés: {stats['checked']} | erreurs: {stats['errors']} | "
+                f"tokens désactivés: {stats['deactivated']} | en attente: {stats['pending']} | "
+                f"expirés: {stats['expired']}"
+            )
+        )
@@ -63,3 +63,20 @@ class PushToken(models.Model):
 
     def __str__(self):
         return f"{self.user.email} - {self.device_type} - {self.token[:20]}..."
+
+
+class PushTicket(models.Model):
+    """
+    Ticket Expo d'un message accepté, en attente de son reçu.
+    Traité puis supprimé par la commande `process_push_receipts`.
+    """
+
+    ticket_id = models.CharField(max_length=64, unique=True)
+    token = models.CharField(max_length=255)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        db_table = "push_tickets"
+
+    def __str__(self):
+        return f"{self.ticket_id} - {self.token[:20]}..."
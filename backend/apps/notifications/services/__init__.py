@@ -1,5 +1,6 @@
 """Notification services."""
 
+from .batch import PushBatch
 from .push import send_push_notification, send_push_to_user
 
-__all__ = ["send_push_notification", "send_push_to_user"]
+__all__ = ["PushBatch", "send_push_notification", "send_push_to_user"]
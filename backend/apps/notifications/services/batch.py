@@ -0,0 +1,90 @@
+"""
+Envoi groupé de notifications push.
+
+`PushBatch` accumule des notifications destinées à des utilisateurs, puis
+`flush()` :
+- résout les tokens actifs de tous les destinataires en une passe (cache) ;
+- envoie l'ensemble par paquets Expo de EXPO_CHUNK_SIZE messages ;
+- retourne un résultat par notification ajoutée (même format que
+  `send_push_to_user`) et journalise le débit du lot.
+
+    batch = PushBatch("reminders")
+    handle = batch.add(user.pk, "Titre", "Message", {"type": "..."})
+    results = batch.flush()
+    results[handle]  # {"success": True, "sent": 1}
+"""
+
+from __future__ import annotations
+
+import logging
+from typing import Any
+
+from .push import _build_messages, deliver_messages
+from .tokens import active_tokens_for
+
+logger = logging.getLogger(__name__)
+
+NO_TOKENS = "No active tokens for user"
+
+
+class PushBatch:
+    def __init__(self, label: str = "push"):
+        self.label = label
+        self.report = None
+        self._pending: list[tuple] = []
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def add(
+        self,
+        user_id,
+        title: str,
+        body: str,
+        data: dict[str, Any] | None = None,
+        sound: str = "default",
+        priority: str = "high",
+    ) -> int:
+        """Ajoute une notification ; retourne son index dans le résultat de flush()."""
+        self._pending.append((user_id, title, body, data, sound, priority))
+        return len(self._pending) - 1
+
+    def flush(self) -> list[dict]:
+        pending, self._pending = self._pending, []
+        if not pending:
+            return []
+
+        tokens_by_user = active_tokens_for({user_id for user_id, *_ in pending})
+        messages: list[dict] = []
+        owners: list[int] = []
+        for index, (user_id, title, body, data, sound, priority) in enumerate(pending):
+            built = _build_messages(tokens_by_user.get(user_id, []), title, body, data, sound, priority)
+            messages.extend(built)
+            owners.extend([index] * len(built))
+
+        results = [{"success": False, "error": NO_TOKENS} for _ in pending]
+        if not messages:
+            return results
+
+        self.report = deliver_messages(messages)
+        per_item: dict[int, list] = {}
+        for owner, message, error in zip(owners, messages, self.report.errors):
+            per_item.setdefault(owner, []).append((message["to"], error))
+
+        for index, outcomes in per_item.items():
+            errors = [{"token": token, "error": error} for token, error in outcomes if error is not None]
+            sent = len(outcomes) - len(errors)
+            if sent:
+                results[index] = {"success": True, "sent": sent}
+                if errors:
+                    results[index]["errors"] = errors
+            else:
+                results[index] = {"success": False, "error": errors[0]["error"], "errors": errors}
+
+        stats = self.report.as_dict()
+        logger.info(
+            f"[PUSH] batch={self.label} notifications={len(pending)} messages={stats['messages']} "
+            f"chunks={stats['chunks']} sent={stats['sent']} errors={stats['errors']} "
+            f"duration_ms={stats['duration_ms']} rate={stats['per_second']}/s"
+        )
+        return results
@@ -3,18 +3,37 @@ Push notification service using Expo Push API.
 
 Expo Push API is free and handles both iOS and Android.
 Documentation: https://docs.expo.dev/push-notifications/sending-notifications/
+
+Messages are sent in chunks of EXPO_CHUNK_SIZE (Expo's limit per request)
+over the pooled `expo_push` client. Accepted tickets are stored as
+PushTicket rows; their receipts are checked later by `receipts.py`.
 """
 
 import logging
+import time
+from dataclasses import dataclass, field
 from typing import Any
 
 import requests
 
-from apps.notifications.models import PushToken
+from apps.notifications.models import PushTicket, PushToken
+from utils import http_client
+
+from . import tokens as token_cache
 
 logger = logging.getLogger(__name__)
 
 EXPO_PUSH_URL = "https://exp.host/--/api/v2/push/send"
+EXPO_CHUNK_SIZE = 100
+
+# Envoi non idempotent : rejoué seulement si la connexion n'a pas abouti.
+_client = http_client.get_client(
+    "expo_push",
+    timeout=(3.0, 10.0),
+    max_concurrency=4,
+    retries=2,
+    headers={"Content-Type": "application/json", "Accept": "application/json"},
+)
 
 
 def _build_messages(
@@ -41,8 +60,23 @@ def _build_messages(
     return messages
 
 
+def deactivate_tokens(tokens: list[str]) -> int:
+    """Désactive des tokens morts (DeviceNotRegistered) et invalide le cache de leurs utilisateurs."""
+    if not tokens:
+        return 0
+    queryset = PushToken.objects.filter(token__in=tokens, is_active=True)
+    user_ids = set(queryset.values_list("user_id", flat=True))
+    updated = queryset.update(is_active=False)
+    if user_ids:
+        token_cache.invalidate(*user_ids)
+    for token in tokens:
+        logger.info(f"Deactivated invalid token: {token[:20]}...")
+    return updated
+
+
 def _process_ticket_errors(tokens: list[str], tickets: list[dict]) -> list[dict]:
     errors = []
+    dead = []
     for i, ticket in enumerate(tickets):
         if ticket.get("status") != "error":
             continue
@@ -52,12 +86,91 @@ def _process_ticket_errors(tokens: list[str], tickets: list[dict]) -> list[dict]
                 "error": ticket.get("message", "Unknown error"),
             }
         )
-        if ticket.get("details", {}).get("error") == "DeviceNotRegistered":
-            PushToken.objects.filter(token=tokens[i]).update(is_active=False)
-            logger.info(f"Deactivated invalid token: {tokens[i][:20]}...")
+        if ticket.get("details", {}).get("error") == "DeviceNotRegistered" and i < len(tokens):
+            dead.append(tokens[i])
+    deactivate_tokens(dead)
     return errors
 
 
+def _record_tickets(tokens: list[str], tickets: list[dict]):
+    """Conserve les tickets acceptés pour la vérification différée des reçus."""
+    pending = [
+        PushTicket(ticket_id=ticket["id"], token=token)
+        for token, ticket in zip(tokens, tickets)
+        if ticket.get("status") == "ok" and ticket.get("id")
+    ]
+    if pending:
+        PushTicket.objects.bulk_create(pending, ignore_conflicts=True)
+
+
+@dataclass
+class DeliveryReport:
+    """Résultat d'un envoi : une erreur (ou None) par message, dans l'ordre."""
+
+    errors: list = field(default_factory=list)
+    chunks: int = 0
+    failed_chunks: int = 0
+    transport_error: str | None = None
+    duration_ms: float = 0.0
+
+    @property
+    def sent(self) -> int:
+        return sum(1 for error in self.errors if error is None)
+
+    @property
+    def throughput(self) -> float:
+        """Messages acceptés par seconde."""
+        return round(self.sent / (self.duration_ms / 1000), 1) if self.duration_ms else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "messages": len(self.errors),
+            "sent": self.sent,
+            "errors": len(self.errors) - self.sent,
+            "chunks": self.chunks,
+            "failed_chunks": self.failed_chunks,
+            "duration_ms": round(self.duration_ms, 1),
+            "per_second": self.throughput,
+        }
+
+
+def _send_chunk(messages: list[dict]) -> list[str | None]:
+    response = _client.post(EXPO_PUSH_URL, json=messages)
+    response.raise_for_status()
+    tickets = response.json().get("data", [])
+
+    tokens = [message["to"] for message in messages]
+    _process_ticket_errors(tokens, tickets)
+    _record_tickets(tokens, tickets)
+
+    outcome = []
+    for i in range(len(messages)):
+        ticket = tickets[i] if i < len(tickets) else {"status": "error", "message": "Missing ticket"}
+        outcome.append(ticket.get("message", "Unknown error") if ticket.get("status") == "error" else None)
+    return outcome
+
+
+def deliver_messages(messages: list[dict]) -> DeliveryReport:
+    """
+    Envoie des messages Expo déjà construits, par paquets de EXPO_CHUNK_SIZE.
+    Un paquet en échec réseau n'empêche pas l'envoi des suivants.
+    """
+    report = DeliveryReport()
+    started = time.perf_counter()
+    for start in range(0, len(messages), EXPO_CHUNK_SIZE):
+        chunk = messages[start : start + EXPO_CHUNK_SIZE]
+        report.chunks += 1
+        try:
+            report.errors.extend(_send_chunk(chunk))
+        except (requests.exceptions.RequestException, ValueError) as e:
+            logger.error(f"Failed to send push notification chunk ({len(chunk)} messages): {e}")
+            report.failed_chunks += 1
+            report.transport_error = str(e)
+            report.errors.extend([str(e)] * len(chunk))
+    report.duration_ms = (time.perf_counter() - started) * 1000
+    return report
+
+
 def send_push_notification(
     tokens: list[str],
     title: str,
@@ -84,37 +197,21 @@ def send_push_notification(
         logger.warning("No push tokens provided")
         return {"success": False, "error": "No tokens provided"}
 
-    messages = _build_messages(tokens, title, body, data, sound, priority)
-
-    try:
-        response = requests.post(
-            EXPO_PUSH_URL,
-            json=messages,
-            headers={
-                "Content-Type": "application/json",
-                "Accept": "application/json",
-            },
-            timeout=10,
-        )
-        response.raise_for_status()
-        result = response.json()
-
-        errors = _process_ticket_errors(tokens, result.get("data", []))
-
-        if errors:
-            logger.warning(f"Push notification errors: {errors}")
-            return {
-                "success": True,
-                "errors": errors,
-                "sent": len(tokens) - len(errors),
-            }
+    report = deliver_messages(_build_messages(tokens, title, body, data, sound, priority))
+    if report.failed_chunks == report.chunks:
+        return {"success": False, "error": report.transport_error}
 
-        logger.info(f"Push notifications sent successfully to {len(tokens)} devices")
-        return {"success": True, "sent": len(tokens)}
+    errors = [
+        {"token": token, "error": error}
+        for token, error in zip(tokens, report.errors)
+        if error is not None
+    ]
+    if errors:
+        logger.warning(f"Push notification errors: {errors}")
+        return {"success": True, "errors": errors, "sent": report.sent}
 
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Failed to send push notification: {e}")
-        return {"success": False, "error": str(e)}
+    logger.info(f"Push notifications sent successfully to {len(tokens)} devices")
+    return {"success": True, "sent": len(tokens)}
 
 
 def send_push_to_user(
@@ -135,11 +232,7 @@ def send_push_to_user(
     Returns:
         dict with success status and details
     """
-    tokens = list(
-        PushToken.objects.filter(user=user, is_active=True).values_list(
-            "token", flat=True
-        )
-    )
+    tokens = list(token_cache.active_tokens(user.pk))
 
     if not tokens:
         logger.info(f"No active push tokens for user {user.email}")
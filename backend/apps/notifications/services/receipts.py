@@ -0,0 +1,80 @@
+"""
+Vérification différée des reçus Expo.
+
+Un ticket "ok" signifie seulement qu'Expo a accepté le message ; le reçu,
+disponible après quelques minutes, dit s'il a été remis au service
+APNs/FCM. Un reçu DeviceNotRegistered désactive le token. Expo conserve
+les reçus 24 h : au-delà, le ticket est abandonné.
+"""
+
+from __future__ import annotations
+
+import logging
+from datetime import timedelta
+
+import requests
+from django.utils import timezone
+
+from apps.notifications.models import PushTicket
+
+from .push import _client, deactivate_tokens
+
+logger = logging.getLogger(__name__)
+
+EXPO_RECEIPTS_URL = "https://exp.host/--/api/v2/push/getReceipts"
+RECEIPTS_CHUNK_SIZE = 1000
+RECEIPT_DELAY = timedelta(minutes=15)
+RECEIPT_EXPIRY = timedelta(hours=24)
+
+
+def _fetch_receipts(ticket_ids: list[str]) -> dict:
+    response = _client.post(EXPO_RECEIPTS_URL, json={"ids": ticket_ids})
+    response.raise_for_status()
+    return response.json().get("data", {})
+
+
+def process_receipts(now=None) -> dict:
+    """
+    Traite les tickets assez anciens pour avoir un reçu.
+    Retourne les stats : checked, ok, errors, deactivated, expired, pending.
+    """
+    now = now or timezone.now()
+    stats = {"checked": 0, "ok": 0, "errors": 0, "deactivated": 0, "expired": 0, "pending": 0}
+
+    stats["expired"], _ = PushTicket.objects.filter(created_at__lt=now - RECEIPT_EXPIRY).delete()
+
+    tickets = list(
+        PushTicket.objects.filter(created_at__lte=now - RECEIPT_DELAY)
+        .order_by("created_at")
+        .values_list("id", "ticket_id", "token")
+    )
+    for start in range(0, len(tickets), RECEIPTS_CHUNK_SIZE):
+        chunk = tickets[start : start + RECEIPTS_CHUNK_SIZE]
+        try:
+            receipts = _fetch_receipts([ticket_id for _, ticket_id, _ in chunk])
+        except (requests.exceptions.RequestException, ValueError) as e:
+            # Les tickets restent en base : nouvel essai au prochain passage.
+            logger.error(f"[PUSH RECEIPTS] fetch failed for {len(chunk)} tickets: {e}")
+            break
+
+        done, dead = [], []
+        for pk, ticket_id, token in chunk:
+            receipt = receipts.get(ticket_id)
+            if receipt is None:
+                stats["pending"] += 1  # reçu pas encore disponible
+                continue
+            done.append(pk)
+            if receipt.get("status") == "error":
+                stats["errors"] += 1
+                logger.warning(f"[PUSH RECEIPTS] {ticket_id}: {receipt.get('message')}")
+                if receipt.get("details", {}).get("error") == "DeviceNotRegistered":
+                    dead.append(token)
+            else:
+                stats["ok"] += 1
+
+        stats["checked"] += len(done)
+        stats["deactivated"] += deactivate_tokens(dead)
+        PushTicket.objects.filter(pk__in=done).delete()
+
+    logger.info(f"[PUSH RECEIPTS] {stats}")
+    return stats
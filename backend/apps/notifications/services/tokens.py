@@ -0,0 +1,68 @@
+"""
+Cache des tokens push actifs par utilisateur.
+
+Un envoi groupé résout les tokens de tous ses destinataires en un
+`get_many` ; seuls les utilisateurs absents du cache coûtent une requête
+(une seule pour tous). Invalidation : signals.py (création, modification,
+suppression d'un PushToken) et `invalidate()` après une mise à jour en
+masse (désactivation des tokens morts).
+"""
+
+from __future__ import annotations
+
+import logging
+
+from django.core.cache import cache
+
+from apps.notifications.models import PushToken
+
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = "push:tokens"
+TTL = 60 * 60
+
+
+def _key(user_id) -> str:
+    return f"{CACHE_PREFIX}:{user_id}"
+
+
+def active_tokens_for(user_ids) -> dict:
+    """{user_id: [tokens actifs]} pour chaque user_id demandé (liste vide si aucun)."""
+    by_key = {_key(user_id): user_id for user_id in user_ids}
+    try:
+        cached = cache.get_many(list(by_key))
+    except Exception as e:
+        logger.warning(f"Push token cache unavailable: {e}")
+        cached = {}
+
+    result = {by_key[key]: tokens for key, tokens in cached.items()}
+    missing = {str(user_id): user_id for user_id in by_key.values() if user_id not in result}
+    if not missing:
+        return result
+
+    loaded = {user_id: [] for user_id in missing.values()}
+    rows = (
+        PushToken.objects.filter(user_id__in=list(missing.values()), is_active=True)
+        .order_by("created_at")
+        .values_list("user_id", "token")
+    )
+    for user_id, token in rows:
+        loaded[missing[str(user_id)]].append(token)
+
+    try:
+        cache.set_many({_key(user_id): tokens for user_id, tokens in loaded.items()}, TTL)
+    except Exception as e:
+        logger.warning(f"Failed to cache push tokens: {e}")
+    result.update(loaded)
+    return result
+
+
+def active_tokens(user_id) -> list[str]:
+    return active_tokens_for([user_id])[user_id]
+
+
+def invalidate(*user_ids):
+    try:
+        cache.delete_many([_key(user_id) for user_id in user_ids])
+    except Exception as e:
+        logger.warning(f"Failed to invalidate push tokens cache: {e}")
@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import PushToken
+from .services import tokens
+
+
+@receiver(post_save, sender=PushToken)
+@receiver(post_delete, sender=PushToken)
+def invalidate_push_tokens(sender, instance, **kwargs):
+    tokens.invalidate(instance.user_id)
@@ -1,3 +1,4 @@
+from datetime import timedelta
 from unittest.mock import MagicMock, patch
 
 import pytest
@@ -6,14 +7,17 @@ from django.contrib.auth import get_user_model
 
 from rest_framework.test import APIClient
 
-from apps.notifications.models import DeviceType, Notification, PushToken, UserNotification
+from apps.notifications.models import DeviceType, Notification, PushTicket, PushToken, UserNotification
 from apps.notifications.serializers import PushTokenSerializer
+from apps.notifications.services import PushBatch, tokens
 from apps.notifications.services.push import (
     _build_messages,
     _process_ticket_errors,
+    deliver_messages,
     send_push_notification,
     send_push_to_user,
 )
+from apps.notifications.services.receipts import process_receipts
 
 User = get_user_model()
 
@@ -260,7 +264,7 @@ def test_send_push_notification_returns_error_without_tokens():
     assert result == {"success": False, "error": "No tokens provided"}
 
 
-@patch("apps.notifications.services.push.requests.post")
+@patch("apps.notifications.services.push._client.post")
 def test_send_push_notification_success(mock_post):
     response = MagicMock()
     response.json.return_value = {"data": [{"status": "ok"}]}
@@ -274,7 +278,7 @@ def test_send_push_notification_success(mock_post):
     assert mock_post.call_args.kwargs["json"][0]["to"] == "ExponentPushToken[ok]"
 
 
-@patch("apps.notifications.services.push.requests.post")
+@patch("apps.notifications.services.push._client.post")
 def test_send_push_notification_reports_ticket_errors(mock_post):
     response = MagicMock()
     response.json.return_value = {
@@ -294,7 +298,7 @@ def test_send_push_notification_reports_ticket_errors(mock_post):
     }
 
 
-@patch("apps.notifications.services.push.requests.post")
+@patch("apps.notifications.services.push._client.post")
 def test_send_push_notification_handles_request_exception(mock_post):
     mock_post.side_effect = requests.exceptions.Timeout("slow")
 
@@ -361,3 +365,170 @@ def test_push_token_serializer_creates_and_reactivates_token():
 
     assert updated.pk == token.pk
     assert updated.is_active is True
+
+
+# ═══════════════════════════════════════════════════════════════════
+# 3. ENVOI GROUPÉ, CACHE DES TOKENS, REÇUS
+# ═══════════════════════════════════════════════════════════════════
+
+
+def _expo_tickets(mock_post, ticket=lambda message, i: {"status": "ok"}):
+    """Réponse Expo simulée : un ticket par message du paquet envoyé."""
+
+    def respond(url, json):
+        response = MagicMock()
+        response.json.return_value = {"data": [ticket(m, i) for i, m in enumerate(json)]}
+        return response
+
+    mock_post.side_effect = respond
+
+
+@patch("apps.notifications.services.push._client.post")
+def test_send_push_notification_splits_into_expo_chunks(mock_post):
+    _expo_tickets(mock_post)
+    tokens = [f"ExponentPushToken[{i}]" for i in range(250)]
+
+    result = send_push_notification(tokens, "Title", "Body")
+
+    assert result == {"success": True, "sent": 250}
+    assert [len(call.kwargs["json"]) for call in mock_post.call_args_list] == [100, 100, 50]
+
+
+@patch("apps.notifications.services.push._client.post")
+def test_deliver_messages_keeps_sending_after_failed_chunk(mock_post):
+    ok = MagicMock()
+    ok.json.return_value = {"data": [{"status": "ok"}] * 100}
+    mock_post.side_effect = [requests.exceptions.ConnectionError("down"), ok]
+    messages = _build_messages([f"t{i}" for i in range(200)], "T", "B", None, "default", "high")
+
+    report = deliver_messages(messages)
+
+    assert report.chunks == 2
+    assert report.failed_chunks == 1
+    assert report.sent == 100
+    assert report.errors[:100] == ["down"] * 100
+    assert report.as_dict()["messages"] == 200
+
+
+@pytest.mark.django_db
+def test_active_tokens_are_cached_and_invalidated_on_change(user, django_assert_num_queries):
+    PushToken.objects.create(user=user, token=VALID_TOKEN)
+
+    assert tokens.active_tokens(user.pk) == [VALID_TOKEN]
+    with django_assert_num_queries(0):
+        assert tokens.active_tokens(user.pk) == [VALID_TOKEN]
+
+    PushToken.objects.create(user=user, token=VALID_TOKEN_2)
+    assert tokens.active_tokens(user.pk) == [VALID_TOKEN, VALID_TOKEN_2]
+
+    PushToken.objects.filter(token=VALID_TOKEN).delete()
+    assert tokens.active_tokens(user.pk) == [VALID_TOKEN_2]
+
+
+@pytest.mark.django_db
+def test_active_tokens_for_loads_all_missing_users_in_one_query(user, other_user, django_assert_num_queries):
+    PushToken.objects.create(user=user, token=VALID_TOKEN)
+    tokens.active_tokens(user.pk)  # déjà en cache
+
+    with django_assert_num_queries(1):
+        result = tokens.active_tokens_for([user.pk, other_user.pk])
+
+    assert result == {user.pk: [VALID_TOKEN], other_user.pk: []}
+
+
+@pytest.mark.django_db
+@patch("apps.notifications.services.push._client.post")
+def test_push_batch_returns_one_result_per_notification(mock_post, user, other_user):
+    PushToken.objects.create(user=user, token=VALID_TOKEN)
+    PushToken.objects.create(user=user, token=VALID_TOKEN_2)
+    _expo_tickets(
+        mock_post,
+        lambda message, i: (
+            {"status": "error", "message": "Rate exceeded"}
+            if message["to"] == VALID_TOKEN_2
+            else {"status": "ok", "id": f"ticket-{i}"}
+        ),
+    )
+
+    batch = PushBatch("test")
+    first = batch.add(user.pk, "A", "1")
+    second = batch.add(user.pk, "B", "2", {"kind": "test"})
+    missing = batch.add(other_user.pk, "C", "3")
+    results = batch.flush()
+
+    mock_post.assert_called_once()
+    assert len(mock_post.call_args.kwargs["json"]) == 4
+    assert results[first] == {
+        "success": True,
+        "sent": 1,
+        "errors": [{"token": VALID_TOKEN_2, "error": "Rate exceeded"}],
+    }
+    assert results[second]["sent"] == 1
+    assert results[missing] == {"success": False, "error": "No active tokens for user"}
+    assert batch.report.as_dict()["sent"] == 2
+    assert PushTicket.objects.filter(token=VALID_TOKEN).count() == 2
+    assert len(batch) == 0
+
+
+@pytest.mark.django_db
+@patch("apps.notifications.services.push._client.post")
+def test_dead_ticket_token_is_dropped_from_cache(mock_post, user):
+    PushToken.objects.create(user=user, token=VALID_TOKEN)
+    assert tokens.active_tokens(user.pk) == [VALID_TOKEN]
+    _expo_tickets(
+        mock_post,
+        lambda message, i: {"status": "error", "message": "gone", "details": {"error": "DeviceNotRegistered"}},
+    )
+
+    send_push_to_user(user, "Title", "Body")
+
+    assert PushToken.objects.get(token=VALID_TOKEN).is_active is False
+    assert tokens.active_tokens(user.pk) == []
+
+
+@pytest.mark.django_db
+@patch("apps.notifications.services.push._client.post")
+def test_process_receipts_deactivates_unregistered_devices(mock_post, user):
+    from django.utils import timezone
+
+    PushToken.objects.create(user=user, token=VALID_TOKEN)
+    PushToken.objects.create(user=user, token=VALID_TOKEN_2)
+    PushTicket.objects.bulk_create(
+        [
+            PushTicket(ticket_id="ok", token=VALID_TOKEN_2),
+            PushTicket(ticket_id="dead", token=VALID_TOKEN),
+            PushTicket(ticket_id="later", token=VALID_TOKEN_2),
+        ]
+    )
+    response = MagicMock()
+    response.json.return_value = {
+        "data": {
+            "ok": {"status": "ok"},
+            "dead": {"status": "error", "message": "gone", "details": {"error": "DeviceNotRegistered"}},
+        }
+    }
+    mock_post.return_value = response
+
+    stats = process_receipts(now=timezone.now() + timedelta(minutes=20))
+
+    assert mock_post.call_args.kwargs["json"] == {"ids": ["ok", "dead", "later"]}
+    assert stats == {"checked": 2, "ok": 1, "errors": 1, "deactivated": 1, "expired": 0, "pending": 1}
+    assert list(PushTicket.objects.values_list("ticket_id", flat=True)) == ["later"]
+    assert PushToken.objects.get(token=VALID_TOKEN).is_active is False
+    assert tokens.active_tokens(user.pk) == [VALID_TOKEN_2]
+
+
+@pytest.mark.django_db
+@patch("apps.notifications.services.push._client.post")
+def test_process_receipts_waits_for_recent_tickets_and_drops_expired(mock_post):
+    from django.utils import timezone
+
+    PushTicket.objects.create(ticket_id="recent", token=VALID_TOKEN)
+    PushTicket.objects.create(ticket_id="old", token=VALID_TOKEN_2)
+    PushTicket.objects.filter(ticket_id="old").update(created_at=timezone.now() - timedelta(days=2))
+
+    stats = process_receipts()
+
+    mock_post.assert_not_called()
+    assert stats["expired"] == 1
+    assert list(PushTicket.objects.values_list("ticket_id", flat=True)) == ["recent"]
@@ -2,14 +2,17 @@
 Django signals for user-related events.
 
 Automatically creates default alert rules (HYPO/HYPER) for new users.
+Invalidates the authenticated-user cache (utils/user_cache.py) on account changes.
 """
 
 import logging
 
 from django.conf import settings
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
+from utils import user_cache
+
 logger = logging.getLogger(__name__)
 
 
@@ -47,3 +50,11 @@ def create_default_alert_rules(sender, instance, created, **kwargs):
     except Exception as e:
         # Don't fail user creation if alerts setup fails
         logger.error(f"Failed to create default alert rules for {instance.email}: {e}")
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def invalidate_cached_user(sender, instance, created=False, **kwargs):
+    """Deactivation, email/role change or deletion must not be served from cache."""
+    if not created:
+        user_cache.invalidate(getattr(instance, settings.SIMPLE_JWT.get("USER_ID_FIELD", "id")))
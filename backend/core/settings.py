@@ -215,6 +215,7 @@ REST_FRAMEWORK = {
         "anon": "200/hour",
         "user": "300/minute",
         "auth": "5/minute",
+        "ws_connect": config("WS_CONNECT_RATE", default="20/minute"),
     },
 }
 
@@ -420,18 +421,60 @@ AUTH_USER_MODEL = "users.AuthAccount"
 AI_SERVICE_URL = config("AI_SERVICE_URL", default="http://localhost:8001")
 AI_SERVICE_TOKEN = config("AI_SERVICE_TOKEN", default="dev_secret")
 
+# Pool de threads des tâches lancées depuis les signaux (utils/background.py)
+BACKGROUND_WORKERS = config("BACKGROUND_WORKERS", default=8, cast=int)
+
+# --- CACHE ---
+# Redis partagé entre workers, par défaut hors tests : cache d'accès, index de
+# diffusion, versions de données (ETag), utilisateurs JWT, dashboard... doivent
+# être invalidés pour tous les processus. Cache mémoire local en test, ou avec
+# REDIS_CACHE=false (un seul processus, développement uniquement).
+if _env_bool("REDIS_CACHE", default=True) and not TESTING:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": "redis://{}:{}/{}".format(
+                config("REDIS_HOST", default="redis"),
+                config("REDIS_PORT", default=6379, cast=int),
+                config("REDIS_CACHE_DB", default=1, cast=int),
+            ),
+        },
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        },
+    }
+
 # --- ASGI / CHANNELS ---
 ASGI_APPLICATION = "core.asgi.application"
+
+
+def _channel_hosts():
+    # REDIS_CHANNEL_HOSTS="redis-a:6379,redis-b:6379" : channels_redis répartit
+    # groupes et canaux entre les instances (hachage cohérent).
+    raw = config("REDIS_CHANNEL_HOSTS", default="")
+    if not raw:
+        return [(config("REDIS_HOST", default="redis"), config("REDIS_PORT", default=6379, cast=int))]
+    hosts = []
+    for item in raw.split(","):
+        host, _, port = item.strip().rpartition(":")
+        hosts.append((host, int(port)))
+    return hosts
+
+
 CHANNEL_LAYERS = {
     "default": {
         "BACKEND": "channels_redis.core.RedisChannelLayer",
         "CONFIG": {
-            "hosts": [
-                (
-                    config("REDIS_HOST", default="redis"),
-                    config("REDIS_PORT", default=6379, cast=int),
-                )
-            ],
+            "hosts": _channel_hosts(),
         },
     },
 }
+
+# Diffusion WebSocket groupée (apps/glycemia/services/broadcaster.py) :
+# fenêtre d'accumulation en secondes ; 0 = envoi immédiat et synchrone (tests).
+# À 0, les mises à jour de widgets différées (apps/dashboard/services/widget_push.py)
+# attendent flush() au lieu d'un thread.
+WS_BATCH_WINDOW = 0 if TESTING else config("WS_BATCH_WINDOW", default=0.25, cast=float)
@@ -2,15 +2,35 @@ from django.contrib import admin
 from django.http import JsonResponse
 from django.urls import include, path
 from django.views.decorators.http import require_GET
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
 
 from decouple import config
 
+from apps.dashboard.services import DashboardCache
+from utils import http_client
+
 
 @require_GET
 def root_view(request):
     return JsonResponse({"message": "Server is running"})
 
 
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def http_metrics_view(request):
+    """Latences / erreurs / état du disjoncteur par cible HTTP sortante."""
+    return Response(http_client.metrics_snapshot())
+
+
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def dashboard_cache_metrics_view(request):
+    """Taux de hit du cache dashboard par section (process courant)."""
+    return Response(DashboardCache.metrics_snapshot())
+
+
 ADMIN_URL = config("ADMIN_URL", default="admin")
 
 urlpatterns = [
@@ -31,4 +51,6 @@ urlpatterns = [
     path("api/medications/", include("apps.medications.urls")),
     path("api/v1/dashboard/", include("apps.dashboard.urls")),
     path("api/notifications/", include("apps.notifications.urls")),
+    path("api/internal/http-metrics/", http_metrics_view),
+    path("api/internal/dashboard-cache-metrics/", dashboard_cache_metrics_view),
 ]
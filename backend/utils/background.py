@@ -0,0 +1,49 @@
+"""
+Exécuteur partagé pour les tâches « fire-and-forget » lancées depuis les
+signaux (prédiction IA, notification des proches).
+
+Un pool de threads borné remplace un thread jetable par lecture : le
+nombre d'appels sortants simultanés reste plafonné et les threads (et leurs
+connexions HTTP keep-alive) sont réutilisés.
+
+BACKGROUND_TASKS_EAGER=True exécute les tâches de façon synchrone (tests).
+"""
+
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, "BACKGROUND_WORKERS", 8),
+    thread_name_prefix="glyco-bg",
+)
+
+
+def _run(fn, args, kwargs):
+    try:
+        return fn(*args, **kwargs)
+    except Exception:
+        logger.exception("Background task %s failed", getattr(fn, "__name__", fn))
+    finally:
+        # Les threads du pool sont réutilisés : ne pas garder de connexion DB périmée.
+        close_old_connections()
+
+
+def submit(fn, *args, **kwargs) -> Future:
+    """
+    Planifie fn(*args, **kwargs) sur le pool ; les exceptions sont journalisées.
+    Avec BACKGROUND_TASKS_EAGER, exécute immédiatement dans le thread appelant.
+    """
+    if getattr(settings, "BACKGROUND_TASKS_EAGER", False):
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as exc:
+            logger.exception("Background task %s failed", getattr(fn, "__name__", fn))
+            future.set_exception(exc)
+        return future
+    return _executor.submit(_run, fn, args, kwargs)
@@ -0,0 +1,124 @@
+"""
+Versions de données par utilisateur et par ressource, et GET conditionnels.
+
+Chaque ressource lue en polling (summary du dashboard, glycémie courante,
+dernière prédiction, widgets) a un compteur monotone en cache,
+`data_version:<ressource>:<user_id>`, incrémenté par les chemins
+d'écriture (signaux, services) après commit. Un compteur perdu (éviction)
+repart d'une valeur tirée de l'horloge, plus grande que toutes les
+précédentes.
+
+`conditional(resource)` décore un GET : l'ETag est dérivé de la version,
+de l'utilisateur et de l'URL ; un `If-None-Match` qui correspond reçoit
+un 304 après une seule lecture de cache (version + date de modification),
+sans exécuter la vue. `window` ajoute une tranche de temps à l'ETag pour
+les ressources dont le contenu dérive aussi avec le temps (fenêtres
+glissantes).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import time
+from functools import wraps
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.http import http_date
+
+from rest_framework import status
+from rest_framework.response import Response
+
+CACHE_PREFIX = "data_version"
+
+DASHBOARD = "dashboard"
+GLUCOSE = "glucose"
+PREDICTIONS = "predictions"
+WIDGETS = "widgets"
+
+
+def _key(resource: str, user_id) -> str:
+    return f"{CACHE_PREFIX}:{resource}:{user_id}"
+
+
+def _modified_key(resource: str, user_id) -> str:
+    return f"{CACHE_PREFIX}:{resource}:{user_id}:at"
+
+
+def _seed() -> int:
+    return time.time_ns() // 1000
+
+
+def current(resource: str, user_id) -> tuple[int, float | None]:
+    """(version, horodatage de la dernière écriture connue | None), en un aller-retour."""
+    key, modified_key = _key(resource, user_id), _modified_key(resource, user_id)
+    found = cache.get_many([key, modified_key])
+    version = found.get(key)
+    if version is None:
+        cache.add(key, _seed(), None)
+        version = cache.get(key)
+    return version, found.get(modified_key)
+
+
+def bump(user_id, *resources: str) -> None:
+    now = time.time()
+    for resource in resources:
+        key = _key(resource, user_id)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, _seed(), None)
+        cache.set(_modified_key(resource, user_id), now, None)
+
+
+def bump_on_commit(user_id, *resources: str) -> None:
+    transaction.on_commit(lambda: bump(user_id, *resources))
+
+
+def etag(resource: str, request, version: int, window: int | None = None) -> str:
+    parts = [resource, str(request.user.pk), request.get_full_path(), str(version)]
+    if window:
+        parts.append(str(int(time.time() // window)))
+    digest = hashlib.sha1("|".join(parts).encode()).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def _matches(if_none_match: str, tag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Comparaison faible (RFC 9110 §13.1.2) : préfixe W/ ignoré.
+    opaque = tag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in if_none_match.split(","))
+
+
+def conditional(resource: str, window: int | None = None):
+    """Décorateur de méthode GET (APIView ou action de ViewSet) : ETag, Last-Modified, 304."""
+
+    def decorator(view_method):
+        @wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            version, modified_at = current(resource, request.user.pk)
+            tag = etag(resource, request, version, window)
+            if _matches(request.headers.get("If-None-Match", ""), tag):
+                return _with_validators(Response(status=status.HTTP_304_NOT_MODIFIED), tag, modified_at)
+
+            response = view_method(self, request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                _with_validators(response, tag, modified_at)
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def _with_validators(response, tag: str, modified_at: float | None):
+    response["ETag"] = tag
+    if modified_at is not None:
+        response["Last-Modified"] = http_date(modified_at)
+    # Données par utilisateur : jamais en cache partagé, toujours revalidées.
+    response["Cache-Control"] = "private, no-cache"
+    response["Vary"] = "Authorization"
+    return response
@@ -0,0 +1,64 @@
+"""
+Encodage JSON des réponses volumineuses (séries temporelles).
+
+orjson s'il est installé (dépendance optionnelle), sinon json de la
+bibliothèque standard avec le même format de sortie, celui des serializers
+DRF :
+- dates-heures par DateTimeField.to_representation : heure locale
+  (TIME_ZONE) avec son décalage, 2026-03-02T11:00:00.123456+01:00, alors
+  que les valeurs lues en base sont en UTC ;
+- UUID en chaîne, Decimal en chaîne (comme DRF par défaut).
+"""
+
+from __future__ import annotations
+
+import datetime
+import decimal
+import json
+import uuid
+
+from django.utils.functional import Promise
+
+from rest_framework.fields import DateTimeField
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dépend de l'environnement
+    orjson = None
+
+
+# Sans `format` : suit api_settings.DATETIME_FORMAT et le fuseau courant, comme DRF.
+_DATETIME_FIELD = DateTimeField()
+
+
+def _default(value):
+    if isinstance(value, datetime.datetime):
+        return _DATETIME_FIELD.to_representation(value)
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, (uuid.UUID, decimal.Decimal)):
+        return str(value)
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    if isinstance(value, Promise):
+        return str(value)  # chaînes traduites paresseuses
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(data) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(
+            data,
+            default=_default,
+            option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS,
+        )
+    return json.dumps(data, default=_default, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def to_columns(rows: list[dict]) -> dict:
+    """[{k: v}, ...] -> {k: [v, ...]} : tableaux parallèles, sans répéter les clés."""
+    columns: dict = {}
+    for row in rows:
+        for key, value in row.items():
+            columns.setdefault(key, []).append(value)
+    return columns
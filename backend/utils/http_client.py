@@ -0,0 +1,276 @@
+"""
+Client HTTP partagé pour les appels sortants (service IA, Expo Push,
+Open Food Facts).
+
+Une cible = un `HttpClient` enregistré une fois par module appelant :
+- `requests.Session` dédiée : pool de connexions keep-alive ;
+- limite de concurrence (sémaphore) pour ne pas saturer la cible ;
+- timeouts (connexion, lecture) par défaut ;
+- retries avec backoff exponentiel + jitter sur erreurs réseau, 429 et 5xx
+  (les méthodes non idempotentes ne sont rejouées que si la requête n'a
+  jamais atteint la cible, sauf `retry_unsafe=True`) ;
+- disjoncteur : après `failure_threshold` échecs consécutifs, les appels
+  échouent immédiatement pendant `reset_timeout` secondes, puis une
+  requête d'essai décide de la fermeture ;
+- métriques par cible (latences, erreurs, retries, rejets), exposées par
+  `metrics_snapshot()`.
+
+Toutes les erreurs levées héritent de `requests.exceptions.RequestException`.
+"""
+
+from __future__ import annotations
+
+import logging
+import random
+import threading
+import time
+from collections import deque
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = frozenset({429, 502, 503, 504})
+SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+LATENCY_SAMPLES = 512
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """Disjoncteur ouvert : la cible est considérée indisponible."""
+
+
+class TargetBusyError(requests.exceptions.RequestException):
+    """Limite de concurrence atteinte pour la cible."""
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            # Une seule requête d'essai par reset_timeout : un essai resté sans
+            # issue (thread perdu) n'empêche pas le suivant.
+            if self.state != self.CLOSED and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self.opened_at = time.monotonic()
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning("Circuit opened after %d consecutive failures", self.failures)
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+class TargetMetrics:
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.rejected = 0
+        self.status_counts: dict[int, int] = {}
+        self.last_error = None
+        self.latencies_ms: deque = deque(maxlen=LATENCY_SAMPLES)
+        self._lock = threading.Lock()
+
+    def record(self, latency_ms: float, status: int | None = None, error: Exception | None = None):
+        with self._lock:
+            self.requests += 1
+            self.latencies_ms.append(latency_ms)
+            if status is not None:
+                self.status_counts[status] = self.status_counts.get(status, 0) + 1
+            if error is not None or (status is not None and status >= 500):
+                self.errors += 1
+                self.last_error = str(error) if error is not None else f"HTTP {status}"
+
+    def incr(self, field: str):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            ordered = sorted(self.latencies_ms)
+            status_counts = dict(self.status_counts)
+            counters = (self.requests, self.errors, self.retries, self.rejected, self.last_error)
+
+        def pct(p):
+            return round(ordered[min(len(ordered) - 1, int(len(ordered) * p))], 1) if ordered else None
+
+        requests_count, errors, retries, rejected, last_error = counters
+        return {
+            "requests": requests_count,
+            "errors": errors,
+            "retries": retries,
+            "rejected": rejected,
+            "error_rate": round(errors / requests_count, 4) if requests_count else 0.0,
+            "latency_p50_ms": pct(0.5),
+            "latency_p95_ms": pct(0.95),
+            "latency_max_ms": round(ordered[-1], 1) if ordered else None,
+            "status_counts": status_counts,
+            "last_error": last_error,
+        }
+
+
+class HttpClient:
+    def __init__(
+        self,
+        name: str,
+        base_url: str = "",
+        *,
+        timeout: tuple[float, float] = (3.0, 10.0),
+        max_concurrency: int = 10,
+        acquire_timeout: float = 5.0,
+        retries: int = 2,
+        backoff: float = 0.2,
+        retry_unsafe: bool = False,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        headers: dict | None = None,
+    ):
+        self.name = name
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.acquire_timeout = acquire_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.retry_unsafe = retry_unsafe
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.metrics = TargetMetrics()
+        self._semaphore = threading.BoundedSemaphore(max_concurrency)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        if headers:
+            self.session.headers.update(headers)
+
+    def _url(self, path: str) -> str:
+        if path.startswith(("http://", "https://")):
+            return path
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def _can_retry(self, method: str, exc: Exception | None) -> bool:
+        if method in SAFE_METHODS or self.retry_unsafe:
+            return True
+        # Non idempotent : seulement si la requête n'est jamais partie.
+        if isinstance(exc, requests.exceptions.ConnectTimeout):
+            return True
+        reason = getattr(exc.args[0], "reason", None) if exc is not None and exc.args else None
+        return isinstance(reason, NewConnectionError)
+
+    def _sleep_before_retry(self, attempt: int):
+        # Backoff exponentiel, "full jitter".
+        time.sleep(random.uniform(0, self.backoff * (2**attempt)))
+
+    def request(self, method: str, path: str, **kwargs) -> requests.Response:
+        """
+        Envoie la requête avec retries et disjoncteur. Retourne la réponse
+        (y compris 4xx) ; lève une RequestException sur échec définitif.
+        """
+        method = method.upper()
+        if not self._semaphore.acquire(timeout=self.acquire_timeout):
+            self.metrics.incr("rejected")
+            raise TargetBusyError(f"{self.name}: too many concurrent requests")
+        if not self.breaker.allow():
+            self._semaphore.release()
+            self.metrics.incr("rejected")
+            raise CircuitOpenError(f"{self.name}: circuit open")
+
+        kwargs.setdefault("timeout", self.timeout)
+        try:
+            response = self._send(method, self._url(path), kwargs)
+        except BaseException:
+            # Toute issue sans réponse (erreur réseau, exception inattendue,
+            # interruption) est un échec : une requête d'essai ne laisse
+            # jamais le disjoncteur bloqué en HALF_OPEN.
+            self.breaker.record_failure()
+            raise
+        finally:
+            self._semaphore.release()
+
+        if response.status_code >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return response
+
+    def _send(self, method: str, url: str, kwargs: dict) -> requests.Response:
+        """Boucle de retries ; le disjoncteur est mis à jour par l'appelant."""
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except requests.exceptions.RequestException as exc:
+                self.metrics.record((time.perf_counter() - started) * 1000, error=exc)
+                if attempt < self.retries and self._can_retry(method, exc):
+                    attempt += 1
+                    self.metrics.incr("retries")
+                    self._sleep_before_retry(attempt)
+                    continue
+                raise
+
+            self.metrics.record((time.perf_counter() - started) * 1000, status=response.status_code)
+            if response.status_code in RETRY_STATUSES and attempt < self.retries and self._can_retry(method, None):
+                attempt += 1
+                self.metrics.incr("retries")
+                response.close()
+                self._sleep_before_retry(attempt)
+                continue
+            return response
+
+    def get(self, path: str, **kwargs) -> requests.Response:
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path: str, **kwargs) -> requests.Response:
+        return self.request("POST", path, **kwargs)
+
+    def snapshot(self) -> dict:
+        return {
+            "base_url": self.base_url,
+            "circuit": self.breaker.state,
+            **self.metrics.snapshot(),
+        }
+
+
+_clients: dict[str, HttpClient] = {}
+_registry_lock = threading.Lock()
+
+
+def get_client(name: str, base_url: str = "", **options) -> HttpClient:
+    """Client de la cible `name`, créé au premier appel (options ignorées ensuite)."""
+    client = _clients.get(name)
+    if client is None:
+        with _registry_lock:
+            client = _clients.get(name)
+            if client is None:
+                client = _clients[name] = HttpClient(name, base_url, **options)
+    return client
+
+
+def metrics_snapshot() -> dict:
+    return {name: client.snapshot() for name, client in sorted(_clients.items())}
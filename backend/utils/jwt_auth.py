@@ -38,9 +38,14 @@ from django.conf import settings
 import logging
 
 import jwt
+from django.utils.translation import gettext_lazy as _
 from rest_framework_simplejwt.authentication import JWTAuthentication
-from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
 from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from utils import user_cache
+from utils.service_token_auth import ServiceTokenAuthentication
 
 logger = logging.getLogger(__name__)
 
@@ -90,3 +95,36 @@ class JWTAuthenticationDualKey(JWTAuthentication):
         raise InvalidToken(
             {"detail": "Le jeton est invalide ou expiré.", "code": "token_not_valid"}
         )
+
+
+class CachedUserJWTAuthentication(JWTAuthenticationDualKey):
+    """
+    Variante réservée aux GET conditionnels (utils.data_versions) : le
+    compte vient de utils.user_cache, un client qui interroge en boucle
+    reçoit son 304 sans relire la base. Les autres vues gardent la lecture
+    du compte en base à chaque requête.
+    """
+
+    def get_user(self, validated_token):
+        """Mêmes contrôles que simplejwt, sur le compte en cache."""
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        user = user_cache.get_user(user_id)
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        return user
+
+
+# authentication_classes des vues `data_versions.conditional` (settings.REST_FRAMEWORK, JWT en cache).
+CACHED_AUTHENTICATION_CLASSES = [ServiceTokenAuthentication, CachedUserJWTAuthentication]
@@ -0,0 +1,75 @@
+"""
+Pagination par curseur (keyset) sur (champ date, id), du plus récent au
+plus ancien.
+
+Le curseur est opaque (JSON en base64 url) et porte la clé de la dernière
+ligne servie : la page suivante est un `WHERE (champ, id) < (v, id)`
+servi par les index (user, champ), sans OFFSET, quelle que soit la
+profondeur dans l'historique. Les lignes sans date viennent en dernier.
+"""
+
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(payload: dict) -> str:
+    raw = json.dumps(payload, separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict:
+    """Payload d'un curseur ; lève InvalidCursor s'il est illisible."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, ValueError, UnicodeDecodeError) as exc:
+        raise InvalidCursor("cursor invalide") from exc
+    if not isinstance(payload, dict):
+        raise InvalidCursor("cursor invalide")
+    return payload
+
+
+def paginate(queryset, field: str, cursor: str | None = None, limit: int = 50) -> tuple[list, str | None]:
+    """
+    (lignes, curseur suivant | None) pour un queryset `.values()` qui
+    inclut `field` (DateTimeField) et "id".
+    """
+    queryset = queryset.order_by(F(field).desc(nulls_last=True), "-id")
+    if cursor:
+        payload = decode_cursor(cursor)
+        try:
+            last_id = int(payload["id"])
+            value = payload["v"]
+            # parse_datetime lève ValueError sur une date impossible (2024-02-30).
+            if value is not None:
+                value = parse_datetime(value) if isinstance(value, str) else None
+                if value is None or timezone.is_naive(value):
+                    raise ValueError("v")
+        except (KeyError, TypeError, ValueError) as exc:
+            raise InvalidCursor("cursor invalide") from exc
+        if value is None:
+            queryset = queryset.filter(**{f"{field}__isnull": True, "id__lt": last_id})
+        else:
+            queryset = queryset.filter(
+                Q(**{f"{field}__lt": value})
+                | Q(**{field: value, "id__lt": last_id})
+                | Q(**{f"{field}__isnull": True})
+            )
+
+    rows = list(queryset[: limit + 1])
+    if len(rows) <= limit:
+        return rows, None
+    last = rows[limit - 1]
+    value = last[field]
+    return rows[:limit], encode_cursor({"v": value.isoformat() if value else None, "id": last["id"]})
@@ -0,0 +1,90 @@
+"""
+Rendu compact des séries temporelles volumineuses (opt-in).
+
+Formats négociés par DRF, via `?format=` ou l'en-tête Accept :
+- compact  (application/vnd.glycopilot.compact+json)  : mêmes objets, encodés
+  par utils.fast_json (orjson si disponible) ;
+- columnar (application/vnd.glycopilot.columnar+json) : chaque liste d'objets
+  devient des tableaux parallèles, {"measured_at": [...], "value": [...]},
+  au premier niveau ou sous une clé (results, entries, series...).
+
+Les vues qui exposent ces formats (FastSerializationMixin) lisent alors
+les lignes en tuples (`values_list`) au lieu de passer par le
+ModelSerializer : mêmes clés, mêmes valeurs, dates au format DRF (heure locale).
+"""
+
+from __future__ import annotations
+
+from rest_framework.renderers import BaseRenderer
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from utils import fast_json
+
+
+class CompactJSONRenderer(BaseRenderer):
+    media_type = "application/vnd.glycopilot.compact+json"
+    format = "compact"
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return fast_json.dumps(self.transform(data))
+
+    def transform(self, data):
+        return data
+
+
+class ColumnarJSONRenderer(CompactJSONRenderer):
+    media_type = "application/vnd.glycopilot.columnar+json"
+    format = "columnar"
+
+    def transform(self, data):
+        if _is_rows(data):
+            return fast_json.to_columns(data)
+        if isinstance(data, dict):
+            return {key: fast_json.to_columns(value) if _is_rows(value) else value for key, value in data.items()}
+        return data
+
+
+def _is_rows(value) -> bool:
+    return isinstance(value, list) and bool(value) and all(isinstance(row, dict) for row in value)
+
+
+FAST_FORMATS = (CompactJSONRenderer.format, ColumnarJSONRenderer.format)
+TIME_SERIES_RENDERERS = [*api_settings.DEFAULT_RENDERER_CLASSES, CompactJSONRenderer, ColumnarJSONRenderer]
+
+
+class FastSerializationMixin:
+    """
+    Pour un ViewSet : expose les formats compact / columnar et, pour ceux-ci,
+    sert `list` depuis `values_list(*fast_fields)` (par défaut les champs du
+    serializer, qui doivent être des champs du modèle).
+    """
+
+    renderer_classes = TIME_SERIES_RENDERERS
+    fast_fields: tuple | None = None
+
+    def uses_fast_path(self) -> bool:
+        renderer = getattr(self.request, "accepted_renderer", None)
+        return renderer is not None and renderer.format in FAST_FORMATS
+
+    def get_fast_fields(self) -> tuple:
+        return tuple(self.fast_fields or self.get_serializer_class().Meta.fields)
+
+    def fast_rows(self, rows, fields=None) -> list[dict]:
+        """Tuples (queryset values_list ou page) -> dicts ; sans instance de modèle."""
+        fields = fields or self.get_fast_fields()
+        return [dict(zip(fields, row)) for row in rows]
+
+    def list(self, request, *args, **kwargs):
+        if not self.uses_fast_path():
+            return super().list(request, *args, **kwargs)
+
+        fields = self.get_fast_fields()
+        queryset = self.filter_queryset(self.get_queryset()).values_list(*fields)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.fast_rows(page, fields))
+        return Response(self.fast_rows(queryset, fields))
@@ -1,5 +1,5 @@
 from django.conf import settings
-from rest_framework.throttling import AnonRateThrottle
+from rest_framework.throttling import AnonRateThrottle, SimpleRateThrottle
 
 
 class AuthRateThrottle(AnonRateThrottle):
@@ -11,3 +11,20 @@ class AuthRateThrottle(AnonRateThrottle):
         if getattr(settings, "TESTING", False):
             return True
         return super().allow_request(request, view)
+
+
+class WebSocketConnectThrottle(SimpleRateThrottle):
+    """
+    Limits WebSocket (re)connections per user (rate "ws_connect").
+    Keyed by the user id decoded from the JWT, checked before any DB access.
+    """
+
+    scope = "ws_connect"
+
+    def get_cache_key(self, user_id, view=None):
+        return self.cache_format % {"scope": self.scope, "ident": user_id}
+
+    def allow_connect(self, user_id) -> bool:
+        if getattr(settings, "TESTING", False):
+            return True
+        return self.allow_request(user_id, None)
@@ -0,0 +1,54 @@
+"""
+Cache court des comptes authentifiés (AuthAccount) par identifiant JWT.
+
+L'authentification d'une connexion ne relit pas la base à chaque fois :
+le compte est mis en cache USER_TTL secondes sous son `id_auth`
+(SIMPLE_JWT["USER_ID_FIELD"]). Toute sauvegarde ou suppression du compte
+(désactivation, changement d'email…) invalide l'entrée
+(apps/users/signals.py) ; le TTL borne l'écart si une écriture en masse
+contourne les signaux.
+"""
+
+from __future__ import annotations
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+CACHE_PREFIX = "auth:user"
+USER_TTL = 60
+
+
+def _key(user_id) -> str:
+    return f"{CACHE_PREFIX}:{user_id}"
+
+
+def get_cached(user_id):
+    """Compte en cache, ou None (aucune requête SQL)."""
+    return cache.get(_key(user_id))
+
+
+def load(user_id):
+    """Lit le compte en base et le met en cache ; None s'il n'existe pas."""
+    User = get_user_model()
+    user_id_field = settings.SIMPLE_JWT.get("USER_ID_FIELD", "id")
+    try:
+        user = User.objects.get(**{user_id_field: user_id})
+    except (User.DoesNotExist, ValueError, TypeError):
+        return None
+    store(user_id, user)
+    return user
+
+
+def store(user_id, user):
+    """Met en cache un compte déjà lu par ailleurs."""
+    cache.set(_key(user_id), user, USER_TTL)
+
+
+def get_user(user_id):
+    user = get_cached(user_id)
+    return user if user is not None else load(user_id)
+
+
+def invalidate(*user_ids):
+    cache.delete_many([_key(user_id) for user_id in user_ids])
@@ -199,4 +199,35 @@ describe('useDashboard hook', () => {
 
         jest.useRealTimers();
     });
+
+    it('should merge pushed widget sections into the summary', async () => {
+        const widgetUpdates = [
+            { widgetId: 'health_score', section: 'healthScore' as const, data: 91, updatedAt: '2024-01-01T12:00:00Z' },
+        ];
+        const { result, rerender } = renderHook(
+            (props: { widgetUpdates: typeof widgetUpdates | null }) => useDashboard({ widgetUpdates: props.widgetUpdates }),
+            { initialProps: { widgetUpdates: null } }
+        );
+
+        await waitFor(() => {
+            expect(result.current.summary).toEqual(mockDashboardSummary);
+        });
+
+        rerender({ widgetUpdates });
+
+        expect(result.current.healthScore).toBe(91);
+        expect(result.current.summary?.nutrition).toEqual(mockDashboardSummary.nutrition);
+    });
+
+    it('should not poll while the server pushes widgets', () => {
+        jest.useFakeTimers();
+
+        renderHook(() => useDashboard({ autoLoad: false, refreshInterval: 1000, widgetPushEnabled: true }));
+
+        act(() => { jest.advanceTimersByTime(5000); });
+
+        expect(dashboardService.getSummary).not.toHaveBeenCalled();
+
+        jest.useRealTimers();
+    });
 });
@@ -109,6 +109,60 @@ describe('useGlycemiaWebSocket', () => {
     expect(result.current.alert).toEqual({ type: 'hypoglycemia', data: reading });
   });
 
+  it('should apply every message of a glycemia_batch frame', () => {
+    const { result } = renderHook(() =>
+      useGlycemiaWebSocket(TOKEN, WS_URL)
+    );
+    act(() => { mockWsInstance.triggerOpen(); });
+
+    const first = { id: '4', value: 90, measured_at: '2024-01-01T12:00:00Z', source: 'cgm' };
+    const last = { id: '5', value: 60, measured_at: '2024-01-01T12:05:00Z', source: 'cgm' };
+
+    act(() => {
+      mockWsInstance.triggerMessage({
+        type: 'glycemia_batch',
+        user_id: 'auth-1',
+        messages: [
+          { type: 'glycemia_update', data: first },
+          { type: 'glycemia_update', data: last },
+          { type: 'glycemia_alert', alert_type: 'hypoglycemia', data: last },
+        ],
+      });
+    });
+
+    expect(result.current.lastReading).toEqual(last);
+    expect(result.current.alert).toEqual({ type: 'hypoglycemia', data: last });
+  });
+
+  it('should expose widget_update frames and the widget push capability', () => {
+    const { result } = renderHook(() =>
+      useGlycemiaWebSocket(TOKEN, WS_URL)
+    );
+    act(() => { mockWsInstance.triggerOpen(); });
+
+    expect(result.current.widgetPushEnabled).toBe(false);
+
+    act(() => {
+      mockWsInstance.triggerMessage({ type: 'connection_established', widget_updates: true });
+    });
+
+    expect(result.current.widgetPushEnabled).toBe(true);
+
+    const widgets = [
+      { widgetId: 'health_score', section: 'healthScore', data: 82, updatedAt: '2024-01-01T12:00:00Z' },
+    ];
+
+    act(() => {
+      mockWsInstance.triggerMessage({ type: 'widget_update', widgets });
+    });
+
+    expect(result.current.widgetUpdates).toEqual(widgets);
+
+    act(() => { mockWsInstance.triggerClose(1000); });
+
+    expect(result.current.widgetPushEnabled).toBe(false);
+  });
+
   it('should clear alert with clearAlert()', () => {
     const { result } = renderHook(() =>
       useGlycemiaWebSocket(TOKEN, WS_URL)
@@ -202,6 +256,20 @@ describe('useGlycemiaWebSocket', () => {
     expect(((globalThis as any).WebSocket as jest.Mock).mock.calls.length).toBeGreaterThan(callsBefore);
   });
 
+  it('should wait for the server window before reconnecting when rate limited (code 4029)', () => {
+    renderHook(() => useGlycemiaWebSocket(TOKEN, WS_URL));
+    act(() => { mockWsInstance.triggerOpen(); });
+
+    const callsBefore = ((globalThis as any).WebSocket as jest.Mock).mock.calls.length;
+
+    act(() => { mockWsInstance.triggerClose(4029); });
+    act(() => { jest.advanceTimersByTime(3000); });
+    expect(((globalThis as any).WebSocket as jest.Mock).mock.calls.length).toBe(callsBefore);
+
+    act(() => { jest.advanceTimersByTime(60000); });
+    expect(((globalThis as any).WebSocket as jest.Mock).mock.calls.length).toBeGreaterThan(callsBefore);
+  });
+
   it('should close WebSocket on unmount', () => {
     const { unmount } = renderHook(() =>
       useGlycemiaWebSocket(TOKEN, WS_URL)
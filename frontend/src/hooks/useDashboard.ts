@@ -10,12 +10,17 @@ import type {
   DashboardMedicationData,
   DashboardNutritionData,
   DashboardActivityData,
+  DashboardWidgetUpdate,
 } from '../types/dashboard.types';
 
 interface UseDashboardOptions {
   modules?: DashboardModule[] | null;
   refreshInterval?: number;
   autoLoad?: boolean;
+  /** Dernière trame widget_update (useGlycemiaWebSocket) : sections fusionnées dans le summary. */
+  widgetUpdates?: DashboardWidgetUpdate[] | null;
+  /** Widgets poussés par le serveur : le rafraîchissement périodique est suspendu. */
+  widgetPushEnabled?: boolean;
 }
 
 interface UseDashboardReturn {
@@ -65,7 +70,13 @@ interface UseDashboardReturn {
 export const useDashboard = (
   options: UseDashboardOptions = {}
 ): UseDashboardReturn => {
-  const { modules = null, refreshInterval = 0, autoLoad = true } = options;
+  const {
+    modules = null,
+    refreshInterval = 0,
+    autoLoad = true,
+    widgetUpdates = null,
+    widgetPushEnabled = false,
+  } = options;
 
   // États
   const [summary, setSummary] = useState<DashboardSummary | null>(null);
@@ -80,6 +91,7 @@ export const useDashboard = (
     null
   );
   const isMountedRef = useRef(true);
+  const widgetPushLostRef = useRef(false);
 
   const withLoading = useCallback(
     async <T>(fn: () => Promise<T>, onSuccess?: (data: T) => void): Promise<T> => {
@@ -245,9 +257,37 @@ export const useDashboard = (
     // eslint-disable-next-line react-hooks/exhaustive-deps
   }, [autoLoad]);
 
-  // Rafraîchissement automatique
+  // Sections poussées par le serveur : fusion dans le summary, sans requête
   useEffect(() => {
-    if (refreshInterval > 0) {
+    if (!widgetUpdates || widgetUpdates.length === 0) {
+      return;
+    }
+    setSummary(prev =>
+      widgetUpdates.reduce<DashboardSummary>(
+        (next, update) => ({ ...next, [update.section]: update.data }),
+        { ...prev }
+      )
+    );
+  }, [widgetUpdates]);
+
+  // Push rétabli après une coupure : rattraper les mises à jour manquées
+  useEffect(() => {
+    if (!widgetPushEnabled) {
+      widgetPushLostRef.current = summary !== null;
+      return;
+    }
+    if (widgetPushLostRef.current) {
+      widgetPushLostRef.current = false;
+      loadSummary(false).catch(() => {
+        // Ignore les erreurs en arrière-plan
+      });
+    }
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [widgetPushEnabled]);
+
+  // Rafraîchissement automatique, sauf si le serveur pousse les widgets
+  useEffect(() => {
+    if (refreshInterval > 0 && !widgetPushEnabled) {
       refreshIntervalRef.current = setInterval(() => {
         loadSummary(false).catch(() => {
           // Ignore les erreurs en arrière-plan
@@ -262,7 +302,7 @@ export const useDashboard = (
     }
     return undefined;
     // eslint-disable-next-line react-hooks/exhaustive-deps
-  }, [refreshInterval]);
+  }, [refreshInterval, widgetPushEnabled]);
 
   // Cleanup au démontage
   useEffect(() => {
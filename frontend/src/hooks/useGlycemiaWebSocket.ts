@@ -1,5 +1,8 @@
 import { useEffect, useRef, useState, useCallback } from 'react';
 import type { GlycemiaEntry } from '../types/glycemia.types';
+import type { DashboardWidgetUpdate } from '../types/dashboard.types';
+
+const RATE_LIMITED_RECONNECT_MS = 60000;
 
 interface GlycemiaAlert {
   type: 'hypoglycemia' | 'hyperglycemia';
@@ -10,6 +13,10 @@ interface UseGlycemiaWebSocketReturn {
   isConnected: boolean;
   lastReading: GlycemiaEntry | null;
   alert: GlycemiaAlert | null;
+  /** Sections de la dernière trame widget_update. */
+  widgetUpdates: DashboardWidgetUpdate[] | null;
+  /** Le serveur pousse les widgets du dashboard : inutile de les interroger. */
+  widgetPushEnabled: boolean;
   sendPing: () => void;
   clearAlert: () => void;
 }
@@ -27,6 +34,8 @@ export function useGlycemiaWebSocket(
   const [isConnected, setIsConnected] = useState<boolean>(false);
   const [lastReading, setLastReading] = useState<GlycemiaEntry | null>(null);
   const [alert, setAlert] = useState<GlycemiaAlert | null>(null);
+  const [widgetUpdates, setWidgetUpdates] = useState<DashboardWidgetUpdate[] | null>(null);
+  const [widgetPushEnabled, setWidgetPushEnabled] = useState<boolean>(false);
 
   /**
    * Envoie un ping pour vérifier la connexion
@@ -76,27 +85,37 @@ export function useGlycemiaWebSocket(
         try {
           const data = JSON.parse(event.data);
 
-          switch (data.type) {
-            case 'connection_established':
-              break;
-
-            case 'glycemia_update':
-              setLastReading(data.data);
-              break;
-
-            case 'glycemia_alert':
-              setAlert({
-                type: data.alert_type,
-                data: data.data,
-              });
-              break;
-
-            case 'pong':
-              // Réponse au ping
-              break;
-
-            default:
-              break;
+          // glycemia_batch : mises à jour/alertes regroupées par le serveur
+          const messages = data.type === 'glycemia_batch' ? data.messages ?? [] : [data];
+
+          for (const message of messages) {
+            switch (message.type) {
+              case 'connection_established':
+                setWidgetPushEnabled(message.widget_updates === true);
+                break;
+
+              case 'glycemia_update':
+                setLastReading(message.data);
+                break;
+
+              case 'glycemia_alert':
+                setAlert({
+                  type: message.alert_type,
+                  data: message.data,
+                });
+                break;
+
+              case 'widget_update':
+                setWidgetUpdates(message.widgets ?? []);
+                break;
+
+              case 'pong':
+                // Réponse au ping
+                break;
+
+              default:
+                break;
+            }
           }
         } catch {
           // Ignore malformed messages
@@ -105,6 +124,7 @@ export function useGlycemiaWebSocket(
 
       ws.current.onclose = event => {
         setIsConnected(false);
+        setWidgetPushEnabled(false);
 
         // Don't reconnect on authentication failure (code 4001)
         // or normal closure (code 1000)
@@ -112,16 +132,19 @@ export function useGlycemiaWebSocket(
           return;
         }
 
-        // Reconnexion automatique après 3 secondes pour autres erreurs
+        // Reconnexion automatique après 3 secondes pour autres erreurs ;
+        // trop de reconnexions (code 4029) : attendre la fin de la fenêtre serveur
         if (accessToken) {
+          const delay = event.code === 4029 ? RATE_LIMITED_RECONNECT_MS : 3000;
           reconnectTimeout.current = setTimeout(() => {
             connect();
-          }, 3000);
+          }, delay);
         }
       };
 
       ws.current.onerror = () => {
         setIsConnected(false);
+        setWidgetPushEnabled(false);
       };
     } catch {
       // Connection failed silently
@@ -149,6 +172,8 @@ export function useGlycemiaWebSocket(
     isConnected,
     lastReading,
     alert,
+    widgetUpdates,
+    widgetPushEnabled,
     sendPing,
     clearAlert,
   };
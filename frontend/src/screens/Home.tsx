@@ -32,11 +32,23 @@ interface HomeScreenProps {
 }
 
 export default function HomeScreen({ navigation }: HomeScreenProps) {
+  const [accessToken, setAccessToken] = useState<string | null>(null);
+  const [wsEnabled, setWsEnabled] = useState(false);
+
+  // WebSocket pour les mises à jour temps réel (only connect when token is available)
+  const { lastReading, alert, widgetUpdates, widgetPushEnabled } = useGlycemiaWebSocket(
+    wsEnabled ? accessToken : null,
+    WS_URL
+  );
+
+  // Widgets poussés sur le WebSocket ; interrogation toutes les 30 s sinon
   const { glucose, activity, healthScore, refreshing, refresh } =
     useDashboard({
       modules: ['glucose', 'alerts', 'nutrition', 'activity'],
       refreshInterval: 30000,
       autoLoad: true,
+      widgetUpdates,
+      widgetPushEnabled,
     });
 
   const { todayIntakes } = useMedications();
@@ -63,8 +75,6 @@ export default function HomeScreen({ navigation }: HomeScreenProps) {
     };
   }, [todayIntakes]);
 
-  const [accessToken, setAccessToken] = useState<string | null>(null);
-  const [wsEnabled, setWsEnabled] = useState(false);
   const [currentGlucoseEntry, setCurrentGlucoseEntry] = useState<GlycemiaEntry | null>(null);
 
   const fetchCurrentGlucose = useCallback(async () => {
@@ -88,12 +98,6 @@ export default function HomeScreen({ navigation }: HomeScreenProps) {
     await Promise.all([refresh(), fetchCurrentGlucose()]);
   }, [refresh, fetchCurrentGlucose]);
 
-  // WebSocket pour les mises à jour temps réel (only connect when token is available)
-  const { lastReading, alert } = useGlycemiaWebSocket(
-    wsEnabled ? accessToken : null,
-    WS_URL
-  );
-
   // Priorité : WebSocket > glycemia/current (direct DB) > dashboard summary
   const realtimeGlucose = useMemo(() => {
     const wsTs = lastReading?.measured_at ? new Date(lastReading.measured_at).getTime() : 0;
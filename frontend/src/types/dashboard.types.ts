@@ -58,6 +58,16 @@ export interface DashboardSummary {
   last_updated?: string;
 }
 
+export type DashboardSection = Exclude<keyof DashboardSummary, 'last_updated'>;
+
+/** Section poussée par le serveur (trame WebSocket widget_update). */
+export interface DashboardWidgetUpdate {
+  widgetId: string;
+  section: DashboardSection;
+  data: DashboardSummary[DashboardSection];
+  updatedAt: string;
+}
+
 export interface DashboardWidget {
   id: string;
   type: